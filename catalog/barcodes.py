@@ -0,0 +1,106 @@
+"""Helpers for EAN/GTIN barcodes stored in ``ProductBarcode``."""
+
+import re
+from typing import Iterable, Optional
+
+from p_v_App.models import ProductBarcode, Products
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+# Valor usado pela SEFAZ quando o item não possui GTIN.
+NO_GTIN_MARKERS = {'SEM GTIN', 'SEMGTIN'}
+
+
+def normalize_barcode(value) -> str:
+    """Return ``value`` without spaces, or ``''`` for empty/"SEM GTIN" values."""
+    text = re.sub(r'\s+', '', str(value or ''))
+    if not text or text.upper() in NO_GTIN_MARKERS:
+        return ''
+    return text
+
+
+def is_valid_gtin(value: str) -> bool:
+    """Validate the length and check digit of an EAN-8/UPC-A/EAN-13/GTIN-14."""
+    if not value.isdigit() or len(value) not in GTIN_LENGTHS:
+        return False
+    digits = [int(char) for char in value]
+    check_digit = digits.pop()
+    weighted = sum(
+        digit * (3 if index % 2 == 0 else 1)
+        for index, digit in enumerate(reversed(digits))
+    )
+    return (10 - weighted % 10) % 10 == check_digit
+
+
+def find_product_by_barcode(company, value) -> Optional[Products]:
+    """Resolve a scanned code using the ``(company, barcode)`` unique index.
+
+    Falls back to the product code so items without a registered barcode can
+    still be scanned from printed labels.
+    """
+    barcode = normalize_barcode(value)
+    if not barcode:
+        return None
+
+    match = (
+        ProductBarcode.objects.filter(company=company, barcode=barcode)
+        .select_related('product')
+        .first()
+    )
+    if match:
+        return match.product
+    return Products.objects.filter(company=company, code=barcode).first()
+
+
+def resolve_barcodes(company, values: Iterable) -> dict[str, int]:
+    """Bulk version of ``find_product_by_barcode``: ``{code: product_id}``.
+
+    Two queries for any number of codes (barcodes, then product codes for
+    the ones left); unknown codes are missing from the result.
+    """
+    codes = {normalize_barcode(value) for value in values} - {''}
+    if not codes:
+        return {}
+    resolved = dict(
+        ProductBarcode.objects.filter(company=company, barcode__in=codes)
+        .values_list('barcode', 'product_id')
+    )
+    missing = codes - resolved.keys()
+    if missing:
+        resolved.update(
+            Products.objects.filter(company=company, code__in=missing)
+            .values_list('code', 'id')
+        )
+    return resolved
+
+
+def assign_barcodes(product: Products, values: Iterable) -> list[str]:
+    """Register ``values`` as barcodes of ``product``.
+
+    Returns the codes that could not be assigned because they already belong to
+    another product of the same company.
+    """
+    barcodes = {normalize_barcode(value) for value in values}
+    barcodes.discard('')
+    if not barcodes:
+        return []
+
+    existing = dict(
+        ProductBarcode.objects.filter(
+            company_id=product.company_id, barcode__in=barcodes
+        ).values_list('barcode', 'product_id')
+    )
+    conflicts = sorted(
+        code for code, owner_id in existing.items() if owner_id != product.pk
+    )
+    ProductBarcode.objects.bulk_create(
+        [
+            ProductBarcode(
+                company_id=product.company_id,
+                product=product,
+                barcode=code,
+            )
+            for code in sorted(barcodes - set(existing))
+        ],
+        ignore_conflicts=True,
+    )
+    return conflicts
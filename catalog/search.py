@@ -0,0 +1,254 @@
+"""Product search backends used by the catalog, POS, comandas and stock screens.
+
+Two backends share the same normalization (lowercase, accents removed):
+
+* ``postgres``: filters on ``immutable_unaccent(lower(...))`` expressions that
+  are covered by the trigram GIN indexes created in migration 0012.
+* ``memory``: an in-process prefix/trigram index per company, used on SQLite
+  and other local setups where those indexes do not exist.
+"""
+
+import heapq
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import CharField, Func, Q
+from django.db.models.functions import Lower
+
+from p_v_App.models import Products
+
+INDEX_TTL_SECONDS = 60
+MIN_TRIGRAM_LENGTH = 3
+
+
+def normalize_search_text(value) -> str:
+    """Lowercase ``value`` and strip accents so "Açaí" matches "acai"."""
+    normalized = unicodedata.normalize('NFKD', str(value or ''))
+    ascii_text = normalized.encode('ASCII', 'ignore').decode('ASCII')
+    return ' '.join(ascii_text.lower().split())
+
+
+def get_search_backend() -> str:
+    backend = getattr(settings, 'PRODUCT_SEARCH_BACKEND', 'auto')
+    if backend == 'auto':
+        return 'postgres' if connection.vendor == 'postgresql' else 'memory'
+    return backend
+
+
+class ImmutableUnaccent(Func):
+    """``immutable_unaccent()`` wrapper created by migration 0012 (PostgreSQL only)."""
+
+    function = 'immutable_unaccent'
+    output_field = CharField()
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ProductSearchIndex:
+    """In-memory prefix/trigram index over the products of one company."""
+
+    def __init__(self, rows):
+        self.entries = []
+        self.trigrams: dict[str, set[int]] = {}
+        self.prefixes: dict[str, set[int]] = {}
+
+        for row in rows:
+            name = normalize_search_text(row['name'])
+            code = normalize_search_text(row['code'])
+            haystack = f'{name} {code}'
+            position = len(self.entries)
+            self.entries.append((name, code, haystack, row))
+
+            for gram in _trigrams(haystack):
+                self.trigrams.setdefault(gram, set()).add(position)
+            for token in haystack.split():
+                for size in range(1, MIN_TRIGRAM_LENGTH):
+                    if len(token) >= size:
+                        self.prefixes.setdefault(token[:size], set()).add(position)
+
+        self.built_at = time.monotonic()
+
+    def _candidates(self, token: str) -> set[int]:
+        if len(token) < MIN_TRIGRAM_LENGTH:
+            return set(self.prefixes.get(token, ()))
+
+        posting_lists = []
+        for gram in _trigrams(token):
+            postings = self.trigrams.get(gram)
+            if not postings:
+                return set()
+            posting_lists.append(postings)
+        posting_lists.sort(key=len)
+        candidates = set(posting_lists[0])
+        for postings in posting_lists[1:]:
+            candidates &= postings
+            if not candidates:
+                break
+        return candidates
+
+    def search(self, query: str, limit: int | None = 20, predicate=None) -> list[dict]:
+        tokens = normalize_search_text(query).split()
+        if not tokens:
+            return []
+
+        candidates = None
+        for token in sorted(tokens, key=len, reverse=True):
+            found = self._candidates(token)
+            candidates = found if candidates is None else candidates & found
+            if not candidates:
+                return []
+
+        phrase = ' '.join(tokens)
+        word_start = f' {tokens[0]}'
+        ranked = []
+        for position in candidates:
+            name, code, haystack, row = self.entries[position]
+            for token in tokens:
+                if len(token) >= MIN_TRIGRAM_LENGTH:
+                    if token not in haystack:
+                        break
+                elif f' {token}' not in f' {haystack}':
+                    break
+            else:
+                if predicate is not None and not predicate(row):
+                    continue
+
+                if code == phrase:
+                    rank = 0
+                elif name.startswith(phrase) or code.startswith(phrase):
+                    rank = 1
+                elif word_start in f' {haystack}':
+                    rank = 2
+                else:
+                    rank = 3
+                ranked.append((rank, name, position))
+
+        if limit is None:
+            ranked.sort()
+        else:
+            ranked = heapq.nsmallest(limit, ranked)
+        return [self.entries[position][-1] for _, _, position in ranked]
+
+
+_INDEX_FIELDS = (
+    'id',
+    'code',
+    'name',
+    'price',
+    'status',
+    'is_combo',
+    'category_id__name',
+)
+_indexes: dict[int, ProductSearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_company_index(company) -> ProductSearchIndex:
+    company_id = getattr(company, 'pk', company)
+    index = _indexes.get(company_id)
+    if index is not None and time.monotonic() - index.built_at < INDEX_TTL_SECONDS:
+        return index
+
+    with _indexes_lock:
+        index = _indexes.get(company_id)
+        if index is None or time.monotonic() - index.built_at >= INDEX_TTL_SECONDS:
+            rows = Products.objects.filter(
+                company_id=company_id).values(*_INDEX_FIELDS)
+            index = ProductSearchIndex(rows.iterator(chunk_size=2000))
+            _indexes[company_id] = index
+    return index
+
+
+def invalidate_company_index(company_id) -> None:
+    with _indexes_lock:
+        _indexes.pop(company_id, None)
+
+
+def _serialize_row(row) -> dict:
+    return {
+        'id': row['id'],
+        'code': row['code'],
+        'name': row['name'],
+        'price': float(row['price'] or 0),
+        'status': row['status'],
+        'is_combo': row['is_combo'],
+        'category': row['category_id__name'],
+    }
+
+
+def _postgres_condition(query: str) -> Q:
+    condition = Q()
+    for token in normalize_search_text(query).split():
+        condition &= Q(_search_name__contains=token) | Q(
+            _search_code__contains=token)
+    return condition
+
+
+def _annotate_search_fields(queryset, name_field: str, code_field: str):
+    return queryset.annotate(
+        _search_name=ImmutableUnaccent(Lower(name_field)),
+        _search_code=ImmutableUnaccent(Lower(code_field)),
+    )
+
+
+def search_products(
+    company,
+    query: str,
+    *,
+    limit: int = 20,
+    active_only: bool = False,
+    include_combos: bool = True,
+) -> list[dict]:
+    """Return up to ``limit`` products of ``company`` matching ``query``."""
+    if not normalize_search_text(query):
+        return []
+
+    if get_search_backend() == 'postgres':
+        queryset = Products.objects.filter(company=company)
+        if active_only:
+            queryset = queryset.filter(status=1)
+        if not include_combos:
+            queryset = queryset.filter(is_combo=False)
+        queryset = _annotate_search_fields(queryset, 'name', 'code').filter(
+            _postgres_condition(query)
+        )
+        rows = queryset.order_by('name').values(*_INDEX_FIELDS)[:limit]
+        return [_serialize_row(row) for row in rows]
+
+    def predicate(row):
+        if active_only and row['status'] != 1:
+            return False
+        if not include_combos and row['is_combo']:
+            return False
+        return True
+
+    rows = get_company_index(company).search(
+        query, limit=limit, predicate=predicate)
+    return [_serialize_row(row) for row in rows]
+
+
+def filter_by_product_search(queryset, company, query: str, *, product_field: str = ''):
+    """Restrict ``queryset`` to rows whose product matches ``query``.
+
+    ``product_field`` is the lookup path from the queryset model to
+    ``Products`` (``''`` for products themselves, ``'produto'`` for stock).
+    """
+    if not normalize_search_text(query):
+        return queryset
+
+    prefix = f'{product_field}__' if product_field else ''
+    if get_search_backend() == 'postgres':
+        return _annotate_search_fields(
+            queryset, f'{prefix}name', f'{prefix}code'
+        ).filter(_postgres_condition(query))
+
+    product_ids = [
+        row['id'] for row in get_company_index(company).search(query, limit=None)
+    ]
+    id_lookup = f'{product_field}_id__in' if product_field else 'id__in'
+    return queryset.filter(**{id_lookup: product_ids})
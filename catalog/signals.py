@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from catalog.search import invalidate_company_index
+from p_v_App.models import Products
+
+
+@receiver(post_save, sender=Products)
+@receiver(post_delete, sender=Products)
+def refresh_product_search_index(sender, instance, **kwargs):
+    invalidate_company_index(instance.company_id)
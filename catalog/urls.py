@@ -21,6 +21,7 @@ urlpatterns = [
         name='download-product-template',
     ),
     path('products', views.products, name='product-page'),
+    path('products/search', views.product_search, name='product-search'),
     path('manage_products', views.manage_products, name='manage_products-page'),
     path('test', views.test, name='test-page'),
     path('save_product', views.save_product, name='save-product-page'),
@@ -6,10 +6,12 @@ from decimal import Decimal, InvalidOperation
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.db.models import Avg, ProtectedError, Q, Sum
+from django.db.models import Avg, ProtectedError, Sum
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import redirect, render
 
+from catalog.barcodes import assign_barcodes, normalize_barcode
+from catalog.search import filter_by_product_search, search_products
 from core.utils import get_user_company
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font
@@ -517,13 +519,13 @@ def upload_products(request):
                 product.description = description
                 product.category_id = category
                 if price_value is not None:
-                    product.price = float(price_value)
+                    product.price = price_value
                 elif product.price is None:
-                    product.price = 0.0
+                    product.price = Decimal('0.00')
                 if cost_value is not None:
-                    product.custo = float(cost_value)
+                    product.custo = cost_value
                 elif product.custo is None:
-                    product.custo = 0.0
+                    product.custo = Decimal('0.00')
                 product.status = status_value
                 product.save()
                 updated_count += 1
@@ -534,8 +536,8 @@ def upload_products(request):
                     'name': name,
                     'description': description,
                     'category_id': category,
-                    'price': float(price_value) if price_value is not None else 0.0,
-                    'custo': float(cost_value) if cost_value is not None else 0.0,
+                    'price': price_value if price_value is not None else Decimal('0.00'),
+                    'custo': cost_value if cost_value is not None else Decimal('0.00'),
                     'status': status_value,
                 }
                 Products.objects.create(**product_defaults)
@@ -659,8 +661,7 @@ def products(request):
     base_qs = Products.objects.filter(
         company=user_company).select_related('category_id')
     if query:
-        base_qs = base_qs.filter(
-            Q(name__icontains=query) | Q(code__icontains=query))
+        base_qs = filter_by_product_search(base_qs, user_company, query)
     if category_filter.isnumeric():
         base_qs = base_qs.filter(category_id=int(category_filter))
     if status_filter in ['0', '1']:
@@ -696,6 +697,29 @@ def products(request):
     return render(request, 'catalog/products.html', context)
 
 
+@login_required
+def product_search(request):
+    user_company = get_user_company(request)
+    if not user_company:
+        return JsonResponse(
+            {'status': 'failed',
+             'msg': 'Usuário não está associado a nenhuma empresa.'}
+        )
+
+    query = request.GET.get('q', '').strip()
+    limit = request.GET.get('limit', '20').strip()
+    limit = min(int(limit), 50) if limit.isnumeric() and int(limit) > 0 else 20
+
+    results = search_products(
+        user_company,
+        query,
+        limit=limit,
+        active_only=request.GET.get('status', '').strip() == '1',
+        include_combos=request.GET.get('combos', '1').strip() != '0',
+    )
+    return JsonResponse({'status': 'success', 'q': query, 'results': results})
+
+
 @login_required
 def manage_products(request):
     user_company = get_user_company(request)
@@ -706,15 +730,17 @@ def manage_products(request):
 
     product = None
     combo_items = []
+    barcodes = []
     categories = Category.objects.filter(status=1, company=user_company).all()
     product_id = request.GET.get('id', '').strip()
     if product_id.isnumeric() and int(product_id) > 0:
         product = (
             Products.objects.filter(id=product_id, company=user_company)
-            .prefetch_related('combo_items__component')
+            .prefetch_related('combo_items__component', 'barcodes')
             .first()
         )
         if product:
+            barcodes = [item.barcode for item in product.barcodes.all()]
             combo_items = [
                 {
                     'component_id': item.component_id,
@@ -735,6 +761,7 @@ def manage_products(request):
         'categories': categories,
         'component_products': component_products,
         'combo_items': combo_items,
+        'barcodes': barcodes,
     }
     return render(request, 'catalog/manage_product.html', context)
 
@@ -777,14 +804,14 @@ def save_product(request):
     combo_max_flavors = (data.get('combo_max_flavors') or '').strip()
 
     try:
-        price_value = float(price)
-    except ValueError:
+        price_value = Decimal(price)
+    except InvalidOperation:
         resp['msg'] = 'Informe um preço válido.'
         return HttpResponse(json.dumps(resp), content_type='application/json')
 
     try:
-        cost_value = float(cost)
-    except ValueError:
+        cost_value = Decimal(cost)
+    except InvalidOperation:
         resp['msg'] = 'Informe um custo válido.'
         return HttpResponse(json.dumps(resp), content_type='application/json')
 
@@ -832,6 +859,20 @@ def save_product(request):
         resp['msg'] = str(exc)
         return HttpResponse(json.dumps(resp), content_type='application/json')
 
+    if 'barcodes' in data:
+        barcode_values = {
+            normalize_barcode(value)
+            for value in re.split(r'[,;\n]', data.get('barcodes', ''))
+        }
+        barcode_values.discard('')
+        product_instance.barcodes.exclude(barcode__in=barcode_values).delete()
+        conflicts = assign_barcodes(product_instance, barcode_values)
+        if conflicts:
+            resp['msg'] = (
+                'Produto salvo, mas os códigos de barras a seguir já pertencem a outro produto: '
+                + ', '.join(conflicts)
+            )
+
     if is_combo:
         component_ids = data.getlist('combo_component_id[]')
         component_qtys = data.getlist('combo_component_qty[]')
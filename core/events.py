@@ -0,0 +1,155 @@
+"""Realtime events for the floor, kitchen and cashier screens.
+
+Model signals (``core/signals.py``) publish compact deltas after the
+transaction commits; the ``/eventos/`` SSE view streams them to the browsers of
+the same company.
+
+Two transports, selected by ``settings.REALTIME_EVENTS_BACKEND``:
+
+* ``memory``: in-process fan-out. Enough for a single ASGI worker.
+* ``postgres``: ``pg_notify`` on publish and one ``LISTEN`` connection per
+  worker process, so events reach subscribers on every worker.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'pv_events'
+SUBSCRIBER_QUEUE_SIZE = 200
+
+_sequence = itertools.count(1)
+
+
+def get_events_backend() -> str:
+    return getattr(settings, 'REALTIME_EVENTS_BACKEND', 'memory')
+
+
+class EventBroker:
+    """Fan-out of events to the asyncio queues subscribed to each company.
+
+    ``dispatch`` may be called from any thread (sync views run in a thread
+    pool under ASGI); delivery is scheduled on the subscriber's event loop.
+    """
+
+    def __init__(self):
+        self._subscribers: dict[int, set] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, company_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(company_id, set()).add(entry)
+        return queue
+
+    def unsubscribe(self, company_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            entries = self._subscribers.get(company_id, set())
+            for entry in [entry for entry in entries if entry[1] is queue]:
+                entries.discard(entry)
+            if not entries:
+                self._subscribers.pop(company_id, None)
+
+    def subscriber_count(self, company_id: int) -> int:
+        return len(self._subscribers.get(company_id, ()))
+
+    def dispatch(self, company_id: int, event: dict) -> None:
+        with self._lock:
+            entries = list(self._subscribers.get(company_id, ()))
+        for loop, queue in entries:
+            try:
+                loop.call_soon_threadsafe(_deliver, queue, event)
+            except RuntimeError:
+                # Loop já encerrado: a assinatura será removida pelo stream.
+                continue
+
+
+def _deliver(queue: asyncio.Queue, event: dict) -> None:
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # Cliente lento: descarta a fila e pede para recarregar o estado.
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({'type': 'resync', 'data': {}})
+
+
+broker = EventBroker()
+
+
+def build_event(event_type: str, data: dict) -> dict:
+    return {
+        'id': f'{int(time.time() * 1000)}-{next(_sequence)}',
+        'type': event_type,
+        'data': data,
+    }
+
+
+def publish(company_id: int, event_type: str, data: dict) -> None:
+    """Send an event to every subscriber of ``company_id`` right away."""
+    if not company_id:
+        return
+    event = build_event(event_type, data)
+    if get_events_backend() == 'postgres' and connection.vendor == 'postgresql':
+        payload = json.dumps(
+            {'company_id': company_id, 'event': event}, cls=DjangoJSONEncoder)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, payload])
+        return
+    broker.dispatch(company_id, json.loads(json.dumps(event, cls=DjangoJSONEncoder)))
+
+
+def publish_on_commit(company_id: int, event_type: str, data: dict) -> None:
+    """Publish after the current transaction commits (immediately in autocommit)."""
+    transaction.on_commit(lambda: publish(company_id, event_type, data))
+
+
+_listener_lock = threading.Lock()
+_listener_started = False
+
+
+def ensure_listener() -> None:
+    """Start this worker's ``LISTEN`` thread when the postgres backend is on."""
+    global _listener_started
+    if get_events_backend() != 'postgres' or _listener_started:
+        return
+    with _listener_lock:
+        if _listener_started:
+            return
+        thread = threading.Thread(
+            target=_listen_forever, name='pv-events-listener', daemon=True)
+        thread.start()
+        _listener_started = True
+
+
+def _listen_forever() -> None:
+    import psycopg
+
+    params = connection.get_connection_params()
+    params.pop('cursor_factory', None)
+    params.pop('context', None)
+    while True:
+        try:
+            with psycopg.connect(autocommit=True, **params) as conn:
+                conn.execute(f'LISTEN {NOTIFY_CHANNEL}')
+                for notify in conn.notifies():
+                    message = json.loads(notify.payload)
+                    broker.dispatch(message['company_id'], message['event'])
+        except Exception:  # noqa: BLE001
+            logger.exception('Conexão LISTEN de eventos perdida; reconectando.')
+            time.sleep(2)
+
+
+def format_sse(event: dict) -> str:
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder)
+    return f"id: {event.get('id', '')}\nevent: {event['type']}\ndata: {data}\n\n"
@@ -0,0 +1,83 @@
+"""Incremental reader for large JSON fixtures (``dumpdata`` style arrays).
+
+``iter_json_array`` yields the elements of a top-level JSON array one at a
+time, decoding from a bounded text buffer instead of loading the whole file
+with ``json.load``. Memory stays proportional to the largest element.
+"""
+
+import json
+
+CHUNK_SIZE = 1 << 16
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(handle, chunk_size=CHUNK_SIZE):
+    """Yield each element of the top-level array read from ``handle``.
+
+    Raises ``ValueError`` when the document is not a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = handle.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    fill()
+    if buffer.startswith('\ufeff'):
+        pos = 1
+    skip_whitespace()
+    if pos >= len(buffer) or buffer[pos] != '[':
+        raise ValueError('O arquivo JSON deve conter uma lista de objetos.')
+    pos += 1
+
+    expect_value = True
+    first = True
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError('Fim inesperado do arquivo JSON.')
+        char = buffer[pos]
+        if char == ']':
+            if expect_value and not first:
+                raise ValueError('JSON inválido: vírgula antes de "]".')
+            return
+        if char == ',' and not expect_value:
+            pos += 1
+            expect_value = True
+            continue
+        if not expect_value:
+            raise ValueError(f'JSON inválido: esperado "," ou "]" antes de {char!r}.')
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Elemento cortado no fim do buffer: lê mais e tenta de novo.
+                if eof:
+                    raise
+                fill()
+                continue
+            if end == len(buffer) and not eof:
+                # Números podem continuar no próximo bloco ("12" + "34").
+                fill()
+                continue
+            break
+        pos = end
+        expect_value = False
+        first = False
+        yield value
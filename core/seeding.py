@@ -0,0 +1,472 @@
+"""Synthetic tenants for load tests and benchmarks.
+
+``seed_company`` builds one company the size of a real store: catalog with
+barcodes and combos, stock, kitchen stations, waiters, tables with open
+comandas, pedidos on the board, one cash session per day and a year of
+sales with their payments, cash movements and stock ledger rows. Rows are
+bulk-inserted so a ``large`` tenant takes seconds, and a fixed ``seed`` gives
+the same data on every run.
+"""
+
+import random
+import uuid
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from inventory.ledger import take_stock_snapshot
+from p_v_App.models import (
+    CashMovement,
+    CashRegister,
+    CashRegisterSession,
+    Category,
+    Estoque,
+    Garcom,
+    KitchenStation,
+    Pedido,
+    PedidoItem,
+    ProductBarcode,
+    ProductComboItem,
+    Products,
+    SaleComboItem,
+    SalePayment,
+    Sales,
+    StockLocation,
+    StockMovement,
+    StockSnapshot,
+    Table,
+    TableOrder,
+    TableOrderItem,
+    salesItems,
+)
+from p_v_App.models_tenant import Company, UserProfile
+
+DATASET_SIZES = {
+    'small': {'products': 60, 'tables': 10, 'sales_per_day': 10, 'pedidos': 20},
+    'medium': {'products': 300, 'tables': 30, 'sales_per_day': 50, 'pedidos': 60},
+    'large': {'products': 1500, 'tables': 60, 'sales_per_day': 200, 'pedidos': 150},
+}
+
+CATEGORY_NAMES = (
+    ('Bebidas', 'Bar'),
+    ('Cervejas', 'Bar'),
+    ('Drinks', 'Bar'),
+    ('Porções', 'Cozinha'),
+    ('Lanches', 'Cozinha'),
+    ('Pratos', 'Cozinha'),
+    ('Sobremesas', 'Cozinha'),
+    ('Mercearia', None),
+)
+PAYMENT_METHODS = ('PIX', 'DINHEIRO', 'DEBITO', 'CREDITO')
+PAYMENT_WEIGHTS = (40, 15, 25, 20)
+CENTS = Decimal('0.01')
+BATCH_SIZE = 1000
+
+
+def _gtin13(number: int) -> str:
+    """EAN-13 with a valid check digit in the 789 (Brazil) range."""
+    body = f'789{number:09d}'
+    weighted = sum(
+        int(digit) * (3 if index % 2 == 0 else 1)
+        for index, digit in enumerate(reversed(body))
+    )
+    return f'{body}{(10 - weighted % 10) % 10}'
+
+
+def _money(value) -> Decimal:
+    return Decimal(value).quantize(CENTS)
+
+
+def _seed_catalog(company, rng, product_count):
+    stations = {
+        name: KitchenStation.objects.create(company=company, name=name)
+        for name in {station for _, station in CATEGORY_NAMES if station}
+    }
+    categories = [
+        Category.objects.create(
+            company=company,
+            name=name,
+            description=f'Categoria {name}',
+            kitchen_station=stations.get(station),
+        )
+        for name, station in CATEGORY_NAMES
+    ]
+
+    combo_count = max(1, product_count // 20)
+    products = []
+    for idx in range(product_count):
+        category = categories[idx % len(categories)]
+        price = _money(rng.uniform(3, 90))
+        products.append(
+            Products(
+                company=company,
+                code=f'P{idx + 1:05d}',
+                category_id=category,
+                name=f'{category.name} {idx + 1}',
+                description='',
+                price=price,
+                custo=_money(price * Decimal(str(rng.uniform(0.3, 0.6)))),
+                is_combo=idx >= product_count - combo_count,
+                combo_total_quantity=Decimal('3') if idx >= product_count - combo_count else None,
+            )
+        )
+    products = Products.objects.bulk_create(products, batch_size=BATCH_SIZE)
+    simple = [product for product in products if not product.is_combo]
+    combos = [product for product in products if product.is_combo]
+
+    ProductBarcode.objects.bulk_create(
+        [
+            ProductBarcode(company=company, product=product, barcode=_gtin13(company.pk * 100000 + idx))
+            for idx, product in enumerate(simple)
+            if idx % 2 == 0
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    ProductComboItem.objects.bulk_create(
+        [
+            ProductComboItem(
+                company=company, combo=combo, component=component, quantity=Decimal('1'))
+            for combo in combos
+            for component in rng.sample(simple, k=min(3, len(simple)))
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    location = StockLocation.default_for(company)
+    Estoque.objects.bulk_create(
+        [
+            Estoque(
+                company=company,
+                location=location,
+                produto=product,
+                categoria=product.category_id,
+                quantidade=Decimal(rng.randint(50, 500)),
+                preco=product.price,
+                custo=product.custo,
+            )
+            for product in simple
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    return simple, combos
+
+
+def _seed_floor(company, rng, table_count, simple):
+    waiters = Garcom.objects.bulk_create(
+        [
+            Garcom(company=company, name=f'Garçom {idx + 1}', code=f'G{idx + 1:02d}')
+            for idx in range(max(2, table_count // 8))
+        ]
+    )
+    tables = Table.objects.bulk_create(
+        [
+            Table(company=company, number=number, capacity=rng.choice((2, 4, 4, 6)))
+            for number in range(1, table_count + 1)
+        ]
+    )
+
+    # Metade das mesas com comanda aberta, como num horário de movimento.
+    open_tables = tables[: max(1, table_count // 2)]
+    now = timezone.now()
+    orders = []
+    for table in open_tables:
+        waiter = rng.choice(waiters)
+        table.waiter = waiter
+        orders.append(
+            TableOrder(
+                company=company,
+                table=table,
+                waiter=waiter,
+                waiter_name=waiter.name,
+                people_count=rng.randint(1, table.capacity),
+                opened_at=now - timedelta(minutes=rng.randint(5, 180)),
+            )
+        )
+    Table.objects.bulk_update(open_tables, ['waiter'])
+    orders = TableOrder.objects.bulk_create(orders)
+
+    stations = dict(
+        Category.objects.filter(company=company).values_list('pk', 'kitchen_station_id'))
+    statuses = [choice for choice, _ in TableOrderItem.PrepStatus.choices]
+    items = []
+    for order in orders:
+        for _ in range(rng.randint(2, 12)):
+            product = rng.choice(simple)
+            quantity = Decimal(rng.randint(1, 3))
+            items.append(
+                TableOrderItem(
+                    order=order,
+                    product=product,
+                    quantity=quantity,
+                    unit_price=product.price,
+                    total=_money(product.price * quantity),
+                    station_id=stations.get(product.category_id_id),
+                    prep_status=rng.choices(statuses, weights=(2, 1, 1, 6))[0],
+                    added_at=order.opened_at,
+                )
+            )
+    TableOrderItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+    for order in orders:
+        order.recalculate_totals(commit=True)
+    return tables, orders, len(items)
+
+
+def _seed_pedidos(company, rng, count, simple):
+    now = timezone.now()
+    pedidos = []
+    for idx in range(count):
+        pedidos.append(
+            Pedido(
+                company=company,
+                code=f'PED{idx + 1:05d}',
+                customer_name=f'Cliente {idx + 1}',
+                forma_pagamento=rng.choices(PAYMENT_METHODS, weights=PAYMENT_WEIGHTS)[0],
+                endereco_entrega=f'Rua {rng.randint(1, 300)}, {rng.randint(1, 999)}',
+                taxa_entrega=Decimal('5.00'),
+                status=rng.choice(('pendente', 'em_rota', 'entregue')),
+                date_added=now - timedelta(minutes=rng.randint(1, 600)),
+            )
+        )
+    pedidos = Pedido.objects.bulk_create(pedidos, batch_size=BATCH_SIZE)
+
+    items = []
+    for pedido in pedidos:
+        sub_total = Decimal('0')
+        for product in rng.sample(simple, k=min(len(simple), rng.randint(1, 4))):
+            qty = Decimal(rng.randint(1, 3))
+            total = _money(product.price * qty)
+            sub_total += total
+            items.append(
+                PedidoItem(
+                    pedido=pedido, product=product, price=product.price, qty=qty, total=total,
+                    unit_cost=product.custo))
+        pedido.sub_total = sub_total
+        pedido.grand_total = sub_total + pedido.taxa_entrega
+        pedido.tendered_amount = pedido.grand_total
+    PedidoItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+    Pedido.objects.bulk_update(
+        pedidos, ['sub_total', 'grand_total', 'tendered_amount'], batch_size=BATCH_SIZE)
+    return len(pedidos)
+
+
+def _seed_sales(company, user, rng, *, days, per_day, simple, combos, tables):
+    """A year (``days``) of closed cash sessions with their sales."""
+    today = timezone.localdate()
+    tz = timezone.get_current_timezone()
+    components = {}
+    for combo_item in ProductComboItem.objects.filter(combo__in=combos):
+        components.setdefault(combo_item.combo_id, []).append(combo_item)
+
+    register = CashRegister.default_for(company)
+    sessions = CashRegisterSession.objects.bulk_create(
+        [
+            CashRegisterSession(
+                company=company,
+                register=register,
+                opened_by=user,
+                closed_by=None if offset == 0 else user,
+                opening_amount=Decimal('100.00'),
+                status=(
+                    CashRegisterSession.Status.OPEN if offset == 0
+                    else CashRegisterSession.Status.CLOSED),
+                opened_at=datetime.combine(today - timedelta(days=offset), time(9), tz),
+                closed_at=(
+                    None if offset == 0
+                    else datetime.combine(today - timedelta(days=offset), time(23), tz)),
+            )
+            for offset in range(days, -1, -1)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    next_code = {}
+    counts = {'sales': 0, 'sale_items': 0, 'stock_movements': 0}
+    sales, lines = [], []
+    location = StockLocation.default_for(company)
+    # Saldo do ledger relativo à abertura (até aqui só saídas); a fotografia
+    # de abertura e o UPDATE no final somam o estoque inicial.
+    consumed = {}
+
+    def consume(product_id, qty):
+        consumed[product_id] = consumed.get(product_id, Decimal('0')) + qty
+        return consumed[product_id]
+
+    def stock_lines(sale_lines):
+        for product, qty in sale_lines:
+            if product.is_combo:
+                for combo_item in components.get(product.pk, ()):
+                    yield combo_item.component_id, combo_item.quantity * qty
+            else:
+                yield product.pk, qty
+
+    def flush():
+        created = Sales.objects.bulk_create(sales, batch_size=BATCH_SIZE)
+        sale_items, payments, movements, combo_rows = [], [], [], []
+        for sale, (session, sale_lines) in zip(created, lines):
+            for product, qty in sale_lines:
+                sale_items.append(
+                    salesItems(
+                        sale_id=sale, product_id=product, qty=qty, price=product.price,
+                        total=_money(product.price * qty), unit_cost=product.custo))
+            payments.append(
+                SalePayment(
+                    company=company, sale=sale, method=sale.forma_pagamento,
+                    tendered_amount=sale.tendered_amount, applied_amount=sale.grand_total,
+                    change_amount=sale.amount_change, recorded_by=user,
+                    recorded_at=sale.date_added))
+            movements.append(
+                CashMovement(
+                    company=company, session=session, type=CashMovement.Type.ENTRY,
+                    amount=sale.tendered_amount, payment_method=sale.forma_pagamento,
+                    description=f'Pagamento {sale.code}', sale=sale, recorded_by=user,
+                    recorded_at=sale.date_added))
+            if sale.amount_change > 0:
+                movements.append(
+                    CashMovement(
+                        company=company, session=session, type=CashMovement.Type.EXIT,
+                        amount=sale.amount_change, payment_method='DINHEIRO',
+                        description=f'Troco {sale.code}', sale=sale, recorded_by=user,
+                        recorded_at=sale.date_added))
+        sale_items = salesItems.objects.bulk_create(sale_items, batch_size=BATCH_SIZE)
+        for sale_item in sale_items:
+            for combo_item in components.get(sale_item.product_id_id, ()):
+                combo_rows.append(
+                    SaleComboItem(
+                        sale_item=sale_item, component_id=combo_item.component_id,
+                        quantity=combo_item.quantity * sale_item.qty,
+                        unit_cost=costs[combo_item.component_id]))
+        SaleComboItem.objects.bulk_create(combo_rows, batch_size=BATCH_SIZE)
+        SalePayment.objects.bulk_create(payments, batch_size=BATCH_SIZE)
+        CashMovement.objects.bulk_create(movements, batch_size=BATCH_SIZE)
+        ledger = StockMovement.objects.bulk_create(
+            [
+                StockMovement(
+                    company=company, produto_id=product_id, location=location,
+                    delta=-qty, balance_after=-consume(product_id, qty),
+                    reason=StockMovement.Reason.SALE, sale=sale,
+                    reference=sale.code, user=user, created_at=sale.date_added)
+                for sale, (_, sale_lines) in zip(created, lines)
+                for product_id, qty in stock_lines(sale_lines)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        counts['sales'] += len(created)
+        counts['sale_items'] += len(sale_items)
+        counts['stock_movements'] += len(ledger)
+        sales.clear()
+        lines.clear()
+
+    catalog = simple + combos
+    costs = {product.pk: product.custo for product in catalog}
+    for session in sessions:
+        day = timezone.localtime(session.opened_at).date()
+        for _ in range(max(0, int(rng.gauss(per_day, per_day / 4)))):
+            moment = datetime.combine(
+                day, time(rng.randint(10, 22), rng.randint(0, 59), rng.randint(0, 59)), tz)
+            if moment > timezone.now():
+                continue
+            sale_lines = [
+                (product, Decimal(rng.randint(1, 3)))
+                for product in rng.sample(catalog, k=min(len(catalog), rng.randint(1, 5)))
+            ]
+            grand_total = sum((_money(product.price * qty) for product, qty in sale_lines), Decimal('0'))
+            method = rng.choices(PAYMENT_METHODS, weights=PAYMENT_WEIGHTS)[0]
+            tendered = grand_total
+            if method == 'DINHEIRO':
+                tendered = Decimal((int(grand_total) // 10 + 1) * 10)
+            # O código segue o formato de generate_sale_code (prefixo do ano).
+            prefix = day.year * 2
+            next_code[prefix] = next_code.get(prefix, 0) + 1
+            kind = rng.choices(('venda', 'pedido', 'mesa'), weights=(75, 10, 15))[0]
+            table = rng.choice(tables) if kind == 'mesa' and tables else None
+            sales.append(
+                Sales(
+                    company=company,
+                    code=f'{prefix}{next_code[prefix]:05d}',
+                    sub_total=grand_total,
+                    grand_total=grand_total,
+                    tendered_amount=tendered,
+                    amount_change=tendered - grand_total,
+                    forma_pagamento=method,
+                    type=f'Mesa {table.number}' if table else kind,
+                    customer_name=f'Mesa {table.number}' if table else '',
+                    status='entregue',
+                    table=table,
+                    date_added=moment,
+                    total_cost=_money(sum(
+                        (product.custo * qty for product, qty in sale_lines), Decimal('0'))),
+                    item_count=len(sale_lines),
+                )
+            )
+            lines.append((session, sale_lines))
+            if len(sales) >= BATCH_SIZE:
+                flush()
+    if sales:
+        flush()
+
+    # Estoque semeado é o saldo de hoje: a abertura soma o que foi vendido
+    # desde o início do histórico, e cada movimentação recebe esse saldo.
+    opened_at = datetime.combine(today - timedelta(days=days), time(0), tz)
+    current = dict(
+        Estoque.objects.filter(company=company, location=location)
+        .values_list('produto_id', 'quantidade')
+    )
+    StockSnapshot.objects.bulk_create(
+        [
+            StockSnapshot(
+                company=company, produto_id=product_id, taken_at=opened_at,
+                quantidade=quantidade + consumed.get(product_id, Decimal('0')))
+            for product_id, quantidade in current.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    StockMovement.objects.filter(company=company).update(
+        balance_after=F('balance_after') + Subquery(
+            StockSnapshot.objects.filter(
+                company=company, produto_id=OuterRef('produto_id'), taken_at=opened_at,
+            ).values('quantidade')[:1]
+        )
+    )
+    take_stock_snapshot(company)
+    counts['cash_sessions'] = len(sessions)
+    return counts
+
+
+def seed_company(name=None, size='medium', *, seed=42, days=365):
+    """Create one tenant of the given ``size`` (see ``DATASET_SIZES``).
+
+    Returns a summary dict with the ``company``, its ``user`` and the row
+    counts. Runs in a single transaction.
+    """
+    if size not in DATASET_SIZES:
+        raise ValueError(f'Tamanho desconhecido: {size}')
+    spec = DATASET_SIZES[size]
+    rng = random.Random(seed)
+    tag = uuid.uuid4().hex[:8]
+
+    with transaction.atomic():
+        company = Company.objects.create(name=name or f'Loja {size} {tag}')
+        user = User.objects.create_user(f'seed-{tag}', password=None)
+        UserProfile.objects.create(user=user, company=company)
+
+        simple, combos = _seed_catalog(company, rng, spec['products'])
+        tables, orders, order_items = _seed_floor(company, rng, spec['tables'], simple)
+        pedidos = _seed_pedidos(company, rng, spec['pedidos'], simple)
+        counts = _seed_sales(
+            company, user, rng, days=days, per_day=spec['sales_per_day'],
+            simple=simple, combos=combos, tables=tables)
+
+    return {
+        'company': company,
+        'user': user,
+        'products': len(simple) + len(combos),
+        'combos': len(combos),
+        'tables': len(tables),
+        'open_orders': len(orders),
+        'order_items': order_items,
+        'pedidos': pedidos,
+        **counts,
+    }
@@ -0,0 +1,93 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.events import publish_on_commit
+from p_v_App.models import Pedido, Sales, TableOrder, TableOrderItem
+
+
+@receiver(post_save, sender=TableOrder)
+def table_order_saved(sender, instance, created, **kwargs):
+    publish_on_commit(
+        instance.company_id,
+        'table_order.updated',
+        {
+            'id': instance.pk,
+            'table_id': instance.table_id,
+            'status': instance.status,
+            'total': str(instance.total),
+            'created': created,
+        },
+    )
+
+
+@receiver(post_delete, sender=TableOrder)
+def table_order_deleted(sender, instance, **kwargs):
+    publish_on_commit(
+        instance.company_id,
+        'table_order.deleted',
+        {'id': instance.pk, 'table_id': instance.table_id},
+    )
+
+
+def _publish_table_order_item(instance, event_type):
+    order = instance.order
+    publish_on_commit(
+        order.company_id,
+        event_type,
+        {
+            'id': instance.pk,
+            'order_id': order.pk,
+            'table_id': order.table_id,
+            'product_id': instance.product_id,
+            'quantity': str(instance.quantity),
+            'station_id': instance.station_id,
+            'prep_status': instance.prep_status,
+        },
+    )
+
+
+@receiver(post_save, sender=TableOrderItem)
+def table_order_item_saved(sender, instance, **kwargs):
+    _publish_table_order_item(instance, 'table_order_item.updated')
+
+
+@receiver(post_delete, sender=TableOrderItem)
+def table_order_item_deleted(sender, instance, **kwargs):
+    _publish_table_order_item(instance, 'table_order_item.deleted')
+
+
+@receiver(post_save, sender=Pedido)
+def pedido_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        event_type = 'pedido.created'
+    elif update_fields is None or 'status' in update_fields:
+        event_type = 'pedido.status'
+    else:
+        return
+    publish_on_commit(
+        instance.company_id,
+        event_type,
+        {'id': instance.pk, 'code': instance.code, 'status': instance.status},
+    )
+
+
+@receiver(post_delete, sender=Pedido)
+def pedido_deleted(sender, instance, **kwargs):
+    publish_on_commit(instance.company_id, 'pedido.deleted', {'id': instance.pk})
+
+
+@receiver(post_save, sender=Sales)
+def sale_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    publish_on_commit(
+        instance.company_id,
+        'sale.created',
+        {
+            'id': instance.pk,
+            'code': instance.code,
+            'type': instance.type,
+            'table_id': instance.table_id,
+            'table_order_id': instance.table_order_id,
+        },
+    )
@@ -1,2 +1,107 @@
+import io
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.jsonstream import iter_json_array
+from core.utils import create_sale_from_table_order, reopen_table_order
+from inventory.tests import StockFixtureMixin
+from p_v_App.models import (
+    CashMovement,
+    CashRegisterSession,
+    Estoque,
+    Garcom,
+    SalePayment,
+    Sales,
+    StockMovement,
+    Table,
+    TableOrder,
+    TableOrderItem,
+)
+
+
+class IterJsonArrayTests(SimpleTestCase):
+    def parse(self, document, chunk_size=2):
+        return list(iter_json_array(io.StringIO(document), chunk_size=chunk_size))
+
+    def test_yields_elements_across_chunk_boundaries(self):
+        self.assertEqual(
+            self.parse('\ufeff [ {"pk": 1}, 1234 ,"a,]" ] '),
+            [{'pk': 1}, 1234, 'a,]'],
+        )
+        self.assertEqual(self.parse('[]'), [])
+
+    def test_rejects_malformed_arrays(self):
+        for document in ('{"pk": 1}', '[1,]', '[,]', '[1,,2]', '[1 2]', '[1'):
+            with self.subTest(document=document), self.assertRaises(ValueError):
+                self.parse(document)
+
+
+class ReopenTableOrderTests(StockFixtureMixin, TestCase):
+    def setUp(self):
+        self.make_company()
+        self.user = User.objects.create_user('caixa', password='x')
+        self.product = self.make_product('CV')
+        self.make_stock(self.product, '10')
+        self.session = self.open_session()
+        waiter = Garcom.objects.create(company=self.company, name='Ana', code='G1')
+        table = Table.objects.create(company=self.company, number=1)
+        self.order = TableOrder.objects.create(company=self.company, table=table, waiter=waiter)
+        TableOrderItem.objects.create(
+            order=self.order, product=self.product, quantity=3,
+            unit_price=Decimal('10.00'), total=Decimal('30.00'))
+        self.order.refresh_from_db()
+        # Pago com 50 em dinheiro: entrada de 50 e troco de 20.
+        self.sale = create_sale_from_table_order(
+            self.order, self.company,
+            allocations=[{'method': 'DINHEIRO', 'tendered': Decimal('50.00'),
+                          'applied': Decimal('30.00'), 'change': Decimal('20.00')}],
+            tendered_total=Decimal('50.00'), change_total=Decimal('20.00'),
+            primary_method='DINHEIRO', user=self.user, cash_session=self.session)
+        self.order.status = TableOrder.Status.CLOSED
+        self.order.closed_at = timezone.now()
+        self.order.save()
+
+    def open_session(self):
+        return CashRegisterSession.objects.create(
+            company=self.company, opened_by=self.user, opening_amount=Decimal('100.00'))
+
+    def test_reopen_returns_stock_and_reverses_cash(self):
+        self.assertEqual(Estoque.objects.get(produto=self.product).quantidade, Decimal('7'))
+        self.assertEqual(self.session.expected_balance(), Decimal('130.00'))
+
+        self.assertEqual(
+            reopen_table_order(self.order, self.company, self.user),
+            ('success', 'Comanda reaberta.'))
+
+        self.assertEqual(Estoque.objects.get(produto=self.product).quantidade, Decimal('10'))
+        self.assertEqual(
+            list(StockMovement.objects.filter(reason=StockMovement.Reason.REOPEN)
+                 .values_list('delta', 'reference')),
+            [(Decimal('3'), self.sale.code)],
+        )
+        self.assertEqual(self.session.expected_balance(), Decimal('100.00'))
+        reversals = CashMovement.objects.filter(reversal_of__isnull=False)
+        self.assertEqual(
+            sorted(reversals.values_list('type', 'amount', 'reversal_of__type')),
+            [(CashMovement.Type.ENTRY, Decimal('20.00'), CashMovement.Type.EXIT),
+             (CashMovement.Type.EXIT, Decimal('50.00'), CashMovement.Type.ENTRY)],
+        )
+        self.assertFalse(Sales.objects.filter(pk=self.sale.pk).exists())
+        self.assertFalse(SalePayment.objects.exists())
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, TableOrder.Status.OPEN)
+
+    def test_reversal_goes_to_open_session_of_same_register(self):
+        CashRegisterSession.objects.filter(pk=self.session.pk).update(
+            status=CashRegisterSession.Status.CLOSED)
+        current = self.open_session()
+
+        reopen_table_order(self.order, self.company, self.user)
+
+        self.assertEqual(self.session.expected_balance(), Decimal('130.00'))
+        self.assertEqual(current.expected_balance(), Decimal('70.00'))
+        self.assertEqual(
+            CashMovement.objects.filter(session=current, reversal_of__isnull=False).count(), 2)
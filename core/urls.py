@@ -7,4 +7,5 @@ urlpatterns = [
     path('configuracoes/', views.ConfiguracoesView.as_view(),
          name='configuracoes-page'),
     path('about/', views.about, name='about-redirect'),
+    path('eventos/', views.event_stream, name='event-stream'),
 ]
@@ -11,9 +11,20 @@ from django.db.utils import OperationalError, ProgrammingError
 from django.shortcuts import redirect
 from django.utils import timezone
 
-from p_v_App.models import Garcom, Estoque, Sales, Table, TableOrder, TableOrderItem, salesItems
+from inventory.ledger import apply_stock_deltas, lock_stock_balances
+from p_v_App.models import (
+    Garcom,
+    SaleComboItem,
+    Sales,
+    StockLocation,
+    StockMovement,
+    Table,
+    TableOrder,
+    TableOrderItem,
+    salesItems,
+)
 from p_v_App.models_tenant import Company
-from sales.utils import register_sale_payments
+from sales.utils import quantize_currency, register_sale_payments, reverse_sale_payments
 
 
 def get_user_company(request) -> Optional[Company]:
@@ -70,6 +81,30 @@ def generate_sale_code(company: Company, extra_querysets=None) -> str:
         idx += 1
 
 
+def allocate_sale_codes(company: Company, count: int) -> list[str]:
+    """Reserve ``count`` free sale codes with a single lookup.
+
+    Same format and gap-filling order as ``generate_sale_code``, but the codes
+    already used this year are read once instead of probing one by one.
+    """
+    prefix = str(timezone.now().year * 2)
+    used = set()
+    for code in Sales.objects.filter(
+        company=company, code__startswith=prefix
+    ).values_list('code', flat=True):
+        suffix = code[len(prefix):]
+        if suffix.isdigit():
+            used.add(int(suffix))
+
+    codes = []
+    idx = 1
+    while len(codes) < count:
+        if idx not in used:
+            codes.append(f'{prefix}{idx:05d}')
+        idx += 1
+    return codes
+
+
 def _to_decimal(value, default: str = '0') -> Decimal:
     if isinstance(value, Decimal):
         return value
@@ -146,6 +181,7 @@ def create_sale_from_table_order(
     change_total: Decimal,
     primary_method: str,
     user,
+    cash_session=None,
 ) -> Sales:
     table = order.table
     sale_code = generate_sale_code(company)
@@ -154,46 +190,118 @@ def create_sale_from_table_order(
         company=company,
         code=sale_code,
         customer_name=f'Mesa {table.number}',
-        sub_total=float(order.subtotal),
+        sub_total=order.subtotal,
         tax=0,
         tax_amount=0,
-        grand_total=float(order.total),
-        tendered_amount=float(tendered_total),
-        amount_change=float(change_total),
+        grand_total=order.total,
+        tendered_amount=tendered_total,
+        amount_change=change_total,
         forma_pagamento=primary_method or 'PIX',
         type=f'Mesa {table.number}',
         status='entregue',
         delivery_fee=0,
-        discount_total=float(order.discount_amount or 0),
+        discount_total=order.discount_amount or Decimal('0.00'),
         discount_reason=(order.discount_reason if (
             order.discount_amount or 0) > 0 else ''),
         table=table,
         table_order=order,
     )
 
-    register_sale_payments(sale, allocations, user)
+    register_sale_payments(sale, allocations, user, cash_session)
 
-    items = order.items.select_related('product').all()
+    items = order.items.select_related('product', 'station').all()
+    default_location_id = StockLocation.default_for(company).pk
+    sale_cost = Decimal('0')
+    demand_by_location: dict[int, dict[int, Decimal]] = {}
     for item in items:
         salesItems.objects.create(
             sale_id=sale,
             product_id=item.product,
-            price=float(item.unit_price),
-            qty=float(item.quantity),
-            total=float(item.total),
+            price=item.unit_price,
+            qty=item.quantity,
+            total=item.total,
+            unit_cost=item.product.custo,
         )
-        try:
-            estoque_item = Estoque.objects.get(
-                produto=item.product, company=company)
-            estoque_item.quantidade -= float(item.quantity)
-            estoque_item.save(update_fields=['quantidade'])
-        except Estoque.DoesNotExist:
-            pass
-
+        sale_cost += item.quantity * item.product.custo
+        sale.item_count += 1
+        # Cada item baixa do local da sua estação de preparo (bar, cozinha).
+        location_id = (
+            item.station.stock_location_id if item.station else None
+        ) or default_location_id
+        demand = demand_by_location.setdefault(location_id, {})
+        demand[item.product_id] = demand.get(
+            item.product_id, Decimal('0')) + item.quantity
+
+    # Produto sem registro de estoque no local da estação baixa do local
+    # principal, em vez de não baixar de lugar nenhum.
+    for location_id, demand in list(demand_by_location.items()):
+        if location_id == default_location_id:
+            continue
+        stocked = lock_stock_balances(company, demand, location_id)
+        missing = [pid for pid in demand if pid not in stocked]
+        if missing:
+            fallback = demand_by_location.setdefault(default_location_id, {})
+            for pid in missing:
+                fallback[pid] = fallback.get(pid, Decimal('0')) + demand.pop(pid)
+
+    for location_id, demand in demand_by_location.items():
+        apply_stock_deltas(
+            company,
+            {pid: -qty for pid, qty in demand.items()},
+            StockMovement.Reason.SALE,
+            location=location_id,
+            user=user,
+            sale=sale,
+        )
+    sale.total_cost = quantize_currency(sale_cost)
+    sale.save(update_fields=['total_cost', 'item_count'])
     return sale
 
 
-def reopen_table_order(order: TableOrder, company: Company):
+def aggregate_sale_stock(sale: Sales) -> dict[int, Decimal]:
+    """Return ``{product_id: quantity}`` consumed from stock by ``sale``.
+
+    Plain items count against their own product and combos against their
+    components, aggregated in a single ``UNION`` query.
+    """
+    items = (
+        salesItems.objects.filter(sale_id=sale, product_id__is_combo=False)
+        .values('product_id')
+        .annotate(total=Sum('qty'))
+        .values_list('product_id', 'total')
+    )
+    components = (
+        SaleComboItem.objects.filter(sale_item__sale_id=sale)
+        .values('component_id')
+        .annotate(total=Sum('quantity'))
+        .values_list('component_id', 'total')
+    )
+    totals: dict[int, Decimal] = {}
+    for product_id, total in items.union(components, all=True):
+        totals[product_id] = totals.get(product_id, Decimal('0')) + Decimal(total)
+    return totals
+
+
+def sale_stock_by_location(sale: Sales) -> dict:
+    """Return ``{location_id: {product_id: quantity}}`` taken from stock by ``sale``.
+
+    Read from the sale's ledger rows in one grouped query, so a reopening
+    gives each location back what it lost. Sales without ledger rows fall back
+    to ``aggregate_sale_stock`` on the default location (``None``).
+    """
+    by_location: dict = {}
+    for location_id, product_id, total in (
+        sale.stock_movements.filter(reason=StockMovement.Reason.SALE)
+        .order_by()
+        .values('location_id', 'produto_id')
+        .annotate(total=Sum('delta'))
+        .values_list('location_id', 'produto_id', 'total')
+    ):
+        by_location.setdefault(location_id, {})[product_id] = -total
+    return by_location or {None: aggregate_sale_stock(sale)}
+
+
+def reopen_table_order(order: TableOrder, company: Company, user=None):
     if order.status == TableOrder.Status.OPEN:
         return 'info', 'A comanda já está aberta.'
 
@@ -204,33 +312,16 @@ def reopen_table_order(order: TableOrder, company: Company):
         sale = order.sales.filter(
             company=company).order_by('-date_added').first()
         if sale:
-            sale_items = list(
-                salesItems.objects.filter(sale_id=sale)
-                .select_related('product_id')
-                .prefetch_related('combo_components__component')
-            )
-            for sale_item in sale_items:
-                if getattr(sale_item.product_id, 'is_combo', False):
-                    for combo in sale_item.combo_components.all():
-                        try:
-                            estoque_item = Estoque.objects.get(
-                                produto=combo.component,
-                                company=company,
-                            )
-                            estoque_item.quantidade += float(combo.quantity)
-                            estoque_item.save(update_fields=['quantidade'])
-                        except Estoque.DoesNotExist:
-                            pass
-                else:
-                    try:
-                        estoque_item = Estoque.objects.get(
-                            produto=sale_item.product_id,
-                            company=company,
-                        )
-                        estoque_item.quantidade += float(sale_item.qty)
-                        estoque_item.save(update_fields=['quantidade'])
-                    except Estoque.DoesNotExist:
-                        pass
+            for location_id, deltas in sale_stock_by_location(sale).items():
+                apply_stock_deltas(
+                    company,
+                    deltas,
+                    StockMovement.Reason.REOPEN,
+                    location=location_id,
+                    user=user,
+                    reference=sale.code,
+                )
+            reverse_sale_payments(sale, user)
             salesItems.objects.filter(sale_id=sale).delete()
             sale.delete()
 
@@ -1,14 +1,20 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import Sum
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.shortcuts import render, redirect
 from django.urls import reverse_lazy
 from django.views.generic import TemplateView
 
+from core.events import broker, ensure_listener, format_sse
 from core.forms import ConfiguracaoSistemaForm
 from core.utils import get_user_company
+from inventory.lots import expiring_summary
 from p_v_App.models import Category, Products, Sales
 
 
@@ -22,10 +28,12 @@ def home(request):
         products = Products.objects.filter(company=user_company).count()
         today_sales = Sales.objects.filter(
             date_added__date=today, company=user_company)
+        expiring = expiring_summary(user_company, today=today)
     else:
         categories = 0
         products = 0
         today_sales = Sales.objects.none()
+        expiring = None
 
     context = {
         'page_title': 'Início',
@@ -33,10 +41,49 @@ def home(request):
         'products': products,
         'transaction': today_sales.count(),
         'total_sales': today_sales.aggregate(total=Sum('grand_total'))['total'] or 0,
+        'expiring': expiring,
+        'today': today,
     }
     return render(request, 'core/home.html', context)
 
 
+EVENT_STREAM_KEEPALIVE_SECONDS = 15
+
+
+@login_required
+async def event_stream(request):
+    """Server-Sent Events feed with the table, pedido and sale changes of the company."""
+    company = await sync_to_async(get_user_company)(request)
+    if not company:
+        return JsonResponse(
+            {'status': 'failed', 'msg': 'Usuário não está associado a nenhuma empresa.'},
+            status=403,
+        )
+
+    ensure_listener()
+    queue = broker.subscribe(company.pk)
+
+    async def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=EVENT_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comentário SSE mantém proxies e o navegador com a conexão aberta.
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_sse(event)
+        finally:
+            broker.unsubscribe(company.pk, queue)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def about(request):
     return redirect(reverse_lazy('configuracoes-page'))
@@ -0,0 +1,95 @@
+"""Moving weighted-average cost of stock.
+
+Each entry blends the units already on hand with the units received::
+
+    novo custo = (saldo x custo médio + entrada x custo da entrada) / (saldo + entrada)
+
+using only the balance and cost stored on ``Estoque``, so it is O(1) per entry
+and never replays the history. The cost is per product: the balance is the sum
+over every stock location (one indexed aggregate) and the result is written to
+all of its ``Estoque`` rows and to ``Products.custo`` (the cost sales snapshot
+into ``unit_cost``). Every change is appended to ``StockCostHistory`` for audit.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Optional
+
+from django.db.models import Sum
+
+from p_v_App.models import Estoque, Products, StockCostHistory
+
+ZERO = Decimal('0.000')
+COST_STEP = Decimal('0.01')
+
+
+def weighted_average_cost(quantidade, custo, entrada, custo_entrada) -> Decimal:
+    """Average cost after receiving ``entrada`` units at ``custo_entrada``.
+
+    A negative or empty balance carries no cost, so the entry cost wins.
+    """
+    quantidade = max(Decimal(quantidade or 0), ZERO)
+    entrada = Decimal(entrada or 0)
+    custo_entrada = Decimal(custo_entrada or 0)
+    total = quantidade + entrada
+    if entrada <= 0 or total <= 0:
+        return Decimal(custo or 0).quantize(COST_STEP, ROUND_HALF_UP)
+    average = (quantidade * Decimal(custo or 0) + entrada * custo_entrada) / total
+    return average.quantize(COST_STEP, ROUND_HALF_UP)
+
+
+def update_stock_cost(
+    estoque: Estoque,
+    quantidade_anterior,
+    entrada,
+    custo_entrada,
+    reason: str,
+    *,
+    user=None,
+    reference: str = '',
+) -> Optional[StockCostHistory]:
+    """Apply an entry (or a cost correction) to the cost of ``estoque``.
+
+    ``estoque.custo`` must still hold the cost before the entry and
+    ``quantidade_anterior`` the balance of ``estoque`` before it; the balance
+    of the product in other locations is added. With a positive ``entrada``
+    the cost becomes the weighted average; without one, ``custo_entrada``
+    replaces it as an explicit correction. Returns the history row, or
+    ``None`` when nothing changed.
+    """
+    if custo_entrada is None:
+        return None
+    others = Estoque.objects.filter(
+        company_id=estoque.company_id, produto_id=estoque.produto_id,
+    ).exclude(pk=estoque.pk).aggregate(total=Sum('quantidade'))['total']
+    quantidade_anterior = Decimal(quantidade_anterior or 0) + (others or ZERO)
+    entrada = Decimal(entrada or 0)
+    custo_anterior = Decimal(estoque.custo or 0)
+    custo_entrada = Decimal(custo_entrada)
+    if entrada > 0:
+        custo_medio = weighted_average_cost(
+            quantidade_anterior, custo_anterior, entrada, custo_entrada)
+    else:
+        entrada = ZERO
+        custo_medio = custo_entrada.quantize(COST_STEP, ROUND_HALF_UP)
+        if custo_medio == custo_anterior:
+            return None
+
+    estoque.custo = custo_medio
+    Estoque.objects.filter(
+        company_id=estoque.company_id, produto_id=estoque.produto_id,
+    ).update(custo=custo_medio)
+    Products.objects.filter(pk=estoque.produto_id).update(custo=custo_medio)
+    if user is not None and not getattr(user, 'is_authenticated', False):
+        user = None
+    return StockCostHistory.objects.create(
+        company_id=estoque.company_id,
+        produto_id=estoque.produto_id,
+        quantidade_anterior=quantidade_anterior,
+        custo_anterior=custo_anterior,
+        quantidade_entrada=entrada,
+        custo_entrada=custo_entrada,
+        custo_medio=custo_medio,
+        reason=reason,
+        reference=(reference or '')[:120],
+        user=user,
+    )
@@ -0,0 +1,236 @@
+"""Physical inventory count sessions.
+
+Handhelds post the scanned codes in batches; each batch is resolved with one
+barcode query, summed per product in memory and merged into the session with
+one read plus one bulk insert/update, so a count session keeps a single
+compact row per product however many times it was scanned.
+
+A session counts one stock location. The variance (counted x system balance
+in that location) is a single query over the session lines with the balance
+as a subquery. Applying the count writes the counted
+quantities in chunks of ``APPLY_CHUNK`` products: one locked read, one
+``UPDATE`` keeping the system balance on the lines, one
+``INSERT ... ON CONFLICT DO UPDATE`` of the stock rows and one bulk ledger
+insert per chunk instead of one round-trip per item.
+"""
+
+from decimal import Decimal, InvalidOperation
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from catalog.barcodes import normalize_barcode, resolve_barcodes
+from inventory.ledger import lock_stock_balances, upsert_stock_rows
+from inventory.lots import apply_lot_deltas
+from p_v_App.models import (
+    Estoque,
+    InventoryCount,
+    InventoryCountLine,
+    Products,
+    StockMovement,
+)
+
+ZERO = Decimal('0.000')
+QUANTITY_STEP = Decimal('0.001')
+APPLY_CHUNK = 1000
+MAX_BATCH = 5000
+
+
+class CountError(ValueError):
+    """Raised when a count session cannot receive counts or be applied."""
+
+
+def parse_count_entries(raw_entries: Iterable) -> tuple[list[tuple[str, Decimal]], list[str]]:
+    """Normalize ``[{'code', 'qty'}]`` dicts or ``'code;qty'`` text lines.
+
+    A missing quantity counts as one unit (one scan). Returns the valid
+    ``(code, quantity)`` pairs and the rejected entries.
+    """
+    entries, rejected = [], []
+    for raw in raw_entries:
+        if isinstance(raw, dict):
+            code, qty = raw.get('code'), raw.get('qty', raw.get('quantity'))
+        else:
+            code, _, qty = str(raw).replace('\t', ';').partition(';')
+        text = '' if qty is None else str(qty).strip().replace(',', '.')
+        try:
+            quantity = Decimal(text or '1').quantize(QUANTITY_STEP)
+        except InvalidOperation:
+            quantity = None
+        code = normalize_barcode(code)
+        if not code or quantity is None or quantity < 0:
+            rejected.append(str(code or raw))
+            continue
+        entries.append((code, quantity))
+    return entries, rejected
+
+
+def record_counts(session: InventoryCount, entries, *, replace: bool = False) -> dict:
+    """Merge ``(code, quantity)`` pairs into ``session``.
+
+    Quantities are added to what was already counted, or replace it with
+    ``replace=True`` (a recount). Returns the accepted lines and unknown codes.
+    """
+    if session.status != InventoryCount.Status.OPEN:
+        raise CountError('A contagem não está aberta.')
+    entries = list(entries)
+    if len(entries) > MAX_BATCH:
+        raise CountError(f'Envie no máximo {MAX_BATCH} leituras por lote.')
+
+    products = resolve_barcodes(session.company_id, (code for code, _ in entries))
+    totals: dict[int, Decimal] = {}
+    unknown: list[str] = []
+    for code, quantity in entries:
+        produto_id = products.get(code)
+        if produto_id is None:
+            unknown.append(code)
+            continue
+        totals[produto_id] = totals.get(produto_id, ZERO) + quantity
+    if not totals:
+        return {'accepted': 0, 'products': 0, 'unknown': unknown}
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            line.produto_id: line
+            for line in InventoryCountLine.objects.select_for_update()
+            .filter(count=session, produto_id__in=list(totals))
+            .only('id', 'produto_id', 'quantidade')
+        }
+        changed, created = [], []
+        for produto_id, quantity in totals.items():
+            line = existing.get(produto_id)
+            if line is None:
+                created.append(InventoryCountLine(
+                    count=session, produto_id=produto_id, quantidade=quantity, counted_at=now))
+                continue
+            line.quantidade = quantity if replace else line.quantidade + quantity
+            line.counted_at = now
+            changed.append(line)
+        InventoryCountLine.objects.bulk_update(
+            changed, ['quantidade', 'counted_at'], batch_size=1000)
+        InventoryCountLine.objects.bulk_create(created, batch_size=1000)
+
+    return {
+        'accepted': len(entries) - len(unknown),
+        'products': len(totals),
+        'unknown': unknown,
+    }
+
+
+def _system_balance(session: InventoryCount):
+    return Coalesce(
+        Subquery(
+            Estoque.objects.filter(
+                company_id=session.company_id,
+                location_id=session.location_id,
+                produto_id=OuterRef('produto_id'),
+            )
+            .order_by()
+            .values('produto_id')
+            .annotate(total=Sum('quantidade'))
+            .values('total')[:1]
+        ),
+        Value(ZERO),
+        output_field=DecimalField(max_digits=12, decimal_places=3),
+    )
+
+
+def count_variance(session: InventoryCount):
+    """Lines of ``session`` with the system balance and the difference.
+
+    One query; after the count is applied the balance recorded at that moment
+    is used instead of the current one.
+    """
+    lines = InventoryCountLine.objects.filter(count=session)
+    if session.status == InventoryCount.Status.APPLIED:
+        lines = lines.annotate(sistema=Coalesce(
+            'quantidade_sistema', Value(ZERO),
+            output_field=DecimalField(max_digits=12, decimal_places=3)))
+    else:
+        lines = lines.annotate(sistema=_system_balance(session))
+    return lines.annotate(
+        diferenca=F('quantidade') - F('sistema'),
+        custo_diferenca=(F('quantidade') - F('sistema')) * F('produto__custo'),
+    ).select_related('produto', 'produto__category_id').order_by('produto__name', 'id')
+
+
+def variance_summary(variance) -> dict:
+    """Counts and cost of the over/short products of a ``count_variance`` queryset."""
+    over, short = Q(diferenca__gt=0), Q(diferenca__lt=0)
+    summary = variance.order_by().aggregate(
+        products=Count('id'),
+        over=Count('id', filter=over),
+        short=Count('id', filter=short),
+        over_cost=Sum('custo_diferenca', filter=over),
+        short_cost=Sum('custo_diferenca', filter=short),
+    )
+    summary['matching'] = summary['products'] - summary['over'] - summary['short']
+    summary['over_cost'] = summary['over_cost'] or Decimal('0')
+    summary['short_cost'] = summary['short_cost'] or Decimal('0')
+    return summary
+
+
+def apply_count(session: InventoryCount, user=None) -> dict:
+    """Adjust stock to the counted quantities and close ``session``.
+
+    Products without a stock record get one in the same upsert that writes
+    the counted quantities. Returns the variance summary of the applied count.
+    """
+    with transaction.atomic():
+        session = InventoryCount.objects.select_for_update().get(pk=session.pk)
+        if session.status != InventoryCount.Status.OPEN:
+            raise CountError('A contagem não está aberta.')
+        company = session.company
+
+        counted = dict(
+            InventoryCountLine.objects.filter(count=session)
+            .values_list('produto_id', 'quantidade')
+        )
+        product_ids = list(counted)
+        location_id = session.location_id
+        reference = f'Contagem {session.name}'
+        for start in range(0, len(product_ids), APPLY_CHUNK):
+            chunk = product_ids[start:start + APPLY_CHUNK]
+            balances = {
+                pid: quantidade
+                for pid, (_, quantidade) in lock_stock_balances(company, chunk, location_id).items()
+            }
+
+            InventoryCountLine.objects.filter(count=session, produto_id__in=chunk).update(
+                quantidade_sistema=_system_balance(session))
+            # Produto contado sem registro de estoque é criado já com o saldo contado.
+            upsert_stock_rows(
+                company,
+                [
+                    Estoque(
+                        company=company,
+                        location_id=location_id,
+                        produto_id=pid,
+                        categoria_id=category_id,
+                        quantidade=counted[pid],
+                        preco=price,
+                        custo=custo,
+                    )
+                    for pid, category_id, price, custo in Products.objects.filter(
+                        company=company, pk__in=chunk
+                    ).values_list('pk', 'category_id', 'price', 'custo')
+                ],
+                ['quantidade'],
+                StockMovement.Reason.COUNT,
+                previous={(location_id, pid): balance for pid, balance in balances.items()},
+                user=user,
+                reference=reference,
+            )
+            apply_lot_deltas(
+                company, {pid: counted[pid] - balances.get(pid, ZERO) for pid in chunk})
+
+        session.status = InventoryCount.Status.APPLIED
+        session.applied_at = timezone.now()
+        session.applied_by = user if getattr(user, 'is_authenticated', False) else None
+        session.save(update_fields=['status', 'applied_at', 'applied_by'])
+
+    return variance_summary(count_variance(session))
@@ -0,0 +1,393 @@
+"""Stock ledger: every change to ``Estoque.quantidade`` goes through here.
+
+``Estoque.quantidade`` stays the materialized balance read by the POS, while
+``StockMovement`` keeps the append-only history. ``StockSnapshot`` rows taken
+periodically (``manage.py snapshot_stock``) let historical balances be computed
+from the nearest snapshot plus the movements after it, instead of replaying
+every sale since the first day. Batched sale deltas are mirrored on the
+expiry lots (``inventory.lots``): removals consume them FEFO, reopenings put
+the quantities back.
+
+Balances are kept per ``StockLocation``; the batched helpers work on one
+location at a time (the company default when none is given) and each ledger
+row records the location it moved. There is exactly one ``Estoque`` row per
+``(company, location, produto)``, so writers that may create rows upsert them
+(``INSERT ... ON CONFLICT DO UPDATE``) instead of looking them up first.
+"""
+
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Max, Min, Sum, Value, When
+from django.utils import timezone
+
+from inventory.lots import apply_lot_deltas
+from p_v_App.models import Estoque, StockLocation, StockMovement, StockSnapshot
+
+ZERO = Decimal('0.000')
+STOCK_UNIQUE_FIELDS = ['company', 'location', 'produto']
+
+
+def record_stock_movement(
+    estoque: Estoque,
+    delta,
+    reason: str,
+    *,
+    user=None,
+    sale=None,
+    reference: str = '',
+) -> Optional[StockMovement]:
+    """Append a ledger row for a change already applied to ``estoque``."""
+    delta = Decimal(delta or 0)
+    if not delta:
+        return None
+    if user is not None and not getattr(user, 'is_authenticated', False):
+        user = None
+    return StockMovement.objects.create(
+        company_id=estoque.company_id,
+        produto_id=estoque.produto_id,
+        location_id=estoque.location_id,
+        delta=delta,
+        balance_after=estoque.quantidade or ZERO,
+        reason=reason,
+        sale=sale,
+        reference=(reference or (sale.code if sale else ''))[:120],
+        user=user,
+    )
+
+
+def location_id_for(company, location=None) -> int:
+    """Id of ``location`` (instance or id), or of the company default."""
+    if location is None:
+        return StockLocation.default_for(company).pk
+    return getattr(location, 'pk', location)
+
+
+def lock_stock_balances(
+    company,
+    product_ids: Iterable[int],
+    location=None,
+) -> dict[int, tuple[int, Decimal]]:
+    """Lock and return ``{product_id: (estoque_id, quantidade)}`` in ``location``.
+
+    Products without a stock record in the location are left out.
+    """
+    return {
+        produto_id: (row_id, quantidade or ZERO)
+        for row_id, produto_id, quantidade in Estoque.objects.select_for_update()
+        .filter(
+            company=company,
+            location_id=location_id_for(company, location),
+            produto_id__in=list(product_ids),
+        )
+        .values_list('id', 'produto_id', 'quantidade')
+    }
+
+
+def lock_stock_rows(company, keys: Iterable[tuple[int, int]]) -> dict[tuple[int, int], Estoque]:
+    """Lock and return the rows for ``(location_id, product_id)`` keys, in one query."""
+    keys = set(keys)
+    if not keys:
+        return {}
+    rows = Estoque.objects.select_for_update().filter(
+        company=company,
+        location_id__in={location_id for location_id, _ in keys},
+        produto_id__in={produto_id for _, produto_id in keys},
+    )
+    return {
+        (row.location_id, row.produto_id): row
+        for row in rows
+        if (row.location_id, row.produto_id) in keys
+    }
+
+
+def upsert_stock_rows(
+    company,
+    rows: list[Estoque],
+    update_fields: list[str],
+    reason: str,
+    *,
+    previous: dict[tuple[int, int], Decimal],
+    user=None,
+    reference: str = '',
+) -> list[Estoque]:
+    """Write ``rows`` with ``INSERT ... ON CONFLICT DO UPDATE`` and log them.
+
+    ``rows`` are unsaved ``Estoque`` instances (location set) holding the
+    final ``quantidade``; an existing row of the same product and location
+    gets ``update_fields`` overwritten. ``previous`` maps
+    ``(location_id, product_id)`` to the balance before the write (missing
+    means a new row) so the ledger records the difference. The instances come
+    back with their primary keys.
+    """
+    if not rows:
+        return rows
+    if 'quantidade' not in update_fields:
+        update_fields = [*update_fields, 'quantidade']
+    Estoque.objects.bulk_create(
+        rows,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=STOCK_UNIQUE_FIELDS,
+        update_fields=update_fields,
+    )
+
+    if user is not None and not getattr(user, 'is_authenticated', False):
+        user = None
+    created_at = timezone.now()
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(
+                company_id=getattr(company, 'pk', company),
+                produto_id=row.produto_id,
+                location_id=row.location_id,
+                delta=row.quantidade - previous.get((row.location_id, row.produto_id), ZERO),
+                balance_after=row.quantidade,
+                reason=reason,
+                reference=reference[:120],
+                user=user,
+                created_at=created_at,
+            )
+            for row in rows
+            if row.quantidade != previous.get((row.location_id, row.produto_id), ZERO)
+        ],
+        batch_size=1000,
+    )
+    return rows
+
+
+def apply_stock_deltas(
+    company,
+    deltas: dict[int, Decimal],
+    reason: str,
+    *,
+    location=None,
+    user=None,
+    sale=None,
+    reference: str = '',
+) -> int:
+    """Apply ``{product_id: delta}`` with a constant number of queries.
+
+    Reads the affected balances of ``location`` once (locked), updates them
+    with a single ``CASE`` + ``F()`` statement and bulk-inserts the ledger
+    rows. Products without a stock record are skipped, as in the per-item
+    paths. Returns the number of products updated.
+    """
+    return apply_stock_deltas_by_sale(
+        company, [(sale, deltas)], reason,
+        location=location, user=user, reference=reference)
+
+
+def apply_stock_deltas_by_sale(
+    company,
+    sale_deltas: Iterable[tuple],
+    reason: str,
+    *,
+    location=None,
+    user=None,
+    reference: str = '',
+    lots: bool = True,
+) -> int:
+    """Like ``apply_stock_deltas`` for several sales at once.
+
+    ``sale_deltas`` is a sequence of ``(sale, {product_id: delta})``. Balances
+    are updated once per product with the summed delta, while the ledger keeps
+    one row per sale and product with its running ``balance_after``.
+    ``lots=False`` leaves the expiry lots alone, for moves that keep the units
+    in the company (transfers between locations).
+    """
+    sale_deltas = [
+        (sale, {pid: Decimal(delta) for pid, delta in deltas.items() if delta})
+        for sale, deltas in sale_deltas
+    ]
+    totals: dict[int, Decimal] = {}
+    for _, deltas in sale_deltas:
+        for pid, delta in deltas.items():
+            totals[pid] = totals.get(pid, ZERO) + delta
+    if not totals:
+        return 0
+
+    location_id = location_id_for(company, location)
+    rows = lock_stock_balances(company, totals.keys(), location_id)
+    if not rows:
+        return 0
+
+    changed = [(row_id, totals[pid]) for pid, (row_id, _) in rows.items() if totals[pid]]
+    if changed:
+        Estoque.objects.filter(id__in=[row_id for row_id, _ in changed]).update(
+            quantidade=F('quantidade') + Case(
+                *[When(id=row_id, then=Value(delta)) for row_id, delta in changed],
+                output_field=DecimalField(max_digits=12, decimal_places=3),
+            )
+        )
+        if lots:
+            apply_lot_deltas(company, {pid: totals[pid] for pid in rows})
+
+    if user is not None and not getattr(user, 'is_authenticated', False):
+        user = None
+    running = {pid: quantidade for pid, (_, quantidade) in rows.items()}
+    created_at = timezone.now()
+    movements = []
+    for sale, deltas in sale_deltas:
+        sale_reference = (reference or (sale.code if sale else ''))[:120]
+        for pid, delta in deltas.items():
+            if pid not in running:
+                continue
+            running[pid] += delta
+            movements.append(
+                StockMovement(
+                    company_id=getattr(company, 'pk', company),
+                    produto_id=pid,
+                    location_id=location_id,
+                    delta=delta,
+                    balance_after=running[pid],
+                    reason=reason,
+                    sale=sale,
+                    reference=sale_reference,
+                    user=user,
+                    created_at=created_at,
+                )
+            )
+    StockMovement.objects.bulk_create(movements, batch_size=1000)
+    return len(rows)
+
+
+def take_stock_snapshot(company=None, taken_at=None) -> int:
+    """Store the current balance of every product; returns the rows created."""
+    taken_at = taken_at or timezone.now()
+    balances = Estoque.objects.all()
+    if company is not None:
+        balances = balances.filter(company=company)
+    rows = balances.values('company_id', 'produto_id').annotate(
+        total=Sum('quantidade'))
+    created = StockSnapshot.objects.bulk_create(
+        [
+            StockSnapshot(
+                company_id=row['company_id'],
+                produto_id=row['produto_id'],
+                quantidade=row['total'] or ZERO,
+                taken_at=taken_at,
+            )
+            for row in rows.iterator(chunk_size=2000)
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    return len(created)
+
+
+def stock_balance_as_of(
+    company,
+    when=None,
+    product_ids: Optional[Iterable[int]] = None,
+) -> dict[int, Decimal]:
+    """Return ``{product_id: balance}`` as of ``when`` (defaults to now).
+
+    Starts from the latest snapshot at or before ``when`` and adds the
+    movements recorded after it. Snapshots are taken for all products at once,
+    so one ``Max('taken_at')`` picks the base and only that snapshot is read,
+    however many older ones ``snapshot_stock`` has accumulated.
+    """
+    when = when or timezone.now()
+    snapshots = StockSnapshot.objects.filter(company=company, taken_at__lte=when)
+    movements = StockMovement.objects.filter(company=company, created_at__lte=when)
+    taken_at = snapshots.aggregate(latest=Max('taken_at'))['latest']
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        snapshots = snapshots.filter(produto_id__in=product_ids)
+        movements = movements.filter(produto_id__in=product_ids)
+
+    balances: dict[int, Decimal] = {}
+    if taken_at is not None:
+        balances = dict(
+            snapshots.filter(taken_at=taken_at)
+            .order_by()
+            .values_list('produto_id', 'quantidade')
+        )
+        rows = (
+            movements.filter(produto_id__in=list(balances), created_at__gt=taken_at)
+            .values('produto_id')
+            .annotate(total=Sum('delta'))
+            .order_by()
+        )
+        for row in rows:
+            balances[row['produto_id']] += row['total']
+
+    # Products created after the last snapshot start from zero.
+    rows = (
+        movements.exclude(produto_id__in=list(balances))
+        .values('produto_id')
+        .annotate(total=Sum('delta'))
+        .order_by()
+    )
+    for row in rows:
+        balances[row['produto_id']] = row['total']
+
+    return balances
+
+
+def find_stock_discrepancies(company) -> list[dict]:
+    """Compare ``Estoque.quantidade`` with the balance rebuilt from the ledger."""
+    ledger = stock_balance_as_of(company)
+    materialized = {
+        row['produto_id']: row['total'] or ZERO
+        for row in Estoque.objects.filter(company=company)
+        .values('produto_id')
+        .annotate(total=Sum('quantidade'))
+    }
+
+    discrepancies = []
+    for produto_id in sorted(set(ledger) | set(materialized)):
+        expected = ledger.get(produto_id, ZERO)
+        actual = materialized.get(produto_id, ZERO)
+        if expected != actual:
+            discrepancies.append(
+                {
+                    'produto_id': produto_id,
+                    'ledger': expected,
+                    'estoque': actual,
+                    'difference': actual - expected,
+                }
+            )
+    return discrepancies
+
+
+def merge_duplicate_stock_rows(company=None, *, dry_run: bool = False) -> list[dict]:
+    """Fold duplicate rows of a ``(company, location, produto)`` into the oldest.
+
+    The oldest row keeps its data and receives the summed quantity; the others
+    are deleted. Product balances do not change, so no ledger rows are needed.
+    Returns one dict per merged group (``produto_id``, ``location_id``,
+    ``rows``, ``total``).
+    """
+    stock = Estoque.objects.all()
+    if company is not None:
+        stock = stock.filter(company=company)
+    groups = list(
+        stock.values('company_id', 'location_id', 'produto_id')
+        .annotate(rows=Count('id'), keep_id=Min('id'), total=Sum('quantidade'))
+        .filter(rows__gt=1)
+        .order_by('company_id', 'location_id', 'produto_id')
+    )
+    if not groups or dry_run:
+        return groups
+
+    keys = {(g['company_id'], g['location_id'], g['produto_id']) for g in groups}
+    keep_ids = {g['keep_id'] for g in groups}
+    with transaction.atomic():
+        extra_ids = [
+            row_id
+            for row_id, *key in stock.select_for_update()
+            .filter(produto_id__in={produto_id for _, _, produto_id in keys})
+            .values_list('id', 'company_id', 'location_id', 'produto_id')
+            if tuple(key) in keys and row_id not in keep_ids
+        ]
+        Estoque.objects.filter(id__in=extra_ids).delete()
+        Estoque.objects.filter(id__in=keep_ids).update(
+            quantidade=Case(
+                *[When(id=g['keep_id'], then=Value(g['total'] or ZERO)) for g in groups],
+                output_field=DecimalField(max_digits=12, decimal_places=3),
+            )
+        )
+    return groups
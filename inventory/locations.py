@@ -0,0 +1,131 @@
+"""Stock locations: lookup, per-location totals and transfers.
+
+Each ``Estoque`` row belongs to one ``StockLocation``; a product kept in the
+store and in the warehouse has one row in each. Totals across locations are
+grouped queries served by the ``(company, location, produto)`` and
+``(company, produto)`` indexes instead of loops over the rows.
+
+A transfer moves ``{product_id: quantity}`` between two locations in one
+transaction: one locked read of both sides, one ``INSERT ... ON CONFLICT DO
+UPDATE`` writing the origin and destination rows (creating those missing at
+the destination) and one bulk ledger insert, whatever the number of products.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from inventory.ledger import lock_stock_rows, upsert_stock_rows
+from p_v_App.models import Estoque, Products, StockLocation, StockMovement
+
+ZERO = Decimal('0.000')
+
+
+class TransferError(ValueError):
+    """Raised when a transfer between locations cannot be applied."""
+
+
+def active_locations(company):
+    return StockLocation.objects.filter(company=company, is_active=True)
+
+
+def resolve_location(company, location_id=None) -> StockLocation:
+    """Active location ``location_id`` of ``company``, or its default location."""
+    if location_id not in (None, ''):
+        try:
+            location = active_locations(company).filter(pk=int(location_id)).first()
+        except (TypeError, ValueError):
+            location = None
+        if location is not None:
+            return location
+    return StockLocation.default_for(company)
+
+
+def location_totals(company) -> list[dict]:
+    """Products, quantity, sale value and cost held in each location (one query)."""
+    return list(
+        Estoque.objects.filter(company=company)
+        .values('location_id', 'location__name', 'location__kind')
+        .annotate(
+            products=Count('produto_id', distinct=True),
+            total_quantity=Sum('quantidade'),
+            total_value=Sum(F('quantidade') * F('produto__price')),
+            total_cost=Sum(F('quantidade') * F('produto__custo')),
+        )
+        .order_by('location__name')
+    )
+
+
+def transfer_stock(
+    company,
+    origin: StockLocation,
+    destination: StockLocation,
+    quantities: dict[int, Decimal],
+    *,
+    user=None,
+    reference: str = '',
+) -> int:
+    """Move ``{product_id: quantity}`` from ``origin`` to ``destination``.
+
+    All or nothing: products without enough stock at the origin abort the
+    transfer with ``TransferError``. Expiry lots are company-wide, so they are
+    not touched. Returns the number of products moved.
+    """
+    if origin.pk == destination.pk:
+        raise TransferError('Escolha locais de origem e destino diferentes.')
+    company_id = getattr(company, 'pk', company)
+    if origin.company_id != company_id or destination.company_id != company_id:
+        raise TransferError('Local de estoque inválido.')
+    quantities = {pid: Decimal(qty) for pid, qty in quantities.items() if qty and qty > 0}
+    if not quantities:
+        raise TransferError('Informe ao menos um produto com quantidade.')
+
+    reference = (reference or f'{origin.name} → {destination.name}')[:120]
+    with transaction.atomic():
+        current = lock_stock_rows(
+            company,
+            [(location.pk, pid) for location in (origin, destination) for pid in quantities],
+        )
+        short = [
+            pid for pid, qty in quantities.items()
+            if (origin.pk, pid) not in current or current[origin.pk, pid].quantidade < qty
+        ]
+        if short:
+            names = Products.objects.filter(
+                company_id=company_id, pk__in=short).order_by('name').values_list('name', flat=True)
+            raise TransferError(
+                f'Estoque insuficiente em {origin.name}: {", ".join(names)}.')
+
+        # Origem e destino numa única gravação; produto ainda sem registro no
+        # destino herda os dados do registro da origem.
+        rows = []
+        for pid, qty in quantities.items():
+            source = current[origin.pk, pid]
+            for location, delta in ((origin, -qty), (destination, qty)):
+                existing = current.get((location.pk, pid))
+                row = existing or source
+                rows.append(
+                    Estoque(
+                        company_id=company_id,
+                        location=location,
+                        produto_id=pid,
+                        categoria_id=row.categoria_id,
+                        quantidade=(existing.quantidade if existing else ZERO) + delta,
+                        validade=row.validade,
+                        preco=row.preco,
+                        custo=row.custo,
+                        status=row.status,
+                        descricao_id=row.descricao_id,
+                    )
+                )
+        upsert_stock_rows(
+            company,
+            rows,
+            ['quantidade'],
+            StockMovement.Reason.TRANSFER,
+            previous={key: row.quantidade for key, row in current.items()},
+            user=user,
+            reference=reference,
+        )
+    return len(quantities)
@@ -0,0 +1,196 @@
+"""Stock lots with expiry dates, consumed first-expiry-first-out (FEFO).
+
+``StockLot`` rows split the balance of a product into received batches with
+their own expiry date, cost and source NF-e. ``Estoque.quantidade`` is still
+the balance the POS reads; lots only track *which* units leave. Stock that was
+never received as a lot (balances from before lots existed) is untracked, so
+quantities not covered by open lots are simply not allocated.
+
+Consumption is set-based: one locked query reads the open lots of every
+product involved in FEFO order, the allocation is done in memory and a single
+``CASE`` update writes the new lot balances, whatever the number of lines.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import Case, Count, DecimalField, F, Q, Value, When
+from django.utils import timezone
+
+from p_v_App.models import Estoque, StockLot
+
+ZERO = Decimal('0.000')
+
+
+def _fefo_order(reverse: bool = False) -> list:
+    validade = F('data_validade')
+    order = [
+        'produto_id',
+        validade.desc(nulls_first=True) if reverse else validade.asc(nulls_last=True),
+    ]
+    return order + (['-received_at', '-id'] if reverse else ['received_at', 'id'])
+
+
+def _write_lot_balances(changes: dict[int, Decimal]) -> None:
+    if not changes:
+        return
+    StockLot.objects.filter(id__in=list(changes)).update(
+        quantidade=Case(
+            *[When(id=lot_id, then=Value(quantidade)) for lot_id, quantidade in changes.items()],
+            output_field=DecimalField(max_digits=12, decimal_places=3),
+        )
+    )
+
+
+def receive_stock_lot(
+    estoque: Estoque,
+    quantidade,
+    *,
+    data_validade=None,
+    custo=None,
+    nfe_key: str = '',
+    lot_code: str = '',
+) -> Optional[StockLot]:
+    """Record ``quantidade`` received into ``estoque`` as a new lot."""
+    quantidade = Decimal(quantidade or 0)
+    if quantidade <= 0:
+        return None
+    return StockLot.objects.create(
+        company_id=estoque.company_id,
+        produto_id=estoque.produto_id,
+        lot_code=(lot_code or '')[:60],
+        quantidade=quantidade,
+        quantidade_inicial=quantidade,
+        data_validade=data_validade,
+        custo=estoque.custo if custo is None else custo,
+        nfe_key=(nfe_key or '')[:44],
+    )
+
+
+def consume_stock_lots(company, quantities: dict[int, Decimal]) -> dict[int, Decimal]:
+    """Take ``{product_id: quantity}`` out of the open lots, earliest expiry first.
+
+    Lots without expiry go last. Returns ``{product_id: quantity}`` that was
+    not covered by lots (untracked stock).
+    """
+    remaining = {pid: Decimal(qty) for pid, qty in quantities.items() if qty and qty > 0}
+    if not remaining:
+        return {}
+
+    changes: dict[int, Decimal] = {}
+    lots = (
+        StockLot.objects.select_for_update()
+        .filter(company=company, produto_id__in=list(remaining), quantidade__gt=0)
+        .order_by(*_fefo_order())
+        .values_list('id', 'produto_id', 'quantidade')
+    )
+    for lot_id, produto_id, quantidade in lots:
+        wanted = remaining[produto_id]
+        if wanted <= 0:
+            continue
+        taken = min(wanted, quantidade)
+        remaining[produto_id] = wanted - taken
+        changes[lot_id] = quantidade - taken
+
+    _write_lot_balances(changes)
+    return {pid: qty for pid, qty in remaining.items() if qty > 0}
+
+
+def restore_stock_lots(company, quantities: dict[int, Decimal]) -> dict[int, Decimal]:
+    """Put ``{product_id: quantity}`` back into consumed lots (sale reopened).
+
+    Refills in reverse FEFO order, the lots a later sale would have reached
+    last, never above their received quantity. Returns what did not fit.
+    """
+    remaining = {pid: Decimal(qty) for pid, qty in quantities.items() if qty and qty > 0}
+    if not remaining:
+        return {}
+
+    changes: dict[int, Decimal] = {}
+    lots = (
+        StockLot.objects.select_for_update()
+        .filter(
+            company=company,
+            produto_id__in=list(remaining),
+            quantidade__lt=F('quantidade_inicial'),
+        )
+        .order_by(*_fefo_order(reverse=True))
+        .values_list('id', 'produto_id', 'quantidade', 'quantidade_inicial')
+    )
+    for lot_id, produto_id, quantidade, inicial in lots:
+        wanted = remaining[produto_id]
+        if wanted <= 0:
+            continue
+        put_back = min(wanted, inicial - quantidade)
+        remaining[produto_id] = wanted - put_back
+        changes[lot_id] = quantidade + put_back
+
+    _write_lot_balances(changes)
+    return {pid: qty for pid, qty in remaining.items() if qty > 0}
+
+
+def apply_lot_deltas(company, deltas: dict[int, Decimal]) -> None:
+    """Mirror ``{product_id: delta}`` of a sale or reopening on the lots."""
+    consume_stock_lots(company, {pid: -delta for pid, delta in deltas.items() if delta < 0})
+    restore_stock_lots(company, {pid: delta for pid, delta in deltas.items() if delta > 0})
+
+
+def adjust_stock_lots(estoque: Estoque, delta, **lot_fields) -> Optional[StockLot]:
+    """Mirror a manual change of ``estoque`` on its lots.
+
+    Additions become a new lot (``lot_fields`` as in ``receive_stock_lot``);
+    removals consume the existing lots FEFO.
+    """
+    delta = Decimal(delta or 0)
+    if delta > 0:
+        return receive_stock_lot(estoque, delta, **lot_fields)
+    if delta < 0:
+        consume_stock_lots(estoque.company_id, {estoque.produto_id: -delta})
+    return None
+
+
+def expiry_from_validade(validade, today=None):
+    """Expiry date of a lot received today for ``Estoque.validade`` days."""
+    if not validade:
+        return None
+    return (today or timezone.localdate()) + timedelta(days=int(validade))
+
+
+def expiring_lots(company, days: Optional[int] = None, *, today=None):
+    """Open lots of ``company`` expiring within ``days`` (already expired included).
+
+    Served by the partial ``(company, data_validade)`` index on open lots, so
+    the cost depends on the lots close to expiry, not on the whole stock.
+    """
+    if days is None:
+        days = getattr(settings, 'EXPIRY_ALERT_DAYS', 30)
+    today = today or timezone.localdate()
+    return (
+        StockLot.objects.filter(
+            company=company,
+            quantidade__gt=0,
+            data_validade__lte=today + timedelta(days=days),
+        )
+        .select_related('produto')
+        .order_by('data_validade', 'produto_id', 'id')
+    )
+
+
+def expiring_summary(company, days: Optional[int] = None, *, today=None, limit: int = 5) -> dict:
+    """Counts and the first ``limit`` lots for the dashboard widget."""
+    if days is None:
+        days = getattr(settings, 'EXPIRY_ALERT_DAYS', 30)
+    today = today or timezone.localdate()
+    lots = expiring_lots(company, days, today=today)
+    expired = Q(data_validade__lt=today)
+    counts = lots.order_by().aggregate(
+        total=Count('id'), expired=Count('id', filter=expired))
+    return {
+        'days': days,
+        'total': counts['total'],
+        'expired': counts['expired'],
+        'lots': list(lots[:limit]),
+        'today': today,
+    }
@@ -0,0 +1,133 @@
+"""Reorder suggestions from consumption velocity.
+
+Consumption comes from the sale lines of the last ``REORDER_LOOKBACK_DAYS``:
+``salesItems`` of stock products plus ``SaleComboItem`` for the components of
+combos. Each source is one grouped query per company, balances are another,
+and the results replace the company's ``ReorderSuggestion`` rows in one bulk
+insert, so the nightly run stays a handful of queries regardless of the
+catalog size.
+
+For each product with stock and consumption in the window:
+
+* ``daily_consumption`` = consumed quantity / window days;
+* ``days_of_cover`` = balance / daily consumption;
+* ``reorder_point`` = daily consumption x (lead time + safety days);
+* when the balance is at or below the reorder point, ``suggested_qty`` brings
+  it up to the reorder point plus ``REORDER_TARGET_DAYS`` of consumption.
+"""
+
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, ROUND_UP, Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from p_v_App.models import Estoque, ReorderSuggestion, SaleComboItem, salesItems
+
+ZERO = Decimal('0.000')
+QUANTITY_STEP = Decimal('0.001')
+COVER_STEP = Decimal('0.1')
+# Limite do campo days_of_cover (max_digits=9, decimal_places=1).
+MAX_COVER = Decimal('99999999.9')
+
+
+def reorder_settings(**overrides) -> dict:
+    """Window and policy in days, from settings unless overridden."""
+    values = {
+        'lookback_days': getattr(settings, 'REORDER_LOOKBACK_DAYS', 60),
+        'lead_time_days': getattr(settings, 'REORDER_LEAD_TIME_DAYS', 7),
+        'safety_days': getattr(settings, 'REORDER_SAFETY_DAYS', 3),
+        'target_days': getattr(settings, 'REORDER_TARGET_DAYS', 30),
+    }
+    values.update({key: value for key, value in overrides.items() if value is not None})
+    values['lookback_days'] = max(1, values['lookback_days'])
+    return values
+
+
+def consumption_by_product(company, since) -> dict[int, Decimal]:
+    """``{product_id: quantity}`` taken out of stock by sales since ``since``."""
+    consumed: dict[int, Decimal] = {}
+    direct = (
+        salesItems.objects.filter(
+            sale_id__company=company,
+            sale_id__date_added__gte=since,
+            product_id__is_combo=False,
+        )
+        .values('product_id')
+        .annotate(total=Sum('qty'))
+        .values_list('product_id', 'total')
+    )
+    components = (
+        SaleComboItem.objects.filter(
+            sale_item__sale_id__company=company,
+            sale_item__sale_id__date_added__gte=since,
+        )
+        .values('component_id')
+        .annotate(total=Sum('quantity'))
+        .values_list('component_id', 'total')
+    )
+    for rows in (direct, components):
+        for product_id, total in rows:
+            consumed[product_id] = consumed.get(product_id, ZERO) + (total or ZERO)
+    return consumed
+
+
+def build_reorder_suggestions(company, *, now=None, **overrides) -> list[ReorderSuggestion]:
+    """Unsaved suggestions for every active stock product consumed in the window."""
+    now = now or timezone.now()
+    policy = reorder_settings(**overrides)
+    consumed = consumption_by_product(
+        company, now - timedelta(days=policy['lookback_days']))
+    if not consumed:
+        return []
+
+    balances = (
+        Estoque.objects.filter(company=company, status=1, produto_id__in=list(consumed))
+        .values('produto_id')
+        .annotate(total=Sum('quantidade'))
+        .values_list('produto_id', 'total')
+    )
+    window = Decimal(policy['lookback_days'])
+    point_days = Decimal(policy['lead_time_days'] + policy['safety_days'])
+    target_days = Decimal(policy['target_days'])
+
+    suggestions = []
+    for produto_id, balance in balances:
+        daily = (consumed[produto_id] / window).quantize(QUANTITY_STEP, ROUND_HALF_UP)
+        if daily <= 0:
+            continue
+        balance = balance or ZERO
+        reorder_point = (daily * point_days).quantize(QUANTITY_STEP, ROUND_UP)
+        needs_reorder = balance <= reorder_point
+        suggested = ZERO
+        if needs_reorder:
+            order_up_to = reorder_point + daily * target_days
+            suggested = (order_up_to - max(balance, ZERO)).quantize(QUANTITY_STEP, ROUND_UP)
+        suggestions.append(
+            ReorderSuggestion(
+                company_id=company.pk,
+                produto_id=produto_id,
+                daily_consumption=daily,
+                quantidade=balance,
+                days_of_cover=min(
+                    MAX_COVER,
+                    (max(balance, ZERO) / daily).quantize(COVER_STEP, ROUND_HALF_UP),
+                ),
+                reorder_point=reorder_point,
+                suggested_qty=suggested,
+                needs_reorder=needs_reorder,
+                computed_at=now,
+            )
+        )
+    return suggestions
+
+
+def compute_reorder_suggestions(company, *, now=None, **overrides) -> tuple[int, int]:
+    """Replace the suggestions of ``company``; returns ``(products, to_reorder)``."""
+    suggestions = build_reorder_suggestions(company, now=now, **overrides)
+    with transaction.atomic():
+        ReorderSuggestion.objects.filter(company=company).delete()
+        ReorderSuggestion.objects.bulk_create(suggestions, batch_size=2000)
+    return len(suggestions), sum(1 for row in suggestions if row.needs_reorder)
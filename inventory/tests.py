@@ -1,2 +1,266 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from inventory.costing import update_stock_cost, weighted_average_cost
+from inventory.counting import CountError, apply_count, count_variance, record_counts
+from inventory.ledger import merge_duplicate_stock_rows
+from inventory.locations import TransferError, transfer_stock
+from inventory.lots import consume_stock_lots, receive_stock_lot, restore_stock_lots
+from p_v_App.models import (
+    Category,
+    Estoque,
+    InventoryCount,
+    Products,
+    StockCostHistory,
+    StockLocation,
+    StockLot,
+    StockMovement,
+)
+from p_v_App.models_tenant import Company
+
+
+class StockFixtureMixin:
+    def make_company(self):
+        self.company = Company.objects.create(name='Loja Teste')
+        self.category = Category.objects.create(
+            company=self.company, name='Bebidas', description='')
+        self.location = StockLocation.default_for(self.company)
+
+    def make_product(self, code, custo='4.00'):
+        return Products.objects.create(
+            company=self.company, category_id=self.category, code=code,
+            name=f'Produto {code}', price=Decimal('10.00'), custo=Decimal(custo))
+
+    def make_stock(self, product, quantidade, location=None, custo='4.00'):
+        return Estoque.objects.create(
+            company=self.company, produto=product, categoria=self.category,
+            location=location or self.location, quantidade=Decimal(quantidade),
+            custo=Decimal(custo))
+
+
+class StockLotFefoTests(StockFixtureMixin, TestCase):
+    def setUp(self):
+        self.make_company()
+        self.product = self.make_product('A')
+        estoque = self.make_stock(self.product, '12')
+        today = timezone.localdate()
+        # Recebido primeiro, mas sem validade: deve ser o último a sair.
+        self.no_expiry = receive_stock_lot(estoque, 5)
+        self.late = receive_stock_lot(estoque, 4, data_validade=today + timedelta(days=30))
+        self.soon = receive_stock_lot(estoque, 3, data_validade=today + timedelta(days=5))
+
+    def balances(self):
+        return [
+            StockLot.objects.get(pk=lot.pk).quantidade
+            for lot in (self.soon, self.late, self.no_expiry)
+        ]
+
+    def test_consume_takes_earliest_expiry_first_and_null_expiry_last(self):
+        remaining = consume_stock_lots(self.company, {self.product.pk: Decimal('6')})
+
+        self.assertEqual(remaining, {})
+        self.assertEqual(self.balances(), [Decimal('0'), Decimal('1'), Decimal('5')])
+
+    def test_consume_reports_quantity_not_covered_by_lots(self):
+        consume_stock_lots(self.company, {self.product.pk: Decimal('6')})
+        remaining = consume_stock_lots(self.company, {self.product.pk: Decimal('8')})
+
+        self.assertEqual(remaining, {self.product.pk: Decimal('2')})
+        self.assertEqual(self.balances(), [Decimal('0'), Decimal('0'), Decimal('0')])
+
+    def test_restore_refills_in_reverse_fefo_up_to_received_quantity(self):
+        consume_stock_lots(self.company, {self.product.pk: Decimal('10')})
+        self.assertEqual(self.balances(), [Decimal('0'), Decimal('0'), Decimal('2')])
+
+        remaining = restore_stock_lots(self.company, {self.product.pk: Decimal('6')})
+        self.assertEqual(remaining, {})
+        self.assertEqual(self.balances(), [Decimal('0'), Decimal('3'), Decimal('5')])
+
+        remaining = restore_stock_lots(self.company, {self.product.pk: Decimal('5')})
+        self.assertEqual(remaining, {self.product.pk: Decimal('1')})
+        self.assertEqual(self.balances(), [Decimal('3'), Decimal('4'), Decimal('5')])
+
+
+class WeightedAverageCostTests(StockFixtureMixin, TestCase):
+    def test_blends_balance_and_entry(self):
+        self.assertEqual(weighted_average_cost(10, '4.00', 10, '6.00'), Decimal('5.00'))
+
+    def test_negative_balance_takes_entry_cost(self):
+        self.assertEqual(weighted_average_cost(-3, '4.00', 2, '7.00'), Decimal('7.00'))
+
+    def test_average_uses_balance_of_every_location(self):
+        self.make_company()
+        product = self.make_product('A')
+        bar = StockLocation.objects.create(company=self.company, name='Bar')
+        main_row = self.make_stock(product, '10')
+        bar_row = self.make_stock(product, '30', location=bar)
+
+        history = update_stock_cost(
+            main_row, Decimal('10'), Decimal('40'), Decimal('6.00'),
+            StockMovement.Reason.IMPORT)
+
+        # 40 unidades a 4,00 (10 + 30 no bar) e 40 recebidas a 6,00.
+        self.assertEqual(history.quantidade_anterior, Decimal('40'))
+        self.assertEqual(history.custo_medio, Decimal('5.00'))
+        bar_row.refresh_from_db()
+        product.refresh_from_db()
+        self.assertEqual(bar_row.custo, Decimal('5.00'))
+        self.assertEqual(product.custo, Decimal('5.00'))
+        self.assertEqual(StockCostHistory.objects.filter(produto=product).count(), 1)
+
+
+class MergeDuplicateStockRowsTests(StockFixtureMixin, TransactionTestCase):
+    """Duplicates can only exist without the unique constraint, so it is
+    dropped for the test and put back afterwards, which also proves the merge
+    left one row per key."""
+
+    def setUp(self):
+        self.constraint = next(
+            constraint for constraint in Estoque._meta.constraints
+            if constraint.name == 'estoque_unique_company_loc_produto'
+        )
+        # No SQLite a remoção recria a tabela a partir de _meta.constraints.
+        remaining = [c for c in Estoque._meta.constraints if c is not self.constraint]
+        with mock.patch.object(Estoque._meta, 'constraints', remaining):
+            with connection.schema_editor() as editor:
+                editor.remove_constraint(Estoque, self.constraint)
+        self.make_company()
+
+    def tearDown(self):
+        Estoque.objects.all().delete()
+        with connection.schema_editor() as editor:
+            editor.add_constraint(Estoque, self.constraint)
+
+    def test_keeps_oldest_row_with_summed_quantity(self):
+        product = self.make_product('A')
+        other = self.make_product('B')
+        bar = StockLocation.objects.create(company=self.company, name='Bar')
+        oldest = self.make_stock(product, '3', custo='4.00')
+        self.make_stock(product, '4', custo='9.00')
+        self.make_stock(product, '5')
+        in_bar = self.make_stock(product, '2', location=bar)
+        single = self.make_stock(other, '7')
+
+        groups = merge_duplicate_stock_rows(self.company, dry_run=True)
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(Estoque.objects.filter(produto=product).count(), 4)
+
+        groups = merge_duplicate_stock_rows(self.company)
+        self.assertEqual(
+            [(g['produto_id'], g['location_id'], g['rows'], g['total']) for g in groups],
+            [(product.pk, self.location.pk, 3, Decimal('12'))],
+        )
+        kept = Estoque.objects.get(produto=product, location=self.location)
+        self.assertEqual(kept.pk, oldest.pk)
+        self.assertEqual(kept.quantidade, Decimal('12'))
+        self.assertEqual(kept.custo, Decimal('4.00'))
+        self.assertEqual(Estoque.objects.get(pk=in_bar.pk).quantidade, Decimal('2'))
+        self.assertEqual(Estoque.objects.get(pk=single.pk).quantidade, Decimal('7'))
+
+
+class ApplyCountTests(StockFixtureMixin, TestCase):
+    def setUp(self):
+        self.make_company()
+        self.short = self.make_product('A')
+        self.matching = self.make_product('B')
+        self.new = self.make_product('C')
+        self.make_stock(self.short, '10')
+        self.make_stock(self.matching, '5')
+        self.session = InventoryCount.objects.create(
+            company=self.company, name='Geral', location=self.location)
+
+    def test_apply_writes_counted_quantities_and_ledger(self):
+        record_counts(self.session, [('A', Decimal('7')), ('B', Decimal('5'))])
+        result = record_counts(
+            self.session, [('A', Decimal('1')), ('C', Decimal('3')), ('ZZ', Decimal('1'))])
+        self.assertEqual(result, {'accepted': 2, 'products': 2, 'unknown': ['ZZ']})
+
+        summary = apply_count(self.session)
+
+        self.assertEqual(
+            (summary['products'], summary['over'], summary['short'], summary['matching']),
+            (3, 1, 1, 1))
+        self.assertEqual(
+            dict(Estoque.objects.filter(company=self.company)
+                 .values_list('produto__code', 'quantidade')),
+            {'A': Decimal('8'), 'B': Decimal('5'), 'C': Decimal('3')},
+        )
+        self.assertEqual(
+            sorted(StockMovement.objects.filter(reason=StockMovement.Reason.COUNT)
+                   .values_list('produto__code', 'delta', 'balance_after')),
+            [('A', Decimal('-2'), Decimal('8')), ('C', Decimal('3'), Decimal('3'))],
+        )
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, InventoryCount.Status.APPLIED)
+        # Depois de aplicada, a divergência usa o saldo do momento da aplicação.
+        self.assertEqual(
+            [(line.produto.code, line.sistema) for line in count_variance(self.session)],
+            [('A', Decimal('10')), ('B', Decimal('5')), ('C', Decimal('0'))],
+        )
+
+    def test_applied_count_is_closed(self):
+        record_counts(self.session, [('A', Decimal('1'))])
+        apply_count(self.session)
+
+        with self.assertRaises(CountError):
+            apply_count(self.session)
+        self.session.refresh_from_db()
+        with self.assertRaises(CountError):
+            record_counts(self.session, [('A', Decimal('1'))])
+
+
+class TransferStockTests(StockFixtureMixin, TestCase):
+    def setUp(self):
+        self.make_company()
+        self.bar = StockLocation.objects.create(company=self.company, name='Bar')
+        self.beer = self.make_product('A')
+        self.water = self.make_product('B')
+        self.make_stock(self.beer, '10', custo='3.50')
+        self.make_stock(self.water, '4')
+        self.make_stock(self.water, '1', location=self.bar)
+
+    def balances(self):
+        return sorted(
+            Estoque.objects.filter(company=self.company)
+            .values_list('location__name', 'produto__code', 'quantidade'))
+
+    def test_moves_stock_and_creates_missing_destination_rows(self):
+        moved = transfer_stock(
+            self.company, self.location, self.bar,
+            {self.beer.pk: Decimal('4'), self.water.pk: Decimal('4')})
+
+        self.assertEqual(moved, 2)
+        self.assertEqual(self.balances(), [
+            ('Bar', 'A', Decimal('4')),
+            ('Bar', 'B', Decimal('5')),
+            (self.location.name, 'A', Decimal('6')),
+            (self.location.name, 'B', Decimal('0')),
+        ])
+        self.assertEqual(
+            Estoque.objects.get(location=self.bar, produto=self.beer).custo, Decimal('3.50'))
+        self.assertEqual(
+            sorted(StockMovement.objects.filter(reason=StockMovement.Reason.TRANSFER)
+                   .values_list('location__name', 'produto__code', 'delta')),
+            [('Bar', 'A', Decimal('4')), ('Bar', 'B', Decimal('4')),
+             (self.location.name, 'A', Decimal('-4')), (self.location.name, 'B', Decimal('-4'))],
+        )
+
+    def test_short_stock_aborts_the_whole_transfer(self):
+        before = self.balances()
+
+        with self.assertRaisesMessage(TransferError, 'Produto B'):
+            transfer_stock(
+                self.company, self.location, self.bar,
+                {self.beer.pk: Decimal('2'), self.water.pk: Decimal('5')})
+
+        self.assertEqual(self.balances(), before)
+        self.assertFalse(StockMovement.objects.filter(reason=StockMovement.Reason.TRANSFER).exists())
+
+    def test_rejects_same_location(self):
+        with self.assertRaises(TransferError):
+            transfer_stock(self.company, self.bar, self.bar, {self.water.pk: Decimal('1')})
@@ -4,6 +4,19 @@ from inventory import views
 
 urlpatterns = [
     path('estoque', views.estoque, name='estoque'),
+    path('estoque/saldo', views.stock_balance, name='estoque-saldo'),
+    path('estoque/comprar', views.comprar, name='estoque-comprar'),
+    path('estoque/vencimentos', views.vencimentos, name='estoque-vencimentos'),
+    path('estoque/locais', views.locais, name='estoque-locais'),
+    path('estoque/transferir', views.transferir, name='estoque-transferir'),
+    path('estoque/contagens', views.contagens, name='estoque-contagens'),
+    path('estoque/contagens/<int:count_id>', views.contagem, name='estoque-contagem'),
+    path('estoque/contagens/<int:count_id>/lancar', views.contagem_lancar,
+         name='estoque-contagem-lancar'),
+    path('estoque/contagens/<int:count_id>/aplicar', views.contagem_aplicar,
+         name='estoque-contagem-aplicar'),
+    path('estoque/contagens/<int:count_id>/cancelar', views.contagem_cancelar,
+         name='estoque-contagem-cancelar'),
     path('delete_product_estoque', views.delete_product_estoque,
          name='delete-product-estoque'),
     path('manage_products_estoque', views.manage_products_estoque,
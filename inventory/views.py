@@ -2,22 +2,74 @@ import json
 import re
 import unicodedata
 import xml.etree.ElementTree as ET
+from datetime import datetime
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.db.models import F, Sum
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.views import View
 
+from catalog.barcodes import (
+    assign_barcodes,
+    find_product_by_barcode,
+    is_valid_gtin,
+    normalize_barcode,
+    resolve_barcodes,
+)
+from catalog.search import filter_by_product_search
 from core.utils import get_user_company
-from p_v_App.models import Category, Estoque, Products
+from inventory.costing import update_stock_cost
+from inventory.counting import (
+    CountError,
+    apply_count,
+    count_variance,
+    parse_count_entries,
+    record_counts,
+    variance_summary,
+)
+from inventory.ledger import (
+    lock_stock_rows,
+    record_stock_movement,
+    stock_balance_as_of,
+    upsert_stock_rows,
+)
+from inventory.locations import (
+    TransferError,
+    active_locations,
+    location_totals,
+    resolve_location,
+    transfer_stock,
+)
+from inventory.lots import (
+    adjust_stock_lots,
+    consume_stock_lots,
+    expiring_lots,
+    expiry_from_validade,
+)
+from inventory.reorder import reorder_settings
+from p_v_App.models import (
+    Category,
+    Estoque,
+    InventoryCount,
+    Products,
+    ReorderSuggestion,
+    StockLocation,
+    StockMovement,
+)
 
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font
 
+QUANTITY_STEP = Decimal('0.001')
+
 
 def _normalize_header(value):
     normalized = (
@@ -80,16 +132,23 @@ def _parse_decimal_cell(raw_value):
         return None
 
 
-def _parse_int_cell(raw_value):
+def _parse_quantity_cell(raw_value):
     decimal_value = _parse_decimal_cell(raw_value)
     if decimal_value is None:
         return None
     try:
-        return int(decimal_value.to_integral_value(rounding=ROUND_HALF_UP))
+        return decimal_value.quantize(QUANTITY_STEP, rounding=ROUND_HALF_UP)
     except (InvalidOperation, ValueError):
         return None
 
 
+def _parse_date_cell(raw_value):
+    try:
+        return parse_date(str(raw_value or '').strip()[:10])
+    except ValueError:
+        return None
+
+
 def _parse_validade_cell(raw_value):
     allowed = {choice[0] for choice in Estoque.VALIDADE_CHOICES}
     if raw_value is None:
@@ -130,11 +189,15 @@ def estoque(request):
 
     query = request.GET.get('q', '').strip()
     page = request.GET.get('page', 1)
+    local = request.GET.get('local', '').strip()
 
     base_qs = Estoque.objects.filter(company=user_company)
-    estoque_qs = base_qs.filter(
-        produto__name__icontains=query) if query else base_qs
-    estoque_qs = estoque_qs.order_by('-id')
+    if local.isdigit():
+        base_qs = base_qs.filter(location_id=int(local))
+    estoque_qs = filter_by_product_search(
+        base_qs, user_company, query, product_field='produto')
+    estoque_qs = estoque_qs.select_related(
+        'produto', 'categoria', 'location').order_by('-id')
 
     paginator = Paginator(estoque_qs, 30)
     try:
@@ -144,16 +207,26 @@ def estoque(request):
     except EmptyPage:
         estoque_paginated = paginator.page(paginator.num_pages)
 
-    total_items = base_qs.aggregate(total=Sum('quantidade'))['total'] or 0
-    total_value = base_qs.aggregate(
-        total=Sum(F('quantidade') * F('produto__price')))['total'] or Decimal('0')
-    total_cost = base_qs.aggregate(
-        total=Sum(F('quantidade') * F('produto__custo')))['total'] or Decimal('0')
+    totals = base_qs.aggregate(
+        total_items=Sum('quantidade'),
+        total_value=Sum(F('quantidade') * F('produto__price')),
+        total_cost=Sum(F('quantidade') * F('produto__custo')),
+    )
+    total_items = totals['total_items'] or 0
+    total_value = totals['total_value'] or Decimal('0')
+    total_cost = totals['total_cost'] or Decimal('0')
+    locations = location_totals(user_company)
+
+    reorder_alerts = ReorderSuggestion.objects.filter(
+        company=user_company, needs_reorder=True).count()
 
     context = {
         'page_title': 'Lista de Produtos',
         'estoque': estoque_paginated,
         'q': query,
+        'local': local,
+        'locations': locations if len(locations) > 1 else [],
+        'reorder_alerts': reorder_alerts,
         'total_items': int(total_items) if total_items else 0,
         'total_value': float(total_value) if total_value else 0.0,
         'total_cost': float(total_cost) if total_cost else 0.0,
@@ -161,6 +234,434 @@ def estoque(request):
     return render(request, 'inventory/estoque.html', context)
 
 
+@login_required
+def comprar(request):
+    """Produtos a comprar pelo consumo recente (calculado por compute_reorder)."""
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('estoque')
+
+    show_all = request.GET.get('todos') == '1'
+    suggestions = ReorderSuggestion.objects.filter(
+        company=user_company).select_related('produto', 'produto__category_id')
+    if not show_all:
+        suggestions = suggestions.filter(needs_reorder=True)
+    suggestions = suggestions.order_by(
+        F('days_of_cover').asc(nulls_last=True), 'produto__name')
+
+    paginator = Paginator(suggestions, 50)
+    try:
+        page = paginator.page(request.GET.get('page', 1))
+    except PageNotAnInteger:
+        page = paginator.page(1)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+
+    summary = ReorderSuggestion.objects.filter(company=user_company).aggregate(
+        computed_at=Max('computed_at'),
+        total_cost=Sum(
+            F('suggested_qty') * F('produto__custo'), filter=Q(needs_reorder=True)),
+    )
+    context = {
+        'page_title': 'Comprar',
+        'suggestions': page,
+        'show_all': show_all,
+        'computed_at': summary['computed_at'],
+        'total_cost': summary['total_cost'] or Decimal('0'),
+        'policy': reorder_settings(),
+        'current': 'estoque',
+    }
+    return render(request, 'inventory/comprar.html', context)
+
+
+@login_required
+def vencimentos(request):
+    """Lotes com saldo que vencem nos próximos ``dias`` (vencidos incluídos)."""
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('estoque')
+
+    days = request.GET.get('dias', '').strip()
+    days = int(days) if days.isdigit() else getattr(settings, 'EXPIRY_ALERT_DAYS', 30)
+    today = timezone.localdate()
+    lots = expiring_lots(user_company, days, today=today).select_related(
+        'produto__category_id')
+
+    paginator = Paginator(lots, 50)
+    try:
+        page = paginator.page(request.GET.get('page', 1))
+    except PageNotAnInteger:
+        page = paginator.page(1)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+
+    summary = lots.order_by().aggregate(
+        total_quantity=Sum('quantidade'),
+        total_cost=Sum(F('quantidade') * F('custo')),
+    )
+    context = {
+        'page_title': 'Vencimentos',
+        'lots': page,
+        'days': days,
+        'today': today,
+        'total_quantity': summary['total_quantity'] or Decimal('0'),
+        'total_cost': summary['total_cost'] or Decimal('0'),
+        'current': 'estoque',
+    }
+    return render(request, 'inventory/vencimentos.html', context)
+
+
+@login_required
+def contagens(request):
+    """Sessões de contagem de estoque; POST abre uma nova sessão."""
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('estoque')
+
+    if request.method == 'POST':
+        name = request.POST.get('name', '').strip() or (
+            f'Contagem {timezone.localtime():%d/%m/%Y %H:%M}')
+        session = InventoryCount.objects.create(
+            company=user_company,
+            name=name[:120],
+            location=resolve_location(user_company, request.POST.get('location_id')),
+            started_by=request.user,
+        )
+        return redirect('estoque-contagem', count_id=session.pk)
+
+    sessions = InventoryCount.objects.filter(company=user_company).annotate(
+        products=Count('lines')).select_related('location', 'started_by', 'applied_by')
+    context = {
+        'page_title': 'Contagens de Estoque',
+        'sessions': sessions[:100],
+        'locations': active_locations(user_company),
+        'current': 'estoque',
+    }
+    return render(request, 'inventory/contagens.html', context)
+
+
+@login_required
+def contagem(request, count_id):
+    """Divergências da contagem (contado x sistema); ``?formato=xlsx`` exporta."""
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('estoque')
+
+    session = get_object_or_404(InventoryCount, pk=count_id, company=user_company)
+    variance = count_variance(session)
+    if request.GET.get('formato') == 'xlsx':
+        return _variance_workbook(session, variance)
+
+    only_diff = request.GET.get('divergentes') == '1'
+    listed = variance.exclude(diferenca=0) if only_diff else variance
+    paginator = Paginator(listed, 100)
+    try:
+        page = paginator.page(request.GET.get('page', 1))
+    except PageNotAnInteger:
+        page = paginator.page(1)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+
+    context = {
+        'page_title': session.name,
+        'session': session,
+        'rows': page,
+        'only_diff': only_diff,
+        'summary': variance_summary(variance),
+        'current': 'estoque',
+    }
+    return render(request, 'inventory/contagem.html', context)
+
+
+def _variance_workbook(session, rows):
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = 'Divergências'
+    worksheet.append([
+        'Código do Produto', 'Nome do Produto', 'Categoria', 'Contado', 'Sistema',
+        'Diferença', 'Custo', 'Valor da Diferença',
+    ])
+    for cell in worksheet[1]:
+        cell.font = Font(bold=True)
+    for row in rows:
+        worksheet.append([
+            row.produto.code,
+            row.produto.name,
+            str(row.produto.category_id),
+            float(row.quantidade),
+            float(row.sistema),
+            float(row.diferenca),
+            float(row.produto.custo),
+            float(row.custo_diferenca),
+        ])
+
+    response = HttpResponse(
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    response['Content-Disposition'] = f'attachment; filename=contagem_{session.pk}.xlsx'
+    workbook.save(response)
+    return response
+
+
+@login_required
+def contagem_lancar(request, count_id):
+    """Recebe um lote de leituras do coletor.
+
+    Corpo JSON ``{"items": [{"code": "789...", "qty": 2}], "replace": false}``
+    ou texto com uma leitura ``código;quantidade`` por linha.
+    """
+    resp = {'status': 'failed'}
+    user_company = get_user_company(request)
+    if not user_company:
+        resp['msg'] = 'Usuário não está associado a nenhuma empresa.'
+        return JsonResponse(resp)
+    if request.method != 'POST':
+        resp['msg'] = 'Método inválido.'
+        return JsonResponse(resp, status=405)
+
+    session = get_object_or_404(InventoryCount, pk=count_id, company=user_company)
+    replace = False
+    if request.META.get('CONTENT_TYPE', '').startswith('application/json'):
+        try:
+            payload = json.loads(request.body.decode('utf-8'))
+            raw_entries = payload.get('items') or []
+            replace = bool(payload.get('replace'))
+        except (AttributeError, TypeError, ValueError):
+            resp['msg'] = 'Payload JSON inválido.'
+            return JsonResponse(resp)
+    else:
+        raw_entries = [
+            line for line in request.body.decode('utf-8', 'ignore').splitlines() if line.strip()]
+
+    entries, rejected = parse_count_entries(raw_entries)
+    try:
+        result = record_counts(session, entries, replace=replace)
+    except CountError as exc:
+        resp['msg'] = str(exc)
+        return JsonResponse(resp)
+
+    result['rejected'] = rejected
+    result['status'] = 'success' if not (result['unknown'] or rejected) else 'partial'
+    result['msg'] = f"{result['accepted']} leitura(s) registradas."
+    return JsonResponse(result)
+
+
+@login_required
+def contagem_aplicar(request, count_id):
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('estoque')
+
+    session = get_object_or_404(InventoryCount, pk=count_id, company=user_company)
+    if request.method != 'POST':
+        messages.error(request, 'Método inválido para aplicar a contagem.')
+        return redirect('estoque-contagem', count_id=session.pk)
+
+    try:
+        summary = apply_count(session, request.user)
+    except CountError as exc:
+        messages.error(request, str(exc))
+    else:
+        messages.success(
+            request,
+            f"Contagem aplicada: {summary['over']} produto(s) com sobra, "
+            f"{summary['short']} com falta e {summary['matching']} sem divergência.",
+        )
+    return redirect('estoque-contagem', count_id=session.pk)
+
+
+@login_required
+def contagem_cancelar(request, count_id):
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('estoque')
+
+    session = get_object_or_404(InventoryCount, pk=count_id, company=user_company)
+    if request.method != 'POST':
+        messages.error(request, 'Método inválido para cancelar a contagem.')
+    elif session.status != InventoryCount.Status.OPEN:
+        messages.error(request, 'A contagem não está aberta.')
+    else:
+        session.status = InventoryCount.Status.CANCELLED
+        session.save(update_fields=['status'])
+        messages.success(request, 'Contagem cancelada.')
+    return redirect('estoque-contagem', count_id=session.pk)
+
+
+@login_required
+def locais(request):
+    """Locais de estoque com o saldo de cada um; POST cria ou altera um local."""
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('estoque')
+
+    StockLocation.default_for(user_company)
+    if request.method == 'POST':
+        data = request.POST
+        name = data.get('name', '').strip()[:80]
+        kind = data.get('kind', '').strip()
+        if kind not in StockLocation.Kind.values:
+            kind = StockLocation.Kind.STORE
+        location_id = data.get('id', '').strip()
+        location = None
+        if location_id.isdigit():
+            location = get_object_or_404(
+                StockLocation, pk=int(location_id), company=user_company)
+        if not name:
+            messages.error(request, 'Informe o nome do local.')
+            return redirect('estoque-locais')
+        if StockLocation.objects.filter(
+            company=user_company, name__iexact=name
+        ).exclude(pk=getattr(location, 'pk', None)).exists():
+            messages.error(request, f'Já existe um local chamado {name}.')
+            return redirect('estoque-locais')
+
+        is_default = data.get('is_default') == '1' or bool(location and location.is_default)
+        is_active = data.get('is_active', '1') == '1' or is_default
+        with transaction.atomic():
+            if is_default and not (location and location.is_default):
+                StockLocation.objects.filter(
+                    company=user_company, is_default=True).update(is_default=False)
+            if location is None:
+                StockLocation.objects.create(
+                    company=user_company, name=name, kind=kind,
+                    is_default=is_default, is_active=is_active)
+            else:
+                location.name = name
+                location.kind = kind
+                location.is_default = is_default
+                location.is_active = is_active
+                location.save(update_fields=['name', 'kind', 'is_default', 'is_active'])
+        messages.success(request, 'Local de estoque salvo.')
+        return redirect('estoque-locais')
+
+    totals = {row['location_id']: row for row in location_totals(user_company)}
+    locations = list(StockLocation.objects.filter(company=user_company))
+    for location in locations:
+        location.totals = totals.get(location.pk, {})
+    context = {
+        'page_title': 'Locais de Estoque',
+        'locations': locations,
+        'kinds': StockLocation.Kind.choices,
+        'current': 'estoque',
+    }
+    return render(request, 'inventory/locais.html', context)
+
+
+@login_required
+def transferir(request):
+    """Transfere vários produtos entre locais numa única transação.
+
+    Os itens vêm um por linha no formato ``código;quantidade`` (leitor de
+    código de barras ou colado de uma planilha).
+    """
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('estoque')
+
+    locations = list(active_locations(user_company))
+    if request.method == 'POST':
+        data = request.POST
+        origin = next((loc for loc in locations if str(loc.pk) == data.get('origin')), None)
+        destination = next(
+            (loc for loc in locations if str(loc.pk) == data.get('destination')), None)
+        entries, rejected = parse_count_entries(
+            line for line in data.get('items', '').splitlines() if line.strip())
+        products = resolve_barcodes(user_company, (code for code, _ in entries))
+        unknown = rejected + [code for code, _ in entries if code not in products]
+        if origin is None or destination is None:
+            messages.error(request, 'Selecione os locais de origem e destino.')
+        elif unknown:
+            messages.error(
+                request, f'Códigos não reconhecidos: {", ".join(unknown[:20])}.')
+        else:
+            quantities: dict[int, Decimal] = {}
+            for code, quantity in entries:
+                quantities[products[code]] = quantities.get(products[code], Decimal('0')) + quantity
+            try:
+                moved = transfer_stock(
+                    user_company, origin, destination, quantities, user=request.user)
+            except TransferError as exc:
+                messages.error(request, str(exc))
+            else:
+                messages.success(
+                    request,
+                    f'{moved} produto(s) transferidos de {origin.name} para {destination.name}.')
+                return redirect('estoque-transferir')
+        context_items = data.get('items', '')
+    else:
+        context_items = ''
+
+    recent = (
+        StockMovement.objects.filter(
+            company=user_company, reason=StockMovement.Reason.TRANSFER, delta__gt=0)
+        .select_related('produto', 'location', 'user')
+        .order_by('-created_at', '-id')[:50]
+    )
+    context = {
+        'page_title': 'Transferir Estoque',
+        'locations': locations,
+        'items': context_items,
+        'origin': request.POST.get('origin', ''),
+        'destination': request.POST.get('destination', ''),
+        'recent': recent,
+        'current': 'estoque',
+    }
+    return render(request, 'inventory/transferir.html', context)
+
+
+@login_required
+def stock_balance(request):
+    """Saldo de cada produto ao final do dia ``data`` (YYYY-MM-DD)."""
+    user_company = get_user_company(request)
+    if not user_company:
+        return JsonResponse(
+            {'status': 'failed',
+             'msg': 'Usuário não está associado a nenhuma empresa.'}
+        )
+
+    date_str = request.GET.get('data', '').strip()
+    try:
+        as_of_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        return JsonResponse(
+            {'status': 'failed', 'msg': 'Informe a data no formato AAAA-MM-DD.'}
+        )
+    as_of = timezone.make_aware(
+        datetime.combine(as_of_date, datetime.max.time()))
+
+    balances = stock_balance_as_of(user_company, as_of)
+    products = Products.objects.filter(
+        company=user_company, pk__in=balances.keys()
+    ).order_by('name').values('id', 'code', 'name')
+    return JsonResponse(
+        {
+            'status': 'success',
+            'data': as_of_date.isoformat(),
+            'items': [
+                {**product, 'quantidade': float(balances[product['id']])}
+                for product in products
+            ],
+        }
+    )
+
+
 @login_required
 def delete_product_estoque(request):
     data = request.POST
@@ -177,7 +678,18 @@ def delete_product_estoque(request):
         resp['msg'] = 'Produto não encontrado.'
         return JsonResponse(resp)
 
-    estoque.delete()
+    with transaction.atomic():
+        removed_quantity = estoque.quantidade
+        estoque.quantidade = Decimal('0.000')
+        record_stock_movement(
+            estoque,
+            -removed_quantity,
+            StockMovement.Reason.ADJUSTMENT,
+            user=request.user,
+            reference='Registro de estoque excluído',
+        )
+        consume_stock_lots(user_company, {estoque.produto_id: removed_quantity})
+        estoque.delete()
     messages.success(request, 'Produto deletado com sucesso.')
     resp['status'] = 'success'
     return JsonResponse(resp)
@@ -192,7 +704,7 @@ def manage_products_estoque(request):
         return render(
             request,
             'inventory/manage_estoque.html',
-            {'product': None, 'categories': [], 'products': []},
+            {'product': None, 'categories': [], 'products': [], 'locations': []},
         )
 
     product = None
@@ -208,7 +720,12 @@ def manage_products_estoque(request):
     return render(
         request,
         'inventory/manage_estoque.html',
-        {'product': product, 'categories': categories, 'products': products},
+        {
+            'product': product,
+            'categories': categories,
+            'products': products,
+            'locations': active_locations(user_company),
+        },
     )
 
 
@@ -245,17 +762,72 @@ def save_product_estoque(request):
             Estoque, pk=int(record_id), company=user_company)
     else:
         estoque = Estoque(company=user_company)
-
+    previous_produto_id = estoque.produto_id
+    previous_location_id = estoque.location_id
+    previous_quantity = estoque.quantidade if estoque.pk else Decimal('0.000')
+    if previous_produto_id != produto.pk:
+        # Registro novo ou de outro produto: parte do custo médio do produto.
+        estoque.custo = produto.custo or Decimal('0.00')
+
+    if 'location_id' in data or not estoque.location_id:
+        estoque.location = resolve_location(user_company, data.get('location_id'))
+    if Estoque.objects.filter(
+        company=user_company, location=estoque.location, produto=produto,
+    ).exclude(pk=estoque.pk).exists():
+        resp['msg'] = (
+            f'{produto.name} já tem estoque em {estoque.location.name}. '
+            'Edite o registro existente.'
+        )
+        return JsonResponse(resp)
     estoque.produto = produto
     estoque.categoria = categoria
-    estoque.quantidade = int(quantidade) if quantidade.isnumeric() else 0
+    estoque.quantidade = _parse_quantity_cell(quantidade) or Decimal('0.000')
     estoque.validade = int(validade) if validade.isnumeric() else 0
     estoque.preco = preco
-    estoque.custo = custo
     estoque.status = int(status) if status in ('0', '1') else 1
 
     try:
-        estoque.save()
+        with transaction.atomic():
+            estoque.save()
+            ledger_base = previous_quantity
+            if previous_produto_id and (
+                previous_produto_id != estoque.produto_id
+                or previous_location_id != estoque.location_id
+            ):
+                # O registro mudou de produto ou de local: zera o saldo anterior.
+                record_stock_movement(
+                    Estoque(
+                        company=user_company,
+                        produto_id=previous_produto_id,
+                        location_id=previous_location_id,
+                    ),
+                    -previous_quantity,
+                    StockMovement.Reason.ADJUSTMENT,
+                    user=request.user,
+                )
+                ledger_base = Decimal('0.000')
+                if previous_produto_id != estoque.produto_id:
+                    consume_stock_lots(user_company, {previous_produto_id: previous_quantity})
+                    previous_quantity = Decimal('0.000')
+            record_stock_movement(
+                estoque,
+                estoque.quantidade - ledger_base,
+                StockMovement.Reason.ADJUSTMENT,
+                user=request.user,
+            )
+            adjust_stock_lots(
+                estoque,
+                estoque.quantidade - previous_quantity,
+                data_validade=expiry_from_validade(estoque.validade),
+            )
+            update_stock_cost(
+                estoque,
+                previous_quantity,
+                estoque.quantidade - previous_quantity,
+                _parse_decimal_cell(custo),
+                StockMovement.Reason.ADJUSTMENT,
+                user=request.user,
+            )
         messages.success(request, 'Produto salvo com sucesso.')
         return JsonResponse({'status': 'success'})
     except Exception as exc:
@@ -280,6 +852,7 @@ def upload_estoque(request):
         'Preço',
         'Custo',
         'Status',
+        'Local',
     ]
 
     if request.method == 'GET':
@@ -327,6 +900,7 @@ def upload_estoque(request):
     price_idx = resolve_index(['preco', 'preço', 'valor', 'valor de venda'])
     cost_idx = resolve_index(['custo', 'custo unitario', 'custo unitário'])
     status_idx = resolve_index(['status'])
+    location_idx = resolve_index(['local', 'local de estoque'])
 
     if None in (code_idx, quantity_idx, status_idx):
         resp['msg'] = 'Cabeçalho inválido. Utilize o modelo de importação disponibilizado.'
@@ -335,6 +909,12 @@ def upload_estoque(request):
     created_count = 0
     updated_count = 0
     error_rows = []
+    entries: dict[tuple[int, int], dict] = {}
+    default_location = StockLocation.default_for(user_company)
+    locations_by_name = {
+        location.name.strip().lower(): location
+        for location in active_locations(user_company)
+    }
 
     def is_empty_row(row):
         return all(
@@ -361,10 +941,12 @@ def upload_estoque(request):
         cost_cell = row[cost_idx] if cost_idx is not None and len(
             row) > cost_idx else None
         status_cell = row[status_idx] if len(row) > status_idx else None
+        location_cell = row[location_idx] if location_idx is not None and len(
+            row) > location_idx else None
 
         code = str(code_cell or '').strip()
         category_name = str(category_cell or '').strip()
-        quantity_value = _parse_int_cell(quantity_cell)
+        quantity_value = _parse_quantity_cell(quantity_cell)
         validity_value = _parse_validade_cell(validity_cell)
         status_value = _parse_status_cell(status_cell)
         price_value = _parse_decimal_cell(price_cell)
@@ -392,6 +974,13 @@ def upload_estoque(request):
             )
             continue
 
+        location_name = str(location_cell or '').strip()
+        location = locations_by_name.get(location_name.lower()) if location_name else default_location
+        if location is None:
+            error_rows.append(
+                f"Linha {row_number}: local de estoque '{location_name}' não encontrado.")
+            continue
+
         product = Products.objects.filter(
             company=user_company, code__iexact=code).first()
         if not product:
@@ -419,44 +1008,75 @@ def upload_estoque(request):
             )
             continue
 
+        # Linhas repetidas do mesmo produto e local: vale a última.
+        entries[location.pk, product.pk] = {
+            'location': location,
+            'product': product,
+            'category': category,
+            'quantity': quantity_value,
+            'validity': validity_value,
+            'price': price_value,
+            'cost': cost_value,
+            'status': status_value,
+        }
+
+    if entries:
         try:
-            estoque_obj = Estoque.objects.filter(
-                company=user_company, produto=product).first()
-            if estoque_obj:
-                estoque_obj.categoria = category
-                estoque_obj.quantidade = quantity_value
-                estoque_obj.validade = validity_value
-                if price_value is not None:
-                    estoque_obj.preco = float(price_value)
-                elif estoque_obj.preco in (None, 0) and product.price is not None:
-                    estoque_obj.preco = float(product.price)
-                if cost_value is not None:
-                    estoque_obj.custo = float(cost_value)
-                elif estoque_obj.custo in (None, 0) and product.custo is not None:
-                    estoque_obj.custo = float(product.custo)
-                estoque_obj.descricao = product
-                estoque_obj.status = status_value
-                estoque_obj.save()
-                updated_count += 1
-            else:
-                Estoque.objects.create(
-                    company=user_company,
-                    produto=product,
-                    categoria=category,
-                    quantidade=quantity_value,
-                    validade=validity_value,
-                    preco=float(price_value) if price_value is not None else float(
-                        product.price or 0),
-                    custo=float(cost_value) if cost_value is not None else float(
-                        product.custo or 0),
-                    status=status_value,
-                    descricao=product,
+            with transaction.atomic():
+                current = lock_stock_rows(user_company, entries)
+                rows = []
+                for key, entry in entries.items():
+                    product = entry['product']
+                    existing = current.get(key)
+                    preco = entry['price']
+                    if preco is None and existing and existing.preco:
+                        preco = existing.preco
+                    rows.append(
+                        Estoque(
+                            company=user_company,
+                            location=entry['location'],
+                            produto=product,
+                            categoria=entry['category'],
+                            quantidade=entry['quantity'],
+                            validade=entry['validity'],
+                            preco=preco if preco is not None else (
+                                product.price or Decimal('0.00')),
+                            custo=existing.custo if existing and existing.custo else (
+                                product.custo or Decimal('0.00')),
+                            status=entry['status'],
+                            descricao=product,
+                        )
+                    )
+                upsert_stock_rows(
+                    user_company,
+                    rows,
+                    ['categoria', 'validade', 'preco', 'custo', 'status', 'descricao'],
+                    StockMovement.Reason.IMPORT,
+                    previous={key: row.quantidade for key, row in current.items()},
+                    user=request.user,
+                    reference=upload_file.name,
                 )
-                created_count += 1
+                for estoque_obj in rows:
+                    key = (estoque_obj.location_id, estoque_obj.produto_id)
+                    previous_quantity = current[key].quantidade if key in current else Decimal('0.000')
+                    adjust_stock_lots(
+                        estoque_obj,
+                        estoque_obj.quantidade - previous_quantity,
+                        data_validade=expiry_from_validade(estoque_obj.validade),
+                    )
+                    update_stock_cost(
+                        estoque_obj,
+                        previous_quantity,
+                        estoque_obj.quantidade - previous_quantity,
+                        entries[key]['cost'],
+                        StockMovement.Reason.IMPORT,
+                        user=request.user,
+                        reference=upload_file.name,
+                    )
+            updated_count = len(current)
+            created_count = len(entries) - updated_count
         except Exception as exc:
-            error_rows.append(
-                f'Linha {row_number}: erro ao salvar estoque ({exc}).')
-            continue
+            error_rows.append(f'Erro ao salvar estoque ({exc}).')
 
     if created_count or updated_count:
         if error_rows:
@@ -523,6 +1143,7 @@ def download_estoque_template(request):
         'Preço',
         'Custo',
         'Status',
+        'Local',
     ]
     worksheet.append(headers)
     for cell in worksheet[1]:
@@ -537,6 +1158,7 @@ def download_estoque_template(request):
         6.5,
         3.2,
         'Ativo',
+        StockLocation.DEFAULT_NAME,
     ])
     worksheet.append([
         'PRD-0002',
@@ -547,6 +1169,7 @@ def download_estoque_template(request):
         45.0,
         22.5,
         'Inativo',
+        StockLocation.DEFAULT_NAME,
     ])
 
     response = HttpResponse(
@@ -573,8 +1196,9 @@ class EstoqueXMLUploadView(View):
             request,
             self.template_name,
             {
-                'expected_fields': ['cProd', 'xProd', 'qCom', 'vUnCom', 'vUnTrib'],
+                'expected_fields': ['cProd', 'cEAN', 'xProd', 'qCom', 'vUnCom', 'vUnTrib'],
                 'csrf_token_value': request.META.get('CSRF_COOKIE', ''),
+                'locations': active_locations(user_company),
             },
         )
 
@@ -591,11 +1215,12 @@ class EstoqueXMLUploadView(View):
             try:
                 payload = json.loads(request.body.decode('utf-8'))
                 items = payload.get('items') or []
-            except (TypeError, ValueError):
+                location = resolve_location(user_company, payload.get('location_id'))
+            except (AttributeError, TypeError, ValueError):
                 return JsonResponse(
                     {'status': 'failed', 'msg': 'Payload JSON inválido.'}
                 )
-            return self._apply_items(user_company, items)
+            return self._apply_items(user_company, items, request.user, location)
 
         upload_file = request.FILES.get('file')
         if not upload_file:
@@ -635,6 +1260,27 @@ class EstoqueXMLUploadView(View):
                     return (child.text or '').strip()
             return ''
 
+        def find_child(element, name):
+            return next(
+                (child for child in element if strip_tag(child.tag) == name), None)
+
+        # Chave de acesso: atributo Id do infNFe ("NFe" + 44 dígitos) ou chNFe
+        # do protocolo; sem ela, o número da nota.
+        nfe_key = ''
+        for node in root.iter():
+            tag = strip_tag(node.tag)
+            if tag == 'infNFe' and node.get('Id', '').startswith('NFe'):
+                nfe_key = node.get('Id')[3:]
+                break
+            if tag == 'chNFe' and node.text:
+                nfe_key = node.text.strip()
+                break
+        if not nfe_key:
+            nfe_key = next(
+                ((node.text or '').strip() for node in root.iter() if strip_tag(node.tag) == 'nNF'),
+                '',
+            )
+
         items = []
         errors = []
         for node in root.iter():
@@ -658,17 +1304,36 @@ class EstoqueXMLUploadView(View):
                 find_child_text(prod, 'vUnCom') or find_child_text(prod, 'vProd')
             )
             cost_value = _parse_decimal_cell(find_child_text(prod, 'vUnTrib')) or price_value
+            barcode = next(
+                (
+                    value
+                    for value in (
+                        normalize_barcode(find_child_text(prod, 'cEAN')),
+                        normalize_barcode(find_child_text(prod, 'cEANTrib')),
+                    )
+                    if is_valid_gtin(value)
+                ),
+                '',
+            )
 
             product = Products.objects.filter(
                 company=company, code__iexact=code).first() if code else None
+            if not product and barcode:
+                product = find_product_by_barcode(company, barcode)
             category_name = ''
             if product and product.category_id:
                 category_name = product.category_id.name
 
+            # Rastreabilidade (grupo rastro): lote e data de validade do item.
+            rastro = find_child(prod, 'rastro')
+            lot_code = find_child_text(rastro, 'nLote') if rastro is not None else ''
+            expiry = _parse_date_cell(find_child_text(rastro, 'dVal')) if rastro is not None else None
+
             items.append(
                 {
-                    'code': code,
+                    'code': product.code if product else code,
                     'name': name,
+                    'barcode': barcode,
                     'quantity': float(quantity_value) if quantity_value is not None else 0,
                     'price': float(price_value)
                     if price_value is not None
@@ -678,6 +1343,9 @@ class EstoqueXMLUploadView(View):
                     else float(product.custo if product else 0),
                     'category': category_name,
                     'status': 1,
+                    'lot': lot_code,
+                    'expiry': expiry.isoformat() if expiry else '',
+                    'nfe_key': nfe_key,
                 }
             )
 
@@ -686,13 +1354,15 @@ class EstoqueXMLUploadView(View):
 
         return items, errors
 
-    def _apply_items(self, company, items):
+    def _apply_items(self, company, items, user=None, location=None):
         if not isinstance(items, list):
             return JsonResponse({'status': 'failed', 'msg': 'Lista de itens inválida.'})
 
         created = 0
         updated = 0
         errors: list[str] = []
+        entries: list[dict] = []
+        location = location or StockLocation.default_for(company)
 
         for idx, item in enumerate(items, start=1):
             code = str(item.get('code') or '').strip()
@@ -700,7 +1370,7 @@ class EstoqueXMLUploadView(View):
                 errors.append(f'Linha {idx}: informe o código do produto.')
                 continue
 
-            qty_value = _parse_int_cell(item.get('quantity'))
+            qty_value = _parse_quantity_cell(item.get('quantity'))
             if qty_value is None or qty_value < 0:
                 errors.append(f'Linha {idx}: quantidade inválida.')
                 continue
@@ -711,13 +1381,23 @@ class EstoqueXMLUploadView(View):
 
             price_value = _parse_decimal_cell(item.get('price'))
             cost_value = _parse_decimal_cell(item.get('cost'))
+            expiry = _parse_date_cell(item.get('expiry'))
 
+            barcode = normalize_barcode(item.get('barcode'))
             product = Products.objects.filter(
                 company=company, code__iexact=code).first()
+            if not product and barcode:
+                product = find_product_by_barcode(company, barcode)
             if not product:
                 errors.append(f'Linha {idx}: produto {code} não encontrado.')
                 continue
 
+            if barcode and is_valid_gtin(barcode):
+                for conflict in assign_barcodes(product, [barcode]):
+                    errors.append(
+                        f'Linha {idx}: código de barras {conflict} já pertence a outro produto.'
+                    )
+
             category = product.category_id
             category_name = str(item.get('category') or '').strip()
             if category_name:
@@ -732,32 +1412,78 @@ class EstoqueXMLUploadView(View):
                         status=1,
                     )
 
-            estoque_obj = Estoque.objects.filter(
-                company=company, produto=product).first()
-            if estoque_obj:
-                estoque_obj.quantidade = (estoque_obj.quantidade or 0) + qty_value
-                estoque_obj.categoria = category
-                if price_value is not None:
-                    estoque_obj.preco = float(price_value)
-                if cost_value is not None:
-                    estoque_obj.custo = float(cost_value)
-                estoque_obj.descricao = product
-                estoque_obj.status = status_value if status_value in (0, 1) else estoque_obj.status
-                estoque_obj.save()
-                updated += 1
-            else:
-                Estoque.objects.create(
-                    company=company,
-                    produto=product,
-                    categoria=category,
-                    quantidade=qty_value,
-                    validade=0,
-                    preco=float(price_value if price_value is not None else product.price or 0),
-                    custo=float(cost_value if cost_value is not None else product.custo or 0),
-                    status=status_value if status_value in (0, 1) else 1,
-                    descricao=product,
+            entries.append(
+                {
+                    'product': product,
+                    'category': category,
+                    'quantity': qty_value,
+                    'price': price_value,
+                    'cost': cost_value,
+                    'status': status_value,
+                    'expiry': expiry,
+                    'nfe_key': str(item.get('nfe_key') or '').strip(),
+                    'lot': str(item.get('lot') or '').strip(),
+                }
+            )
+
+        if entries:
+            # O custo médio parte do saldo atual: trava os registros até gravar as entradas.
+            with transaction.atomic():
+                current = lock_stock_rows(
+                    company, {(location.pk, entry['product'].pk) for entry in entries})
+                rows: dict[tuple[int, int], Estoque] = {}
+                for entry in entries:
+                    product = entry['product']
+                    key = (location.pk, product.pk)
+                    base = rows.get(key) or current.get(key)
+                    rows[key] = Estoque(
+                        company=company,
+                        location=location,
+                        produto=product,
+                        categoria=entry['category'],
+                        quantidade=(base.quantidade if base else Decimal('0.000')) + entry['quantity'],
+                        validade=base.validade if base else 0,
+                        preco=entry['price'] if entry['price'] is not None else (
+                            base.preco if base else (product.price or Decimal('0.00'))),
+                        custo=base.custo if base else (product.custo or Decimal('0.00')),
+                        status=entry['status'] if entry['status'] in (0, 1) else (
+                            base.status if base else 1),
+                        descricao=product,
+                    )
+                balances = {key: row.quantidade for key, row in current.items()}
+                upsert_stock_rows(
+                    company,
+                    list(rows.values()),
+                    ['categoria', 'preco', 'status', 'descricao'],
+                    StockMovement.Reason.IMPORT,
+                    previous=dict(balances),
+                    user=user,
+                    reference='Importação XML NF-e',
                 )
-                created += 1
+                for entry in entries:
+                    key = (location.pk, entry['product'].pk)
+                    estoque_obj = rows[key]
+                    previous_quantity = balances.get(key, Decimal('0.000'))
+                    adjust_stock_lots(
+                        estoque_obj,
+                        entry['quantity'],
+                        data_validade=entry['expiry'],
+                        custo=entry['cost'],
+                        nfe_key=entry['nfe_key'],
+                        lot_code=entry['lot'],
+                    )
+                    update_stock_cost(
+                        estoque_obj,
+                        previous_quantity,
+                        entry['quantity'],
+                        entry['cost'],
+                        StockMovement.Reason.IMPORT,
+                        user=user,
+                        reference=f"NF-e {entry['nfe_key']}" if entry['nfe_key'] else 'Importação XML NF-e',
+                    )
+                    balances[key] = previous_quantity + entry['quantity']
+            created = len(rows) - len(current)
+            updated = len(entries) - created
 
         status = 'success' if not errors else 'partial'
         msg = f'Estoque atualizado: {created} criado(s) e {updated} atualizado(s).'
@@ -0,0 +1,61 @@
+from django import forms
+
+from p_v_App.models import Category, KitchenStation, StockLocation
+
+
+class KitchenStationForm(forms.ModelForm):
+    categories = forms.ModelMultipleChoiceField(
+        queryset=Category.objects.none(),
+        required=False,
+        label='Categorias atendidas',
+        widget=forms.CheckboxSelectMultiple,
+    )
+
+    class Meta:
+        model = KitchenStation
+        fields = ['name', 'is_active', 'stock_location']
+        labels = {
+            'name': 'Nome',
+            'is_active': 'Ativa',
+            'stock_location': 'Baixar estoque de',
+        }
+        widgets = {
+            'name': forms.TextInput(attrs={'class': 'form-control'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        self.company = kwargs.pop('company', None)
+        super().__init__(*args, **kwargs)
+        self.fields['stock_location'].queryset = StockLocation.objects.filter(
+            company=self.company, is_active=True)
+        if self.company:
+            self.fields['categories'].queryset = (
+                Category.objects.filter(company=self.company)
+                .select_related('kitchen_station')
+                .order_by('name')
+            )
+        if self.instance.pk:
+            self.initial.setdefault(
+                'categories', list(self.instance.categories.values_list('pk', flat=True)))
+
+    def clean_name(self):
+        name = (self.cleaned_data.get('name') or '').strip()
+        if not name:
+            raise forms.ValidationError('Informe o nome da estação.')
+        if self.company:
+            qs = KitchenStation.objects.filter(
+                company=self.company, name__iexact=name)
+            if self.instance.pk:
+                qs = qs.exclude(pk=self.instance.pk)
+            if qs.exists():
+                raise forms.ValidationError(
+                    'Já existe uma estação com esse nome nesta empresa.')
+        return name
+
+    def save_categories(self, station):
+        """Route the selected categories to ``station`` (and only those)."""
+        selected = [category.pk for category in self.cleaned_data.get('categories', [])]
+        Category.objects.filter(company=station.company, kitchen_station=station).exclude(
+            pk__in=selected).update(kitchen_station=None)
+        Category.objects.filter(company=station.company, pk__in=selected).update(
+            kitchen_station=station)
@@ -0,0 +1,118 @@
+"""Production queue read by the kitchen screens.
+
+Each station reads its open items with one query on the
+``orderitem_station_queue`` index (station, prep_status, added_at). Screens poll
+or react to SSE events many times per minute, so the serialized queue is cached
+per station under a company-wide version that any item or comanda change bumps;
+unchanged queues are answered from the cache with the same ETag.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from p_v_App.models import TableOrder, TableOrderItem
+
+ACTIVE_STATUSES = (
+    TableOrderItem.PrepStatus.PENDING,
+    TableOrderItem.PrepStatus.PREPARING,
+    TableOrderItem.PrepStatus.READY,
+)
+QUEUE_LIMIT = 200
+
+# Fluxo de preparo: cada toque na tela avança uma etapa.
+NEXT_STATUS = {
+    TableOrderItem.PrepStatus.PENDING: TableOrderItem.PrepStatus.PREPARING,
+    TableOrderItem.PrepStatus.PREPARING: TableOrderItem.PrepStatus.READY,
+    TableOrderItem.PrepStatus.READY: TableOrderItem.PrepStatus.DELIVERED,
+}
+
+
+def _version_key(company_id) -> str:
+    return f'kitchen:queue-version:{company_id}'
+
+
+def _queue_key(company_id, station_id, version) -> str:
+    return f'kitchen:queue:{company_id}:{station_id}:{version}'
+
+
+def _queue_version(company_id) -> int:
+    version = cache.get(_version_key(company_id))
+    if version is None:
+        version = 1
+        cache.add(_version_key(company_id), version, None)
+    return version
+
+
+def invalidate_kitchen_queues(company_id) -> None:
+    """Make every station queue of ``company_id`` stale."""
+    try:
+        cache.incr(_version_key(company_id))
+    except ValueError:
+        cache.set(_version_key(company_id), 2, None)
+
+
+def station_queue_rows(station_id, limit: int = QUEUE_LIMIT) -> list[dict]:
+    """Open items routed to ``station_id``, oldest first."""
+    rows = (
+        TableOrderItem.objects.filter(
+            station_id=station_id,
+            prep_status__in=ACTIVE_STATUSES,
+            order__status=TableOrder.Status.OPEN,
+        )
+        .order_by('added_at', 'id')
+        .values(
+            'id',
+            'order_id',
+            'quantity',
+            'notes',
+            'prep_status',
+            'added_at',
+            'prep_updated_at',
+            'product__name',
+            'order__table__number',
+            'order__waiter_name',
+        )[:limit]
+    )
+    return [
+        {
+            'id': row['id'],
+            'order_id': row['order_id'],
+            'table': row['order__table__number'],
+            'waiter': row['order__waiter_name'],
+            'product': row['product__name'],
+            'quantity': float(row['quantity']),
+            'notes': row['notes'],
+            'status': row['prep_status'],
+            'added_at': row['added_at'],
+            'updated_at': row['prep_updated_at'],
+        }
+        for row in rows
+    ]
+
+
+def get_station_queue(station) -> tuple[list[dict], str]:
+    """Return the queue of ``station`` and its ETag (cached)."""
+    key = _queue_key(station.company_id, station.pk, _queue_version(station.company_id))
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    items = station_queue_rows(station.pk)
+    body = json.dumps(items, cls=DjangoJSONEncoder)
+    etag = f'"{hashlib.md5(body.encode("utf-8")).hexdigest()}"'
+    result = (items, etag)
+    cache.set(key, result, getattr(settings, 'KITCHEN_QUEUE_CACHE_SECONDS', 5))
+    return result
+
+
+def set_prep_status(item: TableOrderItem, status: str) -> TableOrderItem:
+    """Move ``item`` to ``status`` without touching the comanda totals."""
+    item.prep_status = status
+    item.prep_updated_at = timezone.now()
+    item.save(update_fields=['prep_status', 'prep_updated_at'])
+    return item
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from kitchen.queue import invalidate_kitchen_queues
+from p_v_App.models import KitchenStation, TableOrder, TableOrderItem
+
+
+@receiver(post_save, sender=TableOrderItem)
+@receiver(post_delete, sender=TableOrderItem)
+def refresh_queue_for_item(sender, instance, **kwargs):
+    if instance.station_id:
+        invalidate_kitchen_queues(instance.order.company_id)
+
+
+@receiver(post_save, sender=TableOrder)
+@receiver(post_delete, sender=TableOrder)
+@receiver(post_save, sender=KitchenStation)
+@receiver(post_delete, sender=KitchenStation)
+def refresh_queues(sender, instance, **kwargs):
+    invalidate_kitchen_queues(instance.company_id)
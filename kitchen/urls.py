@@ -0,0 +1,18 @@
+from django.urls import path
+
+from kitchen import views
+
+urlpatterns = [
+    path('cozinha/', views.cozinha, name='cozinha'),
+    path('cozinha/estacoes/salvar/', views.salvar_estacao, name='salvar_estacao'),
+    path('cozinha/estacoes/<int:station_id>/salvar/',
+         views.salvar_estacao, name='editar_estacao'),
+    path('cozinha/estacoes/<int:station_id>/excluir/',
+         views.excluir_estacao, name='excluir_estacao'),
+    path('cozinha/estacoes/<int:station_id>/',
+         views.cozinha_estacao, name='cozinha-estacao'),
+    path('cozinha/estacoes/<int:station_id>/fila/',
+         views.cozinha_fila, name='cozinha-fila'),
+    path('cozinha/itens/<int:item_id>/status/',
+         views.cozinha_item_status, name='cozinha-item-status'),
+]
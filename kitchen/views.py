@@ -0,0 +1,177 @@
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db.models import Count, Q
+from django.http import HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+
+from core.utils import get_user_company
+from kitchen.forms import KitchenStationForm
+from kitchen.queue import ACTIVE_STATUSES, NEXT_STATUS, get_station_queue, set_prep_status
+from p_v_App.models import Category, KitchenStation, TableOrder, TableOrderItem
+
+
+@login_required
+def cozinha(request):
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('home-page')
+
+    stations = list(
+        KitchenStation.objects.filter(company=user_company)
+        .annotate(
+            open_items=Count(
+                'items',
+                filter=Q(
+                    items__prep_status__in=ACTIVE_STATUSES,
+                    items__order__status=TableOrder.Status.OPEN,
+                ),
+            )
+        )
+        .prefetch_related('categories')
+        .order_by('name')
+    )
+    context = {
+        'page_title': 'Cozinha',
+        'stations': stations,
+        'station_form': KitchenStationForm(company=user_company),
+        'unrouted_categories': Category.objects.filter(
+            company=user_company, kitchen_station__isnull=True).order_by('name'),
+    }
+    return render(request, 'kitchen/estacoes.html', context)
+
+
+@login_required
+def salvar_estacao(request, station_id=None):
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('home-page')
+
+    if request.method != 'POST':
+        messages.error(request, 'Método inválido para salvar estação.')
+        return redirect('cozinha')
+
+    instance = None
+    if station_id:
+        instance = get_object_or_404(
+            KitchenStation, pk=station_id, company=user_company)
+
+    form = KitchenStationForm(
+        request.POST, instance=instance, company=user_company)
+    if form.is_valid():
+        station = form.save(commit=False)
+        station.company = user_company
+        station.save()
+        form.save_categories(station)
+        action = 'atualizada' if instance else 'cadastrada'
+        messages.success(
+            request, f'Estação {station.name} {action} com sucesso.')
+    else:
+        for field_errors in form.errors.values():
+            for error in field_errors:
+                messages.error(request, error)
+
+    return redirect(reverse('cozinha'))
+
+
+@login_required
+def excluir_estacao(request, station_id):
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('home-page')
+
+    station = get_object_or_404(
+        KitchenStation, pk=station_id, company=user_company)
+
+    if request.method != 'POST':
+        messages.error(request, 'Método inválido para excluir estação.')
+        return redirect('cozinha')
+
+    station.delete()
+    messages.success(request, 'Estação removida com sucesso.')
+    return redirect('cozinha')
+
+
+@login_required
+def cozinha_estacao(request, station_id):
+    """Tela da estação (KDS): a fila é carregada e atualizada via JSON/SSE."""
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('home-page')
+
+    station = get_object_or_404(
+        KitchenStation, pk=station_id, company=user_company)
+    context = {
+        'page_title': f'Cozinha - {station.name}',
+        'station': station,
+        'status_labels': dict(TableOrderItem.PrepStatus.choices),
+    }
+    return render(request, 'kitchen/estacao.html', context)
+
+
+@login_required
+def cozinha_fila(request, station_id):
+    """Fila aberta da estação, com ETag para as telas que consultam com frequência."""
+    user_company = get_user_company(request)
+    if not user_company:
+        return JsonResponse(
+            {'status': 'failed',
+             'msg': 'Usuário não está associado a nenhuma empresa.'}
+        )
+
+    station = KitchenStation.objects.filter(
+        pk=station_id, company=user_company).first()
+    if not station:
+        return JsonResponse(
+            {'status': 'failed', 'msg': 'Estação não encontrada.'}, status=404)
+
+    items, etag = get_station_queue(station)
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse({'status': 'success', 'items': items})
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+def cozinha_item_status(request, item_id):
+    user_company = get_user_company(request)
+    if not user_company:
+        return JsonResponse(
+            {'status': 'failed',
+             'msg': 'Usuário não está associado a nenhuma empresa.'}
+        )
+    if request.method != 'POST':
+        return JsonResponse({'status': 'failed', 'msg': 'Método inválido.'})
+
+    item = (
+        TableOrderItem.objects.select_related('order')
+        .filter(pk=item_id, order__company=user_company)
+        .first()
+    )
+    if not item:
+        return JsonResponse(
+            {'status': 'failed', 'msg': 'Item não encontrado.'}, status=404)
+
+    status = request.POST.get('status') or NEXT_STATUS.get(item.prep_status)
+    if status not in TableOrderItem.PrepStatus.values:
+        return JsonResponse(
+            {'status': 'failed', 'msg': 'Status de preparo inválido.'})
+
+    set_prep_status(item, status)
+    return JsonResponse(
+        {
+            'status': 'success',
+            'item': {'id': item.pk, 'status': item.prep_status},
+        }
+    )
@@ -0,0 +1,106 @@
+"""Bounded loaders for the pedidos kanban board.
+
+Each column shows one page of cards (keyset on ``(date_added, id)``), the
+badges come from a single grouped ``COUNT`` and the cards' items are
+prefetched for the page only. ``board_changes`` feeds incremental updates to
+open boards keyed by ``date_updated``; ``removed_from_board`` reports the
+cards a board still shows whose pedido was deleted or finalized, which that
+feed cannot express.
+"""
+
+from django.db.models import Count, Prefetch, Q
+from django.utils.dateparse import parse_datetime
+
+from p_v_App.models import Pedido, PedidoItem
+
+BOARD_COLUMNS = ('pendente', 'em_rota', 'entregue')
+BOARD_PAGE_SIZE = 20
+BOARD_FEED_LIMIT = 200
+
+
+def _with_items(queryset):
+    return queryset.prefetch_related(
+        Prefetch(
+            'pedidoitem_set',
+            queryset=PedidoItem.objects.select_related('product').order_by('id'),
+            to_attr='card_items',
+        )
+    )
+
+
+def column_counts(company) -> dict[str, int]:
+    """``{status: count}`` for every board column with one grouped query."""
+    counts = dict.fromkeys(BOARD_COLUMNS, 0)
+    for row in (
+        Pedido.objects.filter(company=company, status__in=BOARD_COLUMNS)
+        .values('status')
+        .annotate(total=Count('id'))
+        .order_by()
+    ):
+        counts[row['status']] = row['total']
+    return counts
+
+
+def column_page(company, status, *, before=None, limit=BOARD_PAGE_SIZE):
+    """Return ``(pedidos, has_more)`` for one column, newest first.
+
+    ``before`` is the last pedido of the previous page.
+    """
+    queryset = Pedido.objects.filter(company=company, status=status).order_by(
+        '-date_added', '-id')
+    if before is not None:
+        queryset = queryset.filter(
+            Q(date_added__lt=before.date_added)
+            | Q(date_added=before.date_added, id__lt=before.id)
+        )
+    pedidos = list(_with_items(queryset)[:limit + 1])
+    return pedidos[:limit], len(pedidos) > limit
+
+
+def parse_cursor(value):
+    """Parse the ``since`` cursor sent back by the board (ISO datetime)."""
+    if not value:
+        return None
+    try:
+        return parse_datetime(value)
+    except ValueError:
+        return None
+
+
+def board_changes(company, since, *, limit=BOARD_FEED_LIMIT):
+    """Pedidos updated after ``since``, oldest change first.
+
+    Returns ``(pedidos, cursor, truncated)``; when ``truncated`` the board
+    should reload instead of applying a partial delta.
+    """
+    pedidos = list(
+        _with_items(
+            Pedido.objects.filter(company=company, date_updated__gt=since)
+            .order_by('date_updated', 'id')
+        )[:limit + 1]
+    )
+    truncated = len(pedidos) > limit
+    pedidos = pedidos[:limit]
+    cursor = pedidos[-1].date_updated if pedidos else since
+    return pedidos, cursor, truncated
+
+
+def parse_card_ids(value) -> list[int]:
+    """Parse the comma separated card ids sent back by the board."""
+    return [int(part) for part in (value or '').split(',') if part.isdigit()]
+
+
+def removed_from_board(company, ids) -> list[int]:
+    """Ids among ``ids`` that no longer belong on the board.
+
+    Finalizing deletes the pedido, so deleted and finalized cards both
+    disappear from the ``date_updated`` feed; the board prunes them with this
+    list.
+    """
+    if not ids:
+        return []
+    present = set(
+        Pedido.objects.filter(company=company, pk__in=ids, status__in=BOARD_COLUMNS)
+        .values_list('pk', flat=True)
+    )
+    return sorted(set(ids) - present)
@@ -0,0 +1,210 @@
+"""Conversion of delivered pedidos into sales, one or many at a time.
+
+All selected pedidos are converted in a single transaction with a constant
+number of queries: sale codes are reserved in one block, ``Sales``,
+``salesItems`` and ``SaleComboItem`` are bulk-created and the stock is
+decremented once per product (``inventory.ledger.apply_stock_deltas_by_sale``).
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+
+from core.events import publish_on_commit
+from core.utils import allocate_sale_codes
+from inventory.ledger import apply_stock_deltas_by_sale, lock_stock_balances
+from p_v_App.models import (
+    Pedido,
+    PedidoComboItem,
+    PedidoItem,
+    SaleComboItem,
+    Sales,
+    StockMovement,
+    salesItems,
+)
+from p_v_App.models_tenant import validate_tenants
+from sales.analytics import invalidate_sales_analytics
+from sales.utils import quantize_currency
+
+
+def _stock_demand(items, components_by_item) -> dict[int, Decimal]:
+    """``{product_id: quantity}`` a pedido takes from stock (combos by component)."""
+    demand: dict[int, Decimal] = {}
+    for item in items:
+        if item.product.is_combo:
+            for combo in components_by_item.get(item.pk, ()):
+                demand[combo.component_id] = demand.get(combo.component_id, Decimal('0')) + combo.quantity
+        else:
+            demand[item.product_id] = demand.get(item.product_id, Decimal('0')) + item.qty
+    return demand
+
+
+def finalize_pedidos(company, pedidos, *, user=None):
+    """Convert the delivered ``pedidos`` of ``company`` into sales.
+
+    ``pedidos`` is a queryset (or iterable of ids) narrowed to ``entregue``.
+    Pedidos are taken oldest first; one that would leave a product with
+    negative stock is skipped and reported, the others are converted.
+    Returns ``(sales, skipped)`` where ``skipped`` is a list of messages.
+    """
+    with transaction.atomic():
+        pedido_list = list(
+            Pedido.objects.select_for_update()
+            .filter(company=company, status='entregue', pk__in=pedidos)
+            .order_by('date_added', 'id')
+        )
+        if not pedido_list:
+            return [], []
+
+        items_by_pedido: dict[int, list] = {}
+        for item in (
+            PedidoItem.objects.filter(pedido__in=pedido_list)
+            .select_related('product')
+            .order_by('id')
+        ):
+            items_by_pedido.setdefault(item.pedido_id, []).append(item)
+        components_by_item: dict[int, list] = {}
+        for combo in (
+            PedidoComboItem.objects.filter(pedido_item__pedido__in=pedido_list)
+            .select_related('component')
+            .order_by('id')
+        ):
+            components_by_item.setdefault(combo.pedido_item_id, []).append(combo)
+
+        demands = {
+            pedido.pk: _stock_demand(items_by_pedido.get(pedido.pk, ()), components_by_item)
+            for pedido in pedido_list
+        }
+        product_ids = {pid for demand in demands.values() for pid in demand}
+        available = {
+            pid: quantidade
+            for pid, (_, quantidade) in lock_stock_balances(company, product_ids).items()
+        }
+        names = {
+            item.product_id: item.product.name
+            for items in items_by_pedido.values() for item in items
+        }
+        names.update(
+            (combo.component_id, combo.component.name)
+            for combos in components_by_item.values() for combo in combos
+        )
+
+        accepted, skipped = [], []
+        for pedido in pedido_list:
+            short = next(
+                (
+                    pid for pid, qty in demands[pedido.pk].items()
+                    if pid in available and available[pid] < qty
+                ),
+                None,
+            )
+            if short is not None:
+                skipped.append(
+                    f'Pedido #{pedido.pk}: estoque insuficiente para o item {names.get(short, short)}.')
+                continue
+            for pid, qty in demands[pedido.pk].items():
+                if pid in available:
+                    available[pid] -= qty
+            accepted.append(pedido)
+        if not accepted:
+            return [], skipped
+
+        # Custo gravado no pedido (no momento do lançamento) ou o atual do produto.
+        unit_costs = {
+            item.pk: item.unit_cost if item.unit_cost is not None else item.product.custo
+            for items in items_by_pedido.values() for item in items
+        }
+        costs = {
+            pedido.pk: quantize_currency(sum(
+                (item.qty * unit_costs[item.pk] for item in items_by_pedido.get(pedido.pk, ())),
+                Decimal('0'),
+            ))
+            for pedido in accepted
+        }
+
+        codes = allocate_sale_codes(company, len(accepted))
+        sales = Sales.objects.bulk_create(
+            [
+                Sales(
+                    company=company,
+                    code=code,
+                    sub_total=pedido.sub_total,
+                    tax=pedido.tax,
+                    tax_amount=pedido.tax_amount,
+                    grand_total=pedido.grand_total,
+                    tendered_amount=pedido.tendered_amount,
+                    amount_change=pedido.amount_change,
+                    forma_pagamento=pedido.forma_pagamento,
+                    endereco_entrega=pedido.endereco_entrega,
+                    customer_name=pedido.customer_name,
+                    delivery_fee=pedido.taxa_entrega,
+                    discount_total=pedido.discount_total,
+                    discount_reason=(
+                        pedido.discount_reason if (pedido.discount_total or 0) > 0 else ''),
+                    type='pedido',
+                    total_cost=costs[pedido.pk],
+                    item_count=len(items_by_pedido.get(pedido.pk, ())),
+                )
+                for pedido, code in zip(accepted, codes)
+            ]
+        )
+
+        sale_items, sources = [], []
+        for pedido, sale in zip(accepted, sales):
+            for item in items_by_pedido.get(pedido.pk, ()):
+                sale_items.append(
+                    salesItems(
+                        sale_id=sale,
+                        product_id=item.product,
+                        qty=item.qty,
+                        price=item.price,
+                        total=item.total,
+                        unit_cost=unit_costs[item.pk],
+                    )
+                )
+                sources.append(item)
+        # bulk_create não chama save(): valida as empresas com os objetos já carregados.
+        validate_tenants(
+            sale_items, 'product_id', 'sale_id',
+            'O produto deve pertencer à mesma empresa da venda')
+        sale_items = salesItems.objects.bulk_create(sale_items, batch_size=1000)
+        combo_items = [
+            SaleComboItem(
+                sale_item=sale_item,
+                component=combo.component,
+                quantity=combo.quantity,
+                unit_cost=combo.component.custo,
+            )
+            for sale_item, item in zip(sale_items, sources)
+            if item.product.is_combo
+            for combo in components_by_item.get(item.pk, ())
+        ]
+        validate_tenants(
+            combo_items, 'component', 'sale_item__sale_id',
+            'O componente deve pertencer à mesma empresa da venda.')
+        SaleComboItem.objects.bulk_create(combo_items, batch_size=1000)
+
+        apply_stock_deltas_by_sale(
+            company,
+            [
+                (sale, {pid: -qty for pid, qty in demands[pedido.pk].items()})
+                for pedido, sale in zip(accepted, sales)
+            ],
+            StockMovement.Reason.SALE,
+            user=user,
+        )
+
+        # Itens e componentes saem em cascata; post_delete avisa os quadros abertos.
+        Pedido.objects.filter(pk__in=[pedido.pk for pedido in accepted]).delete()
+
+        # bulk_create não dispara post_save: publica as vendas aqui.
+        for sale in sales:
+            publish_on_commit(
+                company.pk,
+                'sale.created',
+                {'id': sale.pk, 'code': sale.code, 'type': sale.type,
+                 'table_id': None, 'table_order_id': None},
+            )
+        transaction.on_commit(lambda: invalidate_sales_analytics(company.pk))
+
+    return sales, skipped
@@ -1,2 +1,70 @@
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase
+
+from inventory.tests import StockFixtureMixin
+from orders.finalize import finalize_pedidos
+from p_v_App.models import Estoque, Pedido, PedidoItem, Sales, StockMovement, salesItems
+
+
+class FinalizePedidosTests(StockFixtureMixin, TestCase):
+    def setUp(self):
+        self.make_company()
+        self.pizza = self.make_product('PZ')
+        self.soda = self.make_product('RF')
+        self.make_stock(self.pizza, '5')
+        self.make_stock(self.soda, '10')
+
+    def make_pedido(self, items, status='entregue'):
+        pedido = Pedido.objects.create(
+            company=self.company, code=f'P{Pedido.objects.count() + 1}', status=status)
+        total = Decimal('0')
+        for product, qty in items:
+            line_total = product.price * Decimal(qty)
+            PedidoItem.objects.create(
+                pedido=pedido, product=product, price=product.price,
+                qty=Decimal(qty), total=line_total)
+            total += line_total
+        Pedido.objects.filter(pk=pedido.pk).update(sub_total=total, grand_total=total)
+        return pedido
+
+    def balance(self, product):
+        return Estoque.objects.get(produto=product).quantidade
+
+    def test_converts_delivered_pedidos_in_one_batch(self):
+        first = self.make_pedido([(self.pizza, '2'), (self.soda, '1')])
+        second = self.make_pedido([(self.soda, '3')])
+        pending = self.make_pedido([(self.pizza, '1')], status='pendente')
+
+        sales, skipped = finalize_pedidos(
+            self.company, [first.pk, second.pk, pending.pk])
+
+        self.assertEqual(skipped, [])
+        self.assertEqual(len(sales), 2)
+        self.assertEqual(len({sale.code for sale in sales}), 2)
+        self.assertEqual(
+            sorted(Sales.objects.filter(company=self.company).values_list('grand_total', flat=True)),
+            [Decimal('30.00'), Decimal('30.00')],
+        )
+        self.assertEqual(salesItems.objects.filter(sale_id__in=sales).count(), 3)
+        self.assertEqual(self.balance(self.pizza), Decimal('3'))
+        self.assertEqual(self.balance(self.soda), Decimal('6'))
+        self.assertEqual(
+            StockMovement.objects.filter(sale__in=sales, reason=StockMovement.Reason.SALE).count(), 3)
+        self.assertEqual(list(Pedido.objects.values_list('pk', flat=True)), [pending.pk])
+
+    def test_skips_pedido_that_would_leave_stock_negative(self):
+        first = self.make_pedido([(self.pizza, '4')])
+        second = self.make_pedido([(self.pizza, '2'), (self.soda, '1')])
+        third = self.make_pedido([(self.soda, '2')])
+
+        sales, skipped = finalize_pedidos(self.company, [first.pk, second.pk, third.pk])
+
+        self.assertEqual(len(sales), 2)
+        self.assertEqual(
+            skipped,
+            [f'Pedido #{second.pk}: estoque insuficiente para o item {self.pizza.name}.'],
+        )
+        self.assertEqual(list(Pedido.objects.values_list('pk', flat=True)), [second.pk])
+        self.assertEqual(self.balance(self.pizza), Decimal('1'))
+        self.assertEqual(self.balance(self.soda), Decimal('8'))
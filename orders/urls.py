@@ -4,10 +4,15 @@ from orders import views
 
 urlpatterns = [
     path('pedidos/', views.pedidos, name='pedidos'),
+    path('pedidos/feed/', views.pedidos_feed, name='pedidos-feed'),
+    path('pedidos/coluna/<str:status>/',
+         views.pedidos_coluna, name='pedidos-coluna'),
     path('pedidos/atualizar-status/<int:id>/',
          views.atualizar_status_pedido, name='atualizar_status_pedido'),
     path('finalizar_pedido/<int:pedido_id>/',
          views.finalizar_pedido, name='finalizar_pedido'),
+    path('pedidos/finalizar-lote/',
+         views.finalizar_pedidos_lote, name='finalizar_pedidos_lote'),
     path('delete_pedido', views.delete_pedido, name='delete_pedido'),
     path('detalhe_pedido', views.view_pedido, name='view-pedido'),
 ]
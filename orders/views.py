@@ -2,54 +2,140 @@ import json
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.utils import timezone
 
-from core.utils import (
-    generate_sale_code,
-    get_user_company,
-    serialize_receipt_items,
-)
-from p_v_App.models import (
-    Estoque,
-    Pedido,
-    PedidoItem,
-    PedidoComboItem,
-    SaleComboItem,
-    Sales,
-    salesItems,
+from core.utils import get_user_company, serialize_receipt_items
+from orders.board import (
+    BOARD_COLUMNS,
+    board_changes,
+    column_counts,
+    column_page,
+    parse_card_ids,
+    parse_cursor,
+    removed_from_board,
 )
+from orders.finalize import finalize_pedidos
+from p_v_App.models import Pedido, PedidoItem
+
+
+BOARD_COLUMN_LAYOUT = {
+    'pendente': {'title': 'Pendentes', 'color': 'primary', 'icon': 'bi-inbox',
+                 'empty': 'Nenhum pedido pendente'},
+    'em_rota': {'title': 'Em rota', 'color': 'warning', 'icon': 'bi-truck',
+                'empty': 'Nenhum pedido em rota'},
+    'entregue': {'title': 'Entregues', 'color': 'success', 'icon': 'bi-check2-all',
+                 'empty': 'Nenhum pedido entregue'},
+}
+
+
+def _render_cards(request, pedidos):
+    return ''.join(
+        render_to_string('orders/_pedido_card.html', {'p': pedido}, request=request)
+        for pedido in pedidos
+    )
 
 
 @login_required
 def pedidos(request):
     user_company = get_user_company(request)
-    if user_company:
-        pendentes = (
-            Pedido.objects.filter(status='pendente', company=user_company)
-            .order_by('-date_added')
-        )
-        em_rota = (
-            Pedido.objects.filter(status='em_rota', company=user_company)
-            .order_by('-date_added')
-        )
-        entregues = (
-            Pedido.objects.filter(status='entregue', company=user_company)
-            .order_by('-date_added')
+    counts = column_counts(user_company) if user_company else dict.fromkeys(BOARD_COLUMNS, 0)
+
+    columns = []
+    for status in BOARD_COLUMNS:
+        page, has_more = column_page(user_company, status) if user_company else ([], False)
+        columns.append(
+            {
+                'status': status,
+                'count': counts[status],
+                'pedidos': page,
+                'has_more': has_more,
+                'next_before': page[-1].pk if has_more else None,
+                **BOARD_COLUMN_LAYOUT[status],
+            }
         )
-    else:
-        pendentes = em_rota = entregues = Pedido.objects.none()
 
     context = {
-        'pedidos_pendentes': pendentes,
-        'pedidos_em_rota': em_rota,
-        'pedidos_entregues': entregues,
+        'columns': columns,
+        'board_cursor': timezone.now().isoformat(),
         'page_title': 'Controle de Pedidos',
     }
     return render(request, 'orders/pedidos.html', context)
 
 
+@login_required
+def pedidos_coluna(request, status):
+    """Próxima página de uma coluna do quadro (?before=<id do último cartão>)."""
+    user_company = get_user_company(request)
+    if not user_company:
+        return JsonResponse(
+            {'status': 'failed',
+             'msg': 'Usuário não está associado a nenhuma empresa.'}
+        )
+    if status not in BOARD_COLUMNS:
+        return JsonResponse({'status': 'failed', 'msg': 'Coluna inválida.'}, status=404)
+
+    before = None
+    before_id = request.GET.get('before')
+    if before_id:
+        before = Pedido.objects.filter(
+            pk=before_id, company=user_company).only('id', 'date_added').first()
+        if before is None:
+            return JsonResponse(
+                {'status': 'failed', 'msg': 'Pedido de referência não encontrado.'})
+
+    page, has_more = column_page(user_company, status, before=before)
+    return JsonResponse(
+        {
+            'status': 'success',
+            'html': _render_cards(request, page),
+            'has_more': has_more,
+            'next_before': page[-1].pk if has_more else None,
+        }
+    )
+
+
+@login_required
+def pedidos_feed(request):
+    """Pedidos alterados desde ``since`` (date_updated) e contagens das colunas.
+
+    ``ids`` traz os cartões exibidos no quadro; os que saíram dele (excluídos
+    ou finalizados) voltam em ``removed`` para o navegador descartá-los.
+    """
+    user_company = get_user_company(request)
+    if not user_company:
+        return JsonResponse(
+            {'status': 'failed',
+             'msg': 'Usuário não está associado a nenhuma empresa.'}
+        )
+
+    since = parse_cursor(request.GET.get('since'))
+    if since is None:
+        return JsonResponse({'status': 'failed', 'msg': 'Cursor inválido.'})
+
+    changed, cursor, truncated = board_changes(user_company, since)
+    return JsonResponse(
+        {
+            'status': 'success',
+            'pedidos': [
+                {
+                    'id': pedido.pk,
+                    'status': pedido.status,
+                    'html': _render_cards(request, [pedido]),
+                }
+                for pedido in changed
+            ],
+            'removed': removed_from_board(
+                user_company, parse_card_ids(request.GET.get('ids'))),
+            'counts': column_counts(user_company),
+            'cursor': cursor.isoformat(),
+            'truncated': truncated,
+        }
+    )
+
+
 @login_required
 def atualizar_status_pedido(request, id):
     if request.method != 'POST':
@@ -64,7 +150,7 @@ def atualizar_status_pedido(request, id):
         current_idx = status_flow.index(pedido.status)
         if current_idx < len(status_flow) - 1:
             pedido.status = status_flow[current_idx + 1]
-            pedido.save(update_fields=['status'])
+            pedido.save(update_fields=['status', 'date_updated'])
             messages.success(
                 request,
                 f"Status do pedido #{pedido.code} atualizado para '{pedido.status}'.",
@@ -93,85 +179,50 @@ def finalizar_pedido(request, pedido_id):
         Pedido, pk=pedido_id, status='entregue', company=user_company
     )
 
-    try:
-        with transaction.atomic():
-            sale_code = generate_sale_code(user_company)
-            discount_reason = pedido.discount_reason if (
-                pedido.discount_total or 0) > 0 else ''
-
-            venda = Sales.objects.create(
-                code=sale_code,
-                sub_total=pedido.sub_total,
-                tax=pedido.tax,
-                tax_amount=pedido.tax_amount,
-                grand_total=pedido.grand_total,
-                tendered_amount=pedido.tendered_amount,
-                amount_change=pedido.amount_change,
-                forma_pagamento=pedido.forma_pagamento,
-                endereco_entrega=pedido.endereco_entrega,
-                customer_name=pedido.customer_name,
-                delivery_fee=pedido.taxa_entrega,
-                discount_total=pedido.discount_total,
-                discount_reason=discount_reason,
-                type='pedido',
-                company=user_company,
-            )
-
-            for item in PedidoItem.objects.filter(pedido=pedido).select_related('product'):
-                sale_item = salesItems.objects.create(
-                    sale_id=venda,
-                    product_id=item.product,
-                    qty=item.qty,
-                    price=item.price,
-                    total=item.total,
-                )
-                if item.product.is_combo:
-                    combo_components = list(
-                        PedidoComboItem.objects.filter(pedido_item=item)
-                        .select_related('component')
-                    )
-                    for combo in combo_components:
-                        SaleComboItem.objects.create(
-                            sale_item=sale_item,
-                            component=combo.component,
-                            quantity=combo.quantity,
-                        )
-                        try:
-                            estoque_item = Estoque.objects.get(
-                                produto=combo.component,
-                                company=user_company,
-                            )
-                            if estoque_item.quantidade < float(combo.quantity):
-                                raise ValueError(
-                                    f'Estoque insuficiente para o item {combo.component.name}.'
-                                )
-                            estoque_item.quantidade -= float(combo.quantity)
-                            estoque_item.save(update_fields=['quantidade'])
-                        except Estoque.DoesNotExist:
-                            pass
-                else:
-                    try:
-                        estoque_item = Estoque.objects.get(
-                            produto=item.product, company=user_company)
-                        if estoque_item.quantidade < float(item.qty):
-                            raise ValueError(
-                                f'Estoque insuficiente para o item {item.product.name}.'
-                            )
-                        estoque_item.quantidade -= item.qty
-                        estoque_item.save(update_fields=['quantidade'])
-                    except Estoque.DoesNotExist:
-                        pass
-
-            PedidoItem.objects.filter(pedido=pedido).delete()
-            pedido.delete()
-    except ValueError as exc:
-        messages.error(request, str(exc))
+    sales, skipped = finalize_pedidos(user_company, [pedido.pk], user=request.user)
+    if not sales:
+        messages.error(
+            request, skipped[0] if skipped else 'Não foi possível finalizar o pedido.')
         return redirect('pedidos')
 
     messages.success(request, 'Pedido convertido em venda com sucesso.')
     return redirect('pedidos')
 
 
+@login_required
+def finalizar_pedidos_lote(request):
+    """Converte em vendas os pedidos entregues selecionados (ou todos)."""
+    if request.method != 'POST':
+        messages.error(request, 'Método HTTP inválido.')
+        return redirect('pedidos')
+
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('pedidos')
+
+    pedidos = Pedido.objects.filter(company=user_company, status='entregue')
+    if request.POST.get('all') != '1':
+        ids = [value for value in request.POST.getlist('ids') if value.isdigit()]
+        if not ids:
+            messages.warning(request, 'Selecione ao menos um pedido entregue.')
+            return redirect('pedidos')
+        pedidos = pedidos.filter(pk__in=ids)
+
+    sales, skipped = finalize_pedidos(user_company, pedidos, user=request.user)
+    if sales:
+        messages.success(
+            request,
+            f'{len(sales)} pedido{"" if len(sales) == 1 else "s"} convertido{"" if len(sales) == 1 else "s"} em venda.',
+        )
+    for msg in skipped:
+        messages.error(request, msg)
+    if not sales and not skipped:
+        messages.info(request, 'Nenhum pedido entregue para finalizar.')
+    return redirect('pedidos')
+
+
 @login_required
 def delete_pedido(request):
     resp = {'status': 'failed', 'msg': ''}
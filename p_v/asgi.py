@@ -3,6 +3,13 @@ ASGI config for p_v project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The realtime feed (``/eventos/``) is a long-lived Server-Sent Events stream, so
+serve the project through this module with an ASGI server, e.g.
+``gunicorn p_v.asgi:application -k uvicorn_worker.UvicornWorker``. With more
+than one worker set ``REALTIME_EVENTS_BACKEND=postgres`` and
+``CACHE_BACKEND=database`` (after ``manage.py createcachetable``), so events
+and cache invalidations reach every worker.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
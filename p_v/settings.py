@@ -36,6 +36,7 @@ INSTALLED_APPS = [
     'orders',
     'inventory',
     'tables',
+    'kitchen',
     'staff',
     'django.contrib.humanize',
 
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'p_v_App.middleware_perf.PerformanceMiddleware',  # Instrumentação opcional (PERF_INSTRUMENTATION)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -130,3 +132,76 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_REDIRECT_URL = '/'
 LOGIN_URL = '/login/'
+
+# Busca de produtos: 'auto' usa índices trigram no PostgreSQL e índice em memória nos demais bancos.
+PRODUCT_SEARCH_BACKEND = os.environ.get('PRODUCT_SEARCH_BACKEND', 'auto')
+
+# Tempo (s) que o estado do salão fica em cache; alterações de mesas/comandas invalidam na hora.
+FLOOR_STATE_CACHE_SECONDS = int(os.environ.get('FLOOR_STATE_CACHE_SECONDS', '5'))
+
+# Eventos em tempo real (SSE): 'memory' para um único worker ASGI, 'postgres' usa LISTEN/NOTIFY entre workers.
+REALTIME_EVENTS_BACKEND = os.environ.get('REALTIME_EVENTS_BACKEND', 'memory')
+
+# Tempo (s) que a fila de cada estação da cozinha fica em cache; alterações nos itens invalidam na hora.
+KITCHEN_QUEUE_CACHE_SECONDS = int(os.environ.get('KITCHEN_QUEUE_CACHE_SECONDS', '5'))
+
+# Cache: 'memory' vale só dentro de cada processo, então com mais de um worker as
+# invalidações (vendas, salão, cozinha) só chegam ao worker que atendeu a alteração.
+# Com vários workers use 'database' (tabela criada por `manage.py createcachetable`).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+if CACHE_BACKEND == 'database':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Tempo (s) que as análises de vendas ficam em cache; novas vendas invalidam na hora no
+# cache compartilhado. No cache em memória o prazo curto limita o atraso entre workers.
+SALES_ANALYTICS_CACHE_SECONDS = int(os.environ.get(
+    'SALES_ANALYTICS_CACHE_SECONDS', '600' if CACHE_BACKEND == 'database' else '60'))
+
+# Sugestões de compra (manage.py compute_reorder), em dias: janela de consumo, prazo do
+# fornecedor, estoque de segurança e consumo coberto por compra.
+REORDER_LOOKBACK_DAYS = int(os.environ.get('REORDER_LOOKBACK_DAYS', '60'))
+REORDER_LEAD_TIME_DAYS = int(os.environ.get('REORDER_LEAD_TIME_DAYS', '7'))
+REORDER_SAFETY_DAYS = int(os.environ.get('REORDER_SAFETY_DAYS', '3'))
+REORDER_TARGET_DAYS = int(os.environ.get('REORDER_TARGET_DAYS', '30'))
+
+# Janela (dias) do alerta de lotes a vencer no painel inicial.
+EXPIRY_ALERT_DAYS = int(os.environ.get('EXPIRY_ALERT_DAYS', '30'))
+
+# Instrumentação de desempenho por view (Server-Timing + log JSON); desligada por padrão.
+PERF_INSTRUMENTATION = os.environ.get('PERF_INSTRUMENTATION', '').lower() in ('1', 'true', 'yes')
+# Arquivo opcional para as linhas de log de desempenho (lido por "manage.py perf_report").
+PERF_LOG_FILE = os.environ.get('PERF_LOG_FILE', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'perf': {'format': '%(asctime)s %(message)s'},
+    },
+    'handlers': {
+        'perf_console': {'class': 'logging.StreamHandler', 'formatter': 'perf'},
+        **(
+            {'perf_file': {'class': 'logging.FileHandler', 'filename': PERF_LOG_FILE,
+                           'formatter': 'perf'}}
+            if PERF_LOG_FILE else {}
+        ),
+    },
+    'loggers': {
+        'p_v.perf': {
+            'handlers': ['perf_file'] if PERF_LOG_FILE else ['perf_console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -5,15 +5,21 @@ from .models_tenant import Company, UserProfile
 from .models import (
     Category,
     Products,
+    ProductBarcode,
     ProductComboItem,
     Sales,
     salesItems,
     Pedido,
     Estoque,
+    StockLocation,
+    StockMovement,
+    StockCostHistory,
     Garcom,
     Table,
     TableOrder,
     TableOrderItem,
+    KitchenStation,
+    CashRegister,
 )
 
 
@@ -92,16 +98,24 @@ class ProductComboItemInline(admin.TabularInline):
     fk_name = 'combo'
 
 
+class ProductBarcodeInline(admin.TabularInline):
+    model = ProductBarcode
+    extra = 1
+    fields = ['barcode']
+    verbose_name = 'Código de barras'
+    verbose_name_plural = 'Códigos de barras'
+
+
 class ProductsAdmin(TenantModelAdmin):
     list_display = ['code', 'name', 'category_id',
                     'price', 'custo', 'status', 'company']
     list_filter = ['status', 'category_id', 'company']
-    search_fields = ['code', 'name']
-    inlines = [ProductComboItemInline]
+    search_fields = ['code', 'name', 'barcodes__barcode']
+    inlines = [ProductBarcodeInline, ProductComboItemInline]
 
     def get_inlines(self, request, obj=None):
         if obj and not obj.is_combo:
-            return []
+            return [ProductBarcodeInline]
         return super().get_inlines(request, obj)
 
 
@@ -120,13 +134,62 @@ class PedidoAdmin(TenantModelAdmin):
     search_fields = ['code', 'customer_name']
 
 
+class StockLocationAdmin(TenantModelAdmin):
+    list_display = ['name', 'kind', 'is_default', 'is_active', 'company']
+    list_filter = ['kind', 'is_active', 'company']
+    search_fields = ['name']
+
+
+class CashRegisterAdmin(TenantModelAdmin):
+    list_display = ['name', 'is_active', 'company', 'created_at']
+    list_filter = ['is_active', 'company']
+    search_fields = ['name']
+
+
 class EstoqueAdmin(TenantModelAdmin):
-    list_display = ['produto', 'quantidade', 'categoria',
+    list_display = ['produto', 'location', 'quantidade', 'categoria',
                     'preco', 'custo', 'status', 'company']
-    list_filter = ['status', 'categoria', 'company']
+    list_filter = ['status', 'location', 'categoria', 'company']
     search_fields = ['produto__name', 'produto__code']
 
 
+class StockMovementAdmin(TenantModelAdmin):
+    list_display = ['produto', 'location', 'delta', 'balance_after', 'reason',
+                    'reference', 'user', 'company', 'created_at']
+    list_filter = ['reason', 'location', 'company', 'created_at']
+    search_fields = ['produto__name', 'produto__code', 'reference']
+    list_select_related = ['produto', 'location', 'user', 'company']
+
+    # Movimentações são geradas pelo sistema; correções entram pelo
+    # comando reconcile_stock como nova movimentação.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class StockCostHistoryAdmin(TenantModelAdmin):
+    list_display = ['produto', 'quantidade_anterior', 'custo_anterior', 'quantidade_entrada',
+                    'custo_entrada', 'custo_medio', 'reason', 'reference', 'company', 'created_at']
+    list_filter = ['reason', 'company', 'created_at']
+    search_fields = ['produto__name', 'produto__code', 'reference']
+    list_select_related = ['produto', 'user', 'company']
+
+    # Trilha de auditoria do custo médio: somente leitura.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 class TableAdmin(TenantModelAdmin):
     list_display = ['number', 'name', 'capacity',
                     'is_active', 'waiter', 'company']
@@ -143,9 +206,17 @@ class TableOrderAdmin(TenantModelAdmin):
 
 
 class TableOrderItemAdmin(admin.ModelAdmin):
-    list_display = ['order', 'product', 'quantity', 'unit_price', 'total']
+    list_display = ['order', 'product', 'quantity', 'unit_price', 'total',
+                    'station', 'prep_status']
+    list_filter = ['prep_status', 'station']
     search_fields = ['order__id', 'product__name']
-    list_select_related = ['order', 'product']
+    list_select_related = ['order', 'product', 'station']
+
+
+class KitchenStationAdmin(TenantModelAdmin):
+    list_display = ['name', 'is_active', 'company', 'created_at']
+    list_filter = ['is_active', 'company']
+    search_fields = ['name']
 
 
 class GarcomAdmin(TenantModelAdmin):
@@ -167,11 +238,16 @@ admin.site.register(Products, ProductsAdmin)
 admin.site.register(Sales, SalesAdmin)
 admin.site.register(salesItems)  # Mantém o registro simples para salesItems
 admin.site.register(Pedido, PedidoAdmin)
+admin.site.register(StockLocation, StockLocationAdmin)
 admin.site.register(Estoque, EstoqueAdmin)
+admin.site.register(StockMovement, StockMovementAdmin)
+admin.site.register(StockCostHistory, StockCostHistoryAdmin)
 admin.site.register(Garcom, GarcomAdmin)
 admin.site.register(Table, TableAdmin)
 admin.site.register(TableOrder, TableOrderAdmin)
 admin.site.register(TableOrderItem, TableOrderItemAdmin)
+admin.site.register(KitchenStation, KitchenStationAdmin)
+admin.site.register(CashRegister, CashRegisterAdmin)
 
 # Configurações do admin
 admin.site.site_header = 'Sistema Multi-Tenant'
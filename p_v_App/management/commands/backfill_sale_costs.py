@@ -0,0 +1,125 @@
+"""
+Comando de gerenciamento para preencher o custo das vendas já registradas.
+
+As linhas de venda e de pedido guardam o custo unitário do produto no
+momento da venda (``unit_cost``) e cada venda guarda o custo total e a
+quantidade de itens. Registros anteriores a esses campos recebem o custo
+atual do produto (melhor aproximação disponível) e os totais são
+recalculados no banco, em lotes, sem carregar as vendas em memória.
+
+Para usar:
+    python manage.py backfill_sale_costs
+    python manage.py backfill_sale_costs --company 3 --batch-size 5000
+    python manage.py backfill_sale_costs --all  # Recalcula também as vendas já preenchidas
+"""
+
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Round
+
+from p_v_App.models import PedidoItem, Products, SaleComboItem, Sales, salesItems
+from p_v_App.models_tenant import Company
+from sales.analytics import invalidate_sales_analytics
+
+
+def _current_cost(product_field):
+    return Subquery(
+        Products.objects.filter(pk=OuterRef(product_field)).values('custo')[:1])
+
+
+class Command(BaseCommand):
+    help = 'Preenche o custo unitário das linhas e o custo total das vendas antigas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company',
+            type=int,
+            help='ID da empresa (padrão: todas as empresas)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Vendas atualizadas por transação (padrão: 2000)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recalcula todas as vendas, não só as que ainda não têm itens contados'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas mostra quantos registros seriam atualizados'
+        )
+
+    def handle(self, *args, **options):
+        company_id = options['company']
+        if company_id and not Company.objects.filter(pk=company_id).exists():
+            raise CommandError(f'Empresa não encontrada: {company_id}')
+        batch_size = max(1, options['batch_size'])
+
+        sale_lines = salesItems.objects.filter(unit_cost__isnull=True)
+        pedido_lines = PedidoItem.objects.filter(unit_cost__isnull=True)
+        combo_lines = SaleComboItem.objects.filter(unit_cost__isnull=True)
+        sales = Sales.objects.all()
+        if company_id:
+            sale_lines = sale_lines.filter(sale_id__company_id=company_id)
+            pedido_lines = pedido_lines.filter(pedido__company_id=company_id)
+            combo_lines = combo_lines.filter(sale_item__sale_id__company_id=company_id)
+            sales = sales.filter(company_id=company_id)
+        if not options['all']:
+            sales = sales.filter(item_count=0)
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'{sale_lines.count()} itens de venda, {pedido_lines.count()} itens de '
+                f'pedido e {combo_lines.count()} componentes de combo sem custo; '
+                f'{sales.count()} vendas a recalcular.'
+            )
+            return
+
+        for label, queryset, product_field in (
+            ('itens de venda', sale_lines, 'product_id'),
+            ('itens de pedido', pedido_lines, 'product'),
+            ('componentes de combo', combo_lines, 'component'),
+        ):
+            updated = self.update_in_batches(
+                queryset, batch_size, unit_cost=_current_cost(product_field))
+            self.stdout.write(f'{label}: {updated} custos preenchidos')
+
+        lines = salesItems.objects.filter(sale_id=OuterRef('pk')).values('sale_id')
+        updated = self.update_in_batches(
+            sales,
+            batch_size,
+            total_cost=Coalesce(
+                Subquery(
+                    lines.annotate(
+                        cost=Round(
+                            Sum(F('qty') * Coalesce('unit_cost', Decimal('0'))), 2,
+                            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+                        )
+                    ).values('cost')
+                ),
+                Decimal('0'),
+            ),
+            item_count=Coalesce(
+                Subquery(lines.annotate(count=Count('id')).values('count')), 0),
+        )
+        # UPDATE em massa não dispara sinais: descarta as análises em cache.
+        for pk in [company_id] if company_id else Company.objects.values_list('pk', flat=True):
+            invalidate_sales_analytics(pk)
+        self.stdout.write(self.style.SUCCESS(f'{updated} vendas recalculadas'))
+
+    def update_in_batches(self, queryset, batch_size, **values):
+        # Lotes curtos mantêm os bloqueios de linha breves em bancos em uso.
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+        updated = 0
+        for start in range(0, len(pks), batch_size):
+            with transaction.atomic():
+                updated += queryset.model.objects.filter(
+                    pk__in=pks[start:start + batch_size]).update(**values)
+        return updated
@@ -0,0 +1,222 @@
+"""
+Comando de gerenciamento para medir as análises de vendas com volume alto.
+
+Cria, dentro de uma transação que é desfeita no final, uma empresa com
+``--lines`` itens de venda (1 milhão por padrão) espalhados pelos últimos
+``--days`` dias e mede, para a segunda metade do período (comparada com a
+primeira):
+
+* extração das colunas (uma consulta por período) e memória ocupada;
+* cálculo da curva ABC, mapa de calor, série diária e variações;
+* análise completa sem cache e servida do cache;
+* as mesmas tabelas com agregações no banco (GROUP BY), como referência.
+
+Para usar:
+    python manage.py benchmark_analytics
+    python manage.py benchmark_analytics --lines 200000 --products 300 --days 120
+"""
+
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+from django.utils import timezone
+
+from p_v_App.models import Category, Products, Sales, salesItems
+from p_v_App.models_tenant import Company
+from sales.analytics import (
+    abc_curve,
+    build_sales_analytics,
+    daily_series,
+    extract_sale_lines,
+    get_sales_analytics,
+    hourly_heatmap,
+    invalidate_sales_analytics,
+    previous_period,
+    product_movers,
+    product_totals,
+)
+
+BATCH_SIZE = 5000
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Mede a curva ABC, o mapa de calor e as variações sobre milhões de itens de venda'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lines',
+            type=int,
+            default=1_000_000,
+            help='Itens de venda gerados (padrão: 1000000)'
+        )
+        parser.add_argument(
+            '--lines-per-sale',
+            type=int,
+            default=4,
+            help='Itens por venda (padrão: 4)'
+        )
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=800,
+            help='Produtos no catálogo (padrão: 800)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Dias de histórico; a análise usa a metade mais recente (padrão: 365)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semente para gerar os dados (padrão: 42)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+        self.stdout.write('Dados de teste descartados.')
+
+    def _seed(self, options):
+        rng = random.Random(options['seed'])
+        company = Company.objects.create(name=f'Benchmark análises {uuid.uuid4().hex[:8]}')
+        category = Category.objects.create(company=company, name='Geral', description='')
+        products = Products.objects.bulk_create(
+            [
+                Products(
+                    company=company, code=f'A{idx:05d}', category_id=category,
+                    name=f'Produto {idx + 1}',
+                    price=Decimal(rng.randint(300, 9000)) / 100,
+                    custo=Decimal(rng.randint(100, 3000)) / 100,
+                )
+                for idx in range(options['products'])
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        # Poucos produtos concentram a receita, como numa curva ABC real.
+        weights = [1 / (rank + 1) for rank in range(len(products))]
+
+        per_sale = max(1, options['lines_per_sale'])
+        sale_count = max(1, options['lines'] // per_sale)
+        now = timezone.now()
+        span = options['days'] * 86400
+        created = 0
+        while created < sale_count:
+            chunk = min(BATCH_SIZE, sale_count - created)
+            lines = [rng.choices(products, weights, k=per_sale) for _ in range(chunk)]
+            sales = Sales.objects.bulk_create([
+                Sales(
+                    company=company, code=f'B{created + idx:08d}',
+                    grand_total=sum(product.price for product in sale_lines),
+                    date_added=now - timedelta(seconds=rng.randrange(span)),
+                    item_count=per_sale,
+                )
+                for idx, sale_lines in enumerate(lines)
+            ])
+            salesItems.objects.bulk_create(
+                [
+                    salesItems(
+                        sale_id=sale, product_id=product, price=product.price, qty=1,
+                        total=product.price, unit_cost=product.custo)
+                    for sale, sale_lines in zip(sales, lines)
+                    for product in sale_lines
+                ],
+                batch_size=BATCH_SIZE,
+            )
+            created += chunk
+        return company, sale_count * per_sale
+
+    def _timed(self, label, func):
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stdout.write(f'{label:<44} {elapsed:10.1f} ms')
+        return result, elapsed
+
+    def _database_tables(self, company, start, end):
+        items = salesItems.objects.filter(
+            Q(sale_id__type__in=['venda', 'pedido']) | Q(sale_id__type__istartswith='Mesa'),
+            sale_id__company=company,
+            sale_id__date_added__date__gte=start,
+            sale_id__date_added__date__lte=end,
+        )
+        by_product = list(
+            items.values('product_id')
+            .annotate(quantity=Sum('qty'), revenue=Sum('total'))
+            .order_by('-revenue')
+        )
+        by_hour = list(
+            items.annotate(
+                weekday=ExtractIsoWeekDay('sale_id__date_added'),
+                hour=ExtractHour('sale_id__date_added'),
+            )
+            .values('weekday', 'hour')
+            .annotate(revenue=Sum('total'), sales=Count('sale_id', distinct=True))
+        )
+        return by_product, by_hour
+
+    def _run(self, options):
+        started = time.perf_counter()
+        company, lines = self._seed(options)
+        end = timezone.localdate()
+        start = end - timedelta(days=max(1, options['days'] // 2) - 1)
+        self.stdout.write(
+            f'{lines:,} itens de venda gerados em {time.perf_counter() - started:.1f}s; '
+            f'análise de {start} a {end}.'
+        )
+
+        columns, extract_ms = self._timed(
+            'Extração colunar (período atual)',
+            lambda: extract_sale_lines(company.pk, start, end))
+        previous = extract_sale_lines(company.pk, *previous_period(start, end))
+        size = sum(
+            len(column) * column.itemsize
+            for column in (columns.sale, columns.day, columns.weekday, columns.hour,
+                           columns.product, columns.qty, columns.revenue, columns.cost)
+        )
+        self.stdout.write(f'  {len(columns):,} linhas em {size / 1024 / 1024:.1f} MiB de colunas')
+
+        def compute():
+            totals = product_totals(columns)
+            abc_curve(totals)
+            hourly_heatmap(columns)
+            daily_series(columns, start, end)
+            product_movers(totals, product_totals(previous))
+
+        _, compute_ms = self._timed('ABC + mapa de calor + série + variações', compute)
+        invalidate_sales_analytics(company.pk)
+        _, cold_ms = self._timed(
+            'Análise completa (sem cache, 2 períodos)',
+            lambda: build_sales_analytics(company.pk, start, end))
+        get_sales_analytics(company.pk, start, end)
+        _, warm_ms = self._timed(
+            'Análise completa (cache)', lambda: get_sales_analytics(company.pk, start, end))
+        _, database_ms = self._timed(
+            'GROUP BY no banco (produto + dia/hora)',
+            lambda: self._database_tables(company, start, end))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Extração {extract_ms / 1000:.1f}s + cálculo {compute_ms / 1000:.1f}s; '
+            f'cache responde em {warm_ms:.2f} ms ({cold_ms / max(warm_ms, 0.001):,.0f}x).'
+        ))
+        if database_ms:
+            self.stdout.write(
+                f'Extração + cálculo em memória vs. GROUP BY: '
+                f'{(extract_ms + compute_ms) / database_ms:.2f}x o tempo.')
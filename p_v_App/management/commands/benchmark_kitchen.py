@@ -0,0 +1,207 @@
+"""
+Comando de gerenciamento para medir a fila da cozinha sob carga de telas.
+
+Cria, dentro de uma transação que é desfeita no final, uma empresa com
+estações, mesas abertas e itens em preparo. Em seguida simula as telas da
+cozinha consultando a fila (``cozinha/estacoes/<id>/fila/``) e compara:
+
+* consulta direta no banco a cada atualização (sem cache);
+* fila em cache com ETag, invalidada a cada ``--write-every`` consultas, como
+  acontece quando um garçom lança ou a cozinha avança um item.
+
+Para usar:
+    python manage.py benchmark_kitchen
+    python manage.py benchmark_kitchen --items 5000 --stations 6 --requests 3000
+"""
+
+import random
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from kitchen.queue import invalidate_kitchen_queues
+from kitchen.views import cozinha_fila
+from p_v_App.models import (
+    Category,
+    KitchenStation,
+    Products,
+    Table,
+    TableOrder,
+    TableOrderItem,
+)
+from p_v_App.models_tenant import Company, UserProfile
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Mede o custo das atualizações das telas da cozinha (fila por estação)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stations',
+            type=int,
+            default=4,
+            help='Quantidade de estações (padrão: 4)'
+        )
+        parser.add_argument(
+            '--tables',
+            type=int,
+            default=40,
+            help='Quantidade de mesas com comanda aberta (padrão: 40)'
+        )
+        parser.add_argument(
+            '--items',
+            type=int,
+            default=3000,
+            help='Itens lançados nas comandas, incluindo já entregues (padrão: 3000)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Consultas simuladas das telas (padrão: 2000)'
+        )
+        parser.add_argument(
+            '--write-every',
+            type=int,
+            default=20,
+            help='Invalida a fila a cada N consultas, simulando lançamentos (padrão: 20)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semente para gerar os dados (padrão: 42)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+        self.stdout.write('Dados de teste descartados.')
+
+    def _seed(self, options):
+        rng = random.Random(options['seed'])
+        tag = uuid.uuid4().hex[:8]
+        company = Company.objects.create(name=f'Benchmark cozinha {tag}')
+        user = User.objects.create_user(f'kds-{tag}', password=None)
+        UserProfile.objects.create(user=user, company=company)
+
+        stations = [
+            KitchenStation.objects.create(company=company, name=f'Estação {idx + 1}')
+            for idx in range(options['stations'])
+        ]
+        products = []
+        for idx, station in enumerate(stations):
+            category = Category.objects.create(
+                company=company, name=f'Categoria {idx + 1}', description='',
+                kitchen_station=station)
+            products.extend(
+                Products.objects.create(
+                    company=company, code=f'K{idx}-{pidx}', category_id=category,
+                    name=f'Prato {idx + 1}.{pidx + 1}', price=Decimal('25.00'))
+                for pidx in range(10)
+            )
+        station_by_product = {
+            product.pk: product.category_id.kitchen_station_id for product in products}
+
+        orders = []
+        for number in range(1, options['tables'] + 1):
+            table = Table.objects.create(company=company, number=number)
+            orders.append(TableOrder.objects.create(company=company, table=table))
+
+        statuses = [choice for choice, _ in TableOrderItem.PrepStatus.choices]
+        items = []
+        for _ in range(options['items']):
+            product = rng.choice(products)
+            items.append(
+                TableOrderItem(
+                    order=rng.choice(orders),
+                    product=product,
+                    quantity=Decimal(rng.randint(1, 3)),
+                    unit_price=product.price,
+                    total=product.price,
+                    station_id=station_by_product[product.pk],
+                    # Maioria já entregue, como numa noite em andamento.
+                    prep_status=rng.choices(statuses, weights=[2, 1, 1, 6])[0],
+                )
+            )
+        TableOrderItem.objects.bulk_create(items, batch_size=1000)
+        return company, user, stations
+
+    def _measure(self, label, func, count):
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for idx in range(count):
+                start = time.perf_counter()
+                func(idx)
+                timings.append((time.perf_counter() - start) * 1000)
+        mean = statistics.mean(timings)
+        self.stdout.write(
+            f'{label:<34} média {mean:7.3f} ms | p95 {_percentile(timings, 95):7.3f} ms | '
+            f'{len(queries) / count:5.2f} consultas SQL por atualização | '
+            f'~{60000 / mean:,.0f} atualizações/min por processo'
+        )
+        return mean
+
+    def _run(self, options):
+        company, user, stations = self._seed(options)
+        count = options['requests']
+        write_every = max(1, options['write_every'])
+        factory = RequestFactory()
+        etags = {}
+
+        def screen_request(idx, use_etag, every=write_every):
+            station = stations[idx % len(stations)]
+            if idx % every == 0:
+                invalidate_kitchen_queues(company.pk)
+            headers = {}
+            if use_etag and station.pk in etags:
+                headers['HTTP_IF_NONE_MATCH'] = etags[station.pk]
+            request = factory.get(f'/cozinha/estacoes/{station.pk}/fila/', **headers)
+            request.user = user
+            response = cozinha_fila(request, station.pk)
+            etags[station.pk] = response['ETag']
+
+        open_items = TableOrderItem.objects.filter(
+            order__company=company,
+            prep_status__in=['pending', 'preparing', 'ready'],
+        ).count()
+        self.stdout.write(
+            f"{len(stations)} estações, {options['tables']} mesas, "
+            f"{options['items']} itens ({open_items} na fila), {count} consultas, "
+            f'invalidação a cada {write_every}.'
+        )
+
+        direct = self._measure(
+            'Endpoint sem cache', lambda idx: screen_request(idx, False, 1), count)
+        etags.clear()
+        cached = self._measure(
+            'Endpoint com cache', lambda idx: screen_request(idx, False), count)
+        etags.clear()
+        etag = self._measure(
+            'Endpoint com cache + ETag (304)', lambda idx: screen_request(idx, True), count)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Cache: {direct / cached:.1f}x mais rápido que sem cache; '
+            f'com ETag: {direct / etag:.1f}x.'
+        ))
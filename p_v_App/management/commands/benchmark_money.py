@@ -0,0 +1,127 @@
+"""
+Comando de gerenciamento para medir o custo das conversões de valores no checkout.
+
+Compara o caminho antigo (campos float convertidos para Decimal via ``str()`` e
+de volta para ``float()`` a cada item) com o caminho atual, em que os campos já
+são ``DecimalField`` e os valores seguem como ``Decimal`` até o banco.
+
+Para usar:
+    python manage.py benchmark_money
+    python manage.py benchmark_money --items 20 --repeat 2000
+"""
+
+import random
+import timeit
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.core.management.base import BaseCommand
+
+from sales.utils import _build_receipt_payload, _to_decimal, quantize_currency
+
+CENTS = Decimal('0.01')
+
+
+def _legacy_checkout(lines):
+    """Mimics the float-column checkout: str() -> Decimal -> float per value."""
+    sub_total = Decimal('0')
+    stored = []
+    for qty, price in lines:
+        qty_decimal = Decimal(str(qty))
+        price_value = float(str(price))
+        total = float(qty_decimal) * price_value
+        stored.append((float(qty_decimal), price_value, total))
+        sub_total += Decimal(str(total))
+    receipt_items = [
+        {'qty': Decimal(str(qty)), 'price': Decimal(str(price))}
+        for qty, price, _ in stored
+    ]
+    return float(sub_total.quantize(CENTS, rounding=ROUND_HALF_UP)), receipt_items
+
+
+def _decimal_checkout(lines):
+    """Current checkout: values stay Decimal from request parsing to storage."""
+    sub_total = Decimal('0')
+    stored = []
+    for qty, price in lines:
+        total = quantize_currency(qty * price)
+        stored.append((qty, price, total))
+        sub_total += total
+    receipt_items = [{'qty': qty, 'price': price} for qty, price, _ in stored]
+    return sub_total, receipt_items
+
+
+class Command(BaseCommand):
+    help = 'Mede a sobrecarga de conversões float/Decimal no fechamento de vendas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items',
+            type=int,
+            default=12,
+            help='Quantidade de itens por venda (padrão: 12)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5000,
+            help='Quantidade de vendas simuladas (padrão: 5000)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semente para gerar os itens (padrão: 42)'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        decimal_lines = [
+            (
+                Decimal(rng.choice(['1', '2', '3', '0.5', '0.25', '1.5'])),
+                Decimal(rng.randint(150, 9990)) / 100,
+            )
+            for _ in range(options['items'])
+        ]
+        float_lines = [(float(qty), float(price)) for qty, price in decimal_lines]
+        repeat = options['repeat']
+
+        def run_legacy():
+            total, items = _legacy_checkout(float_lines)
+            self._receipt(items, total)
+
+        def run_decimal():
+            total, items = _decimal_checkout(decimal_lines)
+            self._receipt(items, total)
+
+        legacy_seconds = min(timeit.repeat(run_legacy, number=repeat, repeat=3))
+        decimal_seconds = min(timeit.repeat(run_decimal, number=repeat, repeat=3))
+
+        drift = abs(
+            Decimal(str(_legacy_checkout(float_lines)[0]))
+            - _decimal_checkout(decimal_lines)[0]
+        )
+        legacy_us = legacy_seconds / repeat * 1_000_000
+        decimal_us = decimal_seconds / repeat * 1_000_000
+
+        self.stdout.write(
+            f'{repeat} vendas com {options["items"]} itens cada')
+        self.stdout.write(f'float + str():  {legacy_us:8.1f} µs/venda')
+        self.stdout.write(f'Decimal direto: {decimal_us:8.1f} µs/venda')
+        self.stdout.write(f'Diferença no subtotal: R$ {drift}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Redução: {(1 - decimal_us / legacy_us) * 100:.1f}%')
+        )
+
+    @staticmethod
+    def _receipt(items, grand_total):
+        return _build_receipt_payload(
+            header_label='Venda',
+            code='BENCH',
+            company_name='Benchmark',
+            created_at=None,
+            items=[{'name': 'Item', **item} for item in items],
+            delivery_fee=Decimal('0'),
+            discount_total=Decimal('0'),
+            grand_total=_to_decimal(grand_total),
+        )
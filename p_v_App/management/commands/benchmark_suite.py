@@ -0,0 +1,428 @@
+"""
+Comando de gerenciamento para medir os caminhos críticos com dados sintéticos.
+
+Para cada porte (``--sizes``) cria, dentro de uma transação que é desfeita no
+final, a empresa medida e algumas empresas vizinhas (multi-tenant) com
+``core.seeding``. Em seguida mede tempo (mediana) e consultas SQL de:
+``pos``, ``save_pos``, ``salesList``, ``sales_report``, ``sales_analytics``, ``mesas``,
+``mesa_detalhe``, ``cashier_dashboard``, ``generate_cash_report_pdf`` e as
+importações XLSX (produtos e estoque) e XML (NF-e).
+
+Os números são comparados com o arquivo de referência JSON (``--baseline``);
+o comando termina com erro quando o tempo passa do limite (``--threshold``,
+em %) ou quando o número de consultas aumenta além do tolerado. Funciona em SQLite ou
+Postgres local; compare apenas referências geradas no mesmo ambiente.
+
+Para usar:
+    python manage.py benchmark_suite --save
+    python manage.py benchmark_suite
+    python manage.py benchmark_suite --sizes small medium large --repeat 7 --threshold 30
+    python manage.py benchmark_suite --only pos save_pos
+"""
+
+import io
+import json
+import os
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.utils import timezone
+from openpyxl import Workbook
+
+from core.seeding import DATASET_SIZES, seed_company
+from p_v_App.middleware_perf import QueryRecorder
+from p_v_App.models import (
+    CashRegisterSession,
+    Estoque,
+    ProductBarcode,
+    TableOrder,
+)
+from sales.analytics import invalidate_sales_analytics
+from sales.utils import generate_cash_report_pdf
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmark_baseline.json')
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _xlsx_file(name, header, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=XLSX_CONTENT_TYPE)
+
+
+def _nfe_xml_file(items):
+    dets = ''.join(
+        f'<det nItem="{idx}"><prod><cProd>{code}</cProd><cEAN>{barcode or "SEM GTIN"}</cEAN>'
+        f'<xProd>{name}</xProd><qCom>{qty}</qCom><vUnCom>{price}</vUnCom>'
+        f'<vUnTrib>{cost}</vUnTrib></prod></det>'
+        for idx, (code, barcode, name, qty, price, cost) in enumerate(items, start=1)
+    )
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<nfeProc xmlns="http://www.portalfiscal.inf.br/nfe"><NFe><infNFe>'
+        f'{dets}</infNFe></NFe></nfeProc>'
+    )
+    return SimpleUploadedFile('nfe.xml', content.encode('utf-8'), content_type='text/xml')
+
+
+class _Scenarios:
+    """Requests for one seeded tenant; each method takes the run index."""
+
+    def __init__(self, summary, import_rows):
+        self.company = summary['company']
+        self.client = Client(HTTP_HOST='localhost')
+        self.client.force_login(summary['user'])
+        self.import_rows = import_rows
+
+        stock = list(
+            Estoque.objects.filter(company=self.company)
+            .select_related('produto', 'categoria')
+            .order_by('id')
+        )
+        self.stock_products = [row.produto for row in stock]
+        self.category_name = stock[0].categoria.name
+        self.order = (
+            TableOrder.objects.filter(company=self.company, status=TableOrder.Status.OPEN)
+            .order_by('id').first()
+        )
+        self.closed_session = (
+            CashRegisterSession.objects.filter(
+                company=self.company, status=CashRegisterSession.Status.CLOSED)
+            .order_by('-opened_at').first()
+        )
+        self.barcodes = dict(
+            ProductBarcode.objects.filter(company=self.company)
+            .values_list('product_id', 'barcode')
+        )
+        today = timezone.localdate()
+        self.year_range = {
+            'start_date': (today - timedelta(days=365)).isoformat(),
+            'end_date': today.isoformat(),
+        }
+
+    def _ok(self, response):
+        if response.status_code >= 400:
+            raise CommandError(f'HTTP {response.status_code} em {response.request["PATH_INFO"]}')
+        if response.get('Content-Type', '').startswith('application/json'):
+            payload = json.loads(response.content)
+            if payload.get('status') == 'failed':
+                raise CommandError(f'{response.request["PATH_INFO"]}: {payload.get("msg")}')
+        return response
+
+    def pos(self, run):
+        return self._ok(self.client.get('/pos'))
+
+    def save_pos(self, run):
+        lines = [self.stock_products[(run * 3 + idx) % len(self.stock_products)] for idx in range(3)]
+        total = sum(product.price for product in lines)
+        return self._ok(self.client.post('/save-pos', {
+            'product_id[]': [product.pk for product in lines],
+            'qty[]': ['1'] * len(lines),
+            'price[]': [str(product.price) for product in lines],
+            'sub_total': str(total),
+            'grand_total': str(total),
+            'payment_method[]': ['PIX'],
+            'payment_amount[]': [str(total)],
+        }))
+
+    def salesList(self, run):
+        return self._ok(self.client.get('/sales'))
+
+    def sales_report(self, run):
+        return self._ok(self.client.get('/salesreport', self.year_range))
+
+    def sales_analytics(self, run):
+        # Mede o cálculo, não o cache: cada execução parte de uma versão nova.
+        invalidate_sales_analytics(self.company.pk)
+        return self._ok(self.client.get('/sales-report/analytics/data/', self.year_range))
+
+    def mesas(self, run):
+        return self._ok(self.client.get('/mesas/'))
+
+    def mesa_detalhe(self, run):
+        return self._ok(self.client.get(f'/mesas/{self.order.table_id}/detalhes/'))
+
+    def cashier_dashboard(self, run):
+        return self._ok(self.client.get('/caixa/'))
+
+    def generate_cash_report_pdf(self, run):
+        session = CashRegisterSession.objects.get(pk=self.closed_session.pk)
+        return generate_cash_report_pdf(session)
+
+    def _import_products(self, run):
+        # Metade atualiza produtos existentes, metade cria códigos novos.
+        half = self.import_rows // 2
+        existing = self.stock_products[:half]
+        return existing, [
+            (f'BENCH{run}-{idx}', f'Produto importado {run}.{idx}')
+            for idx in range(self.import_rows - len(existing))
+        ]
+
+    def import_products_xlsx(self, run):
+        existing, new = self._import_products(run)
+        rows = [
+            (p.code, p.name, '', self.category_name, float(p.price), float(p.custo), 'Ativo')
+            for p in existing
+        ] + [
+            (code, name, '', self.category_name, 9.9, 4.5, 'Ativo') for code, name in new
+        ]
+        upload = _xlsx_file(
+            'produtos.xlsx',
+            ['Código', 'Nome', 'Descrição', 'Categoria', 'Preço', 'Custo', 'Status'],
+            rows,
+        )
+        return self._ok(self.client.post('/upload_products', {'file': upload}))
+
+    def import_stock_xlsx(self, run):
+        existing, new = self._import_products(run)
+        rows = [
+            (p.code, p.name, self.category_name, 5, 0, float(p.price), float(p.custo), 'Ativo')
+            for p in existing
+        ] + [
+            (code, name, self.category_name, 5, 0, 9.9, 4.5, 'Ativo') for code, name in new
+        ]
+        upload = _xlsx_file(
+            'estoque.xlsx',
+            ['Código do Produto', 'Nome do Produto', 'Categoria', 'Quantidade',
+             'Validade (dias)', 'Preço', 'Custo', 'Status'],
+            rows,
+        )
+        return self._ok(self.client.post('/upload_estoque', {'file': upload}))
+
+    def import_stock_xml(self, run):
+        existing, new = self._import_products(run)
+        # Itens conhecidos pelo código ou só pelo GTIN, como em notas de fornecedores.
+        items = [
+            (
+                p.code if idx % 2 else f'FORN-{p.pk}',
+                self.barcodes.get(p.pk, ''),
+                p.name, 5, p.price, p.custo,
+            )
+            for idx, p in enumerate(existing)
+        ] + [(code, '', name, 5, '9.90', '4.50') for code, name in new]
+        return self._ok(self.client.post('/upload_estoque_xml', {'file': _nfe_xml_file(items)}))
+
+
+SCENARIOS = (
+    'pos',
+    'save_pos',
+    'salesList',
+    'sales_report',
+    'sales_analytics',
+    'mesas',
+    'mesa_detalhe',
+    'cashier_dashboard',
+    'generate_cash_report_pdf',
+    'import_products_xlsx',
+    'import_stock_xlsx',
+    'import_stock_xml',
+)
+
+
+class Command(BaseCommand):
+    help = 'Mede tempo e consultas SQL dos caminhos críticos e compara com a referência'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            choices=sorted(DATASET_SIZES),
+            default=['small', 'medium'],
+            help='Portes de dados a medir (padrão: small medium)'
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=SCENARIOS,
+            help='Mede apenas os cenários informados'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Execuções medidas por cenário, após um aquecimento (padrão: 5)'
+        )
+        parser.add_argument(
+            '--neighbours',
+            type=int,
+            default=2,
+            help='Empresas vizinhas do mesmo porte no banco (padrão: 2)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Dias de histórico de vendas (padrão: 365)'
+        )
+        parser.add_argument(
+            '--import-rows',
+            type=int,
+            default=200,
+            help='Linhas dos arquivos de importação (padrão: 200)'
+        )
+        parser.add_argument(
+            '--baseline',
+            default=DEFAULT_BASELINE,
+            help='Arquivo JSON de referência (padrão: benchmark_baseline.json)'
+        )
+        parser.add_argument(
+            '--save',
+            action='store_true',
+            help='Grava os resultados como nova referência em vez de comparar'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=25.0,
+            help='Piora de tempo tolerada, em %% da referência (padrão: 25)'
+        )
+        parser.add_argument(
+            '--min-delta-ms',
+            type=float,
+            default=5.0,
+            help='Diferenças de tempo abaixo disto são ruído (padrão: 5 ms)'
+        )
+        parser.add_argument(
+            '--query-slack',
+            type=int,
+            default=0,
+            help='Consultas a mais toleradas por cenário (padrão: 0)'
+        )
+        parser.add_argument(
+            '--query-threshold',
+            type=float,
+            default=5.0,
+            help='Aumento de consultas tolerado, em %% da referência (padrão: 5)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semente para gerar os dados (padrão: 42)'
+        )
+
+    def handle(self, *args, **options):
+        scenarios = options['only'] or SCENARIOS
+        results = {}
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    results[size] = self._run_size(size, scenarios, options)
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'days': options['days'],
+            'results': results,
+        }
+        path = options['baseline']
+        if options['save']:
+            with open(path, 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+                handle.write('\n')
+            self.stdout.write(self.style.SUCCESS(f'Referência gravada em {path}.'))
+            return
+
+        if not os.path.exists(path):
+            self.stdout.write(self.style.WARNING(
+                f'Referência {path} não encontrada; rode com --save para criá-la.'))
+            return
+        with open(path, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        if baseline.get('database') != connection.vendor:
+            self.stdout.write(self.style.WARNING(
+                f"Referência gerada em {baseline.get('database')}; "
+                f'banco atual é {connection.vendor}.'))
+        regressions = self._compare(baseline.get('results', {}), results, options)
+        if regressions:
+            raise CommandError(
+                f'{len(regressions)} regressão(ões) acima do limite:\n  '
+                + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Sem regressões em relação à referência.'))
+
+    def _run_size(self, size, scenarios, options):
+        start = time.perf_counter()
+        for idx in range(options['neighbours']):
+            seed_company(size=size, seed=options['seed'] + idx + 1, days=options['days'])
+        summary = seed_company(size=size, seed=options['seed'], days=options['days'])
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Porte {size}: {summary['products']} produtos, {summary['sales']} vendas, "
+            f"{summary['open_orders']} comandas abertas, +{options['neighbours']} empresas "
+            f'vizinhas (gerado em {time.perf_counter() - start:.1f}s)'
+        ))
+
+        runner = _Scenarios(summary, options['import_rows'])
+        repeat = max(1, options['repeat'])
+        measured = {}
+        for name in scenarios:
+            func = getattr(runner, name)
+            func(0)  # aquecimento: templates, caches e conexões
+            timings, queries = [], []
+            for run in range(1, repeat + 1):
+                recorder = QueryRecorder()
+                with connection.execute_wrapper(recorder):
+                    started = time.perf_counter()
+                    func(run)
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries.append(recorder.count)
+            measured[name] = {
+                'ms': round(statistics.median(timings), 2),
+                'queries': int(statistics.median(queries)),
+            }
+            self.stdout.write(
+                f"  {name:<26} {measured[name]['ms']:9.2f} ms  "
+                f"{measured[name]['queries']:6d} consultas"
+            )
+        return measured
+
+    def _compare(self, baseline, results, options):
+        threshold = options['threshold'] / 100
+        regressions = []
+        self.stdout.write(self.style.MIGRATE_HEADING('Comparação com a referência'))
+        for size, scenarios in results.items():
+            for name, current in scenarios.items():
+                reference = baseline.get(size, {}).get(name)
+                if reference is None:
+                    self.stdout.write(f'  {size}/{name:<26} sem referência')
+                    continue
+                delta_ms = current['ms'] - reference['ms']
+                slow = (
+                    current['ms'] > reference['ms'] * (1 + threshold)
+                    and delta_ms > options['min_delta_ms']
+                )
+                # Caminhos que crescem com o histórico (ex.: código da venda) variam um pouco.
+                allowed = max(
+                    options['query_slack'],
+                    int(reference['queries'] * options['query_threshold'] / 100),
+                )
+                chatty = current['queries'] > reference['queries'] + allowed
+                pct = (delta_ms / reference['ms'] * 100) if reference['ms'] else 0
+                line = (
+                    f"{size}/{name}: {reference['ms']:.2f} -> {current['ms']:.2f} ms "
+                    f"({pct:+.0f}%), {reference['queries']} -> {current['queries']} consultas"
+                )
+                if slow or chatty:
+                    regressions.append(line)
+                    self.stdout.write(self.style.ERROR(f'  {line}'))
+                else:
+                    self.stdout.write(f'  {line}')
+        return regressions
@@ -0,0 +1,71 @@
+"""
+Comando de gerenciamento para calcular as sugestões de compra.
+
+Deriva o consumo diário de cada produto das vendas recentes (itens vendidos e
+componentes de combos), calcula dias de cobertura e ponto de pedido e grava o
+resultado em ``ReorderSuggestion``, lido pelo relatório "Comprar" do estoque.
+Agende a execução diária, por exemplo após o fechamento:
+
+    python manage.py compute_reorder
+    python manage.py compute_reorder --company 3 --lookback-days 30 --lead-time-days 5
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.reorder import compute_reorder_suggestions
+from p_v_App.models_tenant import Company
+
+
+class Command(BaseCommand):
+    help = 'Calcula consumo diário, dias de cobertura e sugestões de compra por produto'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company',
+            type=int,
+            help='ID da empresa (padrão: todas as empresas)'
+        )
+        parser.add_argument(
+            '--lookback-days',
+            type=int,
+            help='Dias de vendas usados no consumo (padrão: REORDER_LOOKBACK_DAYS)'
+        )
+        parser.add_argument(
+            '--lead-time-days',
+            type=int,
+            help='Prazo de entrega do fornecedor (padrão: REORDER_LEAD_TIME_DAYS)'
+        )
+        parser.add_argument(
+            '--safety-days',
+            type=int,
+            help='Dias de estoque de segurança (padrão: REORDER_SAFETY_DAYS)'
+        )
+        parser.add_argument(
+            '--target-days',
+            type=int,
+            help='Dias de consumo cobertos por compra (padrão: REORDER_TARGET_DAYS)'
+        )
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('pk')
+        if options['company']:
+            companies = companies.filter(pk=options['company'])
+            if not companies.exists():
+                raise CommandError(
+                    f'Empresa não encontrada: {options["company"]}')
+
+        overrides = {
+            key: options[key]
+            for key in ('lookback_days', 'lead_time_days', 'safety_days', 'target_days')
+        }
+        for company in companies:
+            start = time.perf_counter()
+            products, to_reorder = compute_reorder_suggestions(company, **overrides)
+            if products:
+                self.stdout.write(
+                    f'{company.name}: {products} produto(s) com consumo, '
+                    f'{to_reorder} para comprar ({time.perf_counter() - start:.2f}s)'
+                )
+        self.stdout.write(self.style.SUCCESS('Sugestões de compra atualizadas.'))
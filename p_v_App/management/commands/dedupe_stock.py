@@ -0,0 +1,76 @@
+"""
+Comando de gerenciamento para unificar registros de estoque duplicados.
+
+Cada produto deve ter um único registro de ``Estoque`` por local. Registros
+repetidos (criados antes da restrição de unicidade) são somados no mais
+antigo e os demais são excluídos; o saldo do produto não muda. A migração
+``0026_estoque_unique_row`` faz a mesma unificação antes de criar a restrição;
+rode o comando com ``--dry-run`` antes de migrar para revisar o que será
+unificado.
+
+Para usar:
+    python manage.py dedupe_stock --dry-run
+    python manage.py dedupe_stock --company 3
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.ledger import merge_duplicate_stock_rows
+from p_v_App.models import Products, StockLocation
+from p_v_App.models_tenant import Company
+
+
+class Command(BaseCommand):
+    help = 'Unifica registros de estoque duplicados por produto e local'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company',
+            type=int,
+            help='ID da empresa (padrão: todas as empresas)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas lista os registros duplicados, sem alterar nada'
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            company = Company.objects.filter(pk=options['company']).first()
+            if company is None:
+                raise CommandError(
+                    f'Empresa não encontrada: {options["company"]}')
+
+        groups = merge_duplicate_stock_rows(company, dry_run=options['dry_run'])
+        if not groups:
+            self.stdout.write(self.style.SUCCESS('Nenhum registro duplicado encontrado.'))
+            return
+
+        products = dict(
+            Products.objects.filter(
+                pk__in={group['produto_id'] for group in groups}
+            ).values_list('pk', 'name')
+        )
+        locations = dict(
+            StockLocation.objects.filter(
+                pk__in={group['location_id'] for group in groups}
+            ).values_list('pk', 'name')
+        )
+        for group in groups:
+            self.stdout.write(
+                f"  {products.get(group['produto_id'], group['produto_id'])} "
+                f"em {locations.get(group['location_id'], group['location_id'])}: "
+                f"{group['rows']} registros, saldo {group['total']}"
+            )
+
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{len(groups)} produto(s) com registros duplicados. '
+                    'Rode sem --dry-run para unificar.')
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'{len(groups)} produto(s) unificados.'))
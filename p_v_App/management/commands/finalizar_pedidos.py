@@ -0,0 +1,63 @@
+"""
+Comando de gerenciamento para converter pedidos entregues em vendas em lote.
+
+Usa a mesma rotina do botão "Finalizar todos" do quadro de pedidos: todos os
+pedidos entregues da empresa (ou os informados em ``--ids``) viram vendas em
+uma única transação. Pedidos sem estoque suficiente são ignorados e listados.
+
+Para usar:
+    python manage.py finalizar_pedidos --company 3
+    python manage.py finalizar_pedidos --company 3 --ids 10 11 12
+    python manage.py finalizar_pedidos --company 3 --dry-run
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+
+from orders.finalize import finalize_pedidos
+from p_v_App.models import Pedido
+from p_v_App.models_tenant import Company
+
+
+class Command(BaseCommand):
+    help = 'Converte pedidos entregues em vendas em uma única transação'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company',
+            type=int,
+            required=True,
+            help='ID da empresa'
+        )
+        parser.add_argument(
+            '--ids',
+            type=int,
+            nargs='+',
+            help='IDs dos pedidos (padrão: todos os entregues)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas mostra quantos pedidos seriam finalizados'
+        )
+
+    def handle(self, *args, **options):
+        company = Company.objects.filter(pk=options['company']).first()
+        if not company:
+            raise CommandError(f'Empresa não encontrada: {options["company"]}')
+
+        pedidos = Pedido.objects.filter(company=company, status='entregue')
+        if options['ids']:
+            pedidos = pedidos.filter(pk__in=options['ids'])
+
+        if options['dry_run']:
+            summary = pedidos.aggregate(total=Sum('grand_total'))
+            self.stdout.write(
+                f'{pedidos.count()} pedido(s) entregue(s), total R$ {summary["total"] or 0:.2f}.')
+            return
+
+        sales, skipped = finalize_pedidos(company, pedidos)
+        for msg in skipped:
+            self.stdout.write(self.style.WARNING(msg))
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(sales)} pedido(s) convertido(s) em venda; {len(skipped)} ignorado(s).'))
@@ -3,19 +3,85 @@
 Comando de gerenciamento Django para carregar dados do JSON.
 Este arquivo deve ser colocado em: p_v_App/management/commands/load_json_data.py
 
+O arquivo (formato ``dumpdata``) é lido em fluxo, sem carregar tudo na
+memória. Os objetos são separados por modelo em arquivos temporários e
+depois gravados em ordem de dependência com ``bulk_create`` em lotes
+(``ignore_conflicts``: registros já existentes com a mesma chave são
+mantidos, então o comando pode ser repetido, e as estatísticas contam só
+o que foi de fato gravado). As chaves estrangeiras são resolvidas por mapas
+de pk em memória, sem uma consulta por objeto. Cada saldo de estoque gravado
+recebe uma movimentação de abertura no ledger, para a conciliação bater.
+
 Para usar:
     python manage.py load_json_data
     python manage.py load_json_data --file caminho/para/arquivo.json
     python manage.py load_json_data --clear  # Limpa dados antes de carregar
+    python manage.py load_json_data --file historico.json --company 3 --batch-size 5000 --workers 4
 """
 
 import json
 import os
-from django.core.management.base import BaseCommand, CommandError
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
 from django.contrib.auth.models import User
-from django.utils.dateparse import parse_datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
 from django.utils import timezone
-from p_v_App.models import Category, Products, Sales, salesItems, Pedido, PedidoItem, Estoque
+from django.utils.dateparse import parse_datetime
+
+from core.jsonstream import iter_json_array
+from p_v_App.models import (
+    Category, Products, Sales, salesItems, Pedido, PedidoItem, Estoque, StockLocation,
+    StockMovement,
+)
+from p_v_App.models_tenant import Company
+
+# Modelo -> modelos referenciados por chave estrangeira (define a ordem de carga).
+MODEL_DEPENDENCIES = {
+    'auth.user': (),
+    'p_v_App.category': (),
+    'p_v_App.sales': (),
+    'p_v_App.pedido': (),
+    'p_v_App.products': ('p_v_App.category',),
+    'p_v_App.estoque': ('p_v_App.products', 'p_v_App.category'),
+    'p_v_App.salesitems': ('p_v_App.sales', 'p_v_App.products'),
+    'p_v_App.pedidoitem': ('p_v_App.pedido', 'p_v_App.products'),
+}
+MODELS = {
+    'auth.user': User,
+    'p_v_App.category': Category,
+    'p_v_App.products': Products,
+    'p_v_App.sales': Sales,
+    'p_v_App.salesitems': salesItems,
+    'p_v_App.pedido': Pedido,
+    'p_v_App.pedidoitem': PedidoItem,
+    'p_v_App.estoque': Estoque,
+}
+REFERENCED = {dep for deps in MODEL_DEPENDENCIES.values() for dep in deps}
+MAX_ERROR_MESSAGES = 20
+PROGRESS_INTERVAL = 2.0
+
+
+def dependency_levels():
+    """Group the models in levels; a level only references earlier ones."""
+    levels, placed = [], set()
+    while len(placed) < len(MODEL_DEPENDENCIES):
+        level = [
+            label for label, deps in MODEL_DEPENDENCIES.items()
+            if label not in placed and all(dep in placed for dep in deps)
+        ]
+        levels.append(level)
+        placed.update(level)
+    return levels
+
+
+class MissingReference(Exception):
+    pass
 
 
 class Command(BaseCommand):
@@ -38,6 +104,23 @@ class Command(BaseCommand):
             action='store_true',
             help='Executa sem salvar no banco (apenas mostra o que seria feito)'
         )
+        parser.add_argument(
+            '--company',
+            type=int,
+            help='Empresa dos registros que não trazem o campo "company"'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Objetos por INSERT em lote (padrão: 2000)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Modelos independentes carregados em paralelo (padrão: 1; SQLite usa 1)'
+        )
 
     def handle(self, *args, **options):
         file_path = options['file']
@@ -47,6 +130,18 @@ class Command(BaseCommand):
         if not os.path.exists(file_path):
             raise CommandError(f'Arquivo não encontrado: {file_path}')
 
+        self.default_company_id = options['company']
+        if self.default_company_id and not Company.objects.filter(
+                pk=self.default_company_id).exists():
+            raise CommandError(f'Empresa {self.default_company_id} não encontrada.')
+
+        self.batch_size = max(1, options['batch_size'])
+        self.workers = max(1, options['workers'])
+        if self.workers > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                'SQLite não aceita gravações concorrentes; usando --workers 1.'))
+            self.workers = 1
+
         if dry_run:
             self.stdout.write(
                 self.style.WARNING(
@@ -80,335 +175,418 @@ class Command(BaseCommand):
     def load_json_data(self, file_path, dry_run=False):
         """Carrega dados do arquivo JSON."""
         self.stdout.write(f'Carregando dados de {file_path}...')
-
-        try:
-            # Tentar ler com UTF-8 primeiro
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except UnicodeDecodeError:
+        started = time.perf_counter()
+
+        self.lock = threading.Lock()
+        self.pk_maps = {label: {} for label in REFERENCED}
+        self.locations = {}
+        self.stock_rows = {}
+        self.stats = {
+            label: {'total': 0, 'loaded': 0, 'existing': 0, 'errors': 0} for label in MODELS}
+        self.reference = f'Carga {os.path.basename(file_path)}'[:120]
+        self.error_messages = 0
+
+        with tempfile.TemporaryDirectory(prefix='load_json_') as spill_dir:
+            skipped = self.split_by_model(file_path, spill_dir)
+            total = sum(entry['total'] for entry in self.stats.values())
             self.stdout.write(
-                'Erro de codificação UTF-8. Tentando com latin-1...')
-            with open(file_path, 'r', encoding='latin-1') as f:
-                data = json.load(f)
-
-        self.stdout.write(f'Total de objetos encontrados: {len(data)}')
-
-        # Contadores
-        stats = {
-            'auth.user': 0,
-            'p_v_App.category': 0,
-            'p_v_App.products': 0,
-            'p_v_App.sales': 0,
-            'p_v_App.salesitems': 0,
-            'p_v_App.pedido': 0,
-            'p_v_App.pedidoitem': 0,
-            'p_v_App.estoque': 0,
-            'errors': 0,
-            'skipped': 0
-        }
-
-        for i, obj in enumerate(data):
-            model_name = obj.get('model')
-            pk = obj.get('pk')
-            fields = obj.get('fields', {})
-
-            try:
-                if model_name == 'auth.user':
-                    self.load_user(pk, fields, dry_run)
-                    stats['auth.user'] += 1
-
-                elif model_name == 'p_v_App.category':
-                    self.load_category(pk, fields, dry_run)
-                    stats['p_v_App.category'] += 1
-
-                elif model_name == 'p_v_App.products':
-                    self.load_product(pk, fields, dry_run)
-                    stats['p_v_App.products'] += 1
-
-                elif model_name == 'p_v_App.sales':
-                    self.load_sale(pk, fields, dry_run)
-                    stats['p_v_App.sales'] += 1
-
-                elif model_name == 'p_v_App.salesitems':
-                    self.load_sales_item(pk, fields, dry_run)
-                    stats['p_v_App.salesitems'] += 1
-
-                elif model_name == 'p_v_App.pedido':
-                    self.load_pedido(pk, fields, dry_run)
-                    stats['p_v_App.pedido'] += 1
-
-                elif model_name == 'p_v_App.pedidoitem':
-                    self.load_pedido_item(pk, fields, dry_run)
-                    stats['p_v_App.pedidoitem'] += 1
-
-                elif model_name == 'p_v_App.estoque':
-                    self.load_estoque(pk, fields, dry_run)
-                    stats['p_v_App.estoque'] += 1
-
+                f'Total de objetos encontrados: {total + sum(skipped.values())} '
+                f'(lidos em {time.perf_counter() - started:.1f}s)'
+            )
+            for model_name, count in skipped.items():
+                self.stdout.write(f'Modelo não reconhecido: {model_name} ({count} objetos)')
+
+            for level in dependency_levels():
+                labels = [label for label in level if self.stats[label]['total']]
+                if self.workers > 1 and len(labels) > 1:
+                    with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                        for future in [
+                            executor.submit(self.load_model_threaded, label, spill_dir, dry_run)
+                            for label in labels
+                        ]:
+                            future.result()
                 else:
-                    self.stdout.write(f'Modelo não reconhecido: {model_name}')
-                    stats['skipped'] += 1
+                    for label in labels:
+                        self.load_model(label, spill_dir, dry_run)
 
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f'Erro ao processar objeto {i+1} (modelo: {model_name}, pk: {pk}): {e}'
-                    )
-                )
-                stats['errors'] += 1
-                continue
-
-            # Mostrar progresso
-            if (i + 1) % 100 == 0:
-                self.stdout.write(
-                    f'Processados {i + 1}/{len(data)} objetos...')
+        if not dry_run:
+            self.reset_sequences()
 
+        elapsed = time.perf_counter() - started
+        loaded = sum(entry['loaded'] for entry in self.stats.values())
         # Estatísticas finais
         self.stdout.write('\n=== ESTATÍSTICAS FINAIS ===')
-        for key, value in stats.items():
-            if value > 0:
-                self.stdout.write(f'{key}: {value}')
+        for label, entry in self.stats.items():
+            if entry['total']:
+                self.stdout.write(
+                    f"{label}: {entry['loaded']} de {entry['total']}"
+                    + (f" ({entry['existing']} já existentes)" if entry['existing'] else '')
+                    + (f" ({entry['errors']} com erro)" if entry['errors'] else '')
+                )
+        if skipped:
+            self.stdout.write(f'skipped: {sum(skipped.values())}')
+        self.stdout.write(
+            f'Tempo total: {elapsed:.1f}s ({loaded / elapsed if elapsed else 0:,.0f} objetos/s)')
 
         self.stdout.write(
             self.style.SUCCESS('Carregamento concluído!')
         )
 
+    def split_by_model(self, file_path, spill_dir):
+        """Stream the file once, spilling each model to its own JSON-lines file."""
+        spills, skipped = {}, {}
+        try:
+            for encoding in ('utf-8', 'latin-1'):
+                try:
+                    with open(file_path, 'r', encoding=encoding) as f:
+                        for obj in iter_json_array(f):
+                            model_name = obj.get('model') if isinstance(obj, dict) else None
+                            if model_name not in MODELS:
+                                skipped[model_name] = skipped.get(model_name, 0) + 1
+                                continue
+                            if model_name not in spills:
+                                spills[model_name] = open(
+                                    os.path.join(spill_dir, model_name), 'w', encoding='utf-8')
+                            spills[model_name].write(
+                                json.dumps([obj.get('pk'), obj.get('fields', {})]) + '\n')
+                            self.stats[model_name]['total'] += 1
+                    break
+                except UnicodeDecodeError:
+                    # Tentar ler com UTF-8 primeiro
+                    self.stdout.write(
+                        'Erro de codificação UTF-8. Tentando com latin-1...')
+                    for handle in spills.values():
+                        handle.close()
+                    spills, skipped = {}, {}
+                    for entry in self.stats.values():
+                        entry['total'] = 0
+        except ValueError as exc:
+            raise CommandError(f'JSON inválido em {file_path}: {exc}')
+        finally:
+            for handle in spills.values():
+                handle.close()
+        return skipped
+
+    def iter_batches(self, label, spill_dir):
+        batch = []
+        with open(os.path.join(spill_dir, label), encoding='utf-8') as f:
+            for line in f:
+                batch.append(json.loads(line))
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def load_model_threaded(self, label, spill_dir, dry_run):
+        try:
+            self.load_model(label, spill_dir, dry_run)
+        finally:
+            connection.close()
+
+    def load_model(self, label, spill_dir, dry_run):
+        model = MODELS[label]
+        build = getattr(self, f"build_{label.split('.')[1]}")
+        entry = self.stats[label]
+        started = last_report = time.perf_counter()
+        done = 0
+
+        for batch in self.iter_batches(label, spill_dir):
+            self.prefetch_references(label, batch)
+            objects = []
+            for pk, fields in batch:
+                try:
+                    if pk is None:
+                        raise MissingReference('objeto sem pk')
+                    objects.append(build(pk, fields))
+                except (MissingReference, ValueError, TypeError) as exc:
+                    entry['errors'] += 1
+                    self.report_error(label, pk, exc)
+
+            if dry_run:
+                stored, inserted = {obj.pk for obj in objects}, objects
+            else:
+                stored, inserted = self.store_batch(label, objects)
+            if label in REFERENCED:
+                self.register_pks(label, objects, stored)
+            entry['loaded'] += len(inserted)
+            entry['existing'] += len(objects) - len(inserted)
+            done += len(batch)
+
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL or done == entry['total']:
+                last_report = now
+                with self.lock:
+                    self.stdout.write(
+                        f"{label}: {done}/{entry['total']} "
+                        f"({done * 100 // entry['total']}%) "
+                        f'{done / (now - started) if now > started else 0:,.0f} objetos/s'
+                    )
+
+    def store_batch(self, label, objects):
+        """Insert ``objects``; return the pks now stored and the objects really inserted.
+
+        ``ignore_conflicts`` silently drops rows whose pk (or another unique
+        key) already exists, so the pks present before and after the INSERT
+        tell which objects of the batch were written.
+        """
+        if not objects:
+            return set(), []
+        model = MODELS[label]
+        source_pks = [obj.pk for obj in objects]
+        with transaction.atomic():
+            existing = set(model.objects.filter(pk__in=source_pks).values_list('pk', flat=True))
+            model.objects.bulk_create(
+                objects, batch_size=self.batch_size, ignore_conflicts=True)
+            stored = set(model.objects.filter(pk__in=source_pks).values_list('pk', flat=True))
+            inserted = [obj for obj in objects if obj.pk in stored and obj.pk not in existing]
+            if label == 'p_v_App.estoque':
+                self.record_opening_stock(inserted)
+        return stored, inserted
+
+    def record_opening_stock(self, rows):
+        """Ledger rows for the imported balances, so the ledger matches ``Estoque``."""
+        created_at = timezone.now()
+        movements = []
+        for row in rows:
+            quantidade = Decimal(str(row.quantidade or 0))
+            if quantidade:
+                movements.append(
+                    StockMovement(
+                        company_id=row.company_id,
+                        produto_id=row.produto_id,
+                        location_id=row.location_id,
+                        delta=quantidade,
+                        balance_after=quantidade,
+                        reason=StockMovement.Reason.IMPORT,
+                        reference=self.reference,
+                        created_at=created_at,
+                    )
+                )
+        StockMovement.objects.bulk_create(movements, batch_size=self.batch_size)
+
+    def report_error(self, label, pk, exc):
+        with self.lock:
+            self.error_messages += 1
+            if self.error_messages <= MAX_ERROR_MESSAGES:
+                self.stdout.write(
+                    self.style.ERROR(f'Erro ao processar objeto (modelo: {label}, pk: {pk}): {exc}'))
+            elif self.error_messages == MAX_ERROR_MESSAGES + 1:
+                self.stdout.write(self.style.ERROR('Demais erros omitidos; veja o resumo final.'))
+
+    def register_pks(self, label, objects, stored):
+        """Record where each source pk ended up, for the models that reference it."""
+        pk_map = self.pk_maps[label]
+        pk_map.update((pk, pk) for pk in stored)
+        if label == 'auth.user':
+            # pk ocupado por outro usuário ou username já existente: usa o existente.
+            missing = {obj.username: obj.pk for obj in objects if obj.pk not in stored}
+            for user_pk, username in User.objects.filter(
+                    username__in=missing).values_list('pk', 'username'):
+                pk_map[missing[username]] = user_pk
+
+    def prefetch_references(self, label, batch):
+        """Load into the pk maps the referenced rows that exist only in the database."""
+        for field_name, target in self.REFERENCE_FIELDS.get(label, ()):
+            pk_map = self.pk_maps[target]
+            wanted = {
+                fields.get(field_name) for _, fields in batch
+                if fields.get(field_name) is not None
+            } - pk_map.keys()
+            if wanted:
+                pk_map.update(
+                    (pk, pk) for pk in MODELS[target].objects.filter(
+                        pk__in=wanted).values_list('pk', flat=True)
+                )
+
+    # Campo do JSON -> modelo referenciado, por modelo carregado.
+    REFERENCE_FIELDS = {
+        'p_v_App.products': (('category_id', 'p_v_App.category'),),
+        'p_v_App.estoque': (
+            ('produto', 'p_v_App.products'),
+            ('categoria', 'p_v_App.category'),
+            ('descricao', 'p_v_App.products'),
+        ),
+        'p_v_App.salesitems': (('sale_id', 'p_v_App.sales'), ('product_id', 'p_v_App.products')),
+        'p_v_App.pedidoitem': (('pedido', 'p_v_App.pedido'), ('product', 'p_v_App.products')),
+    }
+
+    def resolve(self, label, value, description, pk):
+        try:
+            return self.pk_maps[label][value]
+        except KeyError:
+            raise MissingReference(f'{description} {value} não encontrado(a) para {pk}')
+
+    def company_for(self, fields):
+        company_id = fields.get('company') or self.default_company_id
+        if not company_id:
+            raise MissingReference('empresa não informada (use --company)')
+        return company_id
+
+    def location_for(self, company_id):
+        """Local padrão da empresa: o backup não traz locais de estoque."""
+        with self.lock:
+            if company_id not in self.locations:
+                self.locations[company_id] = StockLocation.default_for(company_id).pk
+            return self.locations[company_id]
+
     def parse_date_field(self, date_string):
         """Converte string de data para objeto datetime."""
         if not date_string:
             return timezone.now()
 
         try:
-            return parse_datetime(date_string)
-        except:
+            return parse_datetime(date_string) or timezone.now()
+        except ValueError:
             return timezone.now()
 
-    def load_user(self, pk, fields, dry_run=False):
-        """Carrega usuário."""
-        if dry_run:
-            self.stdout.write(
-                f'[DRY-RUN] Criaria usuário: {fields.get("username", "")}')
-            return
-
-        user, created = User.objects.get_or_create(
+    def build_user(self, pk, fields):
+        """Monta usuário."""
+        return User(
             pk=pk,
-            defaults={
-                'username': fields.get('username', ''),
-                'first_name': fields.get('first_name', ''),
-                'last_name': fields.get('last_name', ''),
-                'email': fields.get('email', ''),
-                'is_staff': fields.get('is_staff', False),
-                'is_active': fields.get('is_active', True),
-                'is_superuser': fields.get('is_superuser', False),
-                'date_joined': self.parse_date_field(fields.get('date_joined')),
-                'last_login': self.parse_date_field(fields.get('last_login')),
-                'password': fields.get('password', ''),
-            }
+            username=fields.get('username', ''),
+            first_name=fields.get('first_name', ''),
+            last_name=fields.get('last_name', ''),
+            email=fields.get('email', ''),
+            is_staff=fields.get('is_staff', False),
+            is_active=fields.get('is_active', True),
+            is_superuser=fields.get('is_superuser', False),
+            date_joined=self.parse_date_field(fields.get('date_joined')),
+            last_login=self.parse_date_field(fields.get('last_login')),
+            password=fields.get('password', ''),
         )
 
-    def load_category(self, pk, fields, dry_run=False):
-        """Carrega categoria."""
-        if dry_run:
-            self.stdout.write(
-                f'[DRY-RUN] Criaria categoria: {fields.get("name", "")}')
-            return
-
-        category, created = Category.objects.get_or_create(
+    def build_category(self, pk, fields):
+        """Monta categoria."""
+        return Category(
             pk=pk,
-            defaults={
-                'name': fields.get('name', ''),
-                'description': fields.get('description', ''),
-                'status': fields.get('status', 1),
-                'date_added': self.parse_date_field(fields.get('date_added')),
-                'date_updated': self.parse_date_field(fields.get('date_updated')),
-            }
+            company_id=self.company_for(fields),
+            name=fields.get('name', ''),
+            description=fields.get('description', ''),
+            status=fields.get('status', 1),
+            date_added=self.parse_date_field(fields.get('date_added')),
         )
 
-    def load_product(self, pk, fields, dry_run=False):
-        """Carrega produto."""
-        if dry_run:
-            self.stdout.write(
-                f'[DRY-RUN] Criaria produto: {fields.get("name", "")}')
-            return
-
-        category_id = fields.get('category_id')
-        try:
-            category = Category.objects.get(pk=category_id)
-        except Category.DoesNotExist:
-            raise CommandError(
-                f'Categoria {category_id} não encontrada para produto {pk}')
-
-        product, created = Products.objects.get_or_create(
+    def build_products(self, pk, fields):
+        """Monta produto."""
+        return Products(
             pk=pk,
-            defaults={
-                'code': fields.get('code', ''),
-                'category_id': category,
-                'name': fields.get('name', ''),
-                'description': fields.get('description', ''),
-                'price': fields.get('price', 0),
-                'status': fields.get('status', 1),
-                'custo': fields.get('custo', 0),
-                'date_added': self.parse_date_field(fields.get('date_added')),
-                'date_updated': self.parse_date_field(fields.get('date_updated')),
-            }
+            company_id=self.company_for(fields),
+            code=fields.get('code', ''),
+            category_id_id=self.resolve(
+                'p_v_App.category', fields.get('category_id'), 'Categoria', f'produto {pk}'),
+            name=fields.get('name', ''),
+            description=fields.get('description', ''),
+            price=fields.get('price', 0),
+            status=fields.get('status', 1),
+            custo=fields.get('custo', 0),
+            date_added=self.parse_date_field(fields.get('date_added')),
         )
 
-    def load_sale(self, pk, fields, dry_run=False):
-        """Carrega venda."""
-        if dry_run:
-            self.stdout.write(
-                f'[DRY-RUN] Criaria venda: {fields.get("code", "")}')
-            return
-
-        sale, created = Sales.objects.get_or_create(
+    def build_sales(self, pk, fields):
+        """Monta venda."""
+        return Sales(
             pk=pk,
-            defaults={
-                'customer_name': fields.get('customer_name', ''),
-                'code': fields.get('code', ''),
-                'sub_total': fields.get('sub_total', 0),
-                'grand_total': fields.get('grand_total', 0),
-                'tax_amount': fields.get('tax_amount', 0),
-                'tax': fields.get('tax', 0),
-                'tendered_amount': fields.get('tendered_amount', 0),
-                'amount_change': fields.get('amount_change', 0),
-                'forma_pagamento': fields.get('forma_pagamento', 'PIX'),
-                'endereco_entrega': fields.get('endereco_entrega', ''),
-                'type': fields.get('type', 'venda'),
-                'status': fields.get('status', ''),
-                'date_added': self.parse_date_field(fields.get('date_added')),
-                'date_updated': self.parse_date_field(fields.get('date_updated')),
-            }
+            company_id=self.company_for(fields),
+            customer_name=fields.get('customer_name', ''),
+            code=fields.get('code', ''),
+            sub_total=fields.get('sub_total', 0),
+            grand_total=fields.get('grand_total', 0),
+            tax_amount=fields.get('tax_amount', 0),
+            tax=fields.get('tax', 0),
+            tendered_amount=fields.get('tendered_amount', 0),
+            amount_change=fields.get('amount_change', 0),
+            forma_pagamento=fields.get('forma_pagamento', 'PIX'),
+            endereco_entrega=fields.get('endereco_entrega', ''),
+            type=fields.get('type', 'venda'),
+            status=fields.get('status', ''),
+            total_cost=fields.get('total_cost', 0),
+            item_count=fields.get('item_count', 0),
+            date_added=self.parse_date_field(fields.get('date_added')),
         )
 
-    def load_sales_item(self, pk, fields, dry_run=False):
-        """Carrega item de venda."""
-        if dry_run:
-            self.stdout.write(f'[DRY-RUN] Criaria item de venda: {pk}')
-            return
-
-        sale_id = fields.get('sale_id')
-        try:
-            sale = Sales.objects.get(pk=sale_id)
-        except Sales.DoesNotExist:
-            raise CommandError(
-                f'Venda {sale_id} não encontrada para item {pk}')
-
-        product_id = fields.get('product_id')
-        try:
-            product = Products.objects.get(pk=product_id)
-        except Products.DoesNotExist:
-            raise CommandError(
-                f'Produto {product_id} não encontrado para item {pk}')
-
-        sales_item, created = salesItems.objects.get_or_create(
+    def build_salesitems(self, pk, fields):
+        """Monta item de venda."""
+        return salesItems(
             pk=pk,
-            defaults={
-                'sale_id': sale,
-                'product_id': product,
-                'price': fields.get('price', 0),
-                'qty': fields.get('qty', 0),
-                'total': fields.get('total', 0),
-            }
+            sale_id_id=self.resolve(
+                'p_v_App.sales', fields.get('sale_id'), 'Venda', f'item {pk}'),
+            product_id_id=self.resolve(
+                'p_v_App.products', fields.get('product_id'), 'Produto', f'item {pk}'),
+            price=fields.get('price', 0),
+            qty=fields.get('qty', 0),
+            total=fields.get('total', 0),
+            unit_cost=fields.get('unit_cost'),
         )
 
-    def load_pedido(self, pk, fields, dry_run=False):
-        """Carrega pedido."""
-        if dry_run:
-            self.stdout.write(
-                f'[DRY-RUN] Criaria pedido: {fields.get("code", "")}')
-            return
-
-        pedido, created = Pedido.objects.get_or_create(
+    def build_pedido(self, pk, fields):
+        """Monta pedido."""
+        return Pedido(
             pk=pk,
-            defaults={
-                'customer_name': fields.get('customer_name', ''),
-                'code': fields.get('code', ''),
-                'sub_total': fields.get('sub_total', 0),
-                'tax': fields.get('tax', 0),
-                'tax_amount': fields.get('tax_amount', 0),
-                'grand_total': fields.get('grand_total', 0),
-                'tendered_amount': fields.get('tendered_amount', 0),
-                'amount_change': fields.get('amount_change', 0),
-                'forma_pagamento': fields.get('forma_pagamento', 'PIX'),
-                'endereco_entrega': fields.get('endereco_entrega', ''),
-                'taxa_entrega': fields.get('taxa_entrega', 0),
-                'status': fields.get('status', 'pendente'),
-                'date_added': self.parse_date_field(fields.get('date_added')),
-                'date_updated': self.parse_date_field(fields.get('date_updated')),
-            }
+            company_id=self.company_for(fields),
+            customer_name=fields.get('customer_name', ''),
+            code=fields.get('code', ''),
+            sub_total=fields.get('sub_total', 0),
+            tax=fields.get('tax', 0),
+            tax_amount=fields.get('tax_amount', 0),
+            grand_total=fields.get('grand_total', 0),
+            tendered_amount=fields.get('tendered_amount', 0),
+            amount_change=fields.get('amount_change', 0),
+            forma_pagamento=fields.get('forma_pagamento', 'PIX'),
+            endereco_entrega=fields.get('endereco_entrega', ''),
+            taxa_entrega=fields.get('taxa_entrega', 0),
+            status=fields.get('status', 'pendente'),
+            date_added=self.parse_date_field(fields.get('date_added')),
         )
 
-    def load_pedido_item(self, pk, fields, dry_run=False):
-        """Carrega item de pedido."""
-        if dry_run:
-            self.stdout.write(f'[DRY-RUN] Criaria item de pedido: {pk}')
-            return
-
-        pedido_id = fields.get('pedido')
-        try:
-            pedido = Pedido.objects.get(pk=pedido_id)
-        except Pedido.DoesNotExist:
-            raise CommandError(
-                f'Pedido {pedido_id} não encontrado para item {pk}')
-
-        product_id = fields.get('product')
-        try:
-            product = Products.objects.get(pk=product_id)
-        except Products.DoesNotExist:
-            raise CommandError(
-                f'Produto {product_id} não encontrado para item {pk}')
-
-        pedido_item, created = PedidoItem.objects.get_or_create(
+    def build_pedidoitem(self, pk, fields):
+        """Monta item de pedido."""
+        return PedidoItem(
             pk=pk,
-            defaults={
-                'pedido': pedido,
-                'product': product,
-                'price': fields.get('price', 0),
-                'qty': fields.get('qty', 0),
-                'taxa_entrega': fields.get('taxa_entrega', 0),
-                'total': fields.get('total', 0),
-            }
+            pedido_id=self.resolve(
+                'p_v_App.pedido', fields.get('pedido'), 'Pedido', f'item {pk}'),
+            product_id=self.resolve(
+                'p_v_App.products', fields.get('product'), 'Produto', f'item {pk}'),
+            price=fields.get('price', 0),
+            qty=fields.get('qty', 0),
+            taxa_entrega=fields.get('taxa_entrega', 0),
+            total=fields.get('total', 0),
+            unit_cost=fields.get('unit_cost'),
         )
 
-    def load_estoque(self, pk, fields, dry_run=False):
-        """Carrega estoque."""
-        if dry_run:
-            self.stdout.write(f'[DRY-RUN] Criaria estoque: {pk}')
-            return
-
-        produto_id = fields.get('produto')
-        try:
-            produto = Products.objects.get(pk=produto_id)
-        except Products.DoesNotExist:
-            raise CommandError(
-                f'Produto {produto_id} não encontrado para estoque {pk}')
-
-        categoria_id = fields.get('categoria')
-        try:
-            categoria = Category.objects.get(pk=categoria_id)
-        except Category.DoesNotExist:
-            raise CommandError(
-                f'Categoria {categoria_id} não encontrada para estoque {pk}')
-
-        descricao = None
+    def build_estoque(self, pk, fields):
+        """Monta estoque."""
         descricao_id = fields.get('descricao')
-        if descricao_id:
-            try:
-                descricao = Products.objects.get(pk=descricao_id)
-            except Products.DoesNotExist:
-                pass
-
-        estoque, created = Estoque.objects.get_or_create(
+        company_id = self.company_for(fields)
+        location_id = self.location_for(company_id)
+        produto_id = self.resolve(
+            'p_v_App.products', fields.get('produto'), 'Produto', f'estoque {pk}')
+        # Um registro por produto e local: duplicados do backup não são gravados.
+        first_pk = self.stock_rows.setdefault((company_id, location_id, produto_id), pk)
+        if first_pk != pk:
+            raise ValueError(
+                f'estoque duplicado do produto {produto_id} (mantido o registro {first_pk}); '
+                'rode dedupe_stock no banco de origem antes de exportar')
+        return Estoque(
             pk=pk,
-            defaults={
-                'produto': produto,
-                'quantidade': fields.get('quantidade', 0),
-                'categoria': categoria,
-                'validade': fields.get('validade', 0),
-                'descricao': descricao,
-                'data_validade': fields.get('data_validade'),
-                'preco': fields.get('preco', 0),
-                'custo': fields.get('custo', 0),
-                'status': fields.get('status', 1),
-            }
+            company_id=company_id,
+            location_id=location_id,
+            produto_id=produto_id,
+            categoria_id=self.resolve(
+                'p_v_App.category', fields.get('categoria'), 'Categoria', f'estoque {pk}'),
+            quantidade=fields.get('quantidade', 0),
+            validade=fields.get('validade', 0),
+            descricao_id=self.pk_maps['p_v_App.products'].get(descricao_id) if descricao_id else None,
+            data_validade=fields.get('data_validade'),
+            preco=fields.get('preco', 0),
+            custo=fields.get('custo', 0),
+            status=fields.get('status', 1),
         )
+
+    def reset_sequences(self):
+        """Move the pk sequences past the explicit pks just inserted (Postgres)."""
+        statements = connection.ops.sequence_reset_sql(no_style(), list(MODELS.values()))
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
@@ -0,0 +1,134 @@
+"""
+Comando de gerenciamento para resumir os logs de desempenho por endpoint.
+
+Lê as linhas JSON gravadas pelo ``PerformanceMiddleware`` (logger
+``p_v.perf``; ative com ``PERF_INSTRUMENTATION=1`` e ``PERF_LOG_FILE``) e
+lista os endpoints mais lentos, os que mais consultam o banco e as consultas
+repetidas mais frequentes (candidatas a N+1).
+
+Para usar:
+    python manage.py perf_report
+    python manage.py perf_report logs/perf.log --top 20
+    cat perf.log | python manage.py perf_report -
+"""
+
+import json
+import sys
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _parse_line(line):
+    start = line.find('{')
+    if start < 0:
+        return None
+    try:
+        record = json.loads(line[start:])
+    except ValueError:
+        return None
+    return record if 'duration_ms' in record else None
+
+
+class Command(BaseCommand):
+    help = 'Resume os logs de desempenho (tempo e consultas SQL) por endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'log_file',
+            nargs='?',
+            help='Arquivo de log ("-" para a entrada padrão; padrão: PERF_LOG_FILE)'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Quantidade de endpoints em cada ranking (padrão: 10)'
+        )
+
+    def _open(self, path):
+        if path == '-':
+            return sys.stdin
+        try:
+            return open(path, encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f'Não foi possível ler {path}: {exc}')
+
+    def handle(self, *args, **options):
+        path = options['log_file'] or getattr(settings, 'PERF_LOG_FILE', '')
+        if not path:
+            raise CommandError('Informe o arquivo de log ou defina PERF_LOG_FILE.')
+
+        stats = defaultdict(lambda: {'durations': [], 'queries': [], 'sql_ms': [], 'duplicated': 0})
+        duplicate_sql = Counter()
+        duplicate_views = defaultdict(set)
+        handle = self._open(path)
+        try:
+            for line in handle:
+                record = _parse_line(line)
+                if record is None:
+                    continue
+                key = f"{record.get('method', '')} {record.get('view') or record.get('path', '')}"
+                entry = stats[key]
+                entry['durations'].append(record['duration_ms'])
+                entry['queries'].append(record.get('queries', 0))
+                entry['sql_ms'].append(record.get('sql_ms', 0))
+                entry['duplicated'] += record.get('duplicated', 0)
+                for duplicate in record.get('duplicates', ()):
+                    duplicate_sql[duplicate['sql']] += duplicate['count'] - 1
+                    duplicate_views[duplicate['sql']].add(key)
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+        if not stats:
+            self.stdout.write('Nenhuma linha de desempenho encontrada.')
+            return
+
+        rows = []
+        for key, entry in stats.items():
+            count = len(entry['durations'])
+            rows.append(
+                {
+                    'endpoint': key,
+                    'hits': count,
+                    'avg_ms': sum(entry['durations']) / count,
+                    'p95_ms': _percentile(entry['durations'], 95),
+                    'max_ms': max(entry['durations']),
+                    'avg_queries': sum(entry['queries']) / count,
+                    'max_queries': max(entry['queries']),
+                    'avg_sql_ms': sum(entry['sql_ms']) / count,
+                    'avg_duplicated': entry['duplicated'] / count,
+                }
+            )
+
+        top = options['top']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Endpoints mais lentos (p95) — {sum(r["hits"] for r in rows)} requisições'))
+        for row in sorted(rows, key=lambda r: r['p95_ms'], reverse=True)[:top]:
+            self.stdout.write(
+                f"  {row['endpoint']:<45} {row['hits']:>6}x  média {row['avg_ms']:8.1f} ms"
+                f"  p95 {row['p95_ms']:8.1f} ms  máx {row['max_ms']:8.1f} ms"
+                f"  SQL {row['avg_sql_ms']:7.1f} ms"
+            )
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Endpoints com mais consultas SQL (média)'))
+        for row in sorted(rows, key=lambda r: r['avg_queries'], reverse=True)[:top]:
+            self.stdout.write(
+                f"  {row['endpoint']:<45} {row['avg_queries']:7.1f} consultas"
+                f"  (máx {row['max_queries']})  repetidas {row['avg_duplicated']:6.1f}"
+            )
+
+        if duplicate_sql:
+            self.stdout.write(self.style.MIGRATE_HEADING('Consultas repetidas mais frequentes'))
+            for sql, repeated in duplicate_sql.most_common(top):
+                views = ', '.join(sorted(duplicate_views[sql])[:3])
+                self.stdout.write(f'  {repeated:>7}x  {sql[:120]}')
+                self.stdout.write(f'           em: {views}')
@@ -0,0 +1,90 @@
+"""
+Comando de gerenciamento para conciliar o estoque com o livro de movimentações.
+
+Compara ``Estoque.quantidade`` com o saldo reconstruído a partir da última
+fotografia mais as movimentações registradas depois dela. Com ``--fix`` grava
+uma movimentação de conciliação para cada divergência, mantendo o saldo do
+estoque como referência.
+
+Para usar:
+    python manage.py reconcile_stock
+    python manage.py reconcile_stock --company 3 --fix
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from inventory.ledger import find_stock_discrepancies
+from p_v_App.models import Products, StockMovement
+from p_v_App.models_tenant import Company
+
+
+class Command(BaseCommand):
+    help = 'Concilia o saldo de estoque com o livro de movimentações'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company',
+            type=int,
+            help='ID da empresa (padrão: todas as empresas)'
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Registra movimentações de conciliação para as divergências'
+        )
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('pk')
+        if options['company']:
+            companies = companies.filter(pk=options['company'])
+            if not companies.exists():
+                raise CommandError(
+                    f'Empresa não encontrada: {options["company"]}')
+
+        total = 0
+        for company in companies:
+            discrepancies = find_stock_discrepancies(company)
+            if not discrepancies:
+                continue
+
+            total += len(discrepancies)
+            names = dict(
+                Products.objects.filter(
+                    pk__in=[row['produto_id'] for row in discrepancies]
+                ).values_list('pk', 'name')
+            )
+            self.stdout.write(self.style.WARNING(f'{company.name}:'))
+            for row in discrepancies:
+                self.stdout.write(
+                    f"  {names.get(row['produto_id'], row['produto_id'])}: "
+                    f"livro {row['ledger']} / estoque {row['estoque']} "
+                    f"({row['difference']:+})"
+                )
+
+            if options['fix']:
+                with transaction.atomic():
+                    StockMovement.objects.bulk_create(
+                        [
+                            StockMovement(
+                                company=company,
+                                produto_id=row['produto_id'],
+                                delta=row['difference'],
+                                balance_after=row['estoque'],
+                                reason=StockMovement.Reason.RECONCILE,
+                                reference='reconcile_stock',
+                            )
+                            for row in discrepancies
+                        ]
+                    )
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS('Nenhuma divergência encontrada.'))
+        elif options['fix']:
+            self.stdout.write(
+                self.style.SUCCESS(f'{total} divergência(s) conciliada(s).'))
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{total} divergência(s) encontrada(s). Use --fix para conciliar.')
+            )
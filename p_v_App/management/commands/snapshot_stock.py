@@ -0,0 +1,39 @@
+"""
+Comando de gerenciamento para registrar uma fotografia do saldo de estoque.
+
+As fotografias servem de ponto de partida para consultas de saldo em datas
+passadas (apenas as movimentações posteriores precisam ser somadas). Agende
+a execução periódica, por exemplo diariamente após o fechamento:
+
+    python manage.py reconcile_stock --fix && python manage.py snapshot_stock
+    python manage.py snapshot_stock --company 3
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.ledger import take_stock_snapshot
+from p_v_App.models_tenant import Company
+
+
+class Command(BaseCommand):
+    help = 'Registra uma fotografia do saldo atual de estoque de cada produto'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company',
+            type=int,
+            help='ID da empresa (padrão: todas as empresas)'
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            company = Company.objects.filter(pk=options['company']).first()
+            if not company:
+                raise CommandError(
+                    f'Empresa não encontrada: {options["company"]}')
+
+        created = take_stock_snapshot(company)
+        self.stdout.write(
+            self.style.SUCCESS(f'{created} saldo(s) registrado(s).')
+        )
@@ -0,0 +1,109 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('p_v.perf')
+
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_SPACES = re.compile(r'\s+')
+
+
+def sql_fingerprint(sql: str) -> str:
+    """Normalize a statement so repeated shapes (N+1 loops) compare equal."""
+    sql = _IN_LIST.sub('(%s, ...)', sql)
+    sql = _NUMBER.sub('N', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """``execute_wrapper`` hook that counts and times every statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[sql_fingerprint(sql)] += 1
+
+    @property
+    def duplicated(self) -> int:
+        """Statements that repeated an already executed shape."""
+        return sum(count - 1 for count in self.fingerprints.values() if count > 1)
+
+    def duplicates(self, limit: int = 5) -> list[dict]:
+        return [
+            {'sql': fingerprint[:300], 'count': count}
+            for fingerprint, count in self.fingerprints.most_common(limit)
+            if count > 1
+        ]
+
+
+class PerformanceMiddleware:
+    """
+    Middleware opcional de instrumentação (PERF_INSTRUMENTATION=1).
+
+    Mede o tempo total da requisição, a quantidade e o tempo das consultas SQL
+    e as consultas repetidas (mesmo formato executado várias vezes, típico de
+    N+1). Os números vão no cabeçalho ``Server-Timing`` e numa linha de log
+    JSON no logger ``p_v.perf``, lida pelo comando ``perf_report``.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERF_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        sql_ms = recorder.duration * 1000
+
+        duplicated = recorder.duplicated
+        response['Server-Timing'] = ', '.join(
+            [
+                f'app;dur={total_ms:.1f}',
+                f'db;dur={sql_ms:.1f};desc="{recorder.count} queries"',
+                f'dup;desc="{duplicated} duplicated"',
+            ]
+        )
+
+        match = getattr(request, 'resolver_match', None)
+        logger.info(
+            'request %s',
+            json.dumps(
+                {
+                    'view': match.view_name if match else '',
+                    'route': match.route if match else '',
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'duration_ms': round(total_ms, 2),
+                    'queries': recorder.count,
+                    'sql_ms': round(sql_ms, 2),
+                    'duplicated': duplicated,
+                    'duplicates': recorder.duplicates(),
+                },
+                ensure_ascii=False,
+            ),
+        )
+        return response
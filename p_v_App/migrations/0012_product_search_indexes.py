@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    table = schema_editor.quote_name(apps.get_model('p_v_App', 'Products')._meta.db_table)
+    statements = [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        'CREATE EXTENSION IF NOT EXISTS unaccent',
+        # unaccent() is STABLE; index expressions need an IMMUTABLE wrapper.
+        (
+            'CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text AS '
+            "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$ "
+            'LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT'
+        ),
+        (
+            'CREATE INDEX IF NOT EXISTS p_v_app_products_name_trgm '
+            f'ON {table} USING gin (immutable_unaccent(lower(name)) gin_trgm_ops)'
+        ),
+        (
+            'CREATE INDEX IF NOT EXISTS p_v_app_products_code_trgm '
+            f'ON {table} USING gin (immutable_unaccent(lower(code)) gin_trgm_ops)'
+        ),
+    ]
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX IF EXISTS p_v_app_products_name_trgm')
+    schema_editor.execute('DROP INDEX IF EXISTS p_v_app_products_code_trgm')
+    schema_editor.execute('DROP FUNCTION IF EXISTS immutable_unaccent(text)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0011_company_default_printer'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
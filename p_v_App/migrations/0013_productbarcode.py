@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-19 04:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0012_product_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductBarcode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('barcode', models.CharField(help_text='EAN/GTIN ou código interno lido pelo scanner.', max_length=64, verbose_name='Código de barras')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='p_v_App.company')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='barcodes', to='p_v_App.products')),
+            ],
+            options={
+                'verbose_name': 'Código de barras',
+                'verbose_name_plural': 'Códigos de barras',
+                'ordering': ['id'],
+                'unique_together': {('company', 'barcode')},
+            },
+        ),
+    ]
@@ -0,0 +1,184 @@
+# Generated by Django 5.1.7 on 2026-10-19 04:49
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+# Quantities keep 3 decimal places (weighed items), money keeps 2.
+ROUNDED_FIELDS = {
+    'Products': {'price': 2, 'custo': 2},
+    'Estoque': {'quantidade': 3, 'preco': 2, 'custo': 2},
+    'Sales': {
+        'sub_total': 2, 'grand_total': 2, 'tax_amount': 2, 'tax': 2,
+        'tendered_amount': 2, 'amount_change': 2, 'delivery_fee': 2,
+        'discount_total': 2,
+    },
+    'salesItems': {'price': 2, 'qty': 3, 'total': 2},
+    'Pedido': {
+        'sub_total': 2, 'grand_total': 2, 'tax_amount': 2, 'tax': 2,
+        'tendered_amount': 2, 'amount_change': 2, 'taxa_entrega': 2,
+        'discount_total': 2,
+    },
+    'PedidoItem': {'price': 2, 'qty': 3, 'taxa_entrega': 2, 'total': 2},
+}
+
+
+def round_float_values(apps, schema_editor):
+    """Drop float noise (e.g. 9.899999) before the columns become numeric."""
+    for model_name, fields in ROUNDED_FIELDS.items():
+        model = apps.get_model('p_v_App', model_name)
+        model._base_manager.update(
+            **{field: Round(F(field), places) for field, places in fields.items()}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0013_productbarcode'),
+    ]
+
+    operations = [
+        migrations.RunPython(round_float_values, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='estoque',
+            name='custo',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='estoque',
+            name='preco',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='estoque',
+            name='quantidade',
+            field=models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='pedido',
+            name='amount_change',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='pedido',
+            name='discount_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Desconto aplicado'),
+        ),
+        migrations.AlterField(
+            model_name='pedido',
+            name='grand_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='pedido',
+            name='sub_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='pedido',
+            name='tax',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='pedido',
+            name='tax_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='pedido',
+            name='taxa_entrega',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Taxa de Entrega'),
+        ),
+        migrations.AlterField(
+            model_name='pedido',
+            name='tendered_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='pedidoitem',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='pedidoitem',
+            name='qty',
+            field=models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='pedidoitem',
+            name='taxa_entrega',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='pedidoitem',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='products',
+            name='custo',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='products',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='sales',
+            name='amount_change',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='sales',
+            name='delivery_fee',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Taxa de Entrega'),
+        ),
+        migrations.AlterField(
+            model_name='sales',
+            name='discount_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Desconto aplicado'),
+        ),
+        migrations.AlterField(
+            model_name='sales',
+            name='grand_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='sales',
+            name='sub_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='sales',
+            name='tax',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='sales',
+            name='tax_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='sales',
+            name='tendered_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='salesitems',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='salesitems',
+            name='qty',
+            field=models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='salesitems',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+    ]
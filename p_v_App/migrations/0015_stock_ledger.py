@@ -0,0 +1,77 @@
+# Generated by Django 5.1.7 on 2026-10-19 04:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def create_opening_snapshots(apps, schema_editor):
+    """Seed the ledger with the current balance of every product."""
+    Estoque = apps.get_model('p_v_App', 'Estoque')
+    StockSnapshot = apps.get_model('p_v_App', 'StockSnapshot')
+    taken_at = django.utils.timezone.now()
+    rows = Estoque.objects.values('company_id', 'produto_id').annotate(
+        total=Sum('quantidade'))
+    StockSnapshot.objects.bulk_create(
+        [
+            StockSnapshot(
+                company_id=row['company_id'],
+                produto_id=row['produto_id'],
+                quantidade=row['total'] or 0,
+                taken_at=taken_at,
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0014_decimal_money_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('balance_after', models.DecimalField(decimal_places=3, max_digits=12, verbose_name='Saldo após')),
+                ('reason', models.CharField(choices=[('sale', 'Venda'), ('reopen', 'Reabertura de comanda'), ('import', 'Importação'), ('adjustment', 'Ajuste manual'), ('reconcile', 'Conciliação')], max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=120)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='p_v_App.company')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='p_v_App.products')),
+                ('sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='p_v_App.sales')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Movimentação de estoque',
+                'verbose_name_plural': 'Movimentações de estoque',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['company', 'produto', 'created_at'], name='stockmove_company_prod_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='p_v_App.company')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='p_v_App.products')),
+            ],
+            options={
+                'verbose_name': 'Fotografia de estoque',
+                'verbose_name_plural': 'Fotografias de estoque',
+                'ordering': ['-taken_at'],
+                'unique_together': {('company', 'produto', 'taken_at')},
+            },
+        ),
+        migrations.RunPython(create_opening_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-19 04:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0015_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tableorder',
+            index=models.Index(fields=['table', 'status', '-opened_at'], name='tableorder_table_status_date'),
+        ),
+    ]
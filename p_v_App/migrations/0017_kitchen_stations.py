@@ -0,0 +1,56 @@
+# Generated by Django 5.1.7 on 2026-10-19 05:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0016_tableorder_floor_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tableorderitem',
+            name='prep_status',
+            field=models.CharField(choices=[('pending', 'Aguardando'), ('preparing', 'Em preparo'), ('ready', 'Pronto'), ('delivered', 'Entregue')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='tableorderitem',
+            name='prep_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='KitchenStation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=80)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='p_v_App.company')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='kitchen_station',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='categories', to='p_v_App.kitchenstation', verbose_name='Estação de preparo'),
+        ),
+        migrations.AddField(
+            model_name='tableorderitem',
+            name='station',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='items', to='p_v_App.kitchenstation'),
+        ),
+        migrations.AddIndex(
+            model_name='tableorderitem',
+            index=models.Index(fields=['station', 'prep_status', 'added_at'], name='orderitem_station_queue'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='kitchenstation',
+            unique_together={('company', 'name')},
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-19 05:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0017_kitchen_stations'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['company', 'status', '-date_added'], name='pedido_company_status_date'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['company', 'date_updated'], name='pedido_company_updated'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-19 05:23
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0018_pedido_board_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedidoitem',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Custo do produto no momento da venda.', max_digits=12, null=True, verbose_name='Custo unitário'),
+        ),
+        migrations.AddField(
+            model_name='salecomboitem',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Custo do produto no momento da venda.', max_digits=12, null=True, verbose_name='Custo unitário'),
+        ),
+        migrations.AddField(
+            model_name='sales',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Itens'),
+        ),
+        migrations.AddField(
+            model_name='sales',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Custo total'),
+        ),
+        migrations.AddField(
+            model_name='salesitems',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Custo do produto no momento da venda.', max_digits=12, null=True, verbose_name='Custo unitário'),
+        ),
+    ]
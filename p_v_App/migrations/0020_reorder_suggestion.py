@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-19 05:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0019_sale_cost_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReorderSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('daily_consumption', models.DecimalField(decimal_places=3, max_digits=12, verbose_name='Consumo diário')),
+                ('quantidade', models.DecimalField(decimal_places=3, max_digits=12, verbose_name='Saldo no cálculo')),
+                ('days_of_cover', models.DecimalField(blank=True, decimal_places=1, max_digits=9, null=True, verbose_name='Dias de cobertura')),
+                ('reorder_point', models.DecimalField(decimal_places=3, max_digits=12, verbose_name='Ponto de pedido')),
+                ('suggested_qty', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=12, verbose_name='Quantidade sugerida')),
+                ('needs_reorder', models.BooleanField(default=False, verbose_name='Comprar')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='p_v_App.company')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reorder_suggestions', to='p_v_App.products')),
+            ],
+            options={
+                'verbose_name': 'Sugestão de compra',
+                'verbose_name_plural': 'Sugestões de compra',
+                'ordering': ['days_of_cover', 'produto_id'],
+                'indexes': [models.Index(fields=['company', 'needs_reorder'], name='reorder_company_flag')],
+                'unique_together': {('company', 'produto')},
+            },
+        ),
+    ]
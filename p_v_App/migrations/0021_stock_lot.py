@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-19 05:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0020_reorder_suggestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockLot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lot_code', models.CharField(blank=True, max_length=60, verbose_name='Lote')),
+                ('quantidade', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('quantidade_inicial', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('data_validade', models.DateField(blank=True, null=True)),
+                ('custo', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('nfe_key', models.CharField(blank=True, max_length=44, verbose_name='NF-e')),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='p_v_App.company')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_lots', to='p_v_App.products')),
+            ],
+            options={
+                'verbose_name': 'Lote de estoque',
+                'verbose_name_plural': 'Lotes de estoque',
+                'ordering': ['data_validade', 'received_at', 'id'],
+                'indexes': [models.Index(condition=models.Q(('quantidade__gt', 0)), fields=['company', 'data_validade'], name='stocklot_company_validade'), models.Index(fields=['company', 'produto', 'data_validade'], name='stocklot_company_prod_val')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-19 05:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0021_stock_lot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockCostHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade_anterior', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('custo_anterior', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('quantidade_entrada', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('custo_entrada', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('custo_medio', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Custo médio')),
+                ('reason', models.CharField(choices=[('sale', 'Venda'), ('reopen', 'Reabertura de comanda'), ('import', 'Importação'), ('adjustment', 'Ajuste manual'), ('reconcile', 'Conciliação')], max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=120)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='p_v_App.company')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_history', to='p_v_App.products')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_cost_history', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Histórico de custo',
+                'verbose_name_plural': 'Históricos de custo',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['company', 'produto', 'created_at'], name='stockcost_company_prod_date')],
+            },
+        ),
+    ]
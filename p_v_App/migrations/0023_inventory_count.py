@@ -0,0 +1,84 @@
+# Generated by Django 5.1.7 on 2026-10-19 05:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0022_stock_cost_history'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=120)),
+                ('status', models.CharField(choices=[('open', 'Em contagem'), ('applied', 'Aplicada'), ('cancelled', 'Cancelada')], default='open', max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Contagem de estoque',
+                'verbose_name_plural': 'Contagens de estoque',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryCountLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('quantidade_sistema', models.DecimalField(blank=True, decimal_places=3, max_digits=12, null=True)),
+                ('counted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='stockcosthistory',
+            name='reason',
+            field=models.CharField(choices=[('sale', 'Venda'), ('reopen', 'Reabertura de comanda'), ('import', 'Importação'), ('adjustment', 'Ajuste manual'), ('reconcile', 'Conciliação'), ('count', 'Inventário')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='reason',
+            field=models.CharField(choices=[('sale', 'Venda'), ('reopen', 'Reabertura de comanda'), ('import', 'Importação'), ('adjustment', 'Ajuste manual'), ('reconcile', 'Conciliação'), ('count', 'Inventário')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='estoque',
+            index=models.Index(fields=['company', 'produto'], name='estoque_company_produto'),
+        ),
+        migrations.AddField(
+            model_name='inventorycount',
+            name='applied_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_counts_applied', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='inventorycount',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='p_v_App.company'),
+        ),
+        migrations.AddField(
+            model_name='inventorycount',
+            name='started_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_counts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='inventorycountline',
+            name='count',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='p_v_App.inventorycount'),
+        ),
+        migrations.AddField(
+            model_name='inventorycountline',
+            name='produto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='p_v_App.products'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='inventorycountline',
+            unique_together={('count', 'produto')},
+        ),
+    ]
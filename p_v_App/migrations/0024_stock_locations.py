@@ -0,0 +1,85 @@
+# Generated by Django 5.1.7 on 2026-10-19 05:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def assign_default_locations(apps, schema_editor):
+    """Create the 'Principal' location of each company and move its stock there."""
+    Estoque = apps.get_model('p_v_App', 'Estoque')
+    InventoryCount = apps.get_model('p_v_App', 'InventoryCount')
+    StockLocation = apps.get_model('p_v_App', 'StockLocation')
+    company_ids = set(Estoque.objects.values_list('company_id', flat=True).distinct())
+    company_ids.update(InventoryCount.objects.values_list('company_id', flat=True).distinct())
+    for company_id in company_ids:
+        location = StockLocation.objects.create(
+            company_id=company_id, name='Principal', is_default=True)
+        Estoque.objects.filter(company_id=company_id).update(location=location)
+        InventoryCount.objects.filter(company_id=company_id).update(location=location)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0023_inventory_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockcosthistory',
+            name='reason',
+            field=models.CharField(choices=[('sale', 'Venda'), ('reopen', 'Reabertura de comanda'), ('import', 'Importação'), ('adjustment', 'Ajuste manual'), ('reconcile', 'Conciliação'), ('count', 'Inventário'), ('transfer', 'Transferência')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='reason',
+            field=models.CharField(choices=[('sale', 'Venda'), ('reopen', 'Reabertura de comanda'), ('import', 'Importação'), ('adjustment', 'Ajuste manual'), ('reconcile', 'Conciliação'), ('count', 'Inventário'), ('transfer', 'Transferência')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='StockLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=80)),
+                ('kind', models.CharField(choices=[('store', 'Loja'), ('warehouse', 'Depósito'), ('bar', 'Bar'), ('kitchen', 'Cozinha')], default='store', max_length=10)),
+                ('is_default', models.BooleanField(default=False)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='p_v_App.company')),
+            ],
+            options={
+                'verbose_name': 'Local de estoque',
+                'verbose_name_plural': 'Locais de estoque',
+                'ordering': ['-is_default', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='estoque',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stock', to='p_v_App.stocklocation', verbose_name='Local'),
+        ),
+        migrations.AddField(
+            model_name='inventorycount',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='counts', to='p_v_App.stocklocation', verbose_name='Local'),
+        ),
+        migrations.AddField(
+            model_name='kitchenstation',
+            name='stock_location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='kitchen_stations', to='p_v_App.stocklocation', verbose_name='Local de estoque'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='movements', to='p_v_App.stocklocation'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocklocation',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=('company',), name='stocklocation_one_default'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='stocklocation',
+            unique_together={('company', 'name')},
+        ),
+        migrations.RunPython(assign_default_locations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-19 05:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Separada de 0024: no PostgreSQL o AlterField (que recria a FK) não pode rodar
+# na mesma transação dos UPDATEs com verificações de FK ainda pendentes.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0024_stock_locations'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='estoque',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock', to='p_v_App.stocklocation', verbose_name='Local'),
+        ),
+        migrations.AlterField(
+            model_name='inventorycount',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='counts', to='p_v_App.stocklocation', verbose_name='Local'),
+        ),
+        migrations.AddIndex(
+            model_name='estoque',
+            index=models.Index(fields=['company', 'location', 'produto'], name='estoque_company_loc_produto'),
+        ),
+    ]
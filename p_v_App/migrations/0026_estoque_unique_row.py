@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:04
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_rows(apps, schema_editor):
+    """Fold duplicate (company, location, produto) rows into the oldest one."""
+    Estoque = apps.get_model('p_v_App', 'Estoque')
+    groups = (
+        Estoque.objects.values('company_id', 'location_id', 'produto_id')
+        .annotate(rows=Count('id'), keep_id=Min('id'), total=Sum('quantidade'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in list(groups):
+        Estoque.objects.filter(
+            company_id=group['company_id'],
+            location_id=group['location_id'],
+            produto_id=group['produto_id'],
+        ).exclude(pk=group['keep_id']).delete()
+        Estoque.objects.filter(pk=group['keep_id']).update(quantidade=group['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0025_stock_location_required'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_rows, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='estoque',
+            name='estoque_company_loc_produto',
+        ),
+        migrations.AddConstraint(
+            model_name='estoque',
+            constraint=models.UniqueConstraint(fields=('company', 'location', 'produto'), name='estoque_unique_company_loc_produto'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def assign_registers(apps, schema_editor):
+    """Attach each company's sessions to 'Caixa 1'.
+
+    Sessions left open side by side get a register each ('Caixa 2', ...), so
+    the one-open-session-per-register constraint holds.
+    """
+    CashRegister = apps.get_model('p_v_App', 'CashRegister')
+    CashRegisterSession = apps.get_model('p_v_App', 'CashRegisterSession')
+    company_ids = CashRegisterSession.objects.order_by().values_list('company_id', flat=True).distinct()
+    for company_id in list(company_ids):
+        register = CashRegister.objects.create(company_id=company_id, name='Caixa 1')
+        CashRegisterSession.objects.filter(company_id=company_id).update(register=register)
+        extra_open = CashRegisterSession.objects.filter(
+            company_id=company_id, status='open').order_by('-opened_at')[1:]
+        for number, session_id in enumerate(extra_open.values_list('pk', flat=True), start=2):
+            extra = CashRegister.objects.create(company_id=company_id, name=f'Caixa {number}')
+            CashRegisterSession.objects.filter(pk=session_id).update(register=extra)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0026_estoque_unique_row'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CashRegister',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=60)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='p_v_App.company')),
+            ],
+            options={
+                'verbose_name': 'Caixa',
+                'verbose_name_plural': 'Caixas',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='cashregister',
+            unique_together={('company', 'name')},
+        ),
+        migrations.AddField(
+            model_name='cashregistersession',
+            name='register',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='sessions', to='p_v_App.cashregister', verbose_name='Caixa'),
+        ),
+        migrations.RunPython(assign_registers, migrations.RunPython.noop),
+    ]
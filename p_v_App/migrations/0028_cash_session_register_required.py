@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Separada de 0027: no PostgreSQL o AlterField (que recria a FK) não pode rodar
+# na mesma transação dos UPDATEs com verificações de FK ainda pendentes.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0027_cash_registers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cashregistersession',
+            name='register',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='sessions', to='p_v_App.cashregister', verbose_name='Caixa'),
+        ),
+        migrations.AddConstraint(
+            model_name='cashregistersession',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'open')), fields=('register',), name='cashsession_one_open_per_register'),
+        ),
+    ]
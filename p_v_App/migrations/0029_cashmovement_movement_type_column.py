@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+def rename_type_column(apps, schema_editor):
+    """Rename ``p_v_App_cashmovement.type`` to ``movement_type`` where needed.
+
+    0008 only changed the state (``db_column='movement_type'``) because the
+    existing databases already had that column; a database created from the
+    migrations still has ``type``. Databases that are already right are left
+    alone.
+    """
+    CashMovement = apps.get_model('p_v_App', 'CashMovement')
+    table = CashMovement._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        columns = {
+            column.name
+            for column in schema_editor.connection.introspection.get_table_description(cursor, table)
+        }
+    if 'movement_type' in columns or 'type' not in columns:
+        return
+    new_field = CashMovement._meta.get_field('type')
+    old_field = models.CharField(max_length=5, choices=new_field.choices, db_column='type')
+    old_field.set_attributes_from_name('type')
+    old_field.model = CashMovement
+    schema_editor.alter_field(CashMovement, old_field, new_field)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0028_cash_session_register_required'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_type_column, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_existing_reversals(apps, schema_editor):
+    """Point the old ``Estorno ...`` movements at the movement they mirror.
+
+    Before this field, reversals were recognised only by the description
+    prefix. Each one is paired with an unlinked movement of the same sale,
+    with the opposite type, same amount and the description without the
+    prefix; reversals with no such partner keep ``reversal_of`` empty.
+    """
+    CashMovement = apps.get_model('p_v_App', 'CashMovement')
+    reversals = list(
+        CashMovement.objects.filter(sale__isnull=False, description__startswith='Estorno ')
+        .order_by('recorded_at', 'pk')
+    )
+    if not reversals:
+        return
+    candidates = {}
+    for movement in CashMovement.objects.filter(
+        sale_id__in={r.sale_id for r in reversals}
+    ).exclude(description__startswith='Estorno ').order_by('recorded_at', 'pk'):
+        key = (movement.sale_id, movement.type, movement.amount, movement.description)
+        candidates.setdefault(key, []).append(movement.pk)
+
+    linked = []
+    for reversal in reversals:
+        original_type = 'entry' if reversal.type == 'exit' else 'exit'
+        key = (reversal.sale_id, original_type, reversal.amount,
+               reversal.description[len('Estorno '):])
+        if candidates.get(key):
+            reversal.reversal_of_id = candidates[key].pop(0)
+            linked.append(reversal)
+    CashMovement.objects.bulk_update(linked, ['reversal_of'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('p_v_App', '0029_cashmovement_movement_type_column'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cashmovement',
+            name='reversal_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reversals', to='p_v_App.cashmovement', verbose_name='Estorno de'),
+        ),
+        migrations.RunPython(link_existing_reversals, migrations.RunPython.noop),
+    ]
@@ -4,9 +4,10 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import Sum
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from .models_tenant import TenantMixin, TenantManager
+from .models_tenant import TenantMixin, TenantManager, tenant_mismatches
 
 
 User = get_user_model()
@@ -16,6 +17,14 @@ class Category(TenantMixin):
     name = models.TextField()
     description = models.TextField()
     status = models.IntegerField(default=1)
+    kitchen_station = models.ForeignKey(
+        'KitchenStation',
+        related_name='categories',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name='Estação de preparo',
+    )
     date_added = models.DateTimeField(default=timezone.now)
     date_updated = models.DateTimeField(auto_now=True)
 
@@ -30,9 +39,11 @@ class Products(TenantMixin):
     category_id = models.ForeignKey(Category, on_delete=models.CASCADE)
     name = models.TextField()
     description = models.TextField(null=True, blank=True)
-    price = models.FloatField(default=0)
+    price = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
     status = models.IntegerField(default=1)
-    custo = models.FloatField(default=0.0)
+    custo = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
     is_combo = models.BooleanField(default=False)
     combo_total_quantity = models.DecimalField(
         max_digits=12,
@@ -56,7 +67,7 @@ class Products(TenantMixin):
 
     def save(self, *args, **kwargs):
         # Garante que a categoria pertença à mesma empresa
-        if self.category_id and self.company_id and self.category_id.company_id != self.company_id:
+        if tenant_mismatches([self], 'category_id'):
             raise ValueError(
                 'A categoria deve pertencer à mesma empresa do produto')
         if not self.is_combo:
@@ -65,6 +76,41 @@ class Products(TenantMixin):
         super().save(*args, **kwargs)
 
 
+class ProductBarcode(TenantMixin):
+    product = models.ForeignKey(
+        Products,
+        related_name='barcodes',
+        on_delete=models.CASCADE,
+    )
+    barcode = models.CharField(
+        'Código de barras',
+        max_length=64,
+        help_text='EAN/GTIN ou código interno lido pelo scanner.',
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = TenantManager()
+
+    class Meta:
+        unique_together = (('company', 'barcode'),)
+        ordering = ['id']
+        verbose_name = 'Código de barras'
+        verbose_name_plural = 'Códigos de barras'
+
+    def __str__(self):
+        return self.barcode
+
+    def save(self, *args, **kwargs):
+        # O código herda a empresa do produto quando não informada
+        if not self.company_id and self.product_id:
+            self.company_id = self.product.company_id
+        if tenant_mismatches([self], 'product'):
+            raise ValueError(
+                'O produto deve pertencer à mesma empresa do código de barras')
+        self.barcode = (self.barcode or '').strip()
+        super().save(*args, **kwargs)
+
+
 class ProductComboItem(TenantMixin):
     combo = models.ForeignKey(
         Products,
@@ -98,11 +144,7 @@ class ProductComboItem(TenantMixin):
         if self.combo_id and self.component_id and self.combo_id == self.component_id:
             raise ValidationError(
                 'O combo não pode incluir ele mesmo como componente.')
-        if (
-            self.component_id
-            and self.company_id
-            and self.component.company_id != self.company_id
-        ):
+        if tenant_mismatches([self], 'component'):
             raise ValidationError(
                 'O componente precisa pertencer à mesma empresa do combo.')
 
@@ -115,16 +157,36 @@ class Sales(TenantMixin):
     customer_name = models.CharField(
         'Nome do Cliente', max_length=100, blank=True, null=True)
     code = models.CharField(max_length=100)
-    sub_total = models.FloatField(default=0)
-    grand_total = models.FloatField(default=0)
-    tax_amount = models.FloatField(default=0)
-    tax = models.FloatField(default=0)
-    tendered_amount = models.FloatField(default=0)
-    amount_change = models.FloatField(default=0)
-    delivery_fee = models.FloatField('Taxa de Entrega', default=0)
-    discount_total = models.FloatField('Desconto aplicado', default=0)
+    sub_total = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    grand_total = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    tax_amount = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    tax = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    tendered_amount = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    amount_change = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    delivery_fee = models.DecimalField(
+        'Taxa de Entrega',
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+    discount_total = models.DecimalField(
+        'Desconto aplicado',
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
     discount_reason = models.CharField(
         'Motivo do desconto', max_length=255, blank=True)
+    # Custo e quantidade de itens gravados na venda (ver recalculate_costs).
+    total_cost = models.DecimalField(
+        'Custo total', max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    item_count = models.PositiveIntegerField('Itens', default=0)
 
     FORMA_PAGAMENTO_CHOICES = [
         ('PIX', 'Pix'),
@@ -186,6 +248,26 @@ class Sales(TenantMixin):
     def __str__(self):
         return self.code
 
+    @property
+    def profit(self):
+        return self.grand_total - self.total_cost
+
+    def recalculate_costs(self, commit=True):
+        """Refresh ``total_cost``/``item_count`` from the cost snapshot of the lines."""
+        totals = self.salesitems_set.aggregate(
+            cost=Sum(
+                F('qty') * Coalesce('unit_cost', Decimal('0')),
+                output_field=models.DecimalField(max_digits=24, decimal_places=5),
+            ),
+            count=Count('id'),
+        )
+        self.total_cost = Decimal(totals['cost'] or 0).quantize(
+            Decimal('0.01'), rounding=ROUND_HALF_UP)
+        self.item_count = totals['count']
+        if commit:
+            self.save(update_fields=['total_cost', 'item_count'])
+        return self.total_cost
+
 
 class SalePayment(TenantMixin):
     sale = models.ForeignKey(
@@ -235,12 +317,18 @@ class Pedido(TenantMixin):
     customer_name = models.CharField(
         'Nome do Cliente', max_length=100, blank=True, null=True)
     code = models.CharField(max_length=100)
-    sub_total = models.FloatField(default=0)
-    tax = models.FloatField(default=0)
-    tax_amount = models.FloatField(default=0)
-    grand_total = models.FloatField(default=0)
-    tendered_amount = models.FloatField(default=0)
-    amount_change = models.FloatField(default=0)
+    sub_total = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    tax = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    tax_amount = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    grand_total = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    tendered_amount = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    amount_change = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
     forma_pagamento = models.CharField(
         max_length=10,
         choices=Sales.FORMA_PAGAMENTO_CHOICES,
@@ -249,8 +337,18 @@ class Pedido(TenantMixin):
     )
     endereco_entrega = models.CharField('Endereço (Entrega)', max_length=255,
                                         blank=True, null=True)
-    taxa_entrega = models.FloatField('Taxa de Entrega', default=0)
-    discount_total = models.FloatField('Desconto aplicado', default=0)
+    taxa_entrega = models.DecimalField(
+        'Taxa de Entrega',
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+    discount_total = models.DecimalField(
+        'Desconto aplicado',
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
     discount_reason = models.CharField(
         'Motivo do desconto', max_length=255, blank=True)
     status = models.CharField(
@@ -264,6 +362,18 @@ class Pedido(TenantMixin):
 
     objects = TenantManager()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['company', 'status', '-date_added'],
+                name='pedido_company_status_date',
+            ),
+            models.Index(
+                fields=['company', 'date_updated'],
+                name='pedido_company_updated',
+            ),
+        ]
+
     def __str__(self):
         return self.code
 
@@ -271,19 +381,28 @@ class Pedido(TenantMixin):
 class PedidoItem(models.Model):
     pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE)
     product = models.ForeignKey(Products, on_delete=models.CASCADE)
-    price = models.FloatField(default=0)
-    qty = models.FloatField(default=0)
-    taxa_entrega = models.FloatField(default=0)
-    total = models.FloatField(default=0)
+    price = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    qty = models.DecimalField(
+        max_digits=12, decimal_places=3, default=Decimal('0.000'))
+    taxa_entrega = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    total = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    unit_cost = models.DecimalField(
+        'Custo unitário', max_digits=12, decimal_places=2, null=True, blank=True,
+        help_text='Custo do produto no momento da venda.')
 
     def __str__(self):
         return f'{self.product.name} x {self.qty}'
 
     def save(self, *args, **kwargs):
         # Garante que o produto pertença à mesma empresa do pedido
-        if self.product and self.pedido and self.product.company_id != self.pedido.company_id:
+        if tenant_mismatches([self], 'product', 'pedido'):
             raise ValueError(
                 'O produto deve pertencer à mesma empresa do pedido')
+        if self.unit_cost is None and self.product_id:
+            self.unit_cost = self.product.custo
         super().save(*args, **kwargs)
 
 
@@ -302,30 +421,38 @@ class PedidoComboItem(models.Model):
 
     def clean(self):
         super().clean()
-        if self.component_id and self.pedido_item_id:
-            pedido_company = self.pedido_item.pedido.company_id
-            if pedido_company and self.component.company_id != pedido_company:
-                raise ValidationError(
-                    'O componente deve pertencer à mesma empresa do pedido.'
-                )
+        if tenant_mismatches([self], 'component', 'pedido_item__pedido'):
+            raise ValidationError(
+                'O componente deve pertencer à mesma empresa do pedido.'
+            )
 
     def save(self, *args, **kwargs):
-        self.full_clean()
+        # As chaves estrangeiras já são garantidas pelo banco; validar a
+        # existência delas aqui custaria uma consulta por campo.
+        self.full_clean(exclude=['pedido_item', 'component'])
         super().save(*args, **kwargs)
 
 
 class salesItems(models.Model):
     sale_id = models.ForeignKey(Sales, on_delete=models.CASCADE)
     product_id = models.ForeignKey(Products, on_delete=models.CASCADE)
-    price = models.FloatField(default=0)
-    qty = models.FloatField(default=0)
-    total = models.FloatField(default=0)
+    price = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    qty = models.DecimalField(
+        max_digits=12, decimal_places=3, default=Decimal('0.000'))
+    total = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    unit_cost = models.DecimalField(
+        'Custo unitário', max_digits=12, decimal_places=2, null=True, blank=True,
+        help_text='Custo do produto no momento da venda.')
 
     def save(self, *args, **kwargs):
         # Garante que o produto pertença à mesma empresa da venda
-        if self.product_id and self.sale_id and self.product_id.company_id != self.sale_id.company_id:
+        if tenant_mismatches([self], 'product_id', 'sale_id'):
             raise ValueError(
                 'O produto deve pertencer à mesma empresa da venda')
+        if self.unit_cost is None and self.product_id_id:
+            self.unit_cost = self.product_id.custo
         super().save(*args, **kwargs)
 
 
@@ -337,6 +464,9 @@ class SaleComboItem(models.Model):
     )
     component = models.ForeignKey(Products, on_delete=models.PROTECT)
     quantity = models.DecimalField(max_digits=12, decimal_places=3)
+    unit_cost = models.DecimalField(
+        'Custo unitário', max_digits=12, decimal_places=2, null=True, blank=True,
+        help_text='Custo do produto no momento da venda.')
 
     class Meta:
         verbose_name = 'Componente de Combo (Venda)'
@@ -344,22 +474,76 @@ class SaleComboItem(models.Model):
 
     def clean(self):
         super().clean()
-        if self.component_id and self.sale_item_id:
-            sale_company = self.sale_item.sale_id.company_id
-            if sale_company and self.component.company_id != sale_company:
-                raise ValidationError(
-                    'O componente deve pertencer à mesma empresa da venda.'
-                )
+        if tenant_mismatches([self], 'component', 'sale_item__sale_id'):
+            raise ValidationError(
+                'O componente deve pertencer à mesma empresa da venda.'
+            )
 
     def save(self, *args, **kwargs):
-        self.full_clean()
+        if self.unit_cost is None and self.component_id:
+            self.unit_cost = self.component.custo
+        self.full_clean(exclude=['sale_item', 'component'])
         super().save(*args, **kwargs)
 
 
+class StockLocation(TenantMixin):
+    """Place that holds stock (store floor, warehouse, bar, kitchen)."""
+
+    class Kind(models.TextChoices):
+        STORE = 'store', 'Loja'
+        WAREHOUSE = 'warehouse', 'Depósito'
+        BAR = 'bar', 'Bar'
+        KITCHEN = 'kitchen', 'Cozinha'
+
+    DEFAULT_NAME = 'Principal'
+
+    name = models.CharField(max_length=80)
+    kind = models.CharField(
+        max_length=10, choices=Kind.choices, default=Kind.STORE)
+    is_default = models.BooleanField(default=False)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = TenantManager()
+
+    class Meta:
+        unique_together = (('company', 'name'),)
+        ordering = ['-is_default', 'name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company'],
+                condition=models.Q(is_default=True),
+                name='stocklocation_one_default',
+            ),
+        ]
+        verbose_name = 'Local de estoque'
+        verbose_name_plural = 'Locais de estoque'
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def default_for(cls, company) -> 'StockLocation':
+        """Default location of ``company``, created on first use."""
+        location, _ = cls.objects.get_or_create(
+            company_id=getattr(company, 'pk', company),
+            is_default=True,
+            defaults={'name': cls.DEFAULT_NAME},
+        )
+        return location
+
+
 class Estoque(TenantMixin):
     id = models.AutoField(primary_key=True)
     produto = models.ForeignKey(Products, on_delete=models.CASCADE)
-    quantidade = models.IntegerField(default=0)
+    location = models.ForeignKey(
+        StockLocation,
+        verbose_name='Local',
+        related_name='stock',
+        on_delete=models.PROTECT,
+    )
+    quantidade = models.DecimalField(
+        max_digits=12, decimal_places=3, default=Decimal('0.000'))
     categoria = models.ForeignKey(Category, on_delete=models.CASCADE)
     VALIDADE_CHOICES = [
         (0, 'Sem Validade'),
@@ -374,23 +558,328 @@ class Estoque(TenantMixin):
     descricao = models.ForeignKey(
         Products, on_delete=models.CASCADE, related_name='estoque_descricao', null=True, blank=True)
     data_validade = models.DateField(null=True, blank=True)
-    preco = models.FloatField(default=0)
-    custo = models.FloatField(default=0)
+    preco = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    custo = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
     status = models.IntegerField(default=1)  # 1: Ativo, 0: Inativo
 
     objects = TenantManager()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['company', 'produto'],
+                name='estoque_company_produto',
+            ),
+        ]
+        constraints = [
+            # Um registro por produto e local: as gravações fazem upsert nele.
+            models.UniqueConstraint(
+                fields=['company', 'location', 'produto'],
+                name='estoque_unique_company_loc_produto',
+            ),
+        ]
+
     def save(self, *args, **kwargs):
+        if self.location_id is None and self.company_id:
+            self.location = StockLocation.default_for(self.company_id)
         # Garante que produto e categoria pertençam à mesma empresa
-        if self.produto and self.company_id and self.produto.company_id != self.company_id:
+        if tenant_mismatches([self], 'produto'):
             raise ValueError(
                 'O produto deve pertencer à mesma empresa do estoque')
-        if self.categoria and self.company_id and self.categoria.company_id != self.company_id:
+        if tenant_mismatches([self], 'categoria'):
             raise ValueError(
                 'A categoria deve pertencer à mesma empresa do estoque')
+        if tenant_mismatches([self], 'location'):
+            raise ValueError(
+                'O local deve pertencer à mesma empresa do estoque')
+        super().save(*args, **kwargs)
+
+
+class StockMovement(TenantMixin):
+    """Append-only ledger of every change applied to ``Estoque.quantidade``."""
+
+    class Reason(models.TextChoices):
+        SALE = 'sale', 'Venda'
+        REOPEN = 'reopen', 'Reabertura de comanda'
+        IMPORT = 'import', 'Importação'
+        ADJUSTMENT = 'adjustment', 'Ajuste manual'
+        RECONCILE = 'reconcile', 'Conciliação'
+        COUNT = 'count', 'Inventário'
+        TRANSFER = 'transfer', 'Transferência'
+
+    produto = models.ForeignKey(
+        Products,
+        related_name='stock_movements',
+        on_delete=models.CASCADE,
+    )
+    # Vazio nas movimentações anteriores aos locais de estoque.
+    location = models.ForeignKey(
+        StockLocation,
+        related_name='movements',
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+    )
+    delta = models.DecimalField(max_digits=12, decimal_places=3)
+    balance_after = models.DecimalField(
+        'Saldo após', max_digits=12, decimal_places=3)
+    reason = models.CharField(max_length=20, choices=Reason.choices)
+    sale = models.ForeignKey(
+        Sales,
+        related_name='stock_movements',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
+    # Código da venda ou nome do arquivo importado; permanece após exclusões.
+    reference = models.CharField(max_length=120, blank=True)
+    user = models.ForeignKey(
+        User,
+        related_name='stock_movements',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = TenantManager()
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(
+                fields=['company', 'produto', 'created_at'],
+                name='stockmove_company_prod_date',
+            ),
+        ]
+        verbose_name = 'Movimentação de estoque'
+        verbose_name_plural = 'Movimentações de estoque'
+
+    def __str__(self):
+        return f'{self.get_reason_display()} {self.delta:+} - {self.produto}'
+
+
+class StockSnapshot(TenantMixin):
+    """Periodic copy of each product balance used as a base for historical queries."""
+
+    produto = models.ForeignKey(
+        Products,
+        related_name='stock_snapshots',
+        on_delete=models.CASCADE,
+    )
+    quantidade = models.DecimalField(max_digits=12, decimal_places=3)
+    taken_at = models.DateTimeField(default=timezone.now)
+
+    objects = TenantManager()
+
+    class Meta:
+        ordering = ['-taken_at']
+        unique_together = (('company', 'produto', 'taken_at'),)
+        verbose_name = 'Fotografia de estoque'
+        verbose_name_plural = 'Fotografias de estoque'
+
+    def __str__(self):
+        return f'{self.produto} em {self.taken_at:%d/%m/%Y %H:%M}: {self.quantidade}'
+
+
+class StockLot(TenantMixin):
+    """Received batch of a product, consumed first-expiry-first-out by sales."""
+
+    produto = models.ForeignKey(
+        Products,
+        related_name='stock_lots',
+        on_delete=models.CASCADE,
+    )
+    lot_code = models.CharField('Lote', max_length=60, blank=True)
+    # Saldo restante do lote; quantidade_inicial é o que foi recebido.
+    quantidade = models.DecimalField(max_digits=12, decimal_places=3)
+    quantidade_inicial = models.DecimalField(max_digits=12, decimal_places=3)
+    data_validade = models.DateField(null=True, blank=True)
+    custo = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    # Chave de acesso da NF-e de entrada (44 dígitos) ou número da nota.
+    nfe_key = models.CharField('NF-e', max_length=44, blank=True)
+    received_at = models.DateTimeField(default=timezone.now)
+
+    objects = TenantManager()
+
+    class Meta:
+        ordering = ['data_validade', 'received_at', 'id']
+        indexes = [
+            models.Index(
+                fields=['company', 'data_validade'],
+                name='stocklot_company_validade',
+                condition=models.Q(quantidade__gt=0),
+            ),
+            models.Index(
+                fields=['company', 'produto', 'data_validade'],
+                name='stocklot_company_prod_val',
+            ),
+        ]
+        verbose_name = 'Lote de estoque'
+        verbose_name_plural = 'Lotes de estoque'
+
+    def __str__(self):
+        validade = f'{self.data_validade:%d/%m/%Y}' if self.data_validade else 'sem validade'
+        return f'{self.produto} ({validade}): {self.quantidade}'
+
+
+class StockCostHistory(TenantMixin):
+    """Audit trail of the weighted-average cost, one row per stock entry."""
+
+    produto = models.ForeignKey(
+        Products,
+        related_name='cost_history',
+        on_delete=models.CASCADE,
+    )
+    # Saldo e custo médio antes da entrada.
+    quantidade_anterior = models.DecimalField(max_digits=12, decimal_places=3)
+    custo_anterior = models.DecimalField(max_digits=12, decimal_places=2)
+    quantidade_entrada = models.DecimalField(max_digits=12, decimal_places=3)
+    custo_entrada = models.DecimalField(max_digits=12, decimal_places=2)
+    custo_medio = models.DecimalField('Custo médio', max_digits=12, decimal_places=2)
+    reason = models.CharField(max_length=20, choices=StockMovement.Reason.choices)
+    reference = models.CharField(max_length=120, blank=True)
+    user = models.ForeignKey(
+        User,
+        related_name='stock_cost_history',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = TenantManager()
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(
+                fields=['company', 'produto', 'created_at'],
+                name='stockcost_company_prod_date',
+            ),
+        ]
+        verbose_name = 'Histórico de custo'
+        verbose_name_plural = 'Históricos de custo'
+
+    def __str__(self):
+        return f'{self.produto}: {self.custo_anterior} -> {self.custo_medio}'
+
+
+class InventoryCount(TenantMixin):
+    """Physical count session; applied once as a single stock adjustment."""
+
+    class Status(models.TextChoices):
+        OPEN = 'open', 'Em contagem'
+        APPLIED = 'applied', 'Aplicada'
+        CANCELLED = 'cancelled', 'Cancelada'
+
+    name = models.CharField(max_length=120)
+    location = models.ForeignKey(
+        StockLocation,
+        verbose_name='Local',
+        related_name='counts',
+        on_delete=models.PROTECT,
+    )
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.OPEN)
+    started_by = models.ForeignKey(
+        User,
+        related_name='inventory_counts',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
+    applied_by = models.ForeignKey(
+        User,
+        related_name='inventory_counts_applied',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    applied_at = models.DateTimeField(null=True, blank=True)
+
+    objects = TenantManager()
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Contagem de estoque'
+        verbose_name_plural = 'Contagens de estoque'
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
+
+    def save(self, *args, **kwargs):
+        if self.location_id is None and self.company_id:
+            self.location = StockLocation.default_for(self.company_id)
+        if tenant_mismatches([self], 'location'):
+            raise ValueError(
+                'O local deve pertencer à mesma empresa da contagem')
         super().save(*args, **kwargs)
 
 
+class InventoryCountLine(models.Model):
+    """Counted quantity of one product in a session (repeated scans are summed)."""
+
+    count = models.ForeignKey(
+        InventoryCount, related_name='lines', on_delete=models.CASCADE)
+    produto = models.ForeignKey(Products, on_delete=models.CASCADE)
+    quantidade = models.DecimalField(max_digits=12, decimal_places=3)
+    # Saldo do sistema no momento em que a contagem foi aplicada.
+    quantidade_sistema = models.DecimalField(
+        max_digits=12, decimal_places=3, null=True, blank=True)
+    counted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = (('count', 'produto'),)
+
+    def __str__(self):
+        return f'{self.produto}: {self.quantidade}'
+
+
+class ReorderSuggestion(TenantMixin):
+    """Restock numbers derived from recent consumption (``manage.py compute_reorder``)."""
+
+    produto = models.ForeignKey(
+        Products,
+        related_name='reorder_suggestions',
+        on_delete=models.CASCADE,
+    )
+    daily_consumption = models.DecimalField(
+        'Consumo diário', max_digits=12, decimal_places=3)
+    quantidade = models.DecimalField(
+        'Saldo no cálculo', max_digits=12, decimal_places=3)
+    # Vazio quando não há consumo no período (cobertura indefinida).
+    days_of_cover = models.DecimalField(
+        'Dias de cobertura', max_digits=9, decimal_places=1, null=True, blank=True)
+    reorder_point = models.DecimalField(
+        'Ponto de pedido', max_digits=12, decimal_places=3)
+    suggested_qty = models.DecimalField(
+        'Quantidade sugerida', max_digits=12, decimal_places=3, default=Decimal('0.000'))
+    needs_reorder = models.BooleanField('Comprar', default=False)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    objects = TenantManager()
+
+    class Meta:
+        ordering = ['days_of_cover', 'produto_id']
+        unique_together = (('company', 'produto'),)
+        indexes = [
+            models.Index(
+                fields=['company', 'needs_reorder'],
+                name='reorder_company_flag',
+            ),
+        ]
+        verbose_name = 'Sugestão de compra'
+        verbose_name_plural = 'Sugestões de compra'
+
+    def __str__(self):
+        return f'{self.produto}: {self.suggested_qty} ({self.days_of_cover} dias)'
+
+
 class Garcom(TenantMixin):
     name = models.CharField(max_length=120)
     code = models.CharField(max_length=50)
@@ -438,19 +927,9 @@ class Table(TenantMixin):
 
     def clean(self):
         super().clean()
-        if self.waiter_id:
-            waiter_company_id = (
-                Garcom.objects.filter(pk=self.waiter_id)
-                .values_list('company_id', flat=True)
-                .first()
-            )
-            if (
-                waiter_company_id is not None
-                and self.company_id is not None
-                and waiter_company_id != self.company_id
-            ):
-                raise ValidationError(
-                    'O garçom deve pertencer à mesma empresa da mesa')
+        if tenant_mismatches([self], 'waiter'):
+            raise ValidationError(
+                'O garçom deve pertencer à mesma empresa da mesa')
 
     @property
     def active_order(self):
@@ -497,37 +976,24 @@ class TableOrder(TenantMixin):
 
     class Meta:
         ordering = ['-opened_at']
+        indexes = [
+            models.Index(
+                fields=['table', 'status', '-opened_at'],
+                name='tableorder_table_status_date',
+            ),
+        ]
 
     def __str__(self):
         return f'Comanda {self.id} - Mesa {self.table.number}'
 
     def clean(self):
-        table_company_id = None
-        if self.table_id:
-            table_company_id = Table.objects.filter(
-                pk=self.table_id).values_list('company_id', flat=True).first()
-
-        if (
-            table_company_id is not None
-            and self.company_id is not None
-            and table_company_id != self.company_id
-        ):
+        if tenant_mismatches([self], 'table'):
             raise ValidationError(
                 'A mesa deve pertencer à mesma empresa da comanda')
 
-        if self.waiter_id:
-            waiter_company_id = (
-                Garcom.objects.filter(pk=self.waiter_id)
-                .values_list('company_id', flat=True)
-                .first()
-            )
-            if (
-                waiter_company_id is not None
-                and self.company_id is not None
-                and waiter_company_id != self.company_id
-            ):
-                raise ValidationError(
-                    'O garçom deve pertencer à mesma empresa da comanda')
+        if tenant_mismatches([self], 'waiter'):
+            raise ValidationError(
+                'O garçom deve pertencer à mesma empresa da comanda')
 
         discount_value = Decimal(self.discount_amount or 0)
         reason = (self.discount_reason or '').strip()
@@ -582,7 +1048,37 @@ class TableOrder(TenantMixin):
         super().save(*args, **kwargs)
 
 
+class KitchenStation(TenantMixin):
+    name = models.CharField(max_length=80)
+    is_active = models.BooleanField(default=True)
+    # Itens preparados na estação baixam o estoque deste local.
+    stock_location = models.ForeignKey(
+        StockLocation,
+        verbose_name='Local de estoque',
+        related_name='kitchen_stations',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = TenantManager()
+
+    class Meta:
+        unique_together = ('company', 'name')
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
 class TableOrderItem(models.Model):
+    class PrepStatus(models.TextChoices):
+        PENDING = 'pending', 'Aguardando'
+        PREPARING = 'preparing', 'Em preparo'
+        READY = 'ready', 'Pronto'
+        DELIVERED = 'delivered', 'Entregue'
+
     order = models.ForeignKey(
         TableOrder, related_name='items', on_delete=models.CASCADE)
     product = models.ForeignKey(Products, on_delete=models.PROTECT)
@@ -591,34 +1087,53 @@ class TableOrderItem(models.Model):
     notes = models.CharField(max_length=255, blank=True)
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     added_at = models.DateTimeField(default=timezone.now)
+    station = models.ForeignKey(
+        KitchenStation,
+        related_name='items',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    prep_status = models.CharField(
+        max_length=10, choices=PrepStatus.choices, default=PrepStatus.PENDING)
+    prep_updated_at = models.DateTimeField(null=True, blank=True)
+
+    # Campos que não mexem no valor da comanda (atualizados pela cozinha).
+    PREP_FIELDS = frozenset({'prep_status', 'prep_updated_at', 'station'})
 
     class Meta:
         ordering = ['added_at']
+        indexes = [
+            models.Index(
+                fields=['station', 'prep_status', 'added_at'],
+                name='orderitem_station_queue',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.product.name} x {self.quantity}'
 
     def clean(self):
-        if self.product_id and self.order_id:
-            product_company_id = (
-                Products.objects.filter(pk=self.product_id)
-                .values_list('company_id', flat=True)
-                .first()
-            )
-            order_company_id = (
-                TableOrder.objects.filter(pk=self.order_id)
-                .values_list('company_id', flat=True)
-                .first()
-            )
-            if (
-                product_company_id is not None
-                and order_company_id is not None
-                and product_company_id != order_company_id
-            ):
-                raise ValidationError(
-                    'O produto deve pertencer à mesma empresa da comanda')
+        if tenant_mismatches([self], 'product', 'order'):
+            raise ValidationError(
+                'O produto deve pertencer à mesma empresa da comanda')
 
     def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.PREP_FIELDS.issuperset(update_fields):
+            super().save(*args, **kwargs)
+            return
+        if self._state.adding and self.station_id is None:
+            # Roteia o item para a estação configurada na categoria do produto.
+            product = self._meta.get_field('product').get_cached_value(self, None)
+            if product is not None and Products.category_id.is_cached(product):
+                self.station_id = product.category_id.kitchen_station_id
+            else:
+                self.station_id = (
+                    Category.objects.filter(products__pk=self.product_id)
+                    .values_list('kitchen_station_id', flat=True)
+                    .first()
+                )
         self.unit_price = Decimal(self.unit_price)
         self.quantity = Decimal(self.quantity)
         self.total = (self.unit_price *
@@ -632,11 +1147,52 @@ class TableOrderItem(models.Model):
         order.recalculate_totals(commit=True)
 
 
+class CashRegister(TenantMixin):
+    """Checkout terminal; each one opens and closes its own cash sessions."""
+
+    DEFAULT_NAME = 'Caixa 1'
+
+    name = models.CharField(max_length=60)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = TenantManager()
+
+    class Meta:
+        unique_together = (('company', 'name'),)
+        ordering = ['name']
+        verbose_name = 'Caixa'
+        verbose_name_plural = 'Caixas'
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def default_for(cls, company) -> 'CashRegister':
+        """First active register of ``company``, created on first use."""
+        company_id = getattr(company, 'pk', company)
+        register = cls.objects.filter(
+            company_id=company_id, is_active=True).order_by('pk').first()
+        if register is None:
+            register, _ = cls.objects.get_or_create(
+                company_id=company_id,
+                name=cls.DEFAULT_NAME,
+                defaults={'is_active': True},
+            )
+        return register
+
+
 class CashRegisterSession(TenantMixin):
     class Status(models.TextChoices):
         OPEN = 'open', 'Aberto'
         CLOSED = 'closed', 'Fechado'
 
+    register = models.ForeignKey(
+        CashRegister,
+        verbose_name='Caixa',
+        related_name='sessions',
+        on_delete=models.PROTECT,
+    )
     opened_by = models.ForeignKey(
         User,
         on_delete=models.PROTECT,
@@ -671,11 +1227,27 @@ class CashRegisterSession(TenantMixin):
 
     class Meta:
         ordering = ['-opened_at']
+        constraints = [
+            # Cada terminal tem no máximo uma sessão aberta.
+            models.UniqueConstraint(
+                fields=['register'],
+                condition=models.Q(status='open'),
+                name='cashsession_one_open_per_register',
+            ),
+        ]
         verbose_name = 'Sessão de caixa'
         verbose_name_plural = 'Sessões de caixa'
 
     def __str__(self):
-        return f'Caixa {self.opened_at:%d/%m/%Y %H:%M}'
+        return f'{self.register} {self.opened_at:%d/%m/%Y %H:%M}'
+
+    def save(self, *args, **kwargs):
+        if self.register_id is None and self.company_id:
+            self.register = CashRegister.default_for(self.company_id)
+        if tenant_mismatches([self], 'register'):
+            raise ValueError(
+                'O caixa deve pertencer à mesma empresa da sessão')
+        super().save(*args, **kwargs)
 
     def total_entries(self):
         return self.movements.filter(type=CashMovement.Type.ENTRY).aggregate(total=Sum('amount')).get('total') or Decimal('0.00')
@@ -721,6 +1293,14 @@ class CashMovement(TenantMixin):
         blank=True,
         on_delete=models.SET_NULL,
     )
+    reversal_of = models.ForeignKey(
+        'self',
+        related_name='reversals',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        verbose_name='Estorno de',
+    )
     recorded_by = models.ForeignKey(
         User,
         on_delete=models.PROTECT,
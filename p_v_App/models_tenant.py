@@ -116,3 +116,65 @@ def set_current_company(obj, company):
     """
     obj._current_company = company
     return obj
+
+
+def tenant_company_ids(instances, path=None):
+    """
+    Resolve a empresa de cada objeto seguindo ``path`` (ex.: ``'sale_id'``,
+    ``'pedido_item__pedido'``); ``None`` usa o ``company_id`` do próprio objeto.
+
+    Usa os relacionamentos já carregados em memória; os que faltam são
+    resolvidos com uma única consulta para todos os objetos.
+    """
+    resolved = [None] * len(instances)
+    if path is None:
+        return [instance.company_id for instance in instances]
+
+    parts = path.split('__')
+    pending = {}
+    for index, instance in enumerate(instances):
+        obj = instance
+        for depth, name in enumerate(parts):
+            field = obj._meta.get_field(name)
+            if field.is_cached(obj):
+                obj = field.get_cached_value(obj)
+                if obj is None:
+                    break
+                continue
+            pk = getattr(obj, field.attname)
+            if pk is not None:
+                key = (field.related_model, '__'.join(parts[depth + 1:] + ['company_id']))
+                pending.setdefault(key, {}).setdefault(pk, []).append(index)
+            break
+        else:
+            resolved[index] = obj.company_id
+
+    for (model, lookup), indexes_by_pk in pending.items():
+        for pk, company_id in model._base_manager.filter(
+                pk__in=indexes_by_pk).values_list('pk', lookup):
+            for index in indexes_by_pk[pk]:
+                resolved[index] = company_id
+    return resolved
+
+
+def tenant_mismatches(instances, path, other_path=None):
+    """
+    Objetos cujas empresas em ``path`` e ``other_path`` são diferentes.
+
+    API em lote para caminhos com ``bulk_create``, que não chamam ``save()``;
+    relacionamentos ausentes (``None``) não são considerados divergentes.
+    """
+    instances = list(instances)
+    left = tenant_company_ids(instances, path)
+    right = tenant_company_ids(instances, other_path)
+    return [
+        instance
+        for instance, company_a, company_b in zip(instances, left, right)
+        if company_a is not None and company_b is not None and company_a != company_b
+    ]
+
+
+def validate_tenants(instances, path, other_path=None, message=None):
+    """Levanta ``ValueError`` se algum objeto misturar empresas (ver ``tenant_mismatches``)."""
+    if tenant_mismatches(instances, path, other_path):
+        raise ValueError(message or 'Os registros devem pertencer à mesma empresa.')
@@ -10,5 +10,6 @@ urlpatterns = [
     path('', include('orders.urls')),
     path('', include('inventory.urls')),
     path('', include('tables.urls')),
+    path('', include('kitchen.urls')),
     path('', include('staff.urls')),
 ]
@@ -0,0 +1,337 @@
+"""Sales analytics computed over compact columnar extracts.
+
+Two queries per period (sales, then their lines) pull the report line items
+of a company as parallel typed arrays (sale, day, weekday, hour, product, quantity, revenue, cost).
+Money is kept in integer cents and quantities in thousandths, so every total
+is an exact integer sum. ABC curve, weekday x hour heatmap, daily series and
+product movers are then single passes over the zipped columns instead of one
+GROUP BY query per table. Results are cached per company under a version that
+any sale change bumps (see ``sales.signals``). The version lives in the
+Django cache, so the bump only reaches other workers when that cache is
+shared (``CACHE_BACKEND=database``); with the per-process default the results
+expire after the shorter ``SALES_ANALYTICS_CACHE_SECONDS`` instead.
+"""
+
+from array import array
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from p_v_App.models import Products, Sales, salesItems
+
+# Participação acumulada da receita que fecha as classes A e B da curva ABC.
+ABC_THRESHOLDS = (Decimal('0.80'), Decimal('0.95'))
+MOVERS_LIMIT = 10
+EXTRACT_CHUNK = 5000
+WEEKDAY_LABELS = ('Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom')
+
+
+class SaleLineColumns:
+    """Report line items of one company/period as parallel typed arrays."""
+
+    __slots__ = ('sale', 'day', 'weekday', 'hour', 'product', 'qty', 'revenue', 'cost')
+
+    def __init__(self):
+        self.sale = array('q')
+        self.day = array('l')        # date.toordinal()
+        self.weekday = array('b')    # 1 = segunda ... 7 = domingo
+        self.hour = array('b')
+        self.product = array('q')
+        self.qty = array('q')        # milésimos
+        self.revenue = array('q')    # centavos
+        self.cost = array('q')       # centavos
+
+    def __len__(self):
+        return len(self.sale)
+
+
+def previous_period(start, end):
+    """Period of the same length ending the day before ``start``."""
+    length = (end - start).days + 1
+    return start - timedelta(days=length), start - timedelta(days=1)
+
+
+def _period_bounds(start, end):
+    """Aware datetimes covering ``start``..``end`` in the current time zone."""
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+
+
+def extract_sale_lines(company_id, start, end) -> SaleLineColumns:
+    """Load the report line items of ``company_id`` between ``start`` and ``end``.
+
+    The period is filtered on the ``date_added`` range (index friendly) and the
+    local day/weekday/hour are computed once per sale, not once per line.
+    """
+    lower, upper = _period_bounds(start, end)
+    report_sales = Q(type__in=['venda', 'pedido']) | Q(type__istartswith='Mesa')
+    moments = {}
+    for pk, added in Sales.objects.filter(
+            report_sales, company_id=company_id,
+            date_added__gte=lower, date_added__lt=upper,
+    ).values_list('pk', 'date_added').iterator(chunk_size=EXTRACT_CHUNK):
+        local = timezone.localtime(added)
+        moments[pk] = (local.toordinal(), local.isoweekday(), local.hour)
+
+    rows = (
+        salesItems.objects.filter(
+            sale_id__company_id=company_id,
+            sale_id__date_added__gte=lower,
+            sale_id__date_added__lt=upper,
+        )
+        .order_by()
+        .values_list('sale_id', 'product_id', 'qty', 'total', 'unit_cost')
+    )
+
+    columns = SaleLineColumns()
+    append_sale, append_day = columns.sale.append, columns.day.append
+    append_weekday, append_hour = columns.weekday.append, columns.hour.append
+    append_product, append_qty = columns.product.append, columns.qty.append
+    append_revenue, append_cost = columns.revenue.append, columns.cost.append
+    for sale, product, qty, total, unit_cost in rows.iterator(chunk_size=EXTRACT_CHUNK):
+        moment = moments.get(sale)
+        if moment is None:  # tipo de venda fora do relatório
+            continue
+        append_sale(sale)
+        append_day(moment[0])
+        append_weekday(moment[1])
+        append_hour(moment[2])
+        append_product(product)
+        append_qty(int(qty * 1000))
+        append_revenue(int(total * 100))
+        append_cost(
+            int((qty * unit_cost * 100).to_integral_value(ROUND_HALF_UP)) if unit_cost else 0)
+    return columns
+
+
+def summarize(columns: SaleLineColumns) -> dict:
+    revenue = sum(columns.revenue)
+    cost = sum(columns.cost)
+    sales = len(set(columns.sale))
+    return {
+        'sales': sales,
+        'lines': len(columns),
+        'quantity': sum(columns.qty) / 1000,
+        'revenue': revenue / 100,
+        'cost': cost / 100,
+        'profit': (revenue - cost) / 100,
+        'average_ticket': revenue / 100 / sales if sales else 0,
+    }
+
+
+def product_totals(columns: SaleLineColumns) -> dict:
+    """``{product_id: [qty, revenue, cost]}`` in thousandths/cents."""
+    totals = defaultdict(lambda: [0, 0, 0])
+    for product, qty, revenue, cost in zip(
+            columns.product, columns.qty, columns.revenue, columns.cost):
+        entry = totals[product]
+        entry[0] += qty
+        entry[1] += revenue
+        entry[2] += cost
+    return totals
+
+
+def abc_curve(totals: dict, thresholds=ABC_THRESHOLDS) -> list[dict]:
+    """Rank products by revenue and classify them by cumulative share.
+
+    A product belongs to the class whose limit had not been reached before it,
+    so the best seller is always class A even when it alone passes 80%.
+    """
+    grand_total = sum(entry[1] for entry in totals.values())
+    limit_a, limit_b = (int(grand_total * share) for share in thresholds)
+    ranking = sorted(totals.items(), key=lambda item: (-item[1][1], item[0]))
+    rows, cumulative = [], 0
+    for rank, (product, (qty, revenue, cost)) in enumerate(ranking, start=1):
+        klass = 'A' if cumulative < limit_a else 'B' if cumulative < limit_b else 'C'
+        cumulative += revenue
+        rows.append({
+            'rank': rank,
+            'product_id': product,
+            'class': klass,
+            'quantity': qty / 1000,
+            'revenue': revenue / 100,
+            'cost': cost / 100,
+            'profit': (revenue - cost) / 100,
+            'share': round(revenue * 100 / grand_total, 2) if grand_total else 0,
+            'cumulative_share': round(cumulative * 100 / grand_total, 2) if grand_total else 0,
+        })
+    return rows
+
+
+def abc_summary(rows: list[dict]) -> list[dict]:
+    products, revenue = Counter(), Counter()
+    for row in rows:
+        products[row['class']] += 1
+        revenue[row['class']] += row['revenue']
+    grand_total = sum(revenue.values())
+    return [
+        {
+            'class': klass,
+            'products': products[klass],
+            'revenue': round(revenue[klass], 2),
+            'share': round(revenue[klass] * 100 / grand_total, 2) if grand_total else 0,
+        }
+        for klass in 'ABC'
+    ]
+
+
+def hourly_heatmap(columns: SaleLineColumns) -> list[dict]:
+    """Revenue and sale count per weekday x hour (7 rows of 24 cells)."""
+    revenue = [0] * (7 * 24)
+    sale_cells = {}
+    for sale, weekday, hour, amount in zip(
+            columns.sale, columns.weekday, columns.hour, columns.revenue):
+        cell = (weekday - 1) * 24 + hour
+        revenue[cell] += amount
+        sale_cells[sale] = cell
+    sales = Counter(sale_cells.values())
+    peak = max(revenue) or 1
+    return [
+        {
+            'weekday': weekday + 1,
+            'label': WEEKDAY_LABELS[weekday],
+            'cells': [
+                {
+                    'hour': hour,
+                    'revenue': revenue[weekday * 24 + hour] / 100,
+                    'sales': sales[weekday * 24 + hour],
+                    'intensity': round(revenue[weekday * 24 + hour] * 100 / peak),
+                }
+                for hour in range(24)
+            ],
+        }
+        for weekday in range(7)
+    ]
+
+
+def daily_series(columns: SaleLineColumns, start, end) -> list[dict]:
+    first = start.toordinal()
+    revenue = [0] * ((end - start).days + 1)
+    cost = [0] * len(revenue)
+    for day, amount, line_cost in zip(columns.day, columns.revenue, columns.cost):
+        revenue[day - first] += amount
+        cost[day - first] += line_cost
+    return [
+        {
+            'date': (start + timedelta(days=offset)).isoformat(),
+            'revenue': revenue[offset] / 100,
+            'profit': (revenue[offset] - cost[offset]) / 100,
+        }
+        for offset in range(len(revenue))
+    ]
+
+
+def product_movers(current: dict, previous: dict, limit: int = MOVERS_LIMIT) -> dict:
+    """Products whose revenue rose or fell the most against the previous period."""
+    deltas = []
+    for product in current.keys() | previous.keys():
+        now = current[product][1] if product in current else 0
+        before = previous[product][1] if product in previous else 0
+        if now != before:
+            deltas.append((now - before, product, now, before))
+    deltas.sort()
+
+    def serialize(entries):
+        return [
+            {
+                'product_id': product,
+                'revenue': now / 100,
+                'previous_revenue': before / 100,
+                'delta': delta / 100,
+                'delta_pct': round(delta * 100 / before, 1) if before else None,
+            }
+            for delta, product, now, before in entries
+        ]
+
+    return {
+        'risers': serialize([entry for entry in reversed(deltas[-limit:]) if entry[0] > 0]),
+        'fallers': serialize([entry for entry in deltas[:limit] if entry[0] < 0]),
+    }
+
+
+def _percent_change(current, previous):
+    if not previous:
+        return None
+    return round((current - previous) * 100 / previous, 1)
+
+
+def build_sales_analytics(company_id, start, end, movers_limit: int = MOVERS_LIMIT) -> dict:
+    """Analytics of ``start``..``end`` compared with the previous period (uncached)."""
+    previous_start, previous_end = previous_period(start, end)
+    current = extract_sale_lines(company_id, start, end)
+    previous = extract_sale_lines(company_id, previous_start, previous_end)
+
+    summary, previous_summary = summarize(current), summarize(previous)
+    current_totals = product_totals(current)
+    abc = abc_curve(current_totals)
+    movers = product_movers(current_totals, product_totals(previous), movers_limit)
+
+    names = {
+        pk: (code, name, category)
+        for pk, code, name, category in Products.objects.filter(
+            pk__in=current_totals.keys() | {
+                row['product_id'] for rows in movers.values() for row in rows}
+        ).values_list('pk', 'code', 'name', 'category_id__name')
+    }
+    for row in abc + movers['risers'] + movers['fallers']:
+        row['code'], row['name'], row['category'] = names.get(row['product_id'], ('', '', ''))
+
+    return {
+        'period': {'start': start.isoformat(), 'end': end.isoformat()},
+        'previous_period': {
+            'start': previous_start.isoformat(), 'end': previous_end.isoformat()},
+        'summary': summary,
+        'previous_summary': previous_summary,
+        'changes': {
+            key: _percent_change(summary[key], previous_summary[key])
+            for key in ('sales', 'quantity', 'revenue', 'profit', 'average_ticket')
+        },
+        'abc': abc,
+        'abc_summary': abc_summary(abc),
+        'heatmap': hourly_heatmap(current),
+        'daily': daily_series(current, start, end),
+        'movers': movers,
+    }
+
+
+def _version_key(company_id) -> str:
+    return f'sales:analytics-version:{company_id}'
+
+
+def _analytics_key(company_id, version, start, end) -> str:
+    return f'sales:analytics:{company_id}:{version}:{start.isoformat()}:{end.isoformat()}'
+
+
+def _analytics_version(company_id) -> int:
+    version = cache.get(_version_key(company_id))
+    if version is None:
+        version = 1
+        cache.add(_version_key(company_id), version, None)
+    return version
+
+
+def invalidate_sales_analytics(company_id) -> None:
+    """Make every cached analytics result of ``company_id`` stale."""
+    try:
+        cache.incr(_version_key(company_id))
+    except ValueError:
+        cache.set(_version_key(company_id), 2, None)
+
+
+def get_sales_analytics(company_id, start, end) -> dict:
+    """Return the analytics of ``start``..``end`` (cached by data version)."""
+    key = _analytics_key(company_id, _analytics_version(company_id), start, end)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = build_sales_analytics(company_id, start, end)
+    cache.set(key, result, getattr(settings, 'SALES_ANALYTICS_CACHE_SECONDS', 60))
+    return result
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from p_v_App.models import Sales, salesItems
+from sales.analytics import invalidate_sales_analytics
+
+
+@receiver(post_save, sender=Sales)
+@receiver(post_delete, sender=Sales)
+def refresh_analytics(sender, instance, **kwargs):
+    invalidate_sales_analytics(instance.company_id)
+
+
+@receiver(post_save, sender=salesItems)
+def refresh_analytics_for_item(sender, instance, **kwargs):
+    invalidate_sales_analytics(instance.sale_id.company_id)
@@ -1,2 +1,93 @@
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from p_v_App.models import (
+    CashMovement,
+    CashRegister,
+    CashRegisterSession,
+    Garcom,
+    Table,
+    TableOrder,
+)
+from p_v_App.models_tenant import Company, UserProfile
+from sales.utils import get_open_cash_session, open_registers_summary
+
+
+class CashRegisterSessionTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='Loja Teste')
+        self.first = CashRegister.default_for(self.company)
+        self.second = CashRegister.objects.create(company=self.company, name='Caixa 2')
+
+    def make_user(self, username):
+        user = User.objects.create_user(username, password='x')
+        UserProfile.objects.create(user=user, company=self.company)
+        return user
+
+    def open_session(self, register, amount, user=None):
+        return CashRegisterSession.objects.create(
+            company=self.company, register=register, opening_amount=Decimal(amount),
+            opened_by=user or self.make_user(f'op{register.pk}'))
+
+    def test_each_register_keeps_one_open_session(self):
+        first = self.open_session(self.first, '100')
+        second = self.open_session(self.second, '50')
+
+        self.assertEqual(get_open_cash_session(self.company, self.first), first)
+        self.assertEqual(get_open_cash_session(self.company, self.second), second)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.open_session(self.first, '10', user=first.opened_by)
+
+    def test_summary_totals_each_open_register(self):
+        first = self.open_session(self.first, '100')
+        second = self.open_session(self.second, '50')
+        for session, kind, amount in (
+            (first, CashMovement.Type.ENTRY, '30'),
+            (first, CashMovement.Type.EXIT, '5'),
+            (second, CashMovement.Type.ENTRY, '12'),
+        ):
+            CashMovement.objects.create(
+                company=self.company, session=session, type=kind, amount=Decimal(amount),
+                description='Teste', recorded_by=session.opened_by)
+
+        self.assertEqual(
+            [(row['register__name'], row['entries'], row['exits'], row['expected_balance'])
+             for row in open_registers_summary(self.company)],
+            [(self.first.name, Decimal('30'), Decimal('5'), Decimal('125.00')),
+             ('Caixa 2', Decimal('12'), Decimal('0.00'), Decimal('62.00'))],
+        )
+
+    def test_terminals_open_and_close_their_own_register(self):
+        # Um usuário por terminal: a sessão de login é única por usuário.
+        first_client, second_client = self.client, self.client_class()
+        first_client.force_login(self.make_user('caixa1'))
+        second_client.force_login(self.make_user('caixa2'))
+        second_client.get(reverse('cashier'), {'caixa': self.second.pk})
+
+        first_client.post(reverse('open_cash_session'), {'opening_amount': '100'})
+        second_client.post(reverse('open_cash_session'), {'opening_amount': '50'})
+        self.assertEqual(
+            dict(CashRegisterSession.objects.filter(status=CashRegisterSession.Status.OPEN)
+                 .values_list('register__name', 'opening_amount')),
+            {self.first.name: Decimal('100.00'), 'Caixa 2': Decimal('50.00')},
+        )
+
+        waiter = Garcom.objects.create(company=self.company, name='Ana', code='G1')
+        TableOrder.objects.create(
+            company=self.company, waiter=waiter,
+            table=Table.objects.create(company=self.company, number=1))
+        response = first_client.post(reverse('close_cash_session'), {'closing_amount': '100'})
+        self.assertEqual(response.status_code, 200)
+
+        # Com comanda aberta, o último caixa aberto não pode ser fechado.
+        response = second_client.post(reverse('close_cash_session'), {'closing_amount': '50'})
+        self.assertRedirects(response, reverse('cashier'), fetch_redirect_response=False)
+        self.assertEqual(
+            list(CashRegisterSession.objects.filter(status=CashRegisterSession.Status.OPEN)
+                 .values_list('register__name', flat=True)),
+            ['Caixa 2'],
+        )
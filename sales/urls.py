@@ -9,9 +9,12 @@ urlpatterns = [
     path('caixa/movimentacao/', views.register_cash_movement,
          name='register_cash_movement'),
     path('caixa/fechar/', views.close_cash_session, name='close_cash_session'),
+    path('caixa/terminais/novo/', views.create_cash_register,
+         name='create_cash_register'),
     path('caixa/relatorio/<int:session_id>/',
          views.cashier_session_report, name='cashier_session_report'),
     path('pos', views.pos, name='pos-page'),
+    path('pos/scan', views.scan_barcode, name='pos-scan'),
     path('checkout-modal', views.checkout_modal, name='checkout-modal'),
     path('save-pos', views.save_pos, name='save-pos'),
     path('sales', views.salesList, name='sales-page'),
@@ -22,4 +25,7 @@ urlpatterns = [
     path('salesreport', views.sales_report, name='sales_report'),
     path('sales-report/export/', views.export_sales_report,
          name='export_sales_report'),
+    path('sales-report/analytics/', views.sales_analytics, name='sales_analytics'),
+    path('sales-report/analytics/data/', views.sales_analytics_data,
+         name='sales_analytics_data'),
 ]
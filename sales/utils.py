@@ -8,10 +8,11 @@ from typing import Iterable, Sequence
 
 from django.conf import settings
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import Count, Q, Sum
 
 from p_v_App.models import (
     CashMovement,
+    CashRegister,
     CashRegisterSession,
     Pedido,
     PedidoItem,
@@ -21,6 +22,7 @@ from p_v_App.models import (
 )
 
 CENTS = Decimal('0.01')
+CASH_REGISTER_SESSION_KEY = 'cash_register'
 VALID_PAYMENT_METHODS = {
     code
     for code, _ in Sales.FORMA_PAGAMENTO_CHOICES
@@ -317,18 +319,76 @@ def get_primary_payment_method(allocations: Iterable[dict]) -> str:
     return 'MULTI'
 
 
-def get_open_cash_session(company) -> CashRegisterSession | None:
-    return (
+def current_cash_register(request, company) -> CashRegister:
+    """Register this browser works on (chosen in the cashier page), or the default."""
+    register_id = request.session.get(CASH_REGISTER_SESSION_KEY)
+    if register_id:
+        register = CashRegister.objects.filter(
+            company=company, pk=register_id, is_active=True).first()
+        if register is not None:
+            return register
+    return CashRegister.default_for(company)
+
+
+def get_open_cash_session(company, register=None) -> CashRegisterSession | None:
+    """Open session of ``register``; without one, the latest open session of ``company``."""
+    sessions = CashRegisterSession.objects.filter(
+        company=company, status=CashRegisterSession.Status.OPEN)
+    if register is not None:
+        sessions = sessions.filter(register=register)
+    return sessions.select_related('register').order_by('-opened_at').first()
+
+
+def open_registers_summary(company) -> list[dict]:
+    """Opening amount, entries, exits and expected balance of every open register.
+
+    One grouped query over the open sessions and their movements, whatever
+    the number of checkout lanes.
+    """
+    rows = (
         CashRegisterSession.objects.filter(
             company=company, status=CashRegisterSession.Status.OPEN)
-        .order_by('-opened_at')
-        .first()
+        .values('pk', 'register_id', 'register__name', 'opened_at', 'opening_amount',
+                'opened_by__username')
+        .annotate(
+            entries=Sum('movements__amount',
+                        filter=Q(movements__type=CashMovement.Type.ENTRY)),
+            exits=Sum('movements__amount',
+                      filter=Q(movements__type=CashMovement.Type.EXIT)),
+            sales_count=Count('movements__sale', distinct=True),
+        )
+        .order_by('register__name')
     )
+    summary = []
+    for row in rows:
+        entries = row['entries'] or Decimal('0.00')
+        exits = row['exits'] or Decimal('0.00')
+        summary.append(
+            {
+                **row,
+                'entries': entries,
+                'exits': exits,
+                'expected_balance': quantize_currency(
+                    Decimal(row['opening_amount']) + entries - exits),
+            }
+        )
+    return summary
+
 
+def register_sale_payments(
+    sale: Sales,
+    allocations: Sequence[dict],
+    user,
+    session: CashRegisterSession | None = None,
+) -> None:
+    """Record the payments of ``sale`` and their cash movements in ``session``.
 
-def register_sale_payments(sale: Sales, allocations: Sequence[dict], user) -> None:
+    Without ``session`` the movements go to the latest open session of the
+    company.
+    """
     company = sale.company
-    session = get_open_cash_session(company)
+    if session is None:
+        session = get_open_cash_session(company)
 
     with transaction.atomic():
         for allocation in allocations:
@@ -369,6 +429,63 @@ def register_sale_payments(sale: Sales, allocations: Sequence[dict], user) -> No
                 )
 
 
+def reverse_sale_payments(sale: Sales, user=None) -> int:
+    """Undo the cash effect of ``sale`` and drop its payments.
+
+    Cash movements of the sale get a mirrored movement (entry <-> exit) in
+    their own session when it is still open, otherwise in the open session of
+    the same register (or the latest open one), so ``expected_balance`` is
+    corrected while the history is kept. Each reversal points at its original
+    through ``reversal_of``; reversals and movements already reversed are
+    skipped. Runs a constant number of queries regardless of the payment
+    count. Returns the number of reversal movements created.
+    """
+    company = sale.company
+    movements = list(
+        CashMovement.objects.filter(
+            company=company, sale=sale, reversal_of__isnull=True, reversals__isnull=True)
+        .select_related('session')
+    )
+    open_sessions = {}
+    if any(m.session.status != CashRegisterSession.Status.OPEN for m in movements):
+        for session in CashRegisterSession.objects.filter(
+            company=company, status=CashRegisterSession.Status.OPEN
+        ).order_by('opened_at'):
+            open_sessions[session.register_id] = session
+            open_sessions[None] = session
+
+    reversals = []
+    for movement in movements:
+        session = movement.session
+        if session.status != CashRegisterSession.Status.OPEN:
+            session = open_sessions.get(session.register_id, open_sessions.get(None))
+        if session is None:
+            continue
+        reversals.append(
+            CashMovement(
+                company=company,
+                session=session,
+                type=(
+                    CashMovement.Type.EXIT
+                    if movement.type == CashMovement.Type.ENTRY
+                    else CashMovement.Type.ENTRY
+                ),
+                amount=movement.amount,
+                payment_method=movement.payment_method,
+                description=f'Estorno {movement.description}'[:255],
+                sale=sale,
+                reversal_of=movement,
+                recorded_by_id=user.pk if getattr(user, 'is_authenticated', False)
+                else movement.recorded_by_id,
+            )
+        )
+
+    with transaction.atomic():
+        CashMovement.objects.bulk_create(reversals)
+        SalePayment.objects.filter(company=company, sale=sale).delete()
+    return len(reversals)
+
+
 def payment_summary_for_sale(sale: Sales) -> list[dict]:
     summary = []
     for payment in sale.payments.all().order_by('-recorded_at'):
@@ -463,6 +580,7 @@ def generate_cash_report_pdf(session: CashRegisterSession) -> bytes:
         lines.append(text)
 
     add_line(f'Relatorio de Caixa - {session.company.name}')
+    add_line(f'Terminal: {session.register.name}')
     closed_label = session.closed_at.strftime(
         '%d/%m/%Y %H:%M') if session.closed_at else '-'
     add_line(f'Periodo: {session.opened_at:%d/%m/%Y %H:%M} - {closed_label}')
@@ -6,7 +6,7 @@ from datetime import datetime, timedelta
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.db.models import Count, Q, Sum
 from django.db.models.functions import TruncDate
 from django.http import HttpResponse, JsonResponse
@@ -15,6 +15,7 @@ from django.urls import reverse
 from django.utils import timezone
 from openpyxl import Workbook
 
+from catalog.barcodes import find_product_by_barcode
 from core.utils import (
     generate_sale_code,
     get_date_range_from_request,
@@ -22,8 +23,11 @@ from core.utils import (
     get_user_company,
     serialize_receipt_items,
 )
+from inventory.ledger import apply_stock_deltas, lock_stock_balances
+from inventory.locations import active_locations, resolve_location
 from p_v_App.models import (
     CashMovement,
+    CashRegister,
     CashRegisterSession,
     Estoque,
     Pedido,
@@ -33,26 +37,129 @@ from p_v_App.models import (
     Sales,
     SalePayment,
     SaleComboItem,
+    StockMovement,
     TableOrder,
     salesItems,
 )
 from sales.forms import CashCloseForm, CashMovementForm, CashOpenForm
+from sales.analytics import get_sales_analytics
 from sales.utils import (
+    CASH_REGISTER_SESSION_KEY,
     allocate_payments,
+    current_cash_register,
     generate_cash_report_pdf,
     get_open_cash_session,
     get_primary_payment_method,
+    open_registers_summary,
     parse_payment_entries,
     payment_summary_for_sale,
+    quantize_currency,
     register_sale_payments,
     trigger_auto_print,
 )
 
 
+# Linhas da curva ABC exibidas na página; o JSON traz todos os produtos.
+ABC_TABLE_LIMIT = 50
+# Local de estoque escolhido no PDV, guardado na sessão do usuário.
+POS_LOCATION_SESSION_KEY = 'pos_stock_location'
+
+
+def _pos_location(request, company):
+    return resolve_location(company, request.session.get(POS_LOCATION_SESSION_KEY))
+
+
 def _generate_unique_code(company):
     return generate_sale_code(company, [Pedido.objects.filter(company=company)])
 
 
+def _parse_line_values(data, idx):
+    try:
+        qty_decimal = Decimal(data.getlist('qty[]')[idx])
+        price = quantize_currency(Decimal(data.getlist('price[]')[idx]))
+    except (InvalidOperation, IndexError, TypeError):
+        raise ValueError('Quantidade ou preço inválido informado para um dos itens.')
+    return qty_decimal, price
+
+
+def _barcode_payload(product):
+    barcodes = [item.barcode for item in product.barcodes.all()]
+    primary = barcodes[0] if barcodes else product.code
+    return {
+        'codigo_barras': primary,
+        'barcode': primary,
+        'barcodes': barcodes,
+    }
+
+
+def _serialize_pos_product(product, stock_qty):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': float(product.price),
+        'estoque': float(stock_qty),
+        'code': product.code,
+        **_barcode_payload(product),
+        'product_code': product.code,
+        'is_combo': False,
+        'combo_total_quantity': None,
+        'combo_max_flavors': None,
+        'combo_items': [],
+    }
+
+
+def _serialize_pos_combo(combo, component_stocks):
+    combo_items_payload = []
+    available_options = []
+    for item in combo.combo_items.all():
+        component = item.component
+        stock_qty = float(component_stocks.get(component.id, 0))
+        try:
+            quantity_value = float(item.quantity)
+        except (TypeError, ValueError):
+            quantity_value = 0.0
+        if quantity_value > 0:
+            available_options.append(
+                stock_qty / quantity_value if quantity_value else 0
+            )
+        combo_items_payload.append(
+            {
+                'component_id': component.id,
+                'name': component.name,
+                'code': component.code,
+                'quantity': quantity_value,
+                'stock': stock_qty,
+            }
+        )
+
+    available_quantity = None
+    if available_options:
+        try:
+            available_quantity = int(min(available_options))
+        except (ValueError, TypeError):
+            available_quantity = None
+
+    total_quantity = (
+        float(combo.combo_total_quantity)
+        if combo.combo_total_quantity is not None
+        else None
+    )
+
+    return {
+        'id': combo.id,
+        'name': combo.name,
+        'price': float(combo.price),
+        'estoque': available_quantity,
+        'code': combo.code,
+        **_barcode_payload(combo),
+        'product_code': combo.code,
+        'is_combo': True,
+        'combo_total_quantity': total_quantity,
+        'combo_max_flavors': combo.combo_max_flavors,
+        'combo_items': combo_items_payload,
+    }
+
+
 @login_required
 def pos(request):
     user_company = get_user_company(request)
@@ -61,22 +168,28 @@ def pos(request):
             request, 'Usuário não está associado a nenhuma empresa.')
         return redirect('home-page')
 
-    cash_session = get_open_cash_session(user_company)
+    cash_register = current_cash_register(request, user_company)
+    cash_session = get_open_cash_session(user_company, cash_register)
+    if 'local' in request.GET:
+        request.session[POS_LOCATION_SESSION_KEY] = request.GET['local']
+    location = _pos_location(request, user_company)
 
     estoques = (
         Estoque.objects.filter(
             status=1,
             company=user_company,
+            location=location,
             produto__status=1,
             produto__is_combo=False,
         )
         .select_related('produto')
+        .prefetch_related('produto__barcodes')
         .order_by('produto__name')
     )
 
     combo_products = (
         Products.objects.filter(company=user_company, status=1, is_combo=True)
-        .prefetch_related('combo_items__component')
+        .prefetch_related('combo_items__component', 'barcodes')
         .order_by('name')
     )
 
@@ -91,83 +204,18 @@ def pos(request):
             estoque.produto_id: estoque.quantidade
             for estoque in Estoque.objects.filter(
                 company=user_company,
+                location=location,
                 produto_id__in=component_ids,
             )
         }
 
-    product_json = []
-    for estoque in estoques:
-        product = estoque.produto
-        product_json.append(
-            {
-                'id': product.id,
-                'name': product.name,
-                'price': float(product.price),
-                'estoque': estoque.quantidade,
-                'code': product.code,
-                'codigo_barras': getattr(product, 'codigo_barras', product.code),
-                'barcode': getattr(product, 'barcode', product.code),
-                'product_code': product.code,
-                'is_combo': False,
-                'combo_total_quantity': None,
-                'combo_max_flavors': None,
-                'combo_items': [],
-            }
-        )
-
-    for combo in combo_products:
-        combo_items_payload = []
-        available_options = []
-        for item in combo.combo_items.all():
-            component = item.component
-            stock_qty = component_stocks.get(component.id, 0)
-            try:
-                quantity_value = float(item.quantity)
-            except (TypeError, ValueError):
-                quantity_value = 0.0
-            if quantity_value > 0:
-                available_options.append(
-                    stock_qty / quantity_value if quantity_value else 0
-                )
-            combo_items_payload.append(
-                {
-                    'component_id': component.id,
-                    'name': component.name,
-                    'code': component.code,
-                    'quantity': quantity_value,
-                    'stock': stock_qty,
-                }
-            )
-
-        available_quantity = None
-        if available_options:
-            try:
-                available_quantity = int(min(available_options))
-            except (ValueError, TypeError):
-                available_quantity = None
-
-        total_quantity = (
-            float(combo.combo_total_quantity)
-            if combo.combo_total_quantity is not None
-            else None
-        )
-
-        product_json.append(
-            {
-                'id': combo.id,
-                'name': combo.name,
-                'price': float(combo.price),
-                'estoque': available_quantity,
-                'code': combo.code,
-                'codigo_barras': getattr(combo, 'codigo_barras', combo.code),
-                'barcode': getattr(combo, 'barcode', combo.code),
-                'product_code': combo.code,
-                'is_combo': True,
-                'combo_total_quantity': total_quantity,
-                'combo_max_flavors': combo.combo_max_flavors,
-                'combo_items': combo_items_payload,
-            }
-        )
+    product_json = [
+        _serialize_pos_product(estoque.produto, estoque.quantidade)
+        for estoque in estoques
+    ]
+    product_json.extend(
+        _serialize_pos_combo(combo, component_stocks) for combo in combo_products
+    )
 
     context = {
         'page_title': 'Ponto de Venda',
@@ -176,10 +224,63 @@ def pos(request):
         'product_json': json.dumps(product_json),
         'cash_session_open': bool(cash_session),
         'cash_session': cash_session,
+        'cash_register': cash_register,
+        'stock_location': location,
+        'stock_locations': active_locations(user_company),
     }
     return render(request, 'sales/pos.html', context)
 
 
+@login_required
+def scan_barcode(request):
+    user_company = get_user_company(request)
+    if not user_company:
+        return JsonResponse(
+            {'status': 'failed',
+             'msg': 'Usuário não está associado a nenhuma empresa.'}
+        )
+
+    code = request.GET.get('code', '').strip()
+    product = find_product_by_barcode(user_company, code)
+    if not product or product.status != 1:
+        return JsonResponse(
+            {'status': 'failed',
+             'msg': 'Nenhum produto ativo encontrado para o código informado.'}
+        )
+
+    product = (
+        Products.objects.filter(pk=product.pk)
+        .prefetch_related('barcodes', 'combo_items__component')
+        .get()
+    )
+    location = _pos_location(request, user_company)
+    if product.is_combo:
+        component_stocks = dict(
+            Estoque.objects.filter(
+                company=user_company,
+                location=location,
+                produto_id__in=[
+                    item.component_id for item in product.combo_items.all()],
+            ).values_list('produto_id', 'quantidade')
+        )
+        record = _serialize_pos_combo(product, component_stocks)
+    else:
+        stock_qty = (
+            Estoque.objects.filter(
+                company=user_company, location=location, produto=product, status=1)
+            .values_list('quantidade', flat=True)
+            .first()
+        )
+        if stock_qty is None:
+            return JsonResponse(
+                {'status': 'failed',
+                 'msg': f'O produto {product.name} não possui estoque ativo.'}
+            )
+        record = _serialize_pos_product(product, stock_qty)
+
+    return JsonResponse({'status': 'success', 'product': record})
+
+
 @login_required
 def checkout_modal(request):
     grand_total = request.GET.get('grand_total', 0)
@@ -197,12 +298,15 @@ def save_pos(request):
         resp['msg'] = 'Usuário não está associado a nenhuma empresa.'
         return JsonResponse(resp)
 
-    if not get_open_cash_session(user_company):
-        resp['msg'] = 'Abra o caixa para registrar vendas no PDV.'
+    cash_session = get_open_cash_session(
+        user_company, current_cash_register(request, user_company))
+    if not cash_session:
+        resp['msg'] = 'Abra o caixa deste terminal para registrar vendas no PDV.'
         return JsonResponse(resp)
 
     code = _generate_unique_code(user_company)
     combo_configs = data.getlist('combo_config[]')
+    location = _pos_location(request, user_company)
 
     def resolve_combo_components(product, raw_config, combo_qty):
         if not product.is_combo:
@@ -230,10 +334,10 @@ def save_pos(request):
             config_entries = [
                 {
                     'component_id': item.component_id,
-                    'quantity': float(item.quantity),
+                    'quantity': item.quantity,
                 }
                 for item in combo_items
-                if item.quantity and float(item.quantity) > 0
+                if item.quantity and item.quantity > 0
             ]
 
         allowed_components = {item.component_id: item for item in combo_items}
@@ -309,11 +413,15 @@ def save_pos(request):
         return resolved
 
     try:
-        sub_total_value = Decimal(str(data.get('sub_total', 0) or 0))
-        tax_amount_value = Decimal(str(data.get('tax_amount', 0) or 0))
-        discount_value = Decimal(str(data.get('discount_total', 0) or 0))
-        delivery_value = Decimal(
-            str(data.get('taxa_entrega', data.get('delivery_fee', 0)) or 0))
+        sub_total_value = quantize_currency(
+            Decimal(data.get('sub_total', 0) or 0))
+        tax_value = quantize_currency(Decimal(data.get('tax', 0) or 0))
+        tax_amount_value = quantize_currency(
+            Decimal(data.get('tax_amount', 0) or 0))
+        discount_value = quantize_currency(
+            Decimal(data.get('discount_total', 0) or 0))
+        delivery_value = quantize_currency(
+            Decimal(data.get('taxa_entrega', data.get('delivery_fee', 0)) or 0))
     except InvalidOperation:
         resp['msg'] = 'Valores monetários inválidos informados.'
         return JsonResponse(resp)
@@ -348,17 +456,19 @@ def save_pos(request):
             with transaction.atomic():
                 pedido = Pedido.objects.create(
                     code=code,
-                    sub_total=float(sub_total_value),
-                    tax=float(data.get('tax', 0) or 0),
-                    tax_amount=float(tax_amount_value),
-                    grand_total=float(grand_total_value),
-                    tendered_amount=float(data.get('tendered_amount', 0) or 0),
-                    amount_change=float(data.get('amount_change', 0) or 0),
+                    sub_total=sub_total_value,
+                    tax=tax_value,
+                    tax_amount=tax_amount_value,
+                    grand_total=grand_total_value,
+                    tendered_amount=quantize_currency(
+                        data.get('tendered_amount', 0) or 0),
+                    amount_change=quantize_currency(
+                        data.get('amount_change', 0) or 0),
                     forma_pagamento=data.get('forma_pagamento', 'PIX'),
                     customer_name=data.get('customer_name', ''),
                     endereco_entrega=data.get('endereco_entrega', ''),
-                    taxa_entrega=float(delivery_value),
-                    discount_total=float(discount_value),
+                    taxa_entrega=delivery_value,
+                    discount_total=discount_value,
                     discount_reason=discount_reason,
                     status='pendente',
                     company=user_company,
@@ -367,19 +477,13 @@ def save_pos(request):
                 for idx, prod_id in enumerate(data.getlist('product_id[]')):
                     product = Products.objects.get(
                         id=prod_id, company=user_company)
-                    qty_raw = data.getlist('qty[]')[idx]
-                    try:
-                        qty_decimal = Decimal(str(qty_raw))
-                    except (InvalidOperation, ValueError):
-                        raise ValueError(
-                            'Quantidade inválida informada para um dos itens.')
-                    price = float(data.getlist('price[]')[idx])
+                    qty_decimal, price = _parse_line_values(data, idx)
                     pedido_item = PedidoItem.objects.create(
                         pedido=pedido,
                         product=product,
-                        qty=float(qty_decimal),
+                        qty=qty_decimal,
                         price=price,
-                        total=float(qty_decimal) * price,
+                        total=quantize_currency(qty_decimal * price),
                     )
 
                     if product.is_combo:
@@ -437,39 +541,41 @@ def save_pos(request):
         with transaction.atomic():
             venda = Sales.objects.create(
                 code=code,
-                sub_total=float(sub_total_value),
-                tax=float(data.get('tax', 0) or 0),
-                tax_amount=float(tax_amount_value),
-                grand_total=float(grand_total_value),
-                tendered_amount=float(tendered_total),
-                amount_change=float(change_total),
+                sub_total=sub_total_value,
+                tax=tax_value,
+                tax_amount=tax_amount_value,
+                grand_total=grand_total_value,
+                tendered_amount=tendered_total,
+                amount_change=change_total,
                 forma_pagamento=primary_method,
                 customer_name=data.get('customer_name', ''),
                 endereco_entrega=data.get('endereco_entrega', ''),
-                delivery_fee=float(delivery_value),
-                discount_total=float(discount_value),
+                delivery_fee=delivery_value,
+                discount_total=discount_value,
                 discount_reason=discount_reason,
                 type='venda',
                 company=user_company,
             )
 
+            sale_cost = Decimal('0')
+            # Quantidades baixadas por produto: uma leitura travada e uma
+            # gravação em lote por venda, em vez de consulta e UPDATE por item.
+            demand = {}
+            names = {}
             for idx, prod_id in enumerate(data.getlist('product_id[]')):
                 product = Products.objects.get(
                     id=prod_id, company=user_company)
-                qty_raw = data.getlist('qty[]')[idx]
-                try:
-                    qty_decimal = Decimal(str(qty_raw))
-                except (InvalidOperation, ValueError):
-                    raise ValueError(
-                        'Quantidade inválida informada para um dos itens.')
-                price = float(data.getlist('price[]')[idx])
+                qty_decimal, price = _parse_line_values(data, idx)
                 sale_item = salesItems.objects.create(
                     sale_id=venda,
                     product_id=product,
-                    qty=float(qty_decimal),
+                    qty=qty_decimal,
                     price=price,
-                    total=float(qty_decimal) * price,
+                    total=quantize_currency(qty_decimal * price),
+                    unit_cost=product.custo,
                 )
+                sale_cost += qty_decimal * product.custo
+                venda.item_count += 1
 
                 if product.is_combo:
                     raw_config = combo_configs[idx] if idx < len(
@@ -484,35 +590,33 @@ def save_pos(request):
                             component=component['component'],
                             quantity=component['total_quantity'],
                         )
-                        try:
-                            estoque_item = Estoque.objects.get(
-                                produto=component['component'],
-                                company=user_company,
-                            )
-                            if estoque_item.quantidade < float(component['total_quantity']):
-                                raise ValueError(
-                                    f"Estoque insuficiente para o item {component['component'].name}."
-                                )
-                            estoque_item.quantidade -= float(
-                                component['total_quantity'])
-                            estoque_item.save(update_fields=['quantidade'])
-                        except Estoque.DoesNotExist:
-                            pass
+                        component_id = component['component'].pk
+                        demand[component_id] = demand.get(
+                            component_id, Decimal('0')) + component['total_quantity']
+                        names[component_id] = component['component'].name
                 else:
-                    try:
-                        estoque_item = Estoque.objects.get(
-                            produto=product, company=user_company
-                        )
-                        if estoque_item.quantidade < float(qty_decimal):
-                            raise ValueError(
-                                f'Estoque insuficiente para o item {product.name}.'
-                            )
-                        estoque_item.quantidade -= float(qty_decimal)
-                        estoque_item.save(update_fields=['quantidade'])
-                    except Estoque.DoesNotExist:
-                        pass
-
-            register_sale_payments(venda, allocations, request.user)
+                    demand[product.pk] = demand.get(
+                        product.pk, Decimal('0')) + qty_decimal
+                    names[product.pk] = product.name
+
+            # Produto sem registro de estoque no local não é controlado.
+            available = lock_stock_balances(user_company, demand, location)
+            for pid, qty in demand.items():
+                if pid in available and available[pid][1] < qty:
+                    raise ValueError(
+                        f'Estoque insuficiente para o item {names[pid]}.'
+                    )
+            apply_stock_deltas(
+                user_company,
+                {pid: -qty for pid, qty in demand.items()},
+                StockMovement.Reason.SALE,
+                location=location,
+                user=request.user,
+                sale=venda,
+            )
+            venda.total_cost = quantize_currency(sale_cost)
+            venda.save(update_fields=['total_cost', 'item_count'])
+            register_sale_payments(venda, allocations, request.user, cash_session)
             try:
                 print_status, print_message = trigger_auto_print(venda)
             except Exception as print_exc:  # noqa: BLE001
@@ -610,20 +714,11 @@ def salesList(request):
             'discount_reason': sale.discount_reason,
         }
 
-        items = list(
-            salesItems.objects.filter(sale_id=sale)
-            .select_related('product_id')
-            .prefetch_related('combo_components__component')
-        )
-        record['items'] = items
-        record['item_count'] = len(items)
-        total_cost = sum(
-            item.qty * (item.product_id.custo or 0)
-            for item in items
-        )
-        record['total_cost'] = total_cost
-        record['profit'] = float(sale.grand_total) - float(total_cost)
-        record['tax_amount'] = format(float(sale.tax_amount or 0), '.2f')
+        # Custo e itens gravados na venda: sem consultar os itens nem o custo atual.
+        record['item_count'] = sale.item_count
+        record['total_cost'] = sale.total_cost
+        record['profit'] = sale.profit
+        record['tax_amount'] = format(sale.tax_amount or 0, '.2f')
         sale_data.append(record)
 
     stats_sales = base_qs.aggregate(
@@ -631,16 +726,11 @@ def salesList(request):
         total_revenue=Sum('grand_total'),
         total_tax=Sum('tax_amount'),
         total_delivery=Sum('delivery_fee'),
+        total_cost=Sum('total_cost'),
     )
 
-    period_cost = 0
-    period_profit = 0
-    for sale in base_qs.prefetch_related('salesitems_set__product_id'):
-        sale_cost = sum(
-            item.qty * (item.product_id.custo or 0) for item in sale.salesitems_set.all()
-        )
-        period_cost += sale_cost
-        period_profit += float(sale.grand_total) - sale_cost
+    period_cost = stats_sales.get('total_cost') or Decimal('0.00')
+    period_profit = (stats_sales.get('total_revenue') or Decimal('0.00')) - period_cost
 
     payment_methods = (
         base_qs.values_list('forma_pagamento', flat=True).distinct().order_by(
@@ -733,7 +823,11 @@ def cashier_dashboard(request):
             request, 'Usuário não está associado a nenhuma empresa.')
         return redirect('home-page')
 
-    open_session = get_open_cash_session(user_company)
+    if request.GET.get('caixa', '').isdigit():
+        request.session[CASH_REGISTER_SESSION_KEY] = int(request.GET['caixa'])
+    cash_register = current_cash_register(request, user_company)
+    open_session = get_open_cash_session(user_company, cash_register)
+    registers_summary = open_registers_summary(user_company)
     open_form = CashOpenForm()
     movement_form = CashMovementForm()
     close_form = CashCloseForm()
@@ -791,9 +885,11 @@ def cashier_dashboard(request):
         entries_total = open_session.total_entries()
         exits_total = open_session.total_exits()
         expected_balance = open_session.expected_balance()
-        open_tables_count = TableOrder.objects.filter(
-            company=user_company, status=TableOrder.Status.OPEN
-        ).count()
+        if len(registers_summary) <= 1:
+            # Comandas abertas só impedem o fechamento do último caixa aberto.
+            open_tables_count = TableOrder.objects.filter(
+                company=user_company, status=TableOrder.Status.OPEN
+            ).count()
 
     history_date_str = request.GET.get('history_date', '').strip()
     history_date = None
@@ -807,7 +903,7 @@ def cashier_dashboard(request):
     session_history_qs = (
         CashRegisterSession.objects.filter(company=user_company)
         .order_by('-opened_at')
-        .select_related('opened_by', 'closed_by')
+        .select_related('register', 'opened_by', 'closed_by')
     )
     if history_date:
         session_history_qs = session_history_qs.filter(
@@ -821,6 +917,13 @@ def cashier_dashboard(request):
 
     context = {
         'current': 'cashier',
+        'cash_register': cash_register,
+        'cash_registers': CashRegister.objects.filter(company=user_company, is_active=True),
+        'registers_summary': registers_summary,
+        'registers_totals': {
+            key: sum((row[key] for row in registers_summary), Decimal('0'))
+            for key in ('opening_amount', 'entries', 'exits', 'expected_balance')
+        },
         'open_session': open_session,
         'open_form': open_form,
         'movement_form': movement_form,
@@ -852,21 +955,29 @@ def open_cash_session(request):
             request, 'Usuário não está associado a nenhuma empresa.')
         return redirect('home-page')
 
-    if get_open_cash_session(user_company):
-        messages.warning(request, 'Já existe um caixa aberto nesta empresa.')
+    cash_register = current_cash_register(request, user_company)
+    if get_open_cash_session(user_company, cash_register):
+        messages.warning(request, f'O {cash_register.name} já está aberto.')
         return redirect('cashier')
 
     form = CashOpenForm(request.POST)
     if form.is_valid():
-        CashRegisterSession.objects.create(
-            company=user_company,
-            opened_by=request.user,
-            opening_amount=form.cleaned_data['opening_amount'],
-            opening_note=form.cleaned_data['opening_note'],
-            status=CashRegisterSession.Status.OPEN,
-            opened_at=timezone.now(),
-        )
-        messages.success(request, 'Caixa aberto com sucesso.')
+        try:
+            with transaction.atomic():
+                CashRegisterSession.objects.create(
+                    company=user_company,
+                    register=cash_register,
+                    opened_by=request.user,
+                    opening_amount=form.cleaned_data['opening_amount'],
+                    opening_note=form.cleaned_data['opening_note'],
+                    status=CashRegisterSession.Status.OPEN,
+                    opened_at=timezone.now(),
+                )
+        except IntegrityError:
+            # Outro terminal abriu o mesmo caixa ao mesmo tempo.
+            messages.warning(request, f'O {cash_register.name} já está aberto.')
+        else:
+            messages.success(request, f'{cash_register.name} aberto com sucesso.')
     else:
         for field_errors in form.errors.values():
             for error in field_errors:
@@ -888,9 +999,10 @@ def register_cash_movement(request):
             request, 'Usuário não está associado a nenhuma empresa.')
         return redirect('home-page')
 
-    session = get_open_cash_session(user_company)
+    session = get_open_cash_session(
+        user_company, current_cash_register(request, user_company))
     if not session:
-        messages.error(request, 'Não há caixa aberto no momento.')
+        messages.error(request, 'Não há caixa aberto neste terminal.')
         return redirect('cashier')
 
     form = CashMovementForm(request.POST)
@@ -930,15 +1042,22 @@ def close_cash_session(request):
             request, 'Usuário não está associado a nenhuma empresa.')
         return redirect('home-page')
 
-    session = get_open_cash_session(user_company)
+    session = get_open_cash_session(
+        user_company, current_cash_register(request, user_company))
     if not session:
         messages.error(request, 'Não há caixa aberto para ser fechado.')
         return redirect('cashier')
 
-    if TableOrder.objects.filter(company=user_company, status=TableOrder.Status.OPEN).exists():
+    other_open = CashRegisterSession.objects.filter(
+        company=user_company, status=CashRegisterSession.Status.OPEN,
+    ).exclude(pk=session.pk)
+    if (
+        not other_open.exists()
+        and TableOrder.objects.filter(company=user_company, status=TableOrder.Status.OPEN).exists()
+    ):
         messages.error(
             request,
-            'Não é possível fechar o caixa enquanto houver comandas abertas. Finalize as comandas antes de encerrar o caixa.',
+            'Não é possível fechar o último caixa aberto enquanto houver comandas abertas. Finalize as comandas antes de encerrar o caixa.',
         )
         return redirect('cashier')
 
@@ -970,6 +1089,33 @@ def close_cash_session(request):
     return render(request, 'sales/cashier_close_report.html', context)
 
 
+@login_required
+def create_cash_register(request):
+    """Cadastra um novo terminal de caixa e passa a usá-lo neste navegador."""
+    if request.method != 'POST':
+        messages.error(request, 'Método inválido para cadastrar caixa.')
+        return redirect('cashier')
+
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('home-page')
+
+    name = request.POST.get('name', '').strip()[:60]
+    if not name:
+        messages.error(request, 'Informe o nome do caixa.')
+        return redirect('cashier')
+    if CashRegister.objects.filter(company=user_company, name__iexact=name).exists():
+        messages.error(request, f'Já existe um caixa chamado {name}.')
+        return redirect('cashier')
+
+    register = CashRegister.objects.create(company=user_company, name=name)
+    request.session[CASH_REGISTER_SESSION_KEY] = register.pk
+    messages.success(request, f'{register.name} cadastrado. Este terminal passou a usá-lo.')
+    return redirect('cashier')
+
+
 @login_required
 def cashier_session_report(request, session_id):
     user_company = get_user_company(request)
@@ -1047,6 +1193,7 @@ def sales_report(request):
         total_tax=Sum('tax_amount'),
         total_discount=Sum('discount_total'),
         total_delivery=Sum('delivery_fee'),
+        total_cost=Sum('total_cost'),
     )
     totals = {
         'total_tx': sales_qs.count(),
@@ -1061,6 +1208,13 @@ def sales_report(request):
         totals['total_revenue'] /
         totals['total_tx'] if totals['total_tx'] else 0
     )
+    # Custo gravado em cada venda: lucro e margem sem juntar itens e produtos.
+    totals['total_cost'] = float(sales_aggregates.get('total_cost') or 0)
+    totals['total_profit'] = totals['total_revenue'] - totals['total_cost']
+    totals['profit_margin'] = (
+        totals['total_profit'] / totals['total_revenue'] * 100
+        if totals['total_revenue'] else 0
+    )
 
     raw_data = (
         items_qs.annotate(sale_date=TruncDate('sale_id__date_added'))
@@ -1111,6 +1265,43 @@ def sales_report(request):
     return render(request, 'sales/sales_report.html', context)
 
 
+@login_required
+def sales_analytics(request):
+    user_company = get_user_company(request)
+    if not user_company:
+        messages.error(
+            request, 'Usuário não está associado a nenhuma empresa.')
+        return redirect('home-page')
+
+    start, end = get_date_range_from_request(request)
+    analytics = get_sales_analytics(user_company.pk, start, end)
+    context = {
+        'page_title': 'Análise de Vendas',
+        'start_date': start.strftime('%Y-%m-%d'),
+        'end_date': end.strftime('%Y-%m-%d'),
+        'analytics': analytics,
+        'abc_rows': analytics['abc'][:ABC_TABLE_LIMIT],
+        'hours': range(24),
+        'current': 'sales_analytics',
+    }
+    return render(request, 'sales/sales_analytics.html', context)
+
+
+@login_required
+def sales_analytics_data(request):
+    """Curva ABC, mapa de calor e variações do período em JSON."""
+    user_company = get_user_company(request)
+    if not user_company:
+        return JsonResponse(
+            {'status': 'failed',
+             'msg': 'Usuário não está associado a nenhuma empresa.'}
+        )
+
+    start, end = get_date_range_from_request(request)
+    return JsonResponse(
+        {'status': 'success', 'analytics': get_sales_analytics(user_company.pk, start, end)})
+
+
 @login_required
 def export_sales_report(request):
     user_company = get_user_company(request)
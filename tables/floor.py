@@ -0,0 +1,111 @@
+"""Floor-plan state shared by the mesas page and the waiter tablets."""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+
+from p_v_App.models import Table, TableOrder
+
+RECENT_ORDERS_PER_TABLE = 3
+
+
+def _cache_key(company_id) -> str:
+    return f'tables:floor-state:{company_id}'
+
+
+def floor_tables(company, recent_per_table: int = RECENT_ORDERS_PER_TABLE) -> list[Table]:
+    """Tables of ``company`` with ``open_order`` and ``recent_orders`` attached.
+
+    Only open orders and the last ``recent_per_table`` closed orders of each
+    table are loaded (ranked with ``ROW_NUMBER()``), instead of the whole
+    order history.
+    """
+    recent_orders = (
+        TableOrder.objects.filter(company=company)
+        .exclude(status=TableOrder.Status.OPEN)
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F('table_id'),
+                order_by=F('opened_at').desc(),
+            )
+        )
+        .filter(position__lte=recent_per_table)
+        .select_related('waiter')
+        .order_by('-opened_at')
+    )
+    tables = list(
+        Table.objects.filter(company=company)
+        .select_related('waiter')
+        .prefetch_related(
+            Prefetch(
+                'orders',
+                queryset=TableOrder.objects.filter(
+                    company=company, status=TableOrder.Status.OPEN)
+                .select_related('waiter')
+                .order_by('-opened_at'),
+                to_attr='open_orders',
+            ),
+            Prefetch('orders', queryset=recent_orders, to_attr='recent_orders'),
+        )
+    )
+    for table in tables:
+        table.open_order = table.open_orders[0] if table.open_orders else None
+    return tables
+
+
+def get_floor_state(company) -> tuple[list[dict], str]:
+    """Return the compact floor state of ``company`` and its ETag (cached)."""
+    key = _cache_key(company.pk)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    open_orders = {
+        row['table_id']: row
+        for row in TableOrder.objects.filter(
+            company=company, status=TableOrder.Status.OPEN
+        )
+        .order_by('opened_at')
+        .values('id', 'table_id', 'waiter_name', 'total', 'opened_at')
+    }
+    state = []
+    for table in (
+        Table.objects.filter(company=company)
+        .order_by('number')
+        .values('id', 'number', 'name', 'is_active', 'waiter__name')
+    ):
+        order = open_orders.get(table['id'])
+        if not table['is_active']:
+            status = 'inactive'
+        elif order:
+            status = 'occupied'
+        else:
+            status = 'free'
+        state.append(
+            {
+                'id': table['id'],
+                'number': table['number'],
+                'name': table['name'],
+                'status': status,
+                'order_id': order['id'] if order else None,
+                'waiter': (order['waiter_name'] if order else '') or table['waiter__name'] or '',
+                'total': float(order['total']) if order else 0.0,
+                'opened_at': order['opened_at'] if order else None,
+            }
+        )
+
+    body = json.dumps(state, cls=DjangoJSONEncoder)
+    etag = f'"{hashlib.md5(body.encode("utf-8")).hexdigest()}"'
+    result = (state, etag)
+    cache.set(key, result, getattr(settings, 'FLOOR_STATE_CACHE_SECONDS', 5))
+    return result
+
+
+def invalidate_floor_state(company_id) -> None:
+    cache.delete(_cache_key(company_id))
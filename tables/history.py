@@ -0,0 +1,61 @@
+"""Bounded loaders for the order history shown on the table detail page."""
+
+from django.db.models import OuterRef, Prefetch, Q, Subquery
+
+from p_v_App.models import Sales, TableOrder, TableOrderItem
+
+HISTORY_PAGE_SIZE = 10
+
+
+def _with_items(queryset):
+    return queryset.prefetch_related(
+        Prefetch(
+            'items',
+            queryset=TableOrderItem.objects.select_related('product').order_by('added_at', 'id'),
+        )
+    )
+
+
+def get_open_order(table):
+    return (
+        _with_items(
+            TableOrder.objects.filter(
+                company_id=table.company_id,
+                table=table,
+                status=TableOrder.Status.OPEN,
+            )
+        )
+        .select_related('waiter')
+        .order_by('-opened_at')
+        .first()
+    )
+
+
+def closed_orders_page(table, *, before=None, limit=HISTORY_PAGE_SIZE):
+    """Return ``(orders, has_more)`` for the closed orders of ``table``.
+
+    Keyset pagination on ``(opened_at, id)``: ``before`` is the last order of
+    the previous page, so each page costs the same no matter how old it is.
+    ``latest_sale_id`` is annotated with a correlated subquery instead of
+    prefetching every sale of the table.
+    """
+    latest_sale = (
+        Sales.objects.filter(company_id=table.company_id, table_order=OuterRef('pk'))
+        .order_by('-date_added')
+        .values('id')[:1]
+    )
+    queryset = (
+        TableOrder.objects.filter(company_id=table.company_id, table=table)
+        .exclude(status=TableOrder.Status.OPEN)
+        .annotate(latest_sale_id=Subquery(latest_sale))
+        .select_related('table')
+        .order_by('-opened_at', '-id')
+    )
+    if before is not None:
+        queryset = queryset.filter(
+            Q(opened_at__lt=before.opened_at)
+            | Q(opened_at=before.opened_at, id__lt=before.id)
+        )
+
+    orders = list(_with_items(queryset)[:limit + 1])
+    return orders[:limit], len(orders) > limit
@@ -0,0 +1,114 @@
+"""Batch entry of comanda items (one round from a waiter tablet per request)."""
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from p_v_App.models import Products, TableOrder, TableOrderItem
+
+MAX_ITEMS_PER_ROUND = 100
+QUANTITY_STEP = Decimal('0.01')
+
+
+def parse_item_entries(entries) -> tuple[list[dict], list[str]]:
+    """Normalize ``[{product_id, quantity, notes}]``; returns ``(lines, errors)``."""
+    if not isinstance(entries, list) or not entries:
+        return [], ['Informe ao menos um item.']
+    if len(entries) > MAX_ITEMS_PER_ROUND:
+        return [], [f'Envie no máximo {MAX_ITEMS_PER_ROUND} itens por vez.']
+
+    lines, errors = [], []
+    for idx, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict):
+            errors.append(f'Item {idx}: formato inválido.')
+            continue
+        try:
+            product_id = int(entry.get('product_id'))
+            quantity = Decimal(str(entry.get('quantity', 1))).quantize(QUANTITY_STEP)
+        except (TypeError, ValueError, InvalidOperation):
+            errors.append(f'Item {idx}: produto ou quantidade inválidos.')
+            continue
+        if quantity <= 0:
+            errors.append(f'Item {idx}: informe uma quantidade válida.')
+            continue
+        lines.append(
+            {
+                'product_id': product_id,
+                'quantity': quantity,
+                'notes': str(entry.get('notes') or '').strip()[:255],
+            }
+        )
+    return lines, errors
+
+
+def add_items_to_order(order: TableOrder, lines: list[dict]) -> tuple[list[TableOrderItem], list[str]]:
+    """Validate and insert a round of items, recalculating the totals once.
+
+    Products are checked with a single query (same company, available, not a
+    combo) and the items are routed to the kitchen station of their category
+    in that same query. Either the whole round is added or none of it.
+    """
+    product_ids = {line['product_id'] for line in lines}
+    products = {
+        product.pk: product
+        for product in Products.objects.filter(
+            company_id=order.company_id, pk__in=product_ids, is_combo=False
+        ).select_related('category_id')
+    }
+
+    errors = []
+    for idx, line in enumerate(lines, start=1):
+        product = products.get(line['product_id'])
+        if product is None:
+            errors.append(f'Item {idx}: produto não encontrado.')
+        elif product.status != 1:
+            errors.append(f'Item {idx}: {product.name} está indisponível no momento.')
+    if errors:
+        return [], errors
+
+    with transaction.atomic():
+        items = []
+        for line in lines:
+            product = products[line['product_id']]
+            unit_price = Decimal(product.price)
+            items.append(
+                TableOrderItem(
+                    order=order,
+                    product=product,
+                    quantity=line['quantity'],
+                    unit_price=unit_price,
+                    total=(unit_price * line['quantity']).quantize(QUANTITY_STEP),
+                    notes=line['notes'],
+                    station_id=product.category_id.kitchen_station_id,
+                )
+            )
+        items = TableOrderItem.objects.bulk_create(items)
+        # Salva a comanda uma vez: dispara a invalidação do salão, da cozinha e o evento SSE.
+        order.recalculate_totals(commit=True)
+    return items, []
+
+
+def order_summary(order: TableOrder, added=()) -> dict:
+    """Compact totals of ``order`` for the tablet after a round is added."""
+    return {
+        'id': order.pk,
+        'table_id': order.table_id,
+        'status': order.status,
+        'subtotal': float(order.subtotal),
+        'service_amount': float(order.service_amount),
+        'discount_amount': float(order.discount_amount or 0),
+        'total': float(order.total),
+        'item_count': order.items.count(),
+        'added': [
+            {
+                'id': item.pk,
+                'product_id': item.product_id,
+                'product': item.product.name,
+                'quantity': float(item.quantity),
+                'unit_price': float(item.unit_price),
+                'total': float(item.total),
+                'notes': item.notes,
+            }
+            for item in added
+        ],
+    }
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from p_v_App.models import Table, TableOrder
+from tables.floor import invalidate_floor_state
+
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+@receiver(post_save, sender=TableOrder)
+@receiver(post_delete, sender=TableOrder)
+def refresh_floor_state(sender, instance, **kwargs):
+    invalidate_floor_state(instance.company_id)
@@ -4,6 +4,7 @@ from tables import views
 
 urlpatterns = [
     path('mesas/', views.mesas, name='mesas'),
+    path('mesas/estado/', views.mesas_estado, name='mesas-estado'),
     path('mesas/salvar/', views.salvar_mesa, name='salvar_mesa'),
     path('mesas/<int:table_id>/salvar/',
          views.salvar_mesa, name='atualizar_mesa'),
@@ -11,6 +12,8 @@ urlpatterns = [
          views.excluir_mesa, name='excluir_mesa'),
     path('mesas/<int:table_id>/detalhes/',
          views.mesa_detalhe, name='mesa-detalhe'),
+    path('mesas/<int:table_id>/historico/',
+         views.mesa_historico, name='mesa-historico'),
     path('mesas/<int:table_id>/abrir-comanda/',
          views.abrir_comanda, name='abrir_comanda'),
     path('mesas/comanda/<int:order_id>/atualizar/',
@@ -23,6 +26,8 @@ urlpatterns = [
          views.excluir_comanda, name='excluir_comanda'),
     path('mesas/comanda/<int:order_id>/item/',
          views.adicionar_item_comanda, name='adicionar_item_comanda'),
+    path('mesas/comanda/<int:order_id>/itens/',
+         views.adicionar_itens_comanda, name='adicionar_itens_comanda'),
     path(
         'mesas/comanda/item/<int:item_id>/atualizar/',
         views.atualizar_item_comanda,
@@ -1,10 +1,12 @@
+import json
 from decimal import Decimal
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
-from django.db.models import Prefetch
+from django.http import HttpResponseNotModified, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
 
@@ -17,11 +19,15 @@ from core.utils import (
 )
 from sales.utils import (
     allocate_payments,
+    current_cash_register,
     get_open_cash_session,
     get_primary_payment_method,
     parse_payment_entries,
 )
 from p_v_App.models import Garcom, Products, Sales, Table, TableOrder, TableOrderItem
+from tables.floor import floor_tables, get_floor_state
+from tables.history import closed_orders_page, get_open_order
+from tables.items import add_items_to_order, order_summary, parse_item_entries
 from tables.forms import (
     TableForm,
     TableOrderCloseForm,
@@ -61,33 +67,8 @@ def mesas(request):
     recent_orders = []
 
     if tables_ready:
-        table_queryset = (
-            Table.objects.filter(company=user_company)
-            .select_related('waiter')
-            .prefetch_related(
-                Prefetch(
-                    'orders',
-                    queryset=TableOrder.objects.filter(company=user_company)
-                    .order_by('-opened_at')
-                    .select_related('waiter')
-                    .prefetch_related('items__product'),
-                )
-            )
-        )
-        tables = list(table_queryset)
-
-        for table in tables:
-            table.open_order = next(
-                (order for order in table.orders.all()
-                 if order.status == TableOrder.Status.OPEN),
-                None,
-            )
-            if table.open_order:
-                open_orders.append(table.open_order)
-            table.recent_orders = [
-                order for order in table.orders.all() if order.status != TableOrder.Status.OPEN
-            ][:3]
-
+        tables = floor_tables(user_company)
+        open_orders = [table.open_order for table in tables if table.open_order]
         open_orders.sort(key=lambda order: order.opened_at)
 
         recent_orders = list(
@@ -134,6 +115,28 @@ def mesas(request):
     return render(request, 'tables/mesas.html', context)
 
 
+@login_required
+def mesas_estado(request):
+    """Estado compacto do salão para os tablets dos garçons (consulta periódica)."""
+    user_company = get_user_company(request)
+    if not user_company:
+        return JsonResponse(
+            {'status': 'failed',
+             'msg': 'Usuário não está associado a nenhuma empresa.'}
+        )
+    if not table_models_ready():
+        return JsonResponse({'status': 'failed', 'msg': 'Mesas indisponíveis.'})
+
+    state, etag = get_floor_state(user_company)
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse({'status': 'success', 'tables': state})
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 @login_required
 def salvar_mesa(request, table_id=None):
     user_company = get_user_company(request)
@@ -211,43 +214,18 @@ def mesa_detalhe(request, table_id):
         return guard
 
     table = get_object_or_404(
-        Table.objects.filter(company=user_company)
-        .select_related('waiter')
-        .prefetch_related(
-            Prefetch(
-                'orders',
-                queryset=TableOrder.objects.filter(company=user_company)
-                .prefetch_related(
-                    'items__product',
-                    Prefetch(
-                        'sales',
-                        queryset=Sales.objects.filter(
-                            company=user_company).order_by('-date_added'),
-                    ),
-                )
-                .order_by('-opened_at'),
-            )
-        ),
+        Table.objects.filter(company=user_company).select_related('waiter'),
         pk=table_id,
     )
 
-    cash_session_open = bool(get_open_cash_session(user_company))
-
-    open_order = next((order for order in table.orders.all()
-                      if order.status == TableOrder.Status.OPEN), None)
-    closed_orders = []
-    for order in table.orders.all():
-        if order.status == TableOrder.Status.OPEN:
-            continue
-
-        if hasattr(order, 'sales'):
-            order.latest_sale = next(iter(order.sales.all()), None)
-        else:
-            order.latest_sale = order.sales.order_by('-date_added').first()
+    # Abrir comanda exige algum caixa aberto; fechar exige o caixa deste
+    # terminal, que é onde fechar_comanda lança o pagamento.
+    can_open_new_order = bool(get_open_cash_session(user_company))
+    cash_session_open = bool(get_open_cash_session(
+        user_company, current_cash_register(request, user_company)))
 
-        closed_orders.append(order)
-
-    closed_orders = closed_orders[:10]
+    open_order = get_open_order(table)
+    closed_orders, has_more_history = closed_orders_page(table)
 
     if open_order:
         order_form = TableOrderForm(instance=open_order, company=user_company)
@@ -264,13 +242,66 @@ def mesa_detalhe(request, table_id):
         'item_form': TableOrderItemForm(company=user_company),
         'table_form': TableForm(instance=table, company=user_company),
         'closed_orders': closed_orders,
+        'has_more_history': has_more_history,
         'has_waiters': Garcom.objects.filter(company=user_company, is_active=True).exists(),
         'cash_session_open': cash_session_open,
-        'can_open_new_order': cash_session_open,
+        'can_open_new_order': can_open_new_order,
+        'prep_status_labels': dict(TableOrderItem.PrepStatus.choices),
     }
     return render(request, 'tables/mesa_detail.html', context)
 
 
+@login_required
+def mesa_historico(request, table_id):
+    """Próxima página do histórico de comandas (botão "Carregar mais")."""
+    user_company = get_user_company(request)
+    if not user_company:
+        return JsonResponse(
+            {'status': 'failed',
+             'msg': 'Usuário não está associado a nenhuma empresa.'}
+        )
+    if not table_models_ready():
+        return JsonResponse({'status': 'failed', 'msg': 'Mesas indisponíveis.'})
+
+    table = get_object_or_404(Table, pk=table_id, company=user_company)
+    before = None
+    before_id = request.GET.get('before', '').strip()
+    if before_id.isnumeric():
+        before = (
+            TableOrder.objects.filter(company=user_company, table=table, pk=int(before_id))
+            .only('id', 'opened_at')
+            .first()
+        )
+
+    orders, has_more = closed_orders_page(table, before=before)
+    html = render_to_string(
+        'tables/_closed_order.html',
+        {'closed_orders': orders},
+        request=request,
+    )
+    return JsonResponse(
+        {
+            'status': 'success',
+            'orders': [
+                {
+                    'id': order.id,
+                    'status': order.status,
+                    'total': float(order.total),
+                    'payment_method': order.payment_method,
+                    'waiter': order.waiter_name,
+                    'opened_at': order.opened_at,
+                    'closed_at': order.closed_at,
+                    'latest_sale_id': order.latest_sale_id,
+                }
+                for order in orders
+            ],
+            'html': html,
+            'has_more': has_more,
+            'next_before': orders[-1].id if orders else None,
+        }
+    )
+
+
 @login_required
 def abrir_comanda(request, table_id):
     user_company = get_user_company(request)
@@ -379,6 +410,13 @@ def fechar_comanda(request, order_id):
         messages.error(request, 'Método inválido para fechar comanda.')
         return redirect('mesa-detalhe', table_id=order.table_id)
 
+    # O pagamento entra no caixa do terminal que fecha a comanda.
+    cash_session = get_open_cash_session(
+        user_company, current_cash_register(request, user_company))
+    if not cash_session:
+        messages.error(request, 'Abra o caixa deste terminal para fechar a comanda.')
+        return redirect('mesa-detalhe', table_id=order.table_id)
+
     form = TableOrderCloseForm(request.POST, instance=order)
     if form.is_valid():
         order = form.save(commit=False)
@@ -411,6 +449,7 @@ def fechar_comanda(request, order_id):
                 change_total=change_total,
                 primary_method=primary_method,
                 user=request.user,
+                cash_session=cash_session,
             )
 
             table = order.table
@@ -447,7 +486,7 @@ def reabrir_comanda(request, order_id):
         messages.error(request, 'Método inválido para reabrir comanda.')
         return redirect('mesa-detalhe', table_id=order.table_id)
 
-    status, feedback = reopen_table_order(order, user_company)
+    status, feedback = reopen_table_order(order, user_company, request.user)
     if status == 'success':
         messages.success(request, feedback)
     elif status == 'info':
@@ -493,7 +532,7 @@ def reabrir_venda_mesa(request, sale_id):
             request, 'Esta venda não possui comanda vinculada para reabertura.')
         return redirect('sales-page')
 
-    status, feedback = reopen_table_order(order, user_company)
+    status, feedback = reopen_table_order(order, user_company, request.user)
     if status == 'success':
         messages.success(
             request, f'{feedback} A venda #{sale.code} foi revertida.')
@@ -591,6 +630,53 @@ def adicionar_item_comanda(request, order_id):
     return redirect('mesa-detalhe', table_id=order.table_id)
 
 
+@login_required
+def adicionar_itens_comanda(request, order_id):
+    """Lança uma rodada de itens (JSON) na comanda em uma única requisição."""
+    user_company = get_user_company(request)
+    if not user_company:
+        return JsonResponse(
+            {'status': 'failed',
+             'msg': 'Usuário não está associado a nenhuma empresa.'}
+        )
+    if request.method != 'POST':
+        return JsonResponse(
+            {'status': 'failed', 'msg': 'Método inválido para adicionar itens.'})
+    if not table_models_ready():
+        return JsonResponse({'status': 'failed', 'msg': 'Mesas indisponíveis.'})
+
+    order = TableOrder.objects.filter(pk=order_id, company=user_company).first()
+    if not order:
+        return JsonResponse(
+            {'status': 'failed', 'msg': 'Comanda não encontrada.'}, status=404)
+    if order.status != TableOrder.Status.OPEN:
+        return JsonResponse(
+            {'status': 'failed',
+             'msg': 'Não é possível alterar itens de uma comanda fechada.'}
+        )
+
+    try:
+        payload = json.loads(request.body.decode('utf-8'))
+        entries = payload.get('items')
+    except (AttributeError, TypeError, ValueError):
+        return JsonResponse({'status': 'failed', 'msg': 'Payload JSON inválido.'})
+
+    lines, errors = parse_item_entries(entries)
+    if not errors:
+        items, errors = add_items_to_order(order, lines)
+    if errors:
+        return JsonResponse(
+            {'status': 'failed', 'msg': 'Nenhum item foi adicionado.', 'errors': errors})
+
+    return JsonResponse(
+        {
+            'status': 'success',
+            'msg': f'{len(items)} ite{"m" if len(items) == 1 else "ns"} adicionado{"" if len(items) == 1 else "s"} à comanda.',
+            'order': order_summary(order, items),
+        }
+    )
+
+
 @login_required
 def atualizar_item_comanda(request, item_id):
     user_company = get_user_company(request)